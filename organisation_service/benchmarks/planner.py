@@ -0,0 +1,283 @@
+"""
+Сравнение планировщиков распределения отходов `/recycle/` на синтетических графах организаций и хранилищ.
+
+Графы строятся в памяти, без БД: равномерный (uniform), кластерный (clustered) и со степенным распределением
+связей (power_law), для разных наборов типов отходов и заполненности хранилищ. Для каждого планировщика
+выводится время и пиковая память на один вызов; результаты всех планировщиков сверяются с эталонным.
+
+Запуск из каталога organisation_service:
+
+    python -m benchmarks.planner --organisations 1000 --storages 500 --degree 50
+"""
+import argparse
+import math
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+from org_app.services.waste_distribution import PLANNERS, Plan, Planner
+
+REFERENCE_PLANNER = "by_waste_type"
+
+# Наборы типов отходов
+WASTE_MIXES: Dict[str, List[str]] = {
+    "one": ["Пластик"],
+    "three": ["Пластик", "Стекло", "Биоотходы"],
+    "many": ["Пластик", "Стекло", "Биоотходы", "Бумага", "Металл", "Текстиль", "Дерево", "Резина",
+             "Электроника", "Батарейки", "Масла", "Строительные"],
+}
+
+# Средняя заполненность хранилищ
+FILL_LEVELS: Dict[str, float] = {
+    "empty": 0.0,
+    "half": 0.5,
+    "full": 0.95,
+}
+
+
+@dataclass
+class Graph:
+    """
+    Данные для планирования в том виде, в котором их получает планировщик.
+
+    :param organisations: Отходы организаций {ID: {тип: [объём, максимум]}}
+    :param distances: Связанные хранилища организаций {ID: [(ID хранилища, расстояние)]} по возрастанию расстояния
+    :param storages: Вместимость хранилищ {ID: {тип: [занято, максимум]}}
+    """
+
+    organisations: Dict[int, Dict[str, List[int]]]
+    distances: Dict[int, List[Tuple[int, int]]]
+    storages: Dict[int, Dict[str, List[int]]]
+
+
+def random_capacity(rng: random.Random, waste_types: List[str], fill: float, storage: bool) -> Dict[str, List[int]]:
+    """
+    :param rng: Генератор случайных чисел
+    :param waste_types: Типы отходов
+    :param fill: Средняя заполненность хранилища
+    :param storage: Вместимость хранилища (иначе отходы организации)
+    :return: {тип: [объём/занято, максимум]} для случайного непустого набора типов
+    """
+
+    capacity = {}
+    for waste_type in rng.sample(waste_types, rng.randint(1, len(waste_types))):
+        if storage:
+            maximum = rng.randint(50, 500)
+            used = min(maximum, max(0, round(maximum * rng.uniform(fill - 0.05, fill + 0.05))))
+            capacity[waste_type] = [used, maximum]
+        else:
+            amount = rng.randint(1, 200)
+            capacity[waste_type] = [amount, amount]
+
+    return capacity
+
+
+def uniform_links(rng: random.Random, organisations: int, storages: int, degree: int,
+                  ) -> Dict[int, List[Tuple[int, int]]]:
+    """
+    Каждая организация связана с `degree` случайными хранилищами, расстояния распределены равномерно.
+    """
+
+    return {
+        org_id: [(storage_id, rng.randint(1, 1000)) for storage_id in rng.sample(range(1, storages + 1), degree)]
+        for org_id in range(1, organisations + 1)
+    }
+
+
+def clustered_links(rng: random.Random, organisations: int, storages: int, degree: int,
+                    ) -> Dict[int, List[Tuple[int, int]]]:
+    """
+    Организации и хранилища сгруппированы вокруг центров на плоскости: большая часть связей - с хранилищами
+    своего кластера, остальные - с далёкими. Расстояние - евклидово.
+    """
+
+    clusters = max(1, storages // 50)
+    centers = [(rng.uniform(0, 1000), rng.uniform(0, 1000)) for _ in range(clusters)]
+
+    def place(cluster: int) -> Tuple[float, float]:
+        x, y = centers[cluster]
+        return rng.gauss(x, 20), rng.gauss(y, 20)
+
+    storage_clusters = {storage_id: rng.randrange(clusters) for storage_id in range(1, storages + 1)}
+    storage_points = {storage_id: place(cluster) for storage_id, cluster in storage_clusters.items()}
+    members: Dict[int, List[int]] = {}
+    for storage_id, cluster in storage_clusters.items():
+        members.setdefault(cluster, []).append(storage_id)
+
+    links = {}
+    for org_id in range(1, organisations + 1):
+        cluster = rng.randrange(clusters)
+        point = place(cluster)
+        near = rng.sample(members.get(cluster, []), min(len(members.get(cluster, [])), degree * 4 // 5))
+        far = [storage_id for storage_id in rng.sample(range(1, storages + 1), degree) if storage_id not in near]
+        links[org_id] = [(storage_id, round(math.dist(point, storage_points[storage_id])) + 1)
+                         for storage_id in (near + far)[:degree]]
+
+    return links
+
+
+def power_law_links(rng: random.Random, organisations: int, storages: int, degree: int,
+                    ) -> Dict[int, List[Tuple[int, int]]]:
+    """
+    Степени связей распределены по степенному закону: немногие хранилища связаны почти со всеми организациями,
+    у немногих организаций связей во много раз больше средней `degree`.
+    """
+
+    weights = [1 / (rank + 1) ** 1.2 for rank in range(storages)]
+    storage_ids = list(range(1, storages + 1))
+    rng.shuffle(storage_ids)
+
+    links = {}
+    for org_id in range(1, organisations + 1):
+        org_degree = min(storages, max(1, round(degree * rng.paretovariate(2) / 2)))
+        linked = dict.fromkeys(rng.choices(storage_ids, weights, k=org_degree * 2))
+        links[org_id] = [(storage_id, rng.randint(1, 1000)) for storage_id in list(linked)[:org_degree]]
+
+    return links
+
+
+GENERATORS: Dict[str, Callable[[random.Random, int, int, int], Dict[int, List[Tuple[int, int]]]]] = {
+    "uniform": uniform_links,
+    "clustered": clustered_links,
+    "power_law": power_law_links,
+}
+
+
+def generate_graph(kind: str, organisations: int, storages: int, degree: int, waste_mix: str, fill: str,
+                   seed: int = 1) -> Graph:
+    """
+    :param kind: Вид графа: uniform, clustered, power_law
+    :param organisations: Количество организаций
+    :param storages: Количество хранилищ
+    :param degree: Среднее количество хранилищ, связанных с организацией
+    :param waste_mix: Набор типов отходов, см. `WASTE_MIXES`
+    :param fill: Заполненность хранилищ, см. `FILL_LEVELS`
+    :param seed: Зерно генератора: с одним зерном граф одинаковый
+    :return: Граф
+    """
+
+    rng = random.Random(seed)
+    waste_types = WASTE_MIXES[waste_mix]
+    degree = min(degree, storages)
+
+    links = GENERATORS[kind](rng, organisations, storages, degree)
+
+    return Graph(
+        organisations={org_id: random_capacity(rng, waste_types, 0, storage=False) for org_id in links},
+        # Так же, как `get_sorted_storage_distances`: по расстоянию, затем по порядку записи
+        distances={org_id: sorted(org_links, key=lambda link: link[1]) for org_id, org_links in links.items()},
+        storages={storage_id: random_capacity(rng, waste_types, FILL_LEVELS[fill], storage=True)
+                  for storage_id in range(1, storages + 1)},
+    )
+
+
+def plan_all(planner: Planner, graph: Graph) -> Dict[int, Plan]:
+    """
+    :param planner: Планировщик
+    :param graph: Граф
+    :return: Распределение для каждой организации
+    """
+
+    return {org_id: planner(capacity, graph.distances[org_id], graph.storages)
+            for org_id, capacity in graph.organisations.items()}
+
+
+def measure_time(planner: Planner, graph: Graph, repeat: int) -> float:
+    """
+    :param planner: Планировщик
+    :param graph: Граф
+    :param repeat: Количество повторов, берётся лучший
+    :return: Время на один вызов, с
+    """
+
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        plan_all(planner, graph)
+        best = min(best, time.perf_counter() - start)
+
+    return best / len(graph.organisations)
+
+
+def measure_memory(planner: Planner, graph: Graph) -> Tuple[float, int]:
+    """
+    :param planner: Планировщик
+    :param graph: Граф
+    :return: Средняя и максимальная пиковая память на один вызов, байт
+    """
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for org_id, capacity in graph.organisations.items():
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            result = planner(capacity, graph.distances[org_id], graph.storages)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            del result
+    finally:
+        tracemalloc.stop()
+
+    return sum(peaks) / len(peaks), max(peaks)
+
+
+def check_equivalence(graph: Graph, planners: Dict[str, Planner]) -> None:
+    """
+    Сверка результатов всех планировщиков с эталонным.
+
+    :param graph: Граф
+    :param planners: Планировщики
+    :raises AssertionError: результат планировщика отличается от эталонного
+    """
+
+    reference = plan_all(PLANNERS[REFERENCE_PLANNER], graph)
+    for name, planner in planners.items():
+        for org_id, plan in plan_all(planner, graph).items():
+            assert plan == reference[org_id], f"{name}: организация {org_id}: {plan} != {reference[org_id]}"
+
+
+def run(kind: str, waste_mix: str, fill: str, args: argparse.Namespace) -> None:
+    """
+    Замер всех планировщиков на одном графе.
+
+    :param kind: Вид графа
+    :param waste_mix: Набор типов отходов
+    :param fill: Заполненность хранилищ
+    :param args: Аргументы командной строки
+    :return: None
+    """
+
+    graph = generate_graph(kind, args.organisations, args.storages, args.degree, waste_mix, fill, args.seed)
+    check_equivalence(graph, PLANNERS)
+
+    baseline = None
+    for name, planner in PLANNERS.items():
+        elapsed = measure_time(planner, graph, args.repeat)
+        mean_memory, max_memory = measure_memory(planner, graph)
+        baseline = baseline or elapsed
+        print(f"{kind:<10} {waste_mix:<6} {fill:<6} {name:<14} {elapsed * 1e6:>9.1f} us/call "
+              f"x{baseline / elapsed:<5.2f} {mean_memory / 1024:>7.1f} KiB avg {max_memory / 1024:>7.1f} KiB max")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--organisations", type=int, default=1000)
+    parser.add_argument("--storages", type=int, default=500)
+    parser.add_argument("--degree", type=int, default=50, help="среднее количество хранилищ у организации")
+    parser.add_argument("--kinds", nargs="+", choices=list(GENERATORS), default=list(GENERATORS))
+    parser.add_argument("--mixes", nargs="+", choices=list(WASTE_MIXES), default=list(WASTE_MIXES))
+    parser.add_argument("--fills", nargs="+", choices=list(FILL_LEVELS), default=list(FILL_LEVELS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for kind in args.kinds:
+        for waste_mix in args.mixes:
+            for fill in args.fills:
+                run(kind, waste_mix, fill, args)
+
+
+if __name__ == "__main__":
+    main()
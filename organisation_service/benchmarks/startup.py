@@ -0,0 +1,139 @@
+"""
+Время старта сервиса: импорт приложения и время до первого ответа `/health/` новой реплики.
+
+Каждый замер выполняется в отдельном процессе интерпретатора, как при запуске реплики. Брокер по умолчанию
+недоступен: потребители подключаются к нему в фоне и не задерживают готовность.
+
+Запуск из каталога organisation_service:
+
+    python -m benchmarks.startup 10
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+APP_MODULE = "org_app.main"
+HEALTH_PATH = "/api/v1/organisation/health/"
+
+
+def measure_import() -> Tuple[float, Dict[str, float]]:
+    """
+    Импорт приложения в новом процессе с `-X importtime`.
+
+    :return: Время импорта приложения, с, и время импорта каждого пакета, с
+
+    Время пакета - сумма времени его импортов, выполненных не из этого же пакета, то есть вместе с зависимостями.
+    """
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {APP_MODULE}"],
+                            capture_output=True, text=True, check=True)
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        entries.append((len(name) - len(name.lstrip()), name.strip(), int(cumulative) / 1e6))
+
+    # Импорты выводятся после вложенных в них, в обратном порядке каждый модуль идёт раньше своих зависимостей
+    packages: Dict[str, float] = defaultdict(float)
+    parents: List[Tuple[int, str]] = []
+    for depth, name, cumulative in reversed(entries):
+        while parents and parents[-1][0] >= depth:
+            parents.pop()
+        package = name.split(".")[0]
+        if all(parent != package for _, parent in parents):
+            packages[package] += cumulative
+        parents.append((depth, package))
+
+    return packages[APP_MODULE.split(".")[0]], packages
+
+
+def measure_ready(env: Dict[str, str], timeout: float = 30) -> float:
+    """
+    Запуск uvicorn в новом процессе и ожидание первого ответа `/health/`.
+
+    :param env: Переменные окружения процесса
+    :param timeout: Максимальное время ожидания, с
+    :return: Время от запуска процесса до ответа, с
+    """
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    url = f"http://127.0.0.1:{port}{HEALTH_PATH}"
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", f"{APP_MODULE}:app", "--port", str(port)],
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.005)
+        raise TimeoutError(f"{url} did not answer in {timeout} s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run(count: int, rabbitmq_host: str) -> None:
+    """
+    Замер импорта и готовности `count` новых процессов.
+
+    :param count: Количество запусков
+    :param rabbitmq_host: Адрес RabbitMQ для потребителей запускаемых реплик
+    :return: None
+    """
+
+    imports: List[float] = []
+    packages: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(count):
+        total, by_package = measure_import()
+        imports.append(total)
+        for name, seconds in by_package.items():
+            packages[name].append(seconds)
+
+    print(f"import {APP_MODULE:<24} {statistics.median(imports) * 1000:>7.1f} ms (median)")
+    dependencies = [item for item in packages.items() if item[0] != APP_MODULE.split(".")[0]]
+    slowest = sorted(dependencies, key=lambda item: statistics.median(item[1]), reverse=True)[:10]
+    for name, seconds in slowest:
+        print(f"    {name:<27} {statistics.median(seconds) * 1000:>7.1f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite+aiosqlite:///{os.path.join(directory, 'startup.db')}",
+                   RABBITMQ_HOST=rabbitmq_host)
+        # Первый запуск создаёт схему, следующие только проверяют её (`init_db`)
+        first = measure_ready(env)
+        restarts = [measure_ready(env) for _ in range(count)]
+
+    print(f"{'ready, empty database':<31} {first * 1000:>7.1f} ms")
+    print(f"{'ready, restart':<31} {statistics.median(restarts) * 1000:>7.1f} ms (median)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("count", nargs="?", type=int, default=10)
+    parser.add_argument("--rabbitmq-host", default="127.0.0.1",
+                        help="Адрес RabbitMQ, по умолчанию недоступный локальный брокер")
+    args = parser.parse_args()
+
+    run(args.count, args.rabbitmq_host)
+
+
+if __name__ == "__main__":
+    main()
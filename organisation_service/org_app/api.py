@@ -1,126 +1,318 @@
-from typing import Sequence
-
-from fastapi import APIRouter, Depends
-from fastapi import HTTPException
-from fastapi.responses import JSONResponse
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from org_app.crud.organisation import (create_organisation as crud_create_organisation,
-                                       get_all_organisations as crud_get_all_organisations,
-                                       delete_organisation as crud_delete_organisation,
-                                       update_organisation_capacity as crud_update_organisation_capacity,
-                                       )
-from org_app.crud.storage import update_storage_copy_capacity as crud_update_storage_copy_capacity
-from org_app.events.producers.organisation import (send_organisation_created_event,
-                                                   send_organisation_delete_event,
-                                                   )
-from org_app.events.producers.storage import send_update_capacity_event
-from org_app.models.organisation import Organisation
-from org_app.schemas.organisation import OrganisationSchema, OrganisationCreateSchema
-from org_app.schemas.recycle import RecycleRequestSchema, RecycleResponseSchema
-from org_app.services.waste_distribution import find_nearest_storage
-from .database import get_db
-
-router = APIRouter()
-
-
-@router.get("/health/")
-async def health_check():
-    return {"status": "OK"}
-
-
-@router.post("/organisation/", response_model=OrganisationSchema)
-async def create_organisation(
-        org: OrganisationCreateSchema,
-        db: AsyncSession = Depends(get_db),
-) -> Organisation:
-    """
-    Создание новой организации.
-
-    :param org: данные для создания организации
-    :param db: сессия базы данных
-    :return: созданная организация
-    """
-
-    organisation = await crud_create_organisation(db, org)
-    send_organisation_created_event(organisation)
-
-    return organisation
-
-
-@router.get("/organisations/", response_model=list[OrganisationSchema])
-async def get_organisations(db: AsyncSession = Depends(get_db)) -> Sequence[Organisation]:
-    """
-    Получение списка всех организаций.
-
-    :param db: сессия базы данных
-    :return: список организаций
-    """
-
-    return await crud_get_all_organisations(db)
-
-
-@router.delete("/organisation/{organisation_id}/")
-async def delete_organisation(organisation_id: int, db: AsyncSession = Depends(get_db)) -> JSONResponse:
-    """
-    Удаление организации.
-
-    :param organisation_id: ID организации
-    :param db: сессия базы данных
-    :return: сообщение о том, что организация удалена
-    :raises HTTPException: если организации для удаления не найдены
-    """
-
-    organisation = await crud_delete_organisation(db, organisation_id)
-    if not organisation:
-        raise HTTPException(status_code=404, detail="Не найдено организации для удаления")
-
-    send_organisation_delete_event(organisation)
-
-    return JSONResponse(content={"message": "Организация успешно удалена"}, status_code=200)
-
-
-@router.post("/recycle/", response_model=RecycleResponseSchema)
-async def recycle(
-        recycle_request: RecycleRequestSchema,
-        db: AsyncSession = Depends(get_db),
-):
-    """
-    Запрос на утилизацию отходов.
-
-    :param recycle_request: запрос, содержащий ID организации и список типов отходов.
-    :param db: асинхронная сессия базы данных.
-    :return: словарь с хранилищами и количеством отходов для отправки, а также сообщение
-    """
-
-    org_id = recycle_request.organisation_id
-    organisation = await db.get(Organisation, org_id)
-
-    if not organisation:
-        raise HTTPException(status_code=404, detail=f"Организация с идентификатором {org_id} не найдена")
-
-    if organisation.is_all_waste_processed():
-        return RecycleResponseSchema(waste_distribution={}, message="Все отходы уже были успешно переработаны")
-
-    # Находим ближайшие доступные хранилища и определяем, куда можно поместить отходы
-    storage_plan, total_sent_waste, remaining_waste = await find_nearest_storage(db, org_id)
-
-    if not storage_plan:
-        raise HTTPException(status_code=404, detail="Нет доступных хранилищ для утилизации отходов")
-
-    await crud_update_organisation_capacity(db, recycle_request.organisation_id, total_sent_waste)
-
-    for storage_id in storage_plan:
-        updated_capacity = storage_plan[storage_id]
-        await crud_update_storage_copy_capacity(db, storage_id, updated_capacity)
-        send_update_capacity_event(storage_id, updated_capacity)
-
-    if remaining_waste:
-        return RecycleResponseSchema(
-            waste_distribution=storage_plan,
-            message=f"Отходы частично распределены. Не удалось отправить: {remaining_waste} из-за ограничений"
-        )
-    else:
-        return RecycleResponseSchema(waste_distribution=storage_plan,
-                                     message="Отходы были распределены по хранилищам"
-                                     )
+import os
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.crud.organisation import (create_organisation as crud_create_organisation,
+                                       create_organisations as crud_create_organisations,
+                                       get_all_organisations as crud_get_all_organisations,
+                                       get_all_organisation_rows as crud_get_all_organisation_rows,
+                                       delete_organisation as crud_delete_organisation,
+                                       update_organisation_capacity as crud_update_organisation_capacity,
+                                       get_organisation_snapshot as crud_get_organisation_snapshot,
+                                       )
+from org_app.crud.storage import update_storage_copy_capacity as crud_update_storage_copy_capacity
+from org_app.events.producers.organisation import (send_organisation_created_event,
+                                                   send_organisations_created_event,
+                                                   send_organisation_delete_event,
+                                                   )
+from org_app.events.producers.storage import send_update_capacity_event
+from org_app.metrics import RECYCLE_PLANNING_DURATION
+from org_app.profiling import (PROFILE_ID_HEADER, has_profile_token, list_profiles, load_profile, profile_request,
+                               profile_span, speedscope_to_folded,
+                               )
+from org_app.models.organisation import Organisation
+from org_app.reconcile import (SOURCE_TABLES, ReplicatedTable, get_bounds, get_range_checksums,
+                               get_range_rows)
+from org_app.schemas.organisation import OrganisationSchema, OrganisationCreateSchema
+from org_app.schemas.recycle import RecycleRequestSchema, RecycleResponseSchema
+from org_app.serialization import FAST_JSON, FastJSONResponse
+from org_app.services.waste_distribution import find_nearest_storage
+from org_app.tracing import start_span
+from .database import get_db
+
+# Максимальное количество записей в одном запросе на массовое создание
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "50000"))
+
+router = APIRouter()
+
+
+@router.get("/health/")
+async def health_check():
+    return {"status": "OK"}
+
+
+@router.post("/organisation/", response_model=OrganisationSchema)
+async def create_organisation(
+        org: OrganisationCreateSchema,
+        db: AsyncSession = Depends(get_db),
+) -> Organisation:
+    """
+    Создание новой организации.
+
+    :param org: данные для создания организации
+    :param db: сессия базы данных
+    :return: созданная организация
+    """
+
+    organisation = await crud_create_organisation(db, org, commit=False)
+    send_organisation_created_event(db, organisation)
+    await db.commit()
+
+    return organisation
+
+
+@router.post("/organisations/bulk/", response_model=list[OrganisationSchema])
+async def create_organisations(
+        orgs: List[OrganisationCreateSchema],
+        db: AsyncSession = Depends(get_db),
+) -> List[Organisation]:
+    """
+    Массовое создание организаций.
+
+    :param orgs: данные для создания организаций
+    :param db: сессия базы данных
+    :return: созданные организации
+    :raises HTTPException: если записей больше `BULK_MAX_ITEMS`
+
+    Организации создаются одним запросом к базе данных, отправляется одно пакетное событие `organisation_created`.
+    """
+
+    if len(orgs) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413,
+                            detail=f"Слишком много записей в запросе: {len(orgs)}, максимум {BULK_MAX_ITEMS}",
+                            )
+
+    organisations = await crud_create_organisations(db, orgs, commit=False)
+    if organisations:
+        send_organisations_created_event(db, organisations)
+        await db.commit()
+
+    return organisations
+
+
+@router.get("/organisations/", response_model=list[OrganisationSchema])
+async def get_organisations(db: AsyncSession = Depends(get_db)) -> Union[Sequence[Organisation], FastJSONResponse]:
+    """
+    Получение списка всех организаций.
+
+    :param db: сессия базы данных
+    :return: список организаций
+
+    При `FAST_JSON` строки из БД сериализуются напрямую, без ORM-объектов и валидации через `response_model`.
+    """
+
+    if FAST_JSON:
+        return FastJSONResponse(await crud_get_all_organisation_rows(db))
+
+    return await crud_get_all_organisations(db)
+
+
+@router.delete("/organisation/{organisation_id}/")
+async def delete_organisation(organisation_id: int, db: AsyncSession = Depends(get_db)) -> JSONResponse:
+    """
+    Удаление организации.
+
+    :param organisation_id: ID организации
+    :param db: сессия базы данных
+    :return: сообщение о том, что организация удалена
+    :raises HTTPException: если организации для удаления не найдены
+    """
+
+    organisation = await crud_delete_organisation(db, organisation_id, commit=False)
+    if not organisation:
+        raise HTTPException(status_code=404, detail="Не найдено организации для удаления")
+
+    send_organisation_delete_event(db, organisation)
+    await db.commit()
+
+    return JSONResponse(content={"message": "Организация успешно удалена"}, status_code=200)
+
+
+def get_source_table(table: str) -> ReplicatedTable:
+    """
+    :param table: Имя таблицы в API сверки
+    :return: Таблица
+    :raises HTTPException: если таблица не сверяется
+    """
+
+    if table not in SOURCE_TABLES:
+        raise HTTPException(status_code=404, detail=f"Таблица {table} не сверяется")
+
+    return SOURCE_TABLES[table]
+
+
+@router.get("/replication/{table}/bounds/")
+async def get_replication_bounds(table: str, db: AsyncSession = Depends(get_db)) -> Dict[str, Optional[int]]:
+    """
+    :param table: Имя таблицы: organisations
+    :param db: Сессия базы данных
+    :return: Минимальный и максимальный ID таблицы
+
+    Начальный диапазон сверки копий в сервисе Хранилище (см. `org_app.reconcile`).
+    """
+
+    min_id, max_id = await get_bounds(db, get_source_table(table))
+
+    return {"min": min_id, "max": max_id}
+
+
+@router.get("/replication/{table}/checksums/")
+async def get_replication_checksums(table: str,
+                                    start: int,
+                                    end: int,
+                                    parts: int = Query(16, ge=1, le=1024),
+                                    db: AsyncSession = Depends(get_db),
+                                    ) -> List[Dict[str, int]]:
+    """
+    :param table: Имя таблицы: organisations
+    :param start: Начало диапазона ID (включительно)
+    :param end: Конец диапазона ID (не включительно)
+    :param parts: Количество частей диапазона
+    :param db: Сессия базы данных
+    :return: Количество строк и сумма их хешей для каждой части диапазона
+    """
+
+    return await get_range_checksums(db, get_source_table(table), start, end, parts)
+
+
+@router.get("/replication/{table}/rows/")
+async def get_replication_rows(table: str,
+                               start: int,
+                               end: int,
+                               db: AsyncSession = Depends(get_db),
+                               ) -> List[Dict[str, Any]]:
+    """
+    :param table: Имя таблицы: organisations
+    :param start: Начало диапазона ID (включительно)
+    :param end: Конец диапазона ID (не включительно)
+    :param db: Сессия базы данных
+    :return: Строки диапазона для восстановления копий
+    """
+
+    return await get_range_rows(db, get_source_table(table), start, end)
+
+
+@router.post("/recycle/", response_model=RecycleResponseSchema)
+async def recycle(
+        recycle_request: RecycleRequestSchema,
+        response: Response,
+        x_profile: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_db),
+):
+    """
+    Запрос на утилизацию отходов.
+
+    :param recycle_request: запрос, содержащий ID организации и список типов отходов.
+    :param response: ответ, в заголовок `X-Profile-Id` которого записывается идентификатор профиля
+    :param x_profile: заголовок `X-Profile`: при совпадении с `PROFILE_TOKEN` запрос профилируется
+    :param db: асинхронная сессия базы данных.
+    :return: словарь с хранилищами и количеством отходов для отправки, а также сообщение
+    """
+
+    with profile_request(f"recycle organisation={recycle_request.organisation_id}", x_profile) as profile:
+        if profile is not None:
+            response.headers[PROFILE_ID_HEADER] = profile.id
+
+        return await recycle_waste(recycle_request, db)
+
+
+async def recycle_waste(recycle_request: RecycleRequestSchema, db: AsyncSession) -> RecycleResponseSchema:
+    """
+    Распределение отходов организации по ближайшим хранилищам.
+
+    :param recycle_request: запрос, содержащий ID организации и список типов отходов.
+    :param db: асинхронная сессия базы данных.
+    :return: словарь с хранилищами и количеством отходов для отправки, а также сообщение
+    :raises HTTPException: если организация не найдена или нет доступных хранилищ
+    """
+
+    org_id = recycle_request.organisation_id
+    organisation = await crud_get_organisation_snapshot(db, org_id)
+
+    if not organisation:
+        raise HTTPException(status_code=404, detail=f"Организация с идентификатором {org_id} не найдена")
+
+    if organisation.is_all_waste_processed():
+        return RecycleResponseSchema(waste_distribution={}, message="Все отходы уже были успешно переработаны")
+
+    # Находим ближайшие доступные хранилища и определяем, куда можно поместить отходы
+    with RECYCLE_PLANNING_DURATION.time(), profile_span("planning"), start_span("find_nearest_storage"):
+        storage_plan, total_sent_waste, remaining_waste = await find_nearest_storage(db, org_id)
+
+    if not storage_plan:
+        raise HTTPException(status_code=404, detail="Нет доступных хранилищ для утилизации отходов")
+
+    # Изменения и события об обновлении хранилищ фиксируются одной транзакцией
+    await crud_update_organisation_capacity(db, recycle_request.organisation_id, total_sent_waste, commit=False)
+
+    for storage_id in storage_plan:
+        updated_capacity = storage_plan[storage_id]
+        await crud_update_storage_copy_capacity(db, storage_id, updated_capacity, commit=False)
+        with profile_span("publish"):
+            send_update_capacity_event(db, storage_id, updated_capacity)
+
+    # События записываются в outbox при фиксации транзакции и публикуются ретранслятором вне запроса
+    with profile_span("commit"):
+        await db.commit()
+
+    if remaining_waste:
+        return RecycleResponseSchema(
+            waste_distribution=storage_plan,
+            message=f"Отходы частично распределены. Не удалось отправить: {remaining_waste} из-за ограничений"
+        )
+    else:
+        return RecycleResponseSchema(waste_distribution=storage_plan,
+                                     message="Отходы были распределены по хранилищам"
+                                     )
+
+
+def require_profile_token(x_profile: Optional[str] = Header(None)) -> None:
+    """
+    Доступ к сохранённым профилям: в них стеки и SQL-запросы сервиса, поэтому они отдаются только
+    с заголовком `X-Profile`, совпадающим с `PROFILE_TOKEN`.
+
+    :param x_profile: заголовок `X-Profile`
+    :return: None
+    :raises HTTPException: 404, если заголовок не совпадает с `PROFILE_TOKEN` или `PROFILE_TOKEN` не задан
+    """
+
+    if not has_profile_token(x_profile):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("/profiles/", dependencies=[Depends(require_profile_token)])
+async def get_profiles() -> List[Dict[str, Any]]:
+    """
+    Сохранённые профили `/recycle/`. Доступны только с заголовком `X-Profile: <PROFILE_TOKEN>`.
+
+    :return: Сводки профилей, новые первыми: длительность и суммарное время по спанам (db, planning, publish, commit)
+    """
+
+    return list_profiles()
+
+
+@router.get("/profiles/{profile_id}/", dependencies=[Depends(require_profile_token)])
+async def get_profile(profile_id: str, format: str = Query("speedscope", pattern="^(speedscope|folded)$")) -> Response:
+    """
+    Скачивание профиля.
+
+    :param profile_id: Идентификатор профиля (заголовок `X-Profile-Id` ответа `/recycle/`)
+    :param format: speedscope - файл для https://www.speedscope.app, folded - стеки для flamegraph.pl
+    :return: Файл профиля
+    :raises HTTPException: если профиль не найден или заголовок `X-Profile` не совпадает с `PROFILE_TOKEN`
+    """
+
+    document = load_profile(profile_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Профиль не найден")
+
+    if format == "folded":
+        return PlainTextResponse(speedscope_to_folded(document),
+                                 headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'})
+
+    return JSONResponse(document,
+                        headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'})
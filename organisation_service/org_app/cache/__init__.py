@@ -0,0 +1,94 @@
+import os
+from threading import Thread
+from typing import Hashable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import CacheBackend
+from .memory import TTLCache
+
+# memory - кеш в памяти процесса, redis - общий для всех реплик кеш в Redis
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "10000"))
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Время жизни записей локального кеша перед Redis, 0 - без локального кеша
+CACHE_LOCAL_TTL = float(os.getenv("CACHE_LOCAL_TTL", "1"))
+
+_caches: dict[str, CacheBackend] = {}
+
+
+def create_cache(namespace: str) -> CacheBackend:
+    """
+    Создание кеша согласно настройке `CACHE_BACKEND`.
+
+    :param namespace: Пространство имён кеша
+    :return: Кеш
+    """
+
+    if CACHE_BACKEND == "redis":
+        import redis
+
+        from .redis_backend import RedisCache
+
+        local = TTLCache(max_size=CACHE_MAX_SIZE, ttl=CACHE_LOCAL_TTL) if CACHE_LOCAL_TTL > 0 else None
+        cache = RedisCache(redis.Redis.from_url(REDIS_URL), namespace, ttl=CACHE_TTL, local=local)
+    else:
+        cache = TTLCache(max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL)
+
+    _caches[namespace] = cache
+
+    return cache
+
+
+def invalidate_after_commit(db: AsyncSession, cache: CacheBackend, key: Optional[Hashable] = None) -> None:
+    """
+    Сброс записи кеша после фиксации текущей транзакции сессии.
+
+    :param db: Асинхронная сессия базы данных
+    :param cache: Кеш
+    :param key: Ключ записи или None, чтобы очистить весь кеш
+    :return: None
+
+    Если сбросить запись до фиксации, параллельный запрос успеет прочитать из БД старые данные и снова их закешировать.
+    """
+
+    def invalidate(session) -> None:
+        if key is None:
+            cache.clear()
+        else:
+            cache.delete(key)
+
+    event.listen(db.sync_session, "after_commit", invalidate, once=True)
+
+
+def start_cache_invalidation_listener() -> None:
+    """
+    Запуск подписки на оповещения об инвалидации от других реплик в отдельном потоке.
+
+    :return: None
+
+    Нужна только для Redis с локальным кешем: без него все реплики и так читают одни и те же данные.
+    """
+
+    if CACHE_BACKEND != "redis" or CACHE_LOCAL_TTL <= 0:
+        return
+
+    import redis
+
+    from .redis_backend import InvalidationListener
+
+    listener = InvalidationListener(redis.Redis.from_url(REDIS_URL), _caches)
+    Thread(target=listener.run, daemon=True).start()
+
+
+# Снимки организаций (`OrganisationSchema`) по ID организации
+organisation_cache = create_cache("organisation")
+
+# Снимки копий хранилищ (`StorageCopySchema`) по ID хранилища
+storage_copy_cache = create_cache("storage_copy")
+
+# Отсортированные по расстоянию пары [ID хранилища, расстояние] по ID организации
+storage_distances_cache = create_cache("storage_distances")
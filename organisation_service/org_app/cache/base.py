@@ -0,0 +1,83 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+
+class CacheBackend(ABC):
+    """
+    Интерфейс кеша снимков.
+
+    Значения должны быть JSON-совместимыми (словари, списки, числа, строки): так их можно хранить
+    как в памяти процесса, так и во внешнем хранилище. Вызывающая сторона не должна изменять
+    полученные значения.
+
+    :param generation: Счётчик инвалидаций. Значение, прочитанное из БД до инвалидации, не должно
+    попасть в кеш после неё (см. `set`).
+    """
+
+    generation: int = 0
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Возвращает значение из кеша.
+
+        :param key: Ключ записи
+        :return: Значение или None, если записи нет или она устарела
+        """
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """
+        Возвращает несколько значений из кеша.
+
+        :param keys: Ключи записей
+        :return: Словарь найденных записей {ключ: значение}
+        """
+
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+
+        return values
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """
+        Сохраняет значение в кеш.
+
+        :param key: Ключ записи
+        :param value: Значение
+        :param generation: Значение `generation`, полученное до чтения данных из БД. Если с тех пор была
+        инвалидация, значение могло устареть и не сохраняется.
+        :return: None
+        """
+
+    def set_many(self, values: Dict[Hashable, Any], generation: Optional[int] = None) -> None:
+        """
+        Сохраняет несколько значений в кеш.
+
+        :param values: Словарь {ключ: значение}
+        :param generation: См. `set`
+        :return: None
+        """
+
+        for key, value in values.items():
+            self.set(key, value, generation)
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None:
+        """
+        Удаляет запись из кеша.
+
+        :param key: Ключ записи
+        :return: None
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Очищает кеш.
+
+        :return: None
+        """
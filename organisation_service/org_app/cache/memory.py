@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Optional
+
+from .base import CacheBackend
+
+
+class TTLCache(CacheBackend):
+    """
+    Потокобезопасный LRU-кеш в памяти процесса с ограничением времени жизни записей.
+
+    :param max_size: Максимальное количество записей, при превышении вытесняются давно не использованные
+    :param ttl: Время жизни записи в секундах
+
+    Кеш используется и обработчиками запросов, и потоками-потребителями событий, поэтому все операции
+    выполняются под блокировкой.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Возвращает значение из кеша.
+
+        :param key: Ключ записи
+        :return: Значение или None, если записи нет или она устарела
+        """
+
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """
+        Сохраняет значение в кеш.
+
+        :param key: Ключ записи
+        :param value: Значение
+        :param generation: Значение `generation`, полученное до чтения данных из БД. Если с тех пор была
+        инвалидация, значение могло устареть и не сохраняется.
+        :return: None
+        """
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Удаляет запись из кеша.
+
+        :param key: Ключ записи
+        :return: None
+        """
+
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Очищает кеш.
+
+        :return: None
+        """
+
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
@@ -0,0 +1,224 @@
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+import redis
+
+from .base import CacheBackend
+from .memory import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Канал, через который реплики оповещают друг друга об инвалидации
+INVALIDATION_CHANNEL = "org_app:cache:invalidation"
+
+# Идентификатор процесса: собственные оповещения при получении пропускаются
+INSTANCE_ID = uuid.uuid4().hex
+
+
+class RedisCache(CacheBackend):
+    """
+    Кеш, общий для всех реплик сервиса, поверх Redis (или совместимого по протоколу хранилища).
+
+    :param client: Клиент Redis
+    :param namespace: Пространство имён - префикс ключей и имя кеша в оповещениях об инвалидации
+    :param ttl: Время жизни записи в Redis, с
+    :param local: Необязательный локальный кеш первого уровня. Его записи живут недолго и сбрасываются
+    по оповещениям других реплик (см. `InvalidationListener`).
+    :param instance_id: Идентификатор реплики в оповещениях об инвалидации
+
+    Ошибки Redis не прерывают обработку запроса: чтение считается промахом, запись пропускается.
+
+    Счётчик инвалидаций (`generation`) хранится в Redis и общий для всех реплик: `delete` и `clear` увеличивают
+    его (`INCR`) в одной транзакции с удалением записей, а `set_many` с `generation` записывает значения
+    только если счётчик не изменился (`WATCH`/`MULTI`). Так значение, прочитанное из БД до инвалидации
+    на любой реплике, не попадёт в общий кеш после неё.
+    """
+
+    def __init__(self,
+                 client: redis.Redis,
+                 namespace: str,
+                 ttl: float,
+                 local: Optional[TTLCache] = None,
+                 instance_id: str = INSTANCE_ID,
+                 ) -> None:
+        self.client = client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = local
+        self.instance_id = instance_id
+
+    @property
+    def generation(self) -> int:
+        try:
+            return int(self.client.get(self._generation_key()) or 0)
+        except redis.RedisError as exc:
+            logger.warning("Redis cache generation read failed: %s", exc)
+            # Такое значение счётчик не принимает никогда: запись с ним будет пропущена
+            return -1
+
+    def _key(self, key: Hashable) -> str:
+        return f"org_app:cache:{self.namespace}:{key}"
+
+    def _generation_key(self) -> str:
+        # Вне префикса записей, чтобы `clear` не удалял счётчик
+        return f"org_app:cache-generation:{self.namespace}"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        values = {}
+        missing = []
+
+        for key in keys:
+            value = self.local.get(key) if self.local is not None else None
+            if value is not None:
+                values[key] = value
+            else:
+                missing.append(key)
+
+        if not missing:
+            return values
+
+        try:
+            raw_values = self.client.mget([self._key(key) for key in missing])
+        except redis.RedisError as exc:
+            logger.warning("Redis cache read failed: %s", exc)
+            return values
+
+        for key, raw in zip(missing, raw_values):
+            if raw is None:
+                continue
+            value = json.loads(raw)
+            values[key] = value
+            if self.local is not None:
+                self.local.set(key, value)
+
+        return values
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        self.set_many({key: value}, generation)
+
+    def set_many(self, values: Dict[Hashable, Any], generation: Optional[int] = None) -> None:
+        if generation is not None and generation < 0:
+            return
+
+        local_generation = self.local.generation if self.local is not None else None
+        try:
+            with self.client.pipeline(transaction=True) as pipeline:
+                if generation is not None:
+                    pipeline.watch(self._generation_key())
+                    if int(pipeline.get(self._generation_key()) or 0) != generation:
+                        return
+                    pipeline.multi()
+                for key, value in values.items():
+                    pipeline.set(self._key(key), json.dumps(value, ensure_ascii=False), px=int(self.ttl * 1000))
+                pipeline.execute()
+        except redis.WatchError:
+            # Между чтением из БД и записью другая реплика инвалидировала кеш: значение могло устареть
+            return
+        except redis.RedisError as exc:
+            logger.warning("Redis cache write failed: %s", exc)
+            return
+
+        if self.local is not None:
+            self.local.set_many(values, local_generation)
+
+    def delete(self, key: Hashable) -> None:
+        if self.local is not None:
+            self.local.delete(key)
+
+        try:
+            with self.client.pipeline(transaction=True) as pipeline:
+                pipeline.incr(self._generation_key())
+                pipeline.delete(self._key(key))
+                pipeline.execute()
+            self._broadcast(key)
+        except redis.RedisError as exc:
+            logger.warning("Redis cache invalidation failed: %s", exc)
+
+    def clear(self) -> None:
+        if self.local is not None:
+            self.local.clear()
+
+        try:
+            # Сначала счётчик: записи, начатые до него, либо отменятся, либо попадут в удаляемые ключи
+            self.client.incr(self._generation_key())
+            keys = list(self.client.scan_iter(match=self._key("*"), count=1000))
+            if keys:
+                self.client.delete(*keys)
+            self._broadcast(None)
+        except redis.RedisError as exc:
+            logger.warning("Redis cache invalidation failed: %s", exc)
+
+    def _broadcast(self, key: Optional[Hashable]) -> None:
+        """
+        Оповещает остальные реплики об инвалидации.
+
+        :param key: Ключ записи или None, если очищен весь кеш
+        :return: None
+        """
+
+        if self.local is None:
+            return
+
+        message = {"origin": self.instance_id, "namespace": self.namespace, "key": key}
+        self.client.publish(INVALIDATION_CHANNEL, json.dumps(message))
+
+
+class InvalidationListener:
+    """
+    Подписчик на оповещения об инвалидации от других реплик: сбрасывает записи локальных кешей.
+
+    :param client: Клиент Redis
+    :param caches: Кеши процесса, по пространству имён
+    :param instance_id: Идентификатор реплики: собственные оповещения пропускаются
+    """
+
+    def __init__(self, client: redis.Redis, caches: Dict[str, RedisCache], instance_id: str = INSTANCE_ID) -> None:
+        self.caches = caches
+        self.instance_id = instance_id
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(INVALIDATION_CHANNEL)
+
+    def poll(self, timeout: float = 1.0) -> None:
+        """
+        Обрабатывает одно оповещение, если оно пришло за `timeout` секунд.
+
+        :param timeout: Время ожидания оповещения, с
+        :return: None
+        """
+
+        message = self._pubsub.get_message(timeout=timeout)
+        if not message:
+            return
+
+        data = json.loads(message["data"])
+        if data["origin"] == self.instance_id:
+            return
+
+        cache = self.caches.get(data["namespace"])
+        if cache is None or cache.local is None:
+            return
+
+        if data["key"] is None:
+            cache.local.clear()
+        else:
+            cache.local.delete(data["key"])
+
+    def run(self) -> None:
+        """
+        Обрабатывает оповещения, пока жив процесс. Запускается в отдельном потоке.
+
+        :return: None
+        """
+
+        while True:
+            try:
+                self.poll()
+            except redis.RedisError as exc:
+                logger.warning("Redis invalidation listener error: %s", exc)
+                time.sleep(1)
@@ -0,0 +1,19 @@
+from typing import Iterator, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# Количество значений в одном `IN (...)`, чтобы не упереться в ограничение SQLite на число параметров запроса
+IN_CHUNK_SIZE = 500
+
+
+def chunks(items: Sequence[T], size: int = IN_CHUNK_SIZE) -> Iterator[Sequence[T]]:
+    """
+    Разбиение последовательности на части.
+
+    :param items: Последовательность
+    :param size: Максимальный размер части
+    :return: Итератор по частям
+    """
+
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
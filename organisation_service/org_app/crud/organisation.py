@@ -1,122 +1,248 @@
-from typing import Sequence, Union
-
-from fastapi import HTTPException
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm.attributes import flag_modified
-
-from org_app.models.organisation import Organisation
-from org_app.schemas.organisation import OrganisationCreateSchema
-
-
-async def create_organisation(db: AsyncSession, org: OrganisationCreateSchema) -> Organisation:
-    """
-    Создание новой организации в базе данных.
-
-    :param db: асинхронная сессия базы данных
-    :param org: данные для создания организации
-    :return: созданная организация
-    """
-
-    # Проверяем, существует ли организация с таким именем
-    existing_org = await db.execute(select(Organisation).where(Organisation.name == org.name))
-    if existing_org.scalars().first():
-        raise HTTPException(
-            status_code=400,
-            detail=f"Организация с именем {org.name} уже существует",
-        )
-
-    # Проверяем, чтобы количество отходов не превышало вместимость
-    for waste_type, values in org.capacity.items():
-        if values[0] > values[1]:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Переполнение для отхода {waste_type}: {values[0]} превышает вместимость {values[1]}"
-            )
-
-    db_org = Organisation(name=org.name, capacity=org.capacity)
-    db.add(db_org)
-    await db.commit()
-    await db.refresh(db_org)
-
-    return db_org
-
-
-async def get_all_organisations(db: AsyncSession) -> Sequence[Organisation]:
-    """
-    Получение всех организаций из базы данных.
-
-    :param db: асинхронная сессия базы данных
-    :return: список организаций
-    """
-
-    result = await db.execute(select(Organisation))
-
-    return result.scalars().all()
-
-
-async def get_organisation(db: AsyncSession, organisation_id: int) -> Organisation:
-    """
-    Возвращает организацию по её ID.
-
-    :param db: Асинхронная сессия базы данных
-    :param organisation_id: Идентификатор организации
-    :return: Организация или None, если организация не найдена
-    """
-
-    result = await db.execute(select(Organisation).where(Organisation.id == organisation_id))
-
-    return result.scalar_one_or_none()
-
-
-async def update_organisation_capacity(db: AsyncSession,
-                                       organisation_id: int,
-                                       waste_data: dict,
-                                       ) -> Union[Organisation, None]:
-    """
-    Обновляем информацию об организации
-
-    :param db: Асинхронная сессия базы данных
-    :param organisation_id: Идентификатор организации
-    :param waste_data: Словарь отходов, которые удалось утилизировать - {"Пластик": 10, "Биоотходы": 50}
-    :return: Обновленную организацию
-    """
-
-    result = await db.execute(select(Organisation).filter_by(id=organisation_id))
-    organisation = result.scalars().first()
-
-    if organisation:
-        # Обновляем capacity в организации для каждого типа отходов
-        for waste_type, amount in waste_data.items():
-            # Обновляем текущий объем отходов
-            organisation.capacity[waste_type][0] -= amount
-
-        flag_modified(organisation, 'capacity')
-        db.add(organisation)
-        await db.commit()
-
-        return organisation
-    else:
-        return None
-
-
-async def delete_organisation(db: AsyncSession, organisation_id: int) -> Union[Organisation, None]:
-    """
-    Удаление организации из базы данных по ID.
-
-    :param db: асинхронная сессия базы данных
-    :param organisation_id: Идентификатор организации
-    :return: удаленная организация
-    """
-
-    # Получаем все организации
-    result = await db.execute(select(Organisation).filter_by(id=organisation_id))
-    organisation = result.scalars().first()
-
-    if not organisation:
-        return None
-
-    await db.delete(organisation)
-    await db.commit()
-
-    return organisation
+from collections import Counter
+from typing import Any, Dict, List, Sequence, Union
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
+
+from org_app.cache import invalidate_after_commit, organisation_cache, storage_distances_cache
+from org_app.crud import chunks
+from org_app.models.organisation import Organisation
+from org_app.schemas.organisation import OrganisationCreateSchema, OrganisationSchema
+
+
+def validate_capacity(capacity: Dict[str, list]) -> None:
+    """
+    Проверка, что количество отходов не превышает вместимость.
+
+    :param capacity: ёмкости организации по типам отходов
+    :return: None
+    :raises HTTPException: если количество отходов превышает вместимость
+    """
+
+    for waste_type, values in capacity.items():
+        if values[0] > values[1]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Переполнение для отхода {waste_type}: {values[0]} превышает вместимость {values[1]}"
+            )
+
+
+async def create_organisation(db: AsyncSession, org: OrganisationCreateSchema, commit: bool = True) -> Organisation:
+    """
+    Создание новой организации в базе данных.
+
+    :param db: асинхронная сессия базы данных
+    :param org: данные для создания организации
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: созданная организация
+    """
+
+    # Проверяем, существует ли организация с таким именем
+    existing_org = await db.execute(select(Organisation).where(Organisation.name == org.name))
+    if existing_org.scalars().first():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Организация с именем {org.name} уже существует",
+        )
+
+    validate_capacity(org.capacity)
+
+    db_org = Organisation(name=org.name, capacity=org.capacity, latitude=org.latitude, longitude=org.longitude)
+    db.add(db_org)
+    if commit:
+        await db.commit()
+        await db.refresh(db_org)
+    else:
+        await db.flush()
+
+    return db_org
+
+
+async def create_organisations(db: AsyncSession,
+                               orgs: List[OrganisationCreateSchema],
+                               commit: bool = True,
+                               ) -> List[Organisation]:
+    """
+    Создание нескольких организаций одним запросом к базе данных.
+
+    :param db: асинхронная сессия базы данных
+    :param orgs: данные для создания организаций
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: созданные организации в порядке входных данных
+
+    Проверки выполняются для всей пачки сразу: если хотя бы одна организация не проходит проверку,
+    не создается ни одна.
+    """
+
+    if not orgs:
+        return []
+
+    names = [org.name for org in orgs]
+    duplicates = sorted(name for name, count in Counter(names).items() if count > 1)
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Имена организаций повторяются: {', '.join(duplicates)}")
+
+    for org in orgs:
+        validate_capacity(org.capacity)
+
+    existing = []
+    for names_chunk in chunks(names):
+        result = await db.execute(select(Organisation.name).where(Organisation.name.in_(names_chunk)))
+        existing.extend(result.scalars().all())
+    if existing:
+        raise HTTPException(status_code=400,
+                            detail=f"Организации с именами {', '.join(sorted(existing))} уже существуют",
+                            )
+
+    result = await db.scalars(
+        insert(Organisation).returning(Organisation, sort_by_parameter_order=True),
+        [org.model_dump() for org in orgs],
+    )
+    db_orgs = list(result.all())
+
+    if commit:
+        await db.commit()
+    else:
+        await db.flush()
+
+    return db_orgs
+
+
+async def get_all_organisations(db: AsyncSession) -> Sequence[Organisation]:
+    """
+    Получение всех организаций из базы данных.
+
+    :param db: асинхронная сессия базы данных
+    :return: список организаций
+    """
+
+    result = await db.execute(select(Organisation).where(Organisation.deleted.is_(False)))
+
+    return result.scalars().all()
+
+
+async def get_all_organisation_rows(db: AsyncSession) -> List[Dict[str, Any]]:
+    """
+    Получение всех организаций в виде словарей, без создания ORM-объектов.
+
+    :param db: асинхронная сессия базы данных
+    :return: список организаций в формате `OrganisationSchema`
+    """
+
+    result = await db.execute(select(Organisation.name, Organisation.capacity, Organisation.latitude,
+                                     Organisation.longitude, Organisation.id).where(Organisation.deleted.is_(False)))
+
+    return [dict(row) for row in result.mappings()]
+
+
+async def get_organisation(db: AsyncSession, organisation_id: int) -> Organisation:
+    """
+    Возвращает организацию по её ID.
+
+    :param db: Асинхронная сессия базы данных
+    :param organisation_id: Идентификатор организации
+    :return: Организация или None, если организация не найдена
+    """
+
+    result = await db.execute(select(Organisation).where(Organisation.id == organisation_id,
+                                                         Organisation.deleted.is_(False)))
+
+    return result.scalar_one_or_none()
+
+
+async def get_organisation_snapshot(db: AsyncSession, organisation_id: int) -> Union[OrganisationSchema, None]:
+    """
+    Возвращает снимок организации, при возможности - из кеша.
+
+    :param db: Асинхронная сессия базы данных
+    :param organisation_id: Идентификатор организации
+    :return: Снимок организации (только для чтения) или None, если организация не найдена
+    """
+
+    cached = organisation_cache.get(organisation_id)
+    if cached is not None:
+        return OrganisationSchema.model_validate(cached)
+
+    generation = organisation_cache.generation
+    organisation = await get_organisation(db, organisation_id)
+    if not organisation:
+        return None
+
+    snapshot = OrganisationSchema.model_validate(organisation)
+    organisation_cache.set(organisation_id, snapshot.model_dump(), generation)
+
+    return snapshot
+
+
+async def update_organisation_capacity(db: AsyncSession,
+                                       organisation_id: int,
+                                       waste_data: dict,
+                                       commit: bool = True,
+                                       ) -> Union[Organisation, None]:
+    """
+    Обновляем информацию об организации
+
+    :param db: Асинхронная сессия базы данных
+    :param organisation_id: Идентификатор организации
+    :param waste_data: Словарь отходов, которые удалось утилизировать - {"Пластик": 10, "Биоотходы": 50}
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: Обновленную организацию
+    """
+
+    result = await db.execute(select(Organisation).filter_by(id=organisation_id, deleted=False))
+    organisation = result.scalars().first()
+
+    if organisation:
+        # Обновляем capacity в организации для каждого типа отходов
+        for waste_type, amount in waste_data.items():
+            # Обновляем текущий объем отходов
+            organisation.capacity[waste_type][0] -= amount
+
+        flag_modified(organisation, 'capacity')
+        db.add(organisation)
+        invalidate_after_commit(db, organisation_cache, organisation_id)
+        if commit:
+            await db.commit()
+        else:
+            await db.flush()
+
+        return organisation
+    else:
+        return None
+
+
+async def delete_organisation(db: AsyncSession, organisation_id: int, commit: bool = True) -> Union[Organisation, None]:
+    """
+    Удаление организации из базы данных по ID.
+
+    :param db: асинхронная сессия базы данных
+    :param organisation_id: Идентификатор организации
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: удаленная организация
+
+    Организация только помечается удалённой (tombstone) и освобождает имя. Копии расстояний до неё не загружаются
+    в память: их пачками удаляет фоновый процесс (`org_app.tombstones`), а затем и саму организацию.
+    """
+
+    result = await db.execute(select(Organisation).filter_by(id=organisation_id, deleted=False))
+    organisation = result.scalars().first()
+
+    if not organisation:
+        return None
+
+    organisation.deleted = True
+    organisation.name = None
+    invalidate_after_commit(db, organisation_cache, organisation_id)
+    invalidate_after_commit(db, storage_distances_cache, organisation_id)
+    if commit:
+        await db.commit()
+    else:
+        await db.flush()
+
+    return organisation
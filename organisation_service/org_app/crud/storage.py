@@ -1,88 +1,308 @@
-from typing import Union
-
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm.attributes import flag_modified
-
-from org_app.models.storage import StorageCopy
-from org_app.schemas.storage import StorageCopySchema
-
-
-async def create_storage_copy(db: AsyncSession, storage: StorageCopySchema) -> StorageCopy:
-    """
-    Создание копии хранилища.
-
-    :param db: асинхронная сессия базы данных
-    :param storage: данные для создания хранилища
-    :return: созданная копия хранилища
-    """
-
-    db_storage_copy = StorageCopy(id=storage.id, capacity=storage.capacity)
-    db.add(db_storage_copy)
-    await db.commit()
-    await db.refresh(db_storage_copy)
-
-    return db_storage_copy
-
-
-async def get_storage_copy(db: AsyncSession, storage_id: int) -> StorageCopy:
-    """
-    Возвращает копию хранилища по ID.
-
-    :param db: Асинхронная сессия базы данных
-    :param storage_id: Идентификатор хранилища
-    :return: Копия хранилища или None, если копия не найдена
-    """
-
-    result = await db.execute(select(StorageCopy).where(StorageCopy.id == storage_id))
-
-    return result.scalars().first()
-
-
-async def delete_storage(db: AsyncSession, storage_id: int) -> Union[StorageCopy, None]:
-    """
-    Удаление хранилища из БД.
-
-    :param db: асинхронная сессия базы данных
-    :param storage_id: Идентификатор хранилища
-    :return: список удаленных организаций
-    """
-
-    result = await db.execute(select(StorageCopy).filter_by(id=storage_id))
-    storage = result.scalars().first()
-
-    if not storage:
-        return None
-
-    await db.delete(storage)
-    await db.commit()
-
-    return storage
-
-
-async def update_storage_copy_capacity(db: AsyncSession, storage_id: int, waste_data: dict) -> Union[StorageCopy, None]:
-    """
-    Обновляем информацию о хранилище
-
-    :param db: Асинхронная сессия базы данных
-    :param storage_id: Идентификатор хранилища
-    :param waste_data: Словарь отходов, которые помещены в данное хранилище - {"Пластик": 10, "Биоотходы": 50}
-    :return: Обновленное хранилище
-    """
-
-    result = await db.execute(select(StorageCopy).filter_by(id=storage_id))
-    storage = result.scalars().first()
-
-    if storage:
-        # Обновляем capacity для каждого типа отходов
-        for waste_type, amount in waste_data.items():
-            # Обновляем текущий объем отходов
-            storage.capacity[waste_type][0] += amount
-
-        flag_modified(storage, 'capacity')
-        db.add(storage)
-        await db.commit()
-
-        return storage
-    else:
-        return None
+import os
+import time
+from typing import Collection, Dict, Iterable, List, Set, Tuple, Union
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
+
+from org_app.cache import invalidate_after_commit, storage_copy_cache, storage_distances_cache
+from org_app.crud import chunks
+from org_app.models.outbox import OutboxEvent
+from org_app.models.storage import StorageCopy
+from org_app.schemas.storage import StorageCopySchema
+from org_app.schemas.storage_change import StorageChangeSchema
+from org_app.services.spatial_index import storage_location_index
+
+# Сколько опубликованное событие `update_capacity` считается ещё не обработанным сервисом Хранилище, с.
+# Если за это время счётчик применённых изменений в ленте не догнал отправленные, событие считается потерянным
+CAPACITY_UPDATE_TIMEOUT = float(os.getenv("CAPACITY_UPDATE_TIMEOUT", "300"))
+
+
+async def create_storage_copy(db: AsyncSession, storage: StorageCopySchema) -> StorageCopy:
+    """
+    Создание копии хранилища.
+
+    :param db: асинхронная сессия базы данных
+    :param storage: данные для создания хранилища
+    :return: созданная копия хранилища
+    """
+
+    db_storage_copy = StorageCopy(id=storage.id, capacity=storage.capacity, version=storage.version,
+                                  latitude=storage.latitude, longitude=storage.longitude)
+    db.add(db_storage_copy)
+    await db.commit()
+    await db.refresh(db_storage_copy)
+    storage_copy_cache.delete(storage.id)
+    storage_location_index.invalidate()
+
+    return db_storage_copy
+
+
+async def create_storage_copies(db: AsyncSession, storages: List[StorageCopySchema]) -> None:
+    """
+    Создание копий нескольких хранилищ одним запросом.
+
+    :param db: асинхронная сессия базы данных
+    :param storages: данные для создания хранилищ
+    :return: None
+
+    Копии, которые уже созданы синхронизацией (`apply_storage_changes`), пропускаются.
+    """
+
+    existing_ids = await _get_storage_copy_versions(db, [storage.id for storage in storages])
+    storages = [storage for storage in storages if storage.id not in existing_ids]
+    if not storages:
+        return
+
+    await db.execute(insert(StorageCopy), [storage.model_dump() for storage in storages])
+    for storage in storages:
+        invalidate_after_commit(db, storage_copy_cache, storage.id)
+    storage_location_index.invalidate_after_commit(db)
+    await db.commit()
+
+
+async def _get_storage_copy_versions(db: AsyncSession,
+                                     storage_ids: List[int],
+                                     ) -> Dict[int, Tuple[int, int, Union[float, None], dict]]:
+    """
+    :param db: Асинхронная сессия базы данных
+    :param storage_ids: Идентификаторы хранилищ
+    :return: Словарь {ID хранилища: (версия, количество отправленных изменений вместимости, время последнего из них,
+    вместимость)} для существующих копий
+    """
+
+    versions = {}
+    for ids_chunk in chunks(storage_ids):
+        result = await db.execute(select(StorageCopy.id, StorageCopy.version, StorageCopy.capacity_updates,
+                                         StorageCopy.capacity_updated_at, StorageCopy.capacity)
+                                  .where(StorageCopy.id.in_(ids_chunk)))
+        versions.update((storage_id, tuple(values)) for storage_id, *values in result.all())
+
+    return versions
+
+
+async def get_pending_capacity_updates(db: AsyncSession) -> Set[int]:
+    """
+    :param db: Асинхронная сессия базы данных
+    :return: ID хранилищ, изменения вместимости которых ещё не опубликованы из outbox
+    """
+
+    result = await db.execute(select(OutboxEvent.payload).where(OutboxEvent.queue == "update_capacity"))
+
+    return {payload["storage_id"] for payload in result.scalars()}
+
+
+async def apply_storage_changes(db: AsyncSession, changes: List[StorageChangeSchema]) -> int:
+    """
+    Применение изменений из ленты синхронизации сервиса Хранилище к копиям хранилищ.
+
+    :param db: Асинхронная сессия базы данных
+    :param changes: Изменения в порядке возрастания версии
+    :return: Количество созданных, изменённых и удалённых копий
+
+    Недостающие копии создаются, удалённые хранилища помечаются удалёнными, у остальных копий
+    вместимость обновляется, если версия изменения больше версии копии. Повторное применение тех же
+    изменений ничего не меняет. Транзакцию фиксирует вызывающая сторона.
+
+    Вместимость копии не обновляется, пока в изменении применено меньше изменений вместимости, чем отправлено
+    отсюда (`capacity_updates`), и эти изменения ещё в пути: событие `update_capacity` в outbox или опубликовано
+    меньше `CAPACITY_UPDATE_TIMEOUT` назад. Тогда копия новее полученной версии. Если событие потеряно
+    (отброшено потребителем после повторной ошибки, хранилище удалено), по истечении этого времени копия
+    перезаписывается изменением, а счётчик выравнивается по ленте: иначе он не догнал бы отправленные никогда.
+    Копия с разошедшимся счётчиком или вместимостью перезаписывается и при той же версии (восстановление сверкой).
+    """
+
+    # Для каждого хранилища нужна только последняя версия
+    latest = {change.storage_id: change for change in changes}
+    versions = await _get_storage_copy_versions(db, list(latest))
+    pending_ids = await get_pending_capacity_updates(db)
+    in_flight_since = time.time() - CAPACITY_UPDATE_TIMEOUT
+
+    created, updated, deleted_ids = [], [], []
+    for storage_id, change in latest.items():
+        if change.capacity is None:
+            if storage_id in versions:
+                deleted_ids.append(storage_id)
+            continue
+
+        if storage_id not in versions:
+            created.append({"id": storage_id, "capacity": change.capacity, "version": change.version,
+                            "latitude": change.latitude, "longitude": change.longitude,
+                            "capacity_updates": change.capacity_updates})
+            continue
+
+        version, capacity_updates, updated_at, capacity = versions[storage_id]
+        in_flight = change.capacity_updates < capacity_updates and (
+            storage_id in pending_ids or (updated_at is not None and updated_at > in_flight_since))
+        if in_flight or change.version < version:
+            continue
+
+        if change.version > version or (change.capacity_updates, change.capacity) != (capacity_updates, capacity):
+            updated.append({"id": storage_id, "capacity": change.capacity, "version": change.version,
+                            "capacity_updates": change.capacity_updates})
+
+    if created:
+        await db.execute(insert(StorageCopy), created)
+    if updated:
+        await db.execute(update(StorageCopy), updated)
+    # Удалённые хранилища только помечаются, копии расстояний до них удаляются в фоне (`org_app.tombstones`)
+    deleted = 0
+    for ids_chunk in chunks(deleted_ids):
+        result = await db.execute(update(StorageCopy)
+                                  .where(StorageCopy.id.in_(ids_chunk), StorageCopy.deleted.is_(False))
+                                  .values(deleted=True))
+        deleted += result.rowcount
+
+    for item in created + updated:
+        invalidate_after_commit(db, storage_copy_cache, item["id"])
+    for storage_id in deleted_ids:
+        invalidate_after_commit(db, storage_copy_cache, storage_id)
+    if deleted_ids:
+        invalidate_after_commit(db, storage_distances_cache)
+    if created or deleted_ids:
+        storage_location_index.invalidate_after_commit(db)
+
+    return len(created) + len(updated) + deleted
+
+
+async def get_storage_copy(db: AsyncSession, storage_id: int) -> StorageCopy:
+    """
+    Возвращает копию хранилища по ID.
+
+    :param db: Асинхронная сессия базы данных
+    :param storage_id: Идентификатор хранилища
+    :return: Копия хранилища или None, если копия не найдена
+    """
+
+    result = await db.execute(select(StorageCopy).where(StorageCopy.id == storage_id, StorageCopy.deleted.is_(False)))
+
+    return result.scalars().first()
+
+
+async def get_storage_copy_snapshots(db: AsyncSession, storage_ids: Iterable[int]) -> Dict[int, StorageCopySchema]:
+    """
+    Возвращает снимки копий хранилищ. Найденные в кеше берутся из него, остальные загружаются одним запросом.
+
+    :param db: Асинхронная сессия базы данных
+    :param storage_ids: Идентификаторы хранилищ
+    :return: Словарь {ID хранилища: снимок (только для чтения)}; отсутствующих в БД хранилищ в нём нет
+    """
+
+    storage_ids = list(dict.fromkeys(storage_ids))
+    snapshots = {
+        storage_id: StorageCopySchema.model_validate(cached)
+        for storage_id, cached in storage_copy_cache.get_many(storage_ids).items()
+    }
+    missing_ids = [storage_id for storage_id in storage_ids if storage_id not in snapshots]
+
+    if missing_ids:
+        generation = storage_copy_cache.generation
+        result = await db.execute(select(StorageCopy).where(StorageCopy.id.in_(missing_ids),
+                                                            StorageCopy.deleted.is_(False)))
+
+        loaded = {}
+        for storage_copy in result.scalars():
+            snapshots[storage_copy.id] = StorageCopySchema.model_validate(storage_copy)
+            loaded[storage_copy.id] = snapshots[storage_copy.id].model_dump()
+
+        storage_copy_cache.set_many(loaded, generation)
+
+    return snapshots
+
+
+async def delete_storage(db: AsyncSession, storage_id: int) -> Union[StorageCopy, None]:
+    """
+    Удаление хранилища из БД.
+
+    :param db: асинхронная сессия базы данных
+    :param storage_id: Идентификатор хранилища
+    :return: список удаленных организаций
+
+    Копия только помечается удалённой (tombstone), копии расстояний до неё удаляются в фоне (`org_app.tombstones`).
+    """
+
+    result = await db.execute(select(StorageCopy).filter_by(id=storage_id, deleted=False))
+    storage = result.scalars().first()
+
+    if not storage:
+        return None
+
+    storage.deleted = True
+    await db.commit()
+    storage_copy_cache.delete(storage_id)
+    # Вместе с хранилищем удалены его расстояния до всех организаций
+    storage_distances_cache.clear()
+    storage_location_index.invalidate()
+
+    return storage
+
+
+async def delete_storages(db: AsyncSession, storage_ids: Collection[int]) -> int:
+    """
+    Массовое удаление копий хранилищ.
+
+    :param db: асинхронная сессия базы данных
+    :param storage_ids: Идентификаторы хранилищ
+    :return: количество удалённых копий
+
+    Копии помечаются удалёнными запросами `UPDATE ... WHERE id IN (...)` по частям в одной транзакции,
+    копии расстояний до них удаляются в фоне, как и в `delete_storage`.
+    """
+
+    deleted = 0
+    for ids_chunk in chunks(list(storage_ids)):
+        result = await db.execute(update(StorageCopy)
+                                  .where(StorageCopy.id.in_(ids_chunk), StorageCopy.deleted.is_(False))
+                                  .values(deleted=True))
+        deleted += result.rowcount
+
+    await db.commit()
+    for storage_id in storage_ids:
+        storage_copy_cache.delete(storage_id)
+    if deleted:
+        storage_distances_cache.clear()
+        storage_location_index.invalidate()
+
+    return deleted
+
+
+async def update_storage_copy_capacity(db: AsyncSession,
+                                       storage_id: int,
+                                       waste_data: dict,
+                                       commit: bool = True,
+                                       ) -> Union[StorageCopy, None]:
+    """
+    Обновляем информацию о хранилище
+
+    :param db: Асинхронная сессия базы данных
+    :param storage_id: Идентификатор хранилища
+    :param waste_data: Словарь отходов, которые помещены в данное хранилище - {"Пластик": 10, "Биоотходы": 50}
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: Обновленное хранилище
+    """
+
+    result = await db.execute(select(StorageCopy).filter_by(id=storage_id, deleted=False))
+    storage = result.scalars().first()
+
+    if storage:
+        # Обновляем capacity для каждого типа отходов
+        for waste_type, amount in waste_data.items():
+            # Обновляем текущий объем отходов
+            storage.capacity[waste_type][0] += amount
+
+        flag_modified(storage, 'capacity')
+        # Изменение отправляется событием `update_capacity`, до его применения синхронизация не трогает вместимость
+        storage.capacity_updates += 1
+        storage.capacity_updated_at = time.time()
+        db.add(storage)
+        invalidate_after_commit(db, storage_copy_cache, storage_id)
+        if commit:
+            await db.commit()
+        else:
+            await db.flush()
+
+        return storage
+    else:
+        return None
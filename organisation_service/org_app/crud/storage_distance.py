@@ -1,54 +1,194 @@
-from typing import Union
-
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from org_app.models.storage_distance import StorageDistanceCopy
-from org_app.schemas.storage_distance import StorageDistanceCopySchema
-
-
-async def create_storage_distance_copy(
-        db: AsyncSession,
-        storage_distance: StorageDistanceCopySchema,
-) -> StorageDistanceCopy:
-    """
-    Создание копии записи о расстоянии между хранилищем и организацией.
-
-    :param db: асинхронная сессия базы данных
-    :param storage_distance: данные для создания `StorageDistanceCopy`
-    :return: созданная копия записи о расстоянии
-    """
-
-    db_storage_distance_copy = StorageDistanceCopy(
-        id=storage_distance.id,
-        storage_id=storage_distance.storage_id,
-        organisation_id=storage_distance.organisation_id,
-        distance=storage_distance.distance,
-    )
-
-    db.add(db_storage_distance_copy)
-    await db.commit()
-    await db.refresh(db_storage_distance_copy)
-
-    return db_storage_distance_copy
-
-
-async def delete_distance(db: AsyncSession, distance_id: int) -> Union[StorageDistanceCopy, None]:
-    """
-    Удаление `StorageDistance`.
-
-    :param db: асинхронная сессия базы данных
-    :param distance_id: Идентификатор хранилища
-    :return: удаленное расстояние
-    """
-
-    result = await db.execute(select(StorageDistanceCopy).filter_by(id=distance_id))
-    distance = result.scalars().first()
-
-    if not distance:
-        return None
-
-    await db.delete(distance)
-    await db.commit()
-
-    return distance
+from typing import Any, Collection, Dict, List, Tuple, Union
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.cache import invalidate_after_commit, storage_distances_cache
+from org_app.crud import chunks
+from org_app.models.organisation import Organisation
+from org_app.models.storage import StorageCopy
+from org_app.models.storage_distance import StorageDistanceCopy
+from org_app.schemas.storage_distance import StorageDistanceCopySchema
+
+
+async def create_storage_distance_copy(
+        db: AsyncSession,
+        storage_distance: StorageDistanceCopySchema,
+) -> StorageDistanceCopy:
+    """
+    Создание копии записи о расстоянии между хранилищем и организацией.
+
+    :param db: асинхронная сессия базы данных
+    :param storage_distance: данные для создания `StorageDistanceCopy`
+    :return: созданная копия записи о расстоянии
+    """
+
+    db_storage_distance_copy = StorageDistanceCopy(
+        id=storage_distance.id,
+        storage_id=storage_distance.storage_id,
+        organisation_id=storage_distance.organisation_id,
+        distance=storage_distance.distance,
+    )
+
+    db.add(db_storage_distance_copy)
+    await db.commit()
+    await db.refresh(db_storage_distance_copy)
+    storage_distances_cache.delete(storage_distance.organisation_id)
+
+    return db_storage_distance_copy
+
+
+async def create_storage_distance_copies(db: AsyncSession, storage_distances: List[StorageDistanceCopySchema]) -> None:
+    """
+    Создание копий нескольких записей о расстоянии одним запросом.
+
+    :param db: асинхронная сессия базы данных
+    :param storage_distances: данные для создания `StorageDistanceCopy`
+    :return: None
+
+    Копии, которые уже созданы снимком (`apply_storage_snapshot`) или сверкой, пропускаются, поэтому повторная
+    доставка события ничего не меняет.
+    """
+
+    existing_ids = set()
+    for ids_chunk in chunks([distance.id for distance in storage_distances]):
+        result = await db.execute(select(StorageDistanceCopy.id).where(StorageDistanceCopy.id.in_(ids_chunk)))
+        existing_ids.update(result.scalars())
+    storage_distances = [distance for distance in storage_distances if distance.id not in existing_ids]
+    if not storage_distances:
+        return
+
+    await db.execute(insert(StorageDistanceCopy), [distance.model_dump() for distance in storage_distances])
+    for organisation_id in {distance.organisation_id for distance in storage_distances}:
+        invalidate_after_commit(db, storage_distances_cache, organisation_id)
+    await db.commit()
+
+
+async def replace_storage_distance_copies(db: AsyncSession,
+                                          start: int,
+                                          end: int,
+                                          rows: List[Dict[str, Any]],
+                                          ) -> int:
+    """
+    Приведение копий расстояний с ID из диапазона [start, end) к расстояниям сервиса Хранилище.
+
+    :param db: асинхронная сессия базы данных
+    :param start: начало диапазона (включительно)
+    :param end: конец диапазона (не включительно)
+    :param rows: расстояния диапазона в сервисе Хранилище: {"id", "storage_id", "organisation_id", "distance"}
+    :return: количество удалённых и созданных копий
+
+    Лишние и изменившиеся копии удаляются, недостающие создаются, если копия хранилища и организация
+    уже есть. Транзакцию фиксирует вызывающая сторона.
+    """
+
+    remote = {row["id"]: (row["storage_id"], row["organisation_id"], row["distance"]) for row in rows}
+    result = await db.execute(
+        select(StorageDistanceCopy.id, StorageDistanceCopy.storage_id, StorageDistanceCopy.organisation_id,
+               StorageDistanceCopy.distance)
+        .where(StorageDistanceCopy.id >= start, StorageDistanceCopy.id < end)
+    )
+    local = {distance_id: tuple(values) for distance_id, *values in result.all()}
+
+    stale = [distance_id for distance_id, values in local.items() if remote.get(distance_id) != values]
+    missing = {distance_id: values for distance_id, values in remote.items() if local.get(distance_id) != values}
+
+    storage_ids, organisation_ids = set(), set()
+    for ids_chunk in chunks(list({values[0] for values in missing.values()})):
+        result = await db.execute(select(StorageCopy.id).where(StorageCopy.id.in_(ids_chunk),
+                                                               StorageCopy.deleted.is_(False)))
+        storage_ids.update(result.scalars())
+    for ids_chunk in chunks(list({values[1] for values in missing.values()})):
+        result = await db.execute(select(Organisation.id).where(Organisation.id.in_(ids_chunk),
+                                                                Organisation.deleted.is_(False)))
+        organisation_ids.update(result.scalars())
+
+    created = [
+        {"id": distance_id, "storage_id": storage_id, "organisation_id": organisation_id, "distance": distance}
+        for distance_id, (storage_id, organisation_id, distance) in missing.items()
+        if storage_id in storage_ids and organisation_id in organisation_ids
+    ]
+
+    for ids_chunk in chunks(stale):
+        await db.execute(delete(StorageDistanceCopy).where(StorageDistanceCopy.id.in_(ids_chunk)))
+    if created:
+        await db.execute(insert(StorageDistanceCopy), created)
+
+    affected = {local[distance_id][1] for distance_id in stale} | {item["organisation_id"] for item in created}
+    for organisation_id in affected:
+        invalidate_after_commit(db, storage_distances_cache, organisation_id)
+
+    return len(stale) + len(created)
+
+
+async def delete_distance(db: AsyncSession, distance_id: int) -> Union[StorageDistanceCopy, None]:
+    """
+    Удаление `StorageDistance`.
+
+    :param db: асинхронная сессия базы данных
+    :param distance_id: Идентификатор хранилища
+    :return: удаленное расстояние
+    """
+
+    result = await db.execute(select(StorageDistanceCopy).filter_by(id=distance_id))
+    distance = result.scalars().first()
+
+    if not distance:
+        return None
+
+    await db.delete(distance)
+    await db.commit()
+    storage_distances_cache.delete(distance.organisation_id)
+
+    return distance
+
+
+async def delete_distances(db: AsyncSession, distance_ids: Collection[int]) -> int:
+    """
+    Массовое удаление копий `StorageDistance`.
+
+    :param db: асинхронная сессия базы данных
+    :param distance_ids: Идентификаторы записей о расстоянии
+    :return: количество удалённых записей
+
+    Записи удаляются запросами `DELETE ... WHERE id IN (...)` по частям в одной транзакции, без загрузки
+    объектов в память. Из кеша удаляются расстояния только затронутых организаций.
+    """
+
+    organisation_ids = []
+    for ids_chunk in chunks(list(distance_ids)):
+        result = await db.execute(delete(StorageDistanceCopy)
+                                  .where(StorageDistanceCopy.id.in_(ids_chunk))
+                                  .returning(StorageDistanceCopy.organisation_id))
+        organisation_ids.extend(result.scalars())
+
+    await db.commit()
+    for organisation_id in set(organisation_ids):
+        storage_distances_cache.delete(organisation_id)
+
+    return len(organisation_ids)
+
+
+async def get_sorted_storage_distances(db: AsyncSession, organisation_id: int) -> List[Tuple[int, int]]:
+    """
+    Возвращает расстояния от организации до связанных с ней хранилищ, при возможности - из кеша.
+
+    :param db: асинхронная сессия базы данных
+    :param organisation_id: Идентификатор организации
+    :return: Список пар (ID хранилища, расстояние), отсортированный по возрастанию расстояния
+    """
+
+    cached = storage_distances_cache.get(organisation_id)
+    if cached is not None:
+        return [(storage_id, distance) for storage_id, distance in cached]
+
+    generation = storage_distances_cache.generation
+    result = await db.execute(
+        select(StorageDistanceCopy.storage_id, StorageDistanceCopy.distance)
+        .where(StorageDistanceCopy.organisation_id == organisation_id)
+        .order_by(StorageDistanceCopy.distance, StorageDistanceCopy.id)
+    )
+    distances = [(storage_id, distance) for storage_id, distance in result.all()]
+    storage_distances_cache.set(organisation_id, distances, generation)
+
+    return distances
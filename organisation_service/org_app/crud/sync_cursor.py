@@ -0,0 +1,28 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.models.sync_cursor import SyncCursor
+
+
+async def get_sync_cursor(db: AsyncSession, name: str) -> int:
+    """
+    :param db: Асинхронная сессия базы данных
+    :param name: Имя ленты
+    :return: Версия последнего применённого изменения, 0 - лента ещё не читалась
+    """
+
+    cursor = await db.get(SyncCursor, name)
+
+    return cursor.version if cursor else 0
+
+
+async def set_sync_cursor(db: AsyncSession, name: str, version: int) -> None:
+    """
+    Сохраняет позицию синхронизации. Транзакцию фиксирует вызывающая сторона вместе с применёнными изменениями.
+
+    :param db: Асинхронная сессия базы данных
+    :param name: Имя ленты
+    :param version: Версия последнего применённого изменения
+    :return: None
+    """
+
+    await db.merge(SyncCursor(name=name, version=version))
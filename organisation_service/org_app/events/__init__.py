@@ -1,3 +1,32 @@
-import os
-
-RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
+import os
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
+# Брокер событий: rabbitmq или memory (в памяти процесса, для тестов и бенчмарков без RabbitMQ)
+EVENT_BROKER = os.getenv("EVENT_BROKER", "rabbitmq")
+
+# Где работают потребители событий:
+# embedded - в каждом процессе сервиса (по умолчанию, один воркер uvicorn),
+# leader - только в одном воркере на хосте, выбранном через файловую блокировку,
+# dedicated - в отдельном процессе `python -m <app>.worker`, HTTP-воркеры события не слушают
+CONSUMER_MODE = os.getenv("CONSUMER_MODE", "embedded")
+# Количество потоков-потребителей на каждую очередь
+CONSUMER_CONCURRENCY = int(os.getenv("CONSUMER_CONCURRENCY", "1"))
+# Количество сообщений, которые брокер выдаёт потребителю до подтверждения обработки
+CONSUMER_PREFETCH = int(os.getenv("CONSUMER_PREFETCH", "10"))
+# Пауза перед повторным подключением потребителя к брокеру, удваивается после каждой неудачи до максимума, с
+CONSUMER_RECONNECT_DELAY = float(os.getenv("CONSUMER_RECONNECT_DELAY", "1"))
+CONSUMER_MAX_RECONNECT_DELAY = float(os.getenv("CONSUMER_MAX_RECONNECT_DELAY", "30"))
+# Файл блокировки для выбора лидера в режиме leader
+CONSUMER_LOCK_FILE = os.getenv("CONSUMER_LOCK_FILE", "/tmp/org_app_consumers.lock")
+
+# Кодирование тел событий: json или msgpack (компактный двоичный формат). Потребители принимают оба
+EVENT_CODEC = os.getenv("EVENT_CODEC", "json")
+
+# Ретранслятор outbox: размер пачки событий, интервал опроса таблицы и максимальная пауза между повторами, с
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "0.5"))
+OUTBOX_MAX_RETRY_DELAY = float(os.getenv("OUTBOX_MAX_RETRY_DELAY", "30"))
+
+# Сколько хранить идентификаторы обработанных событий для отбрасывания дубликатов и как часто удалять старые, с
+PROCESSED_EVENTS_RETENTION = float(os.getenv("PROCESSED_EVENTS_RETENTION", str(7 * 24 * 3600)))
+PROCESSED_EVENTS_PURGE_INTERVAL = float(os.getenv("PROCESSED_EVENTS_PURGE_INTERVAL", "3600"))
@@ -0,0 +1,275 @@
+import itertools
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Union
+
+from org_app.events import EVENT_BROKER, RABBITMQ_HOST
+
+if TYPE_CHECKING:
+    # pika импортируется при первом подключении, а не при старте процесса
+    import pika
+    from pika.spec import BasicProperties
+
+
+@dataclass
+class _Message:
+    queue: str
+    body: bytes
+    properties: "BasicProperties"
+    redelivered: bool = False
+
+
+class InMemoryBroker:
+    """
+    Брокер сообщений в памяти процесса вместо RabbitMQ: очереди по умолчанию (exchange "") с подтверждениями.
+
+    Сообщение очереди получает один из её потребителей. Неподтверждённое сообщение, для которого вызван
+    `basic_nack(requeue=True)` или канал которого закрыт, возвращается в начало очереди с `redelivered=True`.
+    Один экземпляр можно передать обоим сервисам (`set_broker`), чтобы события ходили между ними в одном процессе.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._queues: Dict[str, Deque[_Message]] = {}
+        self._unacked = 0
+        self._closed = False
+        self.published = 0
+        self.acked = 0
+
+    def declare(self, queue: str) -> None:
+        with self._condition:
+            self._queues.setdefault(queue, deque())
+
+    def publish(self, queue: str, body: bytes, properties: "BasicProperties") -> None:
+        with self._condition:
+            self._queues.setdefault(queue, deque()).append(_Message(queue, body, properties))
+            self.published += 1
+            self._condition.notify_all()
+
+    def get(self,
+            queues: List[str],
+            timeout: Optional[float] = None,
+            cancelled: Callable[[], bool] = lambda: False,
+            ) -> Optional[_Message]:
+        """
+        :param queues: Очереди потребителя
+        :param timeout: Время ожидания сообщения, с. None - ждать, пока брокер не закрыт
+        :param cancelled: Потребитель остановлен, проверяется при каждом пробуждении (см. `wake`)
+        :return: Первое сообщение из непустой очереди или None, если брокер закрыт, потребитель остановлен
+        или время вышло
+        """
+
+        with self._condition:
+            def ready() -> Optional[str]:
+                return next((queue for queue in queues if self._queues.get(queue)), None)
+
+            def stopped() -> bool:
+                return self._closed or cancelled()
+
+            if not self._condition.wait_for(lambda: stopped() or ready() is not None, timeout) or stopped():
+                return None
+
+            self._unacked += 1
+            return self._queues[ready()].popleft()
+
+    def settle(self, message: _Message, requeue: Optional[bool]) -> None:
+        """
+        :param message: Выданное потребителю сообщение
+        :param requeue: None - подтверждено, True - вернуть в очередь, False - отбросить
+        :return: None
+        """
+
+        with self._condition:
+            self._unacked -= 1
+            if requeue is None:
+                self.acked += 1
+            elif requeue:
+                message.redelivered = True
+                self._queues[message.queue].appendleft(message)
+            self._condition.notify_all()
+
+    def wake(self) -> None:
+        """
+        Пробуждение ожидающих потребителей, чтобы они проверили, не остановлены ли.
+
+        :return: None
+        """
+
+        with self._condition:
+            self._condition.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ожидание, пока все сообщения не будут обработаны.
+
+        :param timeout: Максимальное время ожидания, с
+        :return: True, если очереди пусты и нет неподтверждённых сообщений
+        """
+
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._unacked == 0 and not any(self._queues.values()), timeout,
+            )
+
+    def pending(self) -> Dict[str, int]:
+        """
+        :return: Количество сообщений в каждой очереди
+        """
+
+        with self._condition:
+            return {queue: len(messages) for queue, messages in self._queues.items()}
+
+    def close(self) -> None:
+        """
+        Остановка брокера: потребители выходят из `start_consuming`.
+
+        :return: None
+        """
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class InMemoryChannel:
+    """
+    Канал `InMemoryBroker` с методами `pika.adapters.blocking_connection.BlockingChannel`,
+    которые используют продюсеры и потребители.
+    """
+
+    def __init__(self, broker: InMemoryBroker) -> None:
+        self._broker = broker
+        self._consumers: Dict[str, Callable[..., None]] = {}
+        self._unacked: Dict[int, _Message] = {}
+        self._delivery_tags = itertools.count(1)
+        self._consuming = False
+
+    def confirm_delivery(self) -> None:
+        # Публикация в память подтверждена сразу
+        pass
+
+    def queue_declare(self, queue: str, **kwargs: Any) -> None:
+        self._broker.declare(queue)
+
+    def basic_qos(self, prefetch_count: int = 0, **kwargs: Any) -> None:
+        # Сообщения выдаются по одному: следующее - после возврата из обработчика
+        pass
+
+    def basic_publish(self, exchange: str, routing_key: str, body: bytes,
+                      properties: Optional["BasicProperties"] = None, mandatory: bool = False) -> None:
+        from pika.spec import BasicProperties
+
+        self._broker.publish(routing_key, body, properties or BasicProperties())
+
+    def basic_consume(self, queue: str, on_message_callback: Callable[..., None], **kwargs: Any) -> str:
+        self._consumers[queue] = on_message_callback
+        return f"ctag-{queue}"
+
+    def start_consuming(self) -> None:
+        """
+        Обработка сообщений в текущем потоке до `stop_consuming` или закрытия брокера.
+
+        :return: None
+        """
+
+        from pika.spec import Basic
+
+        self._consuming = True
+        while self._consuming:
+            message = self._broker.get(list(self._consumers), cancelled=lambda: not self._consuming)
+            if message is None:
+                return
+
+            delivery_tag = next(self._delivery_tags)
+            self._unacked[delivery_tag] = message
+            method = Basic.Deliver(consumer_tag=f"ctag-{message.queue}", delivery_tag=delivery_tag,
+                                   redelivered=message.redelivered, exchange="", routing_key=message.queue)
+            self._consumers[message.queue](self, method, message.properties, message.body)
+
+    def stop_consuming(self) -> None:
+        self._consuming = False
+        self._broker.wake()
+
+    def basic_ack(self, delivery_tag: int, multiple: bool = False) -> None:
+        self._broker.settle(self._unacked.pop(delivery_tag), requeue=None)
+
+    def basic_nack(self, delivery_tag: int, multiple: bool = False, requeue: bool = True) -> None:
+        self._broker.settle(self._unacked.pop(delivery_tag), requeue=requeue)
+
+    def close(self) -> None:
+        # Как в RabbitMQ: неподтверждённые сообщения закрытого канала возвращаются в очередь
+        for delivery_tag in list(self._unacked):
+            self.basic_nack(delivery_tag, requeue=True)
+
+
+class InMemoryConnection:
+    """
+    Подключение к `InMemoryBroker` с методами `pika.BlockingConnection`.
+    """
+
+    def __init__(self, broker: InMemoryBroker) -> None:
+        self._broker = broker
+        self._channels: List[InMemoryChannel] = []
+
+    def channel(self) -> InMemoryChannel:
+        channel = InMemoryChannel(self._broker)
+        self._channels.append(channel)
+        return channel
+
+    def add_callback_threadsafe(self, callback: Callable[[], None]) -> None:
+        # Каналы в памяти потокобезопасны: обработчик текущего сообщения дорабатывает, следующее не выдаётся
+        callback()
+
+    def close(self) -> None:
+        for channel in self._channels:
+            channel.close()
+
+
+def create_broker(name: str = EVENT_BROKER) -> Optional[InMemoryBroker]:
+    """
+    :param name: Значение `EVENT_BROKER`
+    :return: Брокер в памяти или None для RabbitMQ
+    """
+
+    if name == "rabbitmq":
+        return None
+    if name == "memory":
+        return InMemoryBroker()
+
+    raise ValueError(f"Unknown EVENT_BROKER: {name}")
+
+
+_broker: Optional[InMemoryBroker] = create_broker()
+
+
+def set_broker(broker: Optional[InMemoryBroker]) -> None:
+    """
+    Замена брокера для продюсеров и потребителей, подключающихся после вызова.
+
+    :param broker: Брокер в памяти или None, чтобы подключаться к RabbitMQ
+    :return: None
+    """
+
+    global _broker
+    _broker = broker
+
+
+def get_broker() -> Optional[InMemoryBroker]:
+    return _broker
+
+
+def connect() -> Union["pika.BlockingConnection", InMemoryConnection]:
+    """
+    Подключение к брокеру событий: RabbitMQ (`RABBITMQ_HOST`) или брокеру в памяти (`EVENT_BROKER=memory`).
+
+    :return: Подключение с интерфейсом `pika.BlockingConnection`
+    :raises pika.exceptions.AMQPError: если RabbitMQ недоступен
+    """
+
+    if _broker is not None:
+        return InMemoryConnection(_broker)
+
+    import pika
+
+    return pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
@@ -0,0 +1,156 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import msgpack
+
+from org_app.events import EVENT_CODEC
+from org_app.serialization import dumps
+
+# Версия конверта события. Потребитель отклоняет события более новой версии, чем поддерживает
+ENVELOPE_VERSION = 1
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+# Коды типов отходов для msgpack. Таблица общая для всех сервисов: новые типы добавляются только в конец.
+# Типы, которых нет в таблице, передаются строками
+WASTE_TYPES = ("Пластик", "Стекло", "Биоотходы")
+WASTE_TYPE_CODES = {waste_type: code for code, waste_type in enumerate(WASTE_TYPES)}
+
+# Поля событий, содержащие словари по типам отходов
+WASTE_FIELDS = ("capacity", "updated_capacity")
+
+
+def event_items(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Записи события.
+
+    :param data: Данные события
+    :return: Список записей пакетного события (`{"items": [...]}`) или список из одной записи для обычного события
+    """
+
+    return data["items"] if "items" in data else [data]
+
+
+def _intern_waste_types(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Замена типов отходов в ключах словарей `WASTE_FIELDS` на их коды.
+
+    :param data: Данные события
+    :return: Данные события с кодами вместо типов отходов
+    """
+
+    if "items" in data:
+        return {**data, "items": [_intern_waste_types(item) for item in data["items"]]}
+
+    data = dict(data)
+    for field in WASTE_FIELDS:
+        if isinstance(data.get(field), dict):
+            data[field] = {WASTE_TYPE_CODES.get(waste_type, waste_type): value
+                           for waste_type, value in data[field].items()}
+
+    return data
+
+
+def _waste_type(code: Any) -> Any:
+    """
+    Тип отходов по его коду.
+
+    :param code: Код типа отходов или сам тип, если он не входит в `WASTE_TYPES`
+    :return: Тип отходов
+    :raises ValueError: Неизвестный код, например, от сервиса с другим списком `WASTE_TYPES`
+    """
+
+    if not isinstance(code, int):
+        return code
+
+    if not 0 <= code < len(WASTE_TYPES):
+        raise ValueError(f"Unknown waste type code: {code}")
+
+    return WASTE_TYPES[code]
+
+
+def _restore_waste_types(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Обратная к `_intern_waste_types` замена кодов на типы отходов.
+
+    :param data: Данные события с кодами типов отходов
+    :return: Данные события
+    :raises ValueError: Код типа отходов не входит в `WASTE_TYPES`
+    """
+
+    if "items" in data:
+        data["items"] = [_restore_waste_types(item) for item in data["items"]]
+        return data
+
+    for field in WASTE_FIELDS:
+        if isinstance(data.get(field), dict):
+            data[field] = {_waste_type(code): value for code, value in data[field].items()}
+
+    return data
+
+
+def encode_event(event_type: str,
+                 data: Dict[str, Any],
+                 codec: Optional[str] = None,
+                 event_id: Optional[str] = None,
+                 timestamp: Optional[float] = None,
+                 ) -> Tuple[bytes, str]:
+    """
+    Упаковка данных события в конверт `{"v": версия, "id": идентификатор, "ts": время публикации,
+    "type": тип события, "data": данные}`.
+
+    :param event_type: Тип события (имя очереди)
+    :param data: Данные события
+    :param codec: Формат: json или msgpack, по умолчанию `EVENT_CODEC`
+    :param event_id: Идентификатор события для отбрасывания дубликатов потребителем
+    :param timestamp: Время публикации (Unix time, с), по нему потребитель считает задержку доставки
+    :return: Тело сообщения и его content type
+    """
+
+    codec = codec or EVENT_CODEC
+    envelope = {"v": ENVELOPE_VERSION, "type": event_type}
+    if event_id is not None:
+        envelope["id"] = event_id
+    if timestamp is not None:
+        envelope["ts"] = timestamp
+
+    if codec == "msgpack":
+        envelope["data"] = _intern_waste_types(data)
+        return msgpack.packb(envelope), MSGPACK_CONTENT_TYPE
+
+    if codec == "json":
+        envelope["data"] = data
+        return dumps(envelope), JSON_CONTENT_TYPE
+
+    raise ValueError(f"Unknown EVENT_CODEC: {codec}")
+
+
+def decode_event(body: bytes, content_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Распаковка тела сообщения в конверт события.
+
+    :param body: Тело сообщения
+    :param content_type: Content type сообщения. Без него тело считается JSON
+    :return: Конверт события, данные - в ключе `data`
+
+    Сообщения без конверта (JSON от сервисов предыдущих версий) возвращаются в конверте версии 0.
+    Версия конверта проверяется до разбора данных: событие неизвестной версии отклоняется с `ValueError`,
+    потребитель отклоняет его (nack) с повторной доставкой один раз, например реплике новой версии.
+    """
+
+    if content_type == MSGPACK_CONTENT_TYPE:
+        envelope = msgpack.unpackb(body, strict_map_key=False)
+    else:
+        envelope = json.loads(body)
+        if "v" not in envelope:
+            return {"v": 0, "type": None, "data": envelope}
+
+    version = envelope.get("v")
+    if not isinstance(version, int) or not 1 <= version <= ENVELOPE_VERSION:
+        raise ValueError(f"Unsupported event envelope version: {version}")
+
+    if content_type == MSGPACK_CONTENT_TYPE:
+        envelope["data"] = _restore_waste_types(envelope["data"])
+
+    return envelope
@@ -1,20 +1,123 @@
-from threading import Thread
-
-from .storage import listen_storage_created_event, listen_storage_deleted_event
-from .storage_distance import listen_storage_distance_created_event, listen_distance_deleted_event
-
-
-def start_listening_events() -> None:
-    """
-    Запуск прослушивания событий в отдельных потоках.
-
-    :return: None
-
-    Функция запускает прослушивание событий: о создании/удалении хранилища и о создании/удалении расстояния.
-    """
-
-    Thread(target=listen_storage_created_event, daemon=True).start()
-    Thread(target=listen_storage_deleted_event, daemon=True).start()
-
-    Thread(target=listen_storage_distance_created_event, daemon=True).start()
-    Thread(target=listen_distance_deleted_event, daemon=True).start()
+import asyncio
+import logging
+from functools import partial
+from threading import Thread
+from typing import List
+
+from org_app.database import AsyncSessionLocal
+from org_app.events import CONSUMER_CONCURRENCY, CONSUMER_LOCK_FILE, CONSUMER_MODE
+from org_app.events.leader import ConsumerLeaderLock
+from org_app.events.outbox import flush_outbox, start_outbox_relay
+from org_app.lifecycle import SHUTDOWN_TIMEOUT, join_threads, shutdown_event, start_thread
+from org_app.reconcile import start_reconciler
+from org_app.sync import start_storage_sync
+from org_app.tombstones import start_tombstone_purger
+from .delivery import keep_listening, stop_consumers
+
+logger = logging.getLogger(__name__)
+
+
+def start_listening_events(concurrency: int = CONSUMER_CONCURRENCY) -> List[Thread]:
+    """
+    Запуск прослушивания событий в отдельных потоках.
+
+    :param concurrency: Количество потоков (и подключений к RabbitMQ) на каждую очередь
+    :return: Запущенные потоки
+
+    Функция запускает прослушивание событий: о создании/удалении хранилища и о создании/удалении расстояния.
+    При `concurrency` > 1 сообщения одной очереди обрабатываются параллельно и могут применяться не по порядку.
+    Потоки подключаются к брокеру сами и переподключаются при его недоступности (`keep_listening`), поэтому
+    функция возвращается сразу. Модули потребителей импортируются здесь, а не при старте HTTP-процесса.
+    """
+
+    from .storage import listen_storage_created_event, listen_storage_deleted_event
+    from .storage_distance import listen_storage_distance_created_event, listen_distance_deleted_event
+
+    listeners = (
+        listen_storage_created_event,
+        listen_storage_deleted_event,
+        listen_storage_distance_created_event,
+        listen_distance_deleted_event,
+    )
+
+    return [start_thread(partial(keep_listening, listener)) for listener in listeners for _ in range(concurrency)]
+
+
+def start_listening_events_as_leader(lock_path: str = CONSUMER_LOCK_FILE) -> None:
+    """
+    Запуск прослушивания событий, как только процесс станет лидером среди воркеров.
+
+    :param lock_path: Путь к файлу блокировки, общему для всех воркеров на хосте
+    :return: None
+
+    Ожидание блокировки идёт в отдельном потоке и не задерживает старт HTTP-воркера. Если лидер завершится,
+    блокировку захватит один из оставшихся воркеров и начнёт потреблять события вместо него.
+    Ретранслятор outbox, синхронизация и сверка копий хранилищ и фоновое удаление (`start_tombstone_purger`)
+    также работают только в лидере.
+    """
+
+    lock = ConsumerLeaderLock(lock_path)
+
+    def wait_for_leadership() -> None:
+        lock.acquire(blocking=True)
+        if shutdown_event.is_set():
+            return
+        logger.info("Process became the event consumer leader, starting consumers")
+        start_listening_events()
+        start_outbox_relay()
+        start_storage_sync()
+        start_reconciler()
+        start_tombstone_purger()
+
+    Thread(target=wait_for_leadership, daemon=True).start()
+
+
+def start_event_consumers(mode: str = CONSUMER_MODE) -> None:
+    """
+    Запуск потребителей событий, ретранслятора outbox, синхронизации и сверки копий хранилищ в HTTP-процессе
+    согласно режиму развёртывания.
+
+    :param mode: Режим `CONSUMER_MODE`: embedded, leader или dedicated
+    :return: None
+    """
+
+    if mode == "embedded":
+        start_listening_events()
+        start_outbox_relay()
+        start_storage_sync()
+        start_reconciler()
+        start_tombstone_purger()
+    elif mode == "leader":
+        start_listening_events_as_leader()
+    elif mode == "dedicated":
+        logger.info("Event consumers run in a dedicated worker process, skipping")
+    else:
+        raise ValueError(f"Unknown CONSUMER_MODE: {mode}")
+
+
+async def stop_event_consumers(timeout: float = SHUTDOWN_TIMEOUT) -> None:
+    """
+    Плавная остановка фоновой работы процесса при завершении (rolling restart).
+
+    :param timeout: Максимальное время ожидания фоновых потоков, с
+    :return: None
+
+    1. Потребители перестают получать сообщения, обработчики текущих сообщений дорабатывают и подтверждают их.
+       Выданные брокером, но не обработанные сообщения возвращаются в очередь при закрытии подключения.
+    2. Ретранслятор outbox, синхронизация и сверка копий хранилищ и фоновое удаление завершают текущую итерацию.
+    3. Оставшиеся события outbox публикуются (`flush_outbox`).
+    """
+
+    shutdown_event.set()
+    stop_consumers()
+    if not await asyncio.to_thread(join_threads, timeout):
+        logger.warning("Background threads did not stop in %.0f s", timeout)
+
+    try:
+        async with AsyncSessionLocal() as db:
+            published = await flush_outbox(db)
+    except Exception as exc:
+        logger.warning("Outbox flush failed, events will be published after restart: %s", exc)
+    else:
+        if published:
+            logger.info("Outbox flushed on shutdown, %d events published", published)
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import random
+import time
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from org_app.database import AsyncSessionLocal
+from org_app.events import (CONSUMER_MAX_RECONNECT_DELAY, CONSUMER_RECONNECT_DELAY, PROCESSED_EVENTS_PURGE_INTERVAL,
+                            PROCESSED_EVENTS_RETENTION)
+from org_app.events.codec import decode_event
+from org_app.lifecycle import shutdown_event
+from org_app.metrics import EVENT_CONSUMER_LAG, EVENT_HANDLER_DURATION, EVENTS_CONSUMED
+from org_app.models.processed_event import ProcessedEvent
+from org_app.tracing import TRACEPARENT_HEADER, parse_traceparent, start_span
+
+if TYPE_CHECKING:
+    # pika импортируется при подключении к брокеру (`connect`), а не при старте процесса
+    from pika import BlockingConnection
+    from pika.channel import Channel
+    from pika.spec import Basic, BasicProperties
+
+logger = logging.getLogger(__name__)
+
+# Время последней очистки обработанных событий, общее для всех потоков-потребителей процесса
+_last_purge = 0.0
+
+# Подключения и каналы работающих потребителей процесса, чтобы остановить их при завершении работы
+_consumers: List[Tuple["BlockingConnection", "Channel"]] = []
+_consumers_lock = Lock()
+
+
+def consume(connection: "BlockingConnection", channel: "Channel") -> None:
+    """
+    Обработка сообщений канала до остановки потребителей (`stop_consumers`).
+
+    :param connection: Подключение к брокеру
+    :param channel: Канал с зарегистрированными потребителями (`basic_consume`)
+    :return: None
+
+    После остановки подключение закрывается: сообщения, выданные брокером, но ещё не обработанные,
+    возвращаются в очередь и достаются другому экземпляру сервиса.
+    """
+
+    with _consumers_lock:
+        if shutdown_event.is_set():
+            connection.close()
+            return
+        _consumers.append((connection, channel))
+
+    try:
+        channel.start_consuming()
+    finally:
+        with _consumers_lock:
+            _consumers.remove((connection, channel))
+
+    connection.close()
+
+
+def stop_consumers() -> None:
+    """
+    Остановка всех потребителей процесса после `shutdown_event`.
+
+    :return: None
+
+    Канал останавливается в потоке своего подключения (`add_callback_threadsafe`), поэтому обработчик текущего
+    сообщения доработает и подтвердит его, а следующее сообщение обрабатываться уже не будет.
+    """
+
+    with _consumers_lock:
+        for connection, channel in _consumers:
+            connection.add_callback_threadsafe(channel.stop_consuming)
+
+
+def keep_listening(listener: Callable[[], None],
+                   delay: float = CONSUMER_RECONNECT_DELAY,
+                   max_delay: float = CONSUMER_MAX_RECONNECT_DELAY,
+                   ) -> None:
+    """
+    Работа слушателя очереди с переподключением к брокеру до остановки процесса (`shutdown_event`).
+
+    :param listener: Слушатель очереди: подключается к брокеру и обрабатывает сообщения до остановки потребителей
+    :param delay: Пауза перед первой повторной попыткой, с
+    :param max_delay: Максимальная пауза между попытками, с
+    :return: None
+
+    Подключение к брокеру выполняется в потоке потребителя, поэтому старт процесса его не ждёт: HTTP-запросы
+    (в том числе `/health/`) обслуживаются сразу, даже если RabbitMQ ещё недоступен. Если брокер недоступен
+    или подключение оборвалось, попытка повторяется с экспоненциально растущей паузой и случайным разбросом,
+    чтобы одновременно запущенные реплики не переподключались в один момент.
+    """
+
+    attempt = 0
+    while not shutdown_event.is_set():
+        started = time.monotonic()
+        try:
+            listener()
+            return
+        except Exception as exc:
+            if time.monotonic() - started > max_delay:
+                # Подключение долго работало и оборвалось: переподключаемся без накопленной паузы
+                attempt = 0
+            pause = min(max_delay, delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            attempt += 1
+            logger.warning("Consumer %s failed (attempt %d): %s, reconnecting in %.1f s",
+                           listener.__name__, attempt, exc, pause)
+            shutdown_event.wait(pause)
+
+
+async def purge_processed_events(db: AsyncSession, retention: float = PROCESSED_EVENTS_RETENTION) -> int:
+    """
+    Удаление идентификаторов событий, обработанных раньше, чем `retention` секунд назад.
+
+    :param db: Асинхронная сессия базы данных
+    :param retention: Время хранения, с. Дубликаты старше этого срока не распознаются
+    :return: Количество удалённых записей
+    """
+
+    result = await db.execute(delete(ProcessedEvent).where(ProcessedEvent.processed_at < time.time() - retention))
+    await db.commit()
+
+    return result.rowcount
+
+
+async def process_event_once(event_id: Optional[str],
+                             handler: Callable[[AsyncSession], Awaitable[None]],
+                             session_factory: Optional[sessionmaker] = None,
+                             ) -> bool:
+    """
+    Обработка события, если событие с таким идентификатором ещё не обрабатывалось.
+
+    :param event_id: Идентификатор события или None для событий без конверта (обрабатываются всегда)
+    :param handler: Обработчик, получающий сессию базы данных
+    :param session_factory: Фабрика сессий базы данных, по умолчанию - `AsyncSessionLocal`
+    :return: True, если событие обработано, False - если это дубликат
+
+    Отметка об обработке фиксируется в той же транзакции, что и изменения обработчика. Если одно событие
+    одновременно обрабатывают два потребителя, транзакция второго откатится на уникальном ключе.
+    """
+
+    global _last_purge
+
+    async with (session_factory or AsyncSessionLocal)() as db:
+        if event_id is not None:
+            if await db.get(ProcessedEvent, event_id) is not None:
+                return False
+            db.add(ProcessedEvent(event_id=event_id))
+
+        try:
+            await handler(db)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            if event_id is not None and await db.get(ProcessedEvent, event_id) is not None:
+                return False
+            raise
+
+        if time.time() - _last_purge > PROCESSED_EVENTS_PURGE_INTERVAL:
+            _last_purge = time.time()
+            await purge_processed_events(db)
+
+    return True
+
+
+def handle_delivery(ch: "Channel",
+                    method: "Basic.Deliver",
+                    properties: "BasicProperties",
+                    body: bytes,
+                    handler: Callable[[AsyncSession, Dict[str, Any]], Awaitable[None]],
+                    ) -> None:
+    """
+    Обработка доставленного сообщения с подтверждением.
+
+    :param ch: Канал RabbitMQ
+    :param method: Информация о доставке сообщения
+    :param properties: Свойства сообщения
+    :param body: Тело сообщения
+    :param handler: Обработчик, получающий сессию базы данных и данные события
+    :return: None
+
+    Сообщение подтверждается после фиксации изменений, дубликаты подтверждаются без обработки.
+    При ошибке сообщение один раз возвращается в очередь, при повторной ошибке - отбрасывается.
+    Обработка записывается в трассу издателя из заголовка `traceparent` сообщения.
+    """
+
+    queue = method.routing_key
+    event_id = properties.message_id
+    parent = parse_traceparent((properties.headers or {}).get(TRACEPARENT_HEADER))
+    try:
+        with start_span(f"consume {queue}", parent=parent, kind="consumer",
+                        attributes={"messaging.destination": queue}) as span:
+            envelope = decode_event(body, properties.content_type)
+            event_id = envelope.get("id")
+            if span is not None:
+                span.set_attribute("messaging.message_id", event_id)
+            if "ts" in envelope:
+                EVENT_CONSUMER_LAG.labels(queue).observe(max(0.0, time.time() - envelope["ts"]))
+
+            with EVENT_HANDLER_DURATION.labels(queue).time():
+                processed = asyncio.run(process_event_once(event_id, lambda db: handler(db, envelope["data"])))
+            if not processed:
+                logger.info("Skipping duplicate event %s", event_id)
+    except Exception:
+        logger.exception("Failed to process event %s from %s", event_id, queue)
+        EVENTS_CONSUMED.labels(queue, "failed").inc()
+        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=not method.redelivered)
+        return
+
+    EVENTS_CONSUMED.labels(queue, "processed" if processed else "duplicate").inc()
+    ch.basic_ack(delivery_tag=method.delivery_tag)
@@ -1,90 +1,86 @@
-import asyncio
-import json
-
-import pika
-from pika.channel import Channel
-from pika.spec import Basic, BasicProperties
-
-from org_app.crud.storage_distance import create_storage_distance_copy, delete_distance
-from org_app.database import AsyncSessionLocal
-from org_app.events import RABBITMQ_HOST
-from org_app.schemas.storage_distance import StorageDistanceCopySchema
-
-
-def listen_storage_distance_created_event() -> None:
-    """
-    Прослушивание очереди `storage_distance_created` для получения события о создании расстояния между хранилищем и организацией.
-
-    :return: None
-
-    Функция прослушивает очередь `storage_distance_created` и, получив сообщение, извлекает данные о расстоянии,
-    затем создает копию записи о расстоянии в базе данных с помощью функции `create_storage_distance_copy`.
-    """
-
-    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-    channel = connection.channel()
-    channel.queue_declare(queue="storage_distance_created")
-
-    def callback(ch: Channel, method: Basic.Deliver, properties: BasicProperties, body: bytes) -> None:
-        """
-        :param ch: канал связи с RabbitMQ
-        :param method: информация о доставке сообщения
-        :param properties: дополнительные свойства сообщения
-        :param body: данные события в виде байт
-        :return: None
-        """
-
-        message = json.loads(body)
-        storage_distance_id = message["id"]
-        storage_id = message["storage_id"]
-        organisation_id = message["organisation_id"]
-        distance = message["distance"]
-
-        async def handle_event():
-            async with AsyncSessionLocal() as db:
-                storage_distance_data = StorageDistanceCopySchema(id=storage_distance_id,
-                                                                  storage_id=storage_id,
-                                                                  organisation_id=organisation_id,
-                                                                  distance=distance,
-                                                                  )
-                await create_storage_distance_copy(db,
-                                                   storage_distance=storage_distance_data,
-                                                   )
-
-        asyncio.run(handle_event())
-
-    channel.basic_consume(queue="storage_distance_created", on_message_callback=callback, auto_ack=True)
-    channel.start_consuming()
-
-
-def listen_distance_deleted_event() -> None:
-    """
-    Слушатель события удаления расстояния. Удаляет расстояние по полученному id.
-
-    :return: None
-    """
-
-    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-    channel = connection.channel()
-    channel.queue_declare(queue="distance_delete")
-
-    def callback(ch: Channel, method: Basic.Deliver, properties: BasicProperties, body: bytes) -> None:
-        """
-        :param ch: Канал RabbitMQ
-        :param method: Метаданные о сообщении
-        :param properties: Свойства сообщения
-        :param body: Тело сообщения, содержащее список id расстояния для удаления
-        :return: None
-        """
-
-        message = json.loads(body)
-        distance_id = message["id"]
-
-        async def handle_event():
-            async with AsyncSessionLocal() as db:
-                await delete_distance(db, distance_id)
-
-        asyncio.run(handle_event())
-
-    channel.basic_consume(queue="distance_delete", on_message_callback=callback, auto_ack=True)
-    channel.start_consuming()
+from typing import TYPE_CHECKING, Any, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.crud.storage_distance import create_storage_distance_copies, delete_distances
+from org_app.events import CONSUMER_PREFETCH
+from org_app.events.broker import connect
+from org_app.events.codec import event_items
+from org_app.schemas.storage_distance import StorageDistanceCopySchema
+from .delivery import consume, handle_delivery
+
+if TYPE_CHECKING:
+    from pika.channel import Channel
+    from pika.spec import Basic, BasicProperties
+
+
+def listen_storage_distance_created_event() -> None:
+    """
+    Прослушивание очереди `storage_distance_created` для получения события о создании расстояния между хранилищем и организацией.
+
+    :return: None
+
+    Функция прослушивает очередь `storage_distance_created` и, получив сообщение, извлекает данные о расстояниях
+    (одной записи или пачке), затем создает их копии в базе данных с помощью функции `create_storage_distance_copies`.
+    """
+
+    connection = connect()
+    channel = connection.channel()
+    channel.queue_declare(queue="storage_distance_created")
+
+    def callback(ch: "Channel", method: "Basic.Deliver", properties: "BasicProperties", body: bytes) -> None:
+        """
+        :param ch: канал связи с RabbitMQ
+        :param method: информация о доставке сообщения
+        :param properties: дополнительные свойства сообщения
+        :param body: данные события в виде байт
+        :return: None
+        """
+
+        async def handle_event(db: AsyncSession, message: Dict[str, Any]) -> None:
+            storage_distance_data = [StorageDistanceCopySchema(id=item["id"],
+                                                               storage_id=item["storage_id"],
+                                                               organisation_id=item["organisation_id"],
+                                                               distance=item["distance"],
+                                                               )
+                                     for item in event_items(message)]
+            await create_storage_distance_copies(db,
+                                                 storage_distances=storage_distance_data,
+                                                 )
+
+        handle_delivery(ch, method, properties, body, handle_event)
+
+    channel.basic_qos(prefetch_count=CONSUMER_PREFETCH)
+    channel.basic_consume(queue="storage_distance_created", on_message_callback=callback)
+    consume(connection, channel)
+
+
+def listen_distance_deleted_event() -> None:
+    """
+    Слушатель события удаления расстояния. Удаляет расстояния по полученным id (одному или пачке)
+    одним запросом `DELETE ... WHERE id IN (...)`.
+
+    :return: None
+    """
+
+    connection = connect()
+    channel = connection.channel()
+    channel.queue_declare(queue="distance_delete")
+
+    def callback(ch: "Channel", method: "Basic.Deliver", properties: "BasicProperties", body: bytes) -> None:
+        """
+        :param ch: Канал RabbitMQ
+        :param method: Метаданные о сообщении
+        :param properties: Свойства сообщения
+        :param body: Тело сообщения, содержащее список id расстояния для удаления
+        :return: None
+        """
+
+        async def handle_event(db: AsyncSession, message: Dict[str, Any]) -> None:
+            await delete_distances(db, [item["id"] for item in event_items(message)])
+
+        handle_delivery(ch, method, properties, body, handle_event)
+
+    channel.basic_qos(prefetch_count=CONSUMER_PREFETCH)
+    channel.basic_consume(queue="distance_delete", on_message_callback=callback)
+    consume(connection, channel)
@@ -0,0 +1,58 @@
+import fcntl
+import os
+from typing import IO, Optional
+
+
+class ConsumerLeaderLock:
+    """
+    Межпроцессная блокировка для выбора единственного процесса-потребителя событий на хосте.
+
+    :param path: Путь к файлу блокировки, общему для всех воркеров
+
+    Используется `flock`: блокировку держит открытый файл, поэтому при завершении процесса-лидера
+    она освобождается операционной системой и её сразу может захватить другой воркер.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file: Optional[IO] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Захват блокировки.
+
+        :param blocking: Ждать освобождения блокировки, если она занята другим процессом
+        :return: True, если блокировка захвачена
+        """
+
+        if self._file is not None:
+            return True
+
+        lock_file = open(self.path, "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+
+        return True
+
+    def release(self) -> None:
+        """
+        Освобождение блокировки.
+
+        :return: None
+        """
+
+        if self._file is None:
+            return
+
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from threading import Thread
+from typing import Any, Dict
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.database import AsyncSessionLocal
+from org_app.events import OUTBOX_BATCH_SIZE, OUTBOX_MAX_RETRY_DELAY, OUTBOX_POLL_INTERVAL
+from org_app.events.producers import publish_events
+from org_app.lifecycle import shutdown_event, sleep_until_shutdown, start_thread
+from org_app.metrics import EVENT_PUBLISH_DELAY, EVENT_PUBLISH_DURATION
+from org_app.models.outbox import OutboxEvent
+from org_app.tracing import create_span, current_traceparent, parse_traceparent
+
+logger = logging.getLogger(__name__)
+
+# Ретранслятор запущен в этом процессе: только тогда outbox дочищается при остановке (`flush_outbox`)
+_relay_started = False
+
+
+def stage_event(db: AsyncSession, queue: str, data: Dict[str, Any]) -> None:
+    """
+    Запись события в outbox в рамках текущей транзакции сессии.
+
+    :param db: Асинхронная сессия базы данных
+    :param queue: Очередь RabbitMQ, она же тип события
+    :param data: Данные события
+    :return: None
+
+    Событие сохраняется вместе с изменением данных при `db.commit()` и публикуется ретранслятором
+    (`run_outbox_relay`). Если транзакция откатится, событие не будет отправлено.
+    Вместе с событием сохраняется текущий спан, чтобы публикация и обработка попали в трассу запроса.
+    """
+
+    db.add(OutboxEvent(queue=queue, payload=data, traceparent=current_traceparent()))
+
+
+async def relay_outbox_batch(db: AsyncSession, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Публикация очередной пачки событий из outbox.
+
+    :param db: Асинхронная сессия базы данных
+    :param batch_size: Максимальное количество событий в пачке
+    :return: Количество опубликованных событий
+    :raises Exception: ошибка публикации. События остаются в outbox, их счётчик попыток увеличивается
+
+    События публикуются в порядке записи и удаляются из outbox после подтверждения брокером. Если процесс
+    завершится между публикацией и удалением, события будут опубликованы повторно с теми же идентификаторами.
+    Для событий, записанных внутри трассы, публикация записывается спаном `publish <очередь>` этой трассы.
+    """
+
+    result = await db.execute(
+        select(OutboxEvent.id, OutboxEvent.event_id, OutboxEvent.queue, OutboxEvent.payload, OutboxEvent.created_at,
+               OutboxEvent.traceparent)
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+    )
+    events = result.all()
+    if not events:
+        return 0
+
+    ids = [event.id for event in events]
+    spans = [create_span(f"publish {event.queue}", parent=parse_traceparent(event.traceparent), kind="producer",
+                         attributes={"messaging.destination": event.queue, "messaging.message_id": event.event_id})
+             if event.traceparent else None
+             for event in events]
+    try:
+        # pika блокирующий, публикуем вне цикла событий
+        with EVENT_PUBLISH_DURATION.time():
+            await asyncio.to_thread(publish_events, [
+                (event.queue, event.payload, event.event_id,
+                 span.context.to_traceparent() if span is not None else event.traceparent)
+                for event, span in zip(events, spans)
+            ])
+    except Exception as exc:
+        for span in filter(None, spans):
+            span.end(exc)
+        await db.execute(
+            update(OutboxEvent).where(OutboxEvent.id.in_(ids)).values(attempts=OutboxEvent.attempts + 1)
+        )
+        await db.commit()
+        raise
+
+    published_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    for event, span in zip(events, spans):
+        EVENT_PUBLISH_DELAY.labels(event.queue).observe((published_at - event.created_at).total_seconds())
+        if span is not None:
+            span.end()
+
+    await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+    await db.commit()
+
+    return len(events)
+
+
+async def flush_outbox(db: AsyncSession) -> int:
+    """
+    Публикация всех оставшихся событий outbox при остановке процесса.
+
+    :param db: Асинхронная сессия базы данных
+    :return: Количество опубликованных событий
+    :raises Exception: ошибка публикации. Неопубликованные события останутся в outbox до следующего запуска
+
+    Outbox дочищается, только если ретранслятор работал в этом процессе (см. `CONSUMER_MODE`): иначе события
+    публикует другой процесс, и параллельная публикация нарушила бы их порядок.
+    """
+
+    if not _relay_started:
+        return 0
+
+    published = 0
+    while True:
+        count = await relay_outbox_batch(db)
+        published += count
+        if count < OUTBOX_BATCH_SIZE:
+            return published
+
+
+async def run_outbox_relay(poll_interval: float = OUTBOX_POLL_INTERVAL) -> None:
+    """
+    Ретранслятор outbox: публикует накопившиеся события до остановки процесса (`shutdown_event`).
+
+    :param poll_interval: Интервал опроса outbox, если новых событий нет, с
+    :return: None
+
+    При ошибке публикации пауза перед повтором растёт экспоненциально до `OUTBOX_MAX_RETRY_DELAY`.
+    Следующие события не публикуются в обход неудачных, поэтому порядок событий сохраняется.
+    """
+
+    failures = 0
+    while not shutdown_event.is_set():
+        try:
+            async with AsyncSessionLocal() as db:
+                published = await relay_outbox_batch(db)
+        except Exception as exc:
+            failures += 1
+            delay = min(poll_interval * 2 ** failures, OUTBOX_MAX_RETRY_DELAY)
+            logger.warning("Outbox relay failed, retrying in %.1f s: %s", delay, exc)
+            await sleep_until_shutdown(delay)
+            continue
+
+        failures = 0
+        if published < OUTBOX_BATCH_SIZE:
+            await sleep_until_shutdown(poll_interval)
+
+
+def start_outbox_relay() -> Thread:
+    """
+    Запуск ретранслятора outbox в отдельном потоке.
+
+    :return: Запущенный поток
+
+    Ретранслятор запускается там же, где потребители событий (см. `CONSUMER_MODE`), чтобы
+    одни и те же события не публиковались несколькими воркерами.
+    """
+
+    global _relay_started
+    _relay_started = True
+
+    return start_thread(lambda: asyncio.run(run_outbox_relay()))
@@ -1,55 +1,61 @@
-import json
-
-import pika
-
-from org_app.events import RABBITMQ_HOST
-from org_app.models.organisation import Organisation
-
-
-def send_organisation_created_event(organisation: Organisation) -> None:
-    """
-    Отправка события о создании организации в очередь RabbitMQ.
-
-    :param organisation: объект организации, данные которой отправляются в очередь
-    :return: None
-
-    Функция отправляет сообщение с ID организации в очередь organisation_created
-    для дальнейшей обработки другими сервисами или компонентами системы.
-    """
-
-    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-    channel = connection.channel()
-
-    channel.queue_declare(queue="organisation_created")
-    message = json.dumps({"id": organisation.id})
-    channel.basic_publish(exchange="", routing_key="organisation_created", body=message)
-
-    connection.close()
-
-
-def send_organisation_delete_event(organisation: Organisation) -> None:
-    """
-    Отправка события об удалении организаций в очередь RabbitMQ.
-
-    :param organisation: объект организации, данные которой отправляются в очередь
-    :return: None
-
-    Функция формирует и отправляет сообщение с ID удалённой организации в очередь organisations_delete,
-    чтобы другие компоненты могли обработать это событие для синхронизации данных.
-    """
-
-    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-    channel = connection.channel()
-
-    channel.queue_declare(queue="organisation_delete")
-
-    organisations_data = {"id": organisation.id}
-    message = json.dumps(organisations_data)
-
-    channel.basic_publish(
-        exchange="",
-        routing_key="organisation_delete",
-        body=message,
-    )
-
-    connection.close()
+from typing import Any, Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.events.outbox import stage_event
+from org_app.models.organisation import Organisation
+
+
+def organisation_created_item(organisation: Organisation) -> Dict[str, Any]:
+    """
+    :param organisation: Созданная организация
+    :return: Данные организации для события `organisation_created`. Координаты передаются, только если заданы
+    """
+
+    item = {"id": organisation.id}
+    if organisation.latitude is not None:
+        item.update(latitude=organisation.latitude, longitude=organisation.longitude)
+
+    return item
+
+
+def send_organisation_created_event(db: AsyncSession, organisation: Organisation) -> None:
+    """
+    Отправка события о создании организации в очередь RabbitMQ.
+
+    :param db: сессия базы данных, в транзакции которой создана организация
+    :param organisation: объект организации, данные которой отправляются в очередь
+    :return: None
+
+    Функция записывает в outbox сообщение с ID (и координатами) организации для очереди organisation_created.
+    Сообщение будет опубликовано после фиксации транзакции.
+    """
+
+    stage_event(db, "organisation_created", organisation_created_item(organisation))
+
+
+def send_organisations_created_event(db: AsyncSession, organisations: List[Organisation]) -> None:
+    """
+    Отправка одного пакетного события о создании нескольких организаций.
+
+    :param db: сессия базы данных, в транзакции которой созданы организации
+    :param organisations: созданные организации
+    :return: None
+    """
+
+    stage_event(db, "organisation_created", {"items": [organisation_created_item(organisation) for organisation in organisations]})
+
+
+def send_organisation_delete_event(db: AsyncSession, organisation: Organisation) -> None:
+    """
+    Отправка события об удалении организаций в очередь RabbitMQ.
+
+    :param db: сессия базы данных, в транзакции которой удалена организация
+    :param organisation: объект организации, данные которой отправляются в очередь
+    :return: None
+
+    Функция записывает в outbox сообщение с ID удалённой организации для очереди organisation_delete,
+    чтобы другие компоненты могли обработать это событие для синхронизации данных.
+    """
+
+    stage_event(db, "organisation_delete", {"id": organisation.id})
@@ -1,33 +1,24 @@
-import json
-from typing import Dict
-
-import pika
-
-from org_app.events import RABBITMQ_HOST
-
-
-def send_update_capacity_event(storage_id: int, updated_capacity: Dict[str, int]) -> None:
-    """
-    Отправка события об обновлении емкости хранилища в очередь RabbitMQ.
-
-    :param storage_id: Идентификатор хранилища
-    :param updated_capacity: Словарь с обновленной емкостью для различных типов отходов
-    :return: None
-
-    Функция отправляет сообщение с ID хранилища и его обновленной емкостью в очередь "update_capacity"
-    для дальнейшей обработки другим сервисом.
-    """
-
-    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-    channel = connection.channel()
-
-    channel.queue_declare(queue="update_capacity")
-
-    message = json.dumps({
-        "storage_id": storage_id,
-        "updated_capacity": updated_capacity  # Например, {"Пластик": 10, "Биоотходы": 50}
-    })
-
-    channel.basic_publish(exchange="", routing_key="update_capacity", body=message)
-
-    connection.close()
+from typing import Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.events.outbox import stage_event
+
+
+def send_update_capacity_event(db: AsyncSession, storage_id: int, updated_capacity: Dict[str, int]) -> None:
+    """
+    Отправка события об обновлении емкости хранилища в очередь RabbitMQ.
+
+    :param db: Сессия базы данных, в транзакции которой обновлена копия хранилища
+    :param storage_id: Идентификатор хранилища
+    :param updated_capacity: Словарь с обновленной емкостью для различных типов отходов
+    :return: None
+
+    Функция записывает в outbox сообщение с ID хранилища и его обновленной емкостью для очереди "update_capacity".
+    Сообщение будет опубликовано после фиксации транзакции.
+    """
+
+    stage_event(db, "update_capacity", {
+        "storage_id": storage_id,
+        "updated_capacity": updated_capacity  # Например, {"Пластик": 10, "Биоотходы": 50}
+    })
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import time
+from threading import Event, Lock, Thread
+from typing import Callable, List
+
+# Сколько ждать завершения фоновых потоков при остановке процесса, с
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "30"))
+# Как часто фоновые циклы проверяют, не началась ли остановка, во время пауз, с
+SHUTDOWN_POLL_INTERVAL = 0.1
+
+# Сигнал остановки: фоновые циклы завершают текущую итерацию и выходят, новые потребители не запускаются
+shutdown_event = Event()
+
+_threads: List[Thread] = []
+_threads_lock = Lock()
+
+
+def start_thread(target: Callable[[], None]) -> Thread:
+    """
+    Запуск фонового потока, завершения которого дожидается остановка процесса (`join_threads`).
+
+    :param target: Функция потока
+    :return: Запущенный поток
+    """
+
+    thread = Thread(target=target, daemon=True)
+    thread.start()
+    with _threads_lock:
+        _threads[:] = [running for running in _threads if running.is_alive()]
+        _threads.append(thread)
+
+    return thread
+
+
+def join_threads(timeout: float = SHUTDOWN_TIMEOUT) -> bool:
+    """
+    Ожидание завершения фоновых потоков после `shutdown_event`.
+
+    :param timeout: Максимальное время ожидания всех потоков, с
+    :return: True, если все потоки завершились
+
+    Потоки остаются демонами: если какой-то не успел завершиться, он не задерживает выход из процесса.
+    """
+
+    deadline = time.monotonic() + timeout
+    with _threads_lock:
+        threads = list(_threads)
+
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+    return not any(thread.is_alive() for thread in threads)
+
+
+async def sleep_until_shutdown(delay: float) -> bool:
+    """
+    Пауза фонового цикла, прерываемая остановкой процесса.
+
+    :param delay: Длительность паузы, с
+    :return: True, если началась остановка
+    """
+
+    deadline = time.monotonic() + delay
+    while not shutdown_event.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(remaining, SHUTDOWN_POLL_INTERVAL))
+
+    return True
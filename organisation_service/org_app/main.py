@@ -1,35 +1,52 @@
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator
-
-from fastapi import FastAPI
-
-from org_app.api import router as organisations_router
-from org_app.database import init_db
-from org_app.events.consumers import start_listening_events
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    """
-    Функция, которая выполняется при старте приложения и завершении.
-
-    :return: None
-
-    Инициализирует базу данных с помощью функции `init_db()` и запускает прослушивание событий,
-    используя `start_listening_events()`.
-    """
-
-    # код инициализации
-    await init_db()  # Инициализация базы данных
-    start_listening_events()  # Запуск прослушивания событий в отдельных потоках
-    yield
-    # код завершения работы
-
-
-app = FastAPI(lifespan=lifespan)
-app.include_router(organisations_router, prefix="/api/v1/organisation", tags=["organisations"])
-
-if __name__ == "__main__":
-    import uvicorn
-
-    uvicorn.run('main:app', host="localhost", port=8000, reload=True, log_level='debug')
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+from fastapi import FastAPI
+
+from org_app.api import router as organisations_router
+from org_app.cache import start_cache_invalidation_listener
+from org_app.database import close_db, init_db
+from org_app.events.consumers import start_event_consumers, stop_event_consumers
+from org_app.metrics import METRICS_ENABLED, MetricsMiddleware, metrics_endpoint
+from org_app.sync import bootstrap_storage_copies
+from org_app.tracing import TracingMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    """
+    Функция, которая выполняется при старте приложения и завершении.
+
+    :return: None
+
+    Инициализирует базу данных с помощью функции `init_db()`, при пустой БД загружает копии хранилищ из снимка
+    (`bootstrap_storage_copies()`) и запускает прослушивание событий согласно `CONSUMER_MODE`,
+    используя `start_event_consumers()`. При завершении плавно останавливает потребителей и фоновые потоки
+    и публикует оставшиеся события (`stop_event_consumers()`), затем закрывает подключения к базе данных.
+    """
+
+    # код инициализации
+    await init_db()  # Инициализация базы данных
+    await bootstrap_storage_copies()  # Копии хранилищ и расстояний из снимка, если БД пустая
+    start_event_consumers()  # Запуск прослушивания событий в отдельных потоках
+    start_cache_invalidation_listener()  # Оповещения об инвалидации кеша от других реплик
+    yield
+    # код завершения работы
+    await stop_event_consumers()
+    await close_db()
+
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(organisations_router, prefix="/api/v1/organisation", tags=["organisations"])
+
+# Трассировка подключается всегда: при выключенной (`TRACING_EXPORTER` пуст) запрос передаётся дальше без спана
+app.add_middleware(TracingMiddleware)
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run('main:app', host="localhost", port=8000, reload=True, log_level='debug')
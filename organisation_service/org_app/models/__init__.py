@@ -1,4 +1,4 @@
-from sqlalchemy.orm import declarative_base
-
-# Базовый класс для определения моделей
-Base = declarative_base()
+from sqlalchemy.orm import declarative_base
+
+# Базовый класс для определения моделей
+Base = declarative_base()
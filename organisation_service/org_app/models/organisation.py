@@ -1,42 +1,52 @@
-from sqlalchemy import Column, Integer, String, JSON
-from sqlalchemy.orm import relationship
-
-from . import Base
-
-
-class Organisation(Base):
-    """
-    Модель для представления организации в базе данных.
-
-    :param id: Уникальный идентификатор организации
-    :param name: Название организации (уникальное)
-    :param capacity: Структура данных, описывающая, сколько отходов выработано организацией и сколько может в ней храниться
-    {'Пластик': [40, 50]} - выработано 40 из 50, при переработке будет сброшено на 0
-    :param storage_distances_copy: Связь с таблицей копий расстояний между хранилищами и организациями
-    """
-
-    __tablename__ = "organisations"
-
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, index=True)
-    capacity = Column(JSON, nullable=False)
-
-    # Связь с таблицей копий расстояний
-    storage_distances_copy = relationship(
-        "StorageDistanceCopy",
-        back_populates="organisation",  # Имя переменной на стороне StorageDistanceCopy
-        cascade="all, delete-orphan",  # Удаление зависимых объектов при удалении организации
-        single_parent=True,  # Ограничивает создание только одного родительского объекта
-    )
-
-    def is_all_waste_processed(self) -> bool:
-        """
-        Проверяет, все ли отходы переработаны.
-        :return: Если для всех типов отходов переработано максимальное количество, возвращает True, иначе False.
-        """
-
-        for waste_type, (used, total) in self.capacity.items():
-            if used > 0:  # Если есть отходы, которые не переработаны
-                return False
-
-        return True
+from sqlalchemy import Boolean, Column, Float, Integer, String, JSON, false
+from sqlalchemy.orm import relationship
+
+from . import Base
+
+
+class Organisation(Base):
+    """
+    Модель для представления организации в базе данных.
+
+    :param id: Уникальный идентификатор организации
+    :param name: Название организации (уникальное)
+    :param capacity: Структура данных, описывающая, сколько отходов выработано организацией и сколько может в ней храниться
+    {'Пластик': [40, 50]} - выработано 40 из 50, при переработке будет сброшено на 0
+    :param latitude: Широта организации в градусах или None. С координатами отходы можно отправить в хранилища
+    с координатами без заданного расстояния (см. `org_app.services.spatial_index`)
+    :param longitude: Долгота организации в градусах или None
+    :param deleted: Организация удалена (tombstone): она скрыта, а копии расстояний до неё удаляются в фоне
+    (см. `org_app.tombstones`). ID удалённых организаций не переиспользуются.
+    :param storage_distances_copy: Связь с таблицей копий расстояний между хранилищами и организациями
+    """
+
+    __tablename__ = "organisations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+    capacity = Column(JSON, nullable=False)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    deleted = Column(Boolean, nullable=False, default=False, server_default=false(), index=True)
+
+    # Связь с таблицей копий расстояний
+    storage_distances_copy = relationship(
+        "StorageDistanceCopy",
+        back_populates="organisation",  # Имя переменной на стороне StorageDistanceCopy
+        cascade="all, delete-orphan",  # Удаление зависимых объектов при удалении организации
+        single_parent=True,  # Ограничивает создание только одного родительского объекта
+    )
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    def is_all_waste_processed(self) -> bool:
+        """
+        Проверяет, все ли отходы переработаны.
+        :return: Если для всех типов отходов переработано максимальное количество, возвращает True, иначе False.
+        """
+
+        for waste_type, (used, total) in self.capacity.items():
+            if used > 0:  # Если есть отходы, которые не переработаны
+                return False
+
+        return True
@@ -0,0 +1,19 @@
+import time
+
+from sqlalchemy import Column, Float, String
+
+from . import Base
+
+
+class ProcessedEvent(Base):
+    """
+    Модель обработанного события: по ней потребитель отбрасывает повторно доставленные события.
+
+    :param event_id: Идентификатор события из конверта
+    :param processed_at: Время обработки (unix time). Записи старше `PROCESSED_EVENTS_RETENTION` удаляются
+    """
+
+    __tablename__ = "processed_events"
+
+    event_id = Column(String(32), primary_key=True)
+    processed_at = Column(Float, nullable=False, default=time.time, index=True)
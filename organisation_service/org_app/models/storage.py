@@ -1,25 +1,38 @@
-from sqlalchemy import Column, Integer, JSON
-from sqlalchemy.orm import relationship
-
-from . import Base
-
-
-class StorageCopy(Base):
-    """
-    Модель для хранения копий данных о хранилищах.
-
-    :param id: Уникальный идентификатор копии хранилища
-    :param capacity: Структура данных, описывающая ёмкость хранилища - `Dict[str, list[int]]`
-    :param storage_distances_copy: Связь с таблицей расстояний
-    """
-
-    __tablename__ = "storages_copy"
-
-    id = Column(Integer, primary_key=True, index=True)
-    capacity = Column(JSON, nullable=False)  # Копия данных из сервиса Хранилище
-
-    storage_distances_copy = relationship("StorageDistanceCopy",
-                                          back_populates="storage",
-                                          cascade="all, delete-orphan",
-                                          single_parent=True,
-                                          )
+from sqlalchemy import Boolean, Column, Float, Integer, JSON, false
+from sqlalchemy.orm import relationship
+
+from . import Base
+
+
+class StorageCopy(Base):
+    """
+    Модель для хранения копий данных о хранилищах.
+
+    :param id: Уникальный идентификатор копии хранилища
+    :param capacity: Структура данных, описывающая ёмкость хранилища - `Dict[str, list[int]]`
+    :param version: Версия хранилища в сервисе Хранилище, с которой получена копия
+    :param capacity_updates: Количество изменений вместимости, отправленных в сервис Хранилище (`update_capacity`).
+    Пока в ленте изменений счётчик меньше, часть этих изменений там ещё не применена, и вместимость копии новее
+    :param capacity_updated_at: Время последнего изменения вместимости отсюда (Unix time, с) или None
+    :param latitude: Широта хранилища в градусах или None, если координаты не заданы
+    :param longitude: Долгота хранилища в градусах или None
+    :param deleted: Хранилище удалено (tombstone): копия скрыта, а копии расстояний до неё удаляются в фоне
+    :param storage_distances_copy: Связь с таблицей расстояний
+    """
+
+    __tablename__ = "storages_copy"
+
+    id = Column(Integer, primary_key=True, index=True)
+    capacity = Column(JSON, nullable=False)  # Копия данных из сервиса Хранилище
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    capacity_updates = Column(Integer, nullable=False, default=0, server_default="0")
+    capacity_updated_at = Column(Float, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    deleted = Column(Boolean, nullable=False, default=False, server_default=false(), index=True)
+
+    storage_distances_copy = relationship("StorageDistanceCopy",
+                                          back_populates="storage",
+                                          cascade="all, delete-orphan",
+                                          single_parent=True,
+                                          )
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String
+
+from . import Base
+
+
+class SyncCursor(Base):
+    """
+    Позиция синхронизации копий с лентой изменений другого сервиса.
+
+    :param name: Имя ленты
+    :param version: Версия последнего применённого изменения
+    """
+
+    __tablename__ = "sync_cursors"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,375 @@
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Доля запросов /recycle/, которые профилируются без заголовка. 0 - только по заголовку
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Значение заголовка `X-Profile`, включающее профилирование запроса. Пусто - заголовок не учитывается
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+# Каталог для сохранённых профилей и количество хранимых профилей (старые удаляются)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/org_app_profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "100"))
+# Интервал снятия стека, с
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+
+PROFILING_ENABLED = PROFILE_SAMPLE_RATE > 0 or bool(PROFILE_TOKEN)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Кадр стека: (функция, файл, строка начала функции)
+Frame = Tuple[str, str, int]
+
+
+class Profile:
+    """
+    Профиль одного запроса: стеки потока цикла событий, снятые с интервалом, и интервалы (спаны) работы
+    с БД, планирования и публикации событий.
+
+    :param name: Название профиля
+    :param interval: Интервал снятия стека, с
+    """
+
+    def __init__(self, name: str, interval: float = PROFILE_INTERVAL) -> None:
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.interval = interval
+        self.created_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.samples: List[Tuple[Frame, ...]] = []
+        # События спанов: (открытие/закрытие, имя, время от начала профиля, с)
+        self.span_events: List[Tuple[str, str, float]] = []
+        self.span_totals: Dict[str, float] = {}
+        self._open_spans: List[Tuple[str, float]] = []
+
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        """
+        Снятие стеков потока, в котором создан профиль, до остановки профиля.
+
+        :return: None
+
+        Если в этом же цикле событий выполняются другие запросы, их стеки тоже попадут в профиль.
+        """
+
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.samples.append(tuple(reversed(stack)))
+
+    def begin(self) -> None:
+        self._sampler.start()
+
+    def end(self) -> None:
+        # Спаны, которые не закрылись из-за исключения (например, ошибки запроса к БД), закрываются в конце
+        while self._open_spans:
+            name, opened_at = self._open_spans[-1]
+            self.close_span(name, opened_at)
+
+        self.duration = time.perf_counter() - self.start
+        self._stop.set()
+        self._sampler.join()
+
+    def open_span(self, name: str) -> float:
+        """
+        :param name: Имя спана
+        :return: Время открытия от начала профиля, с
+        """
+
+        at = time.perf_counter() - self.start
+        self.span_events.append(("O", name, at))
+        self._open_spans.append((name, at))
+
+        return at
+
+    def close_span(self, name: str, opened_at: float) -> None:
+        """
+        :param name: Имя спана
+        :param opened_at: Время открытия, которое вернул `open_span`
+        :return: None
+        """
+
+        if (name, opened_at) not in self._open_spans:
+            return
+
+        # Спаны вложены друг в друга: вместе со спаном закрываются не закрытые вложенные
+        while self._open_spans:
+            open_name, open_at = self._open_spans.pop()
+            at = time.perf_counter() - self.start
+            self.span_events.append(("C", open_name, at))
+            self.span_totals[open_name] = self.span_totals.get(open_name, 0.0) + at - open_at
+            if (open_name, open_at) == (name, opened_at):
+                break
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        :return: Сводка: длительность, количество снятых стеков и суммарное время по спанам, с
+        """
+
+        return {
+            "id": self.id,
+            "name": self.name,
+            "created_at": self.created_at,
+            "duration": self.duration,
+            "samples": len(self.samples),
+            "spans": dict(self.span_totals),
+        }
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """
+        Профиль в формате speedscope (https://www.speedscope.app): стеки - профиль типа sampled,
+        спаны - профиль типа evented.
+
+        :return: Документ speedscope
+        """
+
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[Frame, int] = {}
+
+        def index(frame: Frame) -> int:
+            if frame not in frame_index:
+                frame_index[frame] = len(frames)
+                name, file, line = frame
+                frames.append({"name": name, "file": file, "line": line})
+            return frame_index[frame]
+
+        samples = [[index(frame) for frame in stack] for stack in self.samples]
+        span_events = [{"type": kind, "frame": index((name, "", 0)), "at": at}
+                       for kind, name, at in self.span_events]
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "org_app.profiling",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": f"{self.name}: стеки",
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.duration,
+                    "samples": samples,
+                    "weights": [self.interval] * len(samples),
+                },
+                {
+                    "type": "evented",
+                    "name": f"{self.name}: БД, планирование, публикация",
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.duration,
+                    "events": span_events,
+                },
+            ],
+        }
+
+
+def speedscope_to_folded(document: Dict[str, Any]) -> str:
+    """
+    Преобразование стеков профиля speedscope в формат folded stacks (`flamegraph.pl`, inferno).
+
+    :param document: Документ speedscope
+    :return: Строки `функция;функция;... количество`
+    """
+
+    frames = document["shared"]["frames"]
+    stacks = Counter()
+    for profile in document["profiles"]:
+        if profile["type"] != "sampled":
+            continue
+        for sample in profile["samples"]:
+            stacks[";".join(f"{frames[index]['name']} ({Path(frames[index]['file']).name})"
+                            for index in sample)] += 1
+
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+# Профиль текущего запроса. Вне профилируемых запросов - None
+_current_profile: ContextVar[Optional[Profile]] = ContextVar("current_profile", default=None)
+
+
+def has_profile_token(header_value: Optional[str]) -> bool:
+    """
+    :param header_value: Значение заголовка `X-Profile`
+    :return: Совпадает ли заголовок с `PROFILE_TOKEN`. При пустом `PROFILE_TOKEN` - всегда False
+    """
+
+    if not PROFILE_TOKEN or header_value is None:
+        return False
+
+    return hmac.compare_digest(header_value.encode(), PROFILE_TOKEN.encode())
+
+
+def should_profile(header_value: Optional[str], sample_rate: float = PROFILE_SAMPLE_RATE) -> bool:
+    """
+    :param header_value: Значение заголовка `X-Profile`
+    :param sample_rate: Доля профилируемых запросов без заголовка
+    :return: Нужно ли профилировать запрос
+    """
+
+    if has_profile_token(header_value):
+        return True
+
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+@contextmanager
+def profile_span(name: str) -> Iterator[None]:
+    """
+    Интервал работы внутри профилируемого запроса. Вне профилируемых запросов ничего не делает.
+
+    :param name: Имя спана: db, planning, publish, commit
+    """
+
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+
+    opened_at = profile.open_span(name)
+    try:
+        yield
+    finally:
+        profile.close_span(name, opened_at)
+
+
+def save_profile(profile: Profile, directory: Optional[str] = None, max_files: int = PROFILE_MAX_FILES) -> None:
+    """
+    Сохранение профиля в каталог: `<id>.speedscope.json` и сводка `<id>.summary.json`.
+
+    :param profile: Завершённый профиль
+    :param directory: Каталог профилей, по умолчанию `PROFILE_DIR`
+    :param max_files: Сколько профилей хранить, старые удаляются
+    :return: None
+    """
+
+    path = Path(directory or PROFILE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    (path / f"{profile.id}.speedscope.json").write_text(json.dumps(profile.to_speedscope(), ensure_ascii=False))
+    (path / f"{profile.id}.summary.json").write_text(json.dumps(profile.summary(), ensure_ascii=False))
+
+    summaries = sorted(path.glob("*.summary.json"), key=lambda file: file.stat().st_mtime)
+    for summary in summaries[:max(0, len(summaries) - max_files)]:
+        profile_id = summary.name.split(".", 1)[0]
+        summary.unlink(missing_ok=True)
+        (path / f"{profile_id}.speedscope.json").unlink(missing_ok=True)
+
+
+@contextmanager
+def profile_request(name: str, header_value: Optional[str] = None) -> Iterator[Optional[Profile]]:
+    """
+    Профилирование блока `with`, если его запросили заголовком или он попал в выборку.
+
+    :param name: Название профиля
+    :param header_value: Значение заголовка `X-Profile`
+    :return: Профиль или None, если блок не профилируется
+
+    Профиль сохраняется и при исключении в блоке: медленные запросы с ошибкой тоже интересны.
+    """
+
+    if not should_profile(header_value):
+        yield None
+        return
+
+    profile = Profile(name)
+    token = _current_profile.set(profile)
+    profile.begin()
+    try:
+        yield profile
+    finally:
+        profile.end()
+        _current_profile.reset(token)
+        try:
+            save_profile(profile)
+        except OSError as exc:
+            logger.warning("Failed to save profile %s: %s", profile.id, exc)
+
+
+def list_profiles(directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    :param directory: Каталог профилей, по умолчанию `PROFILE_DIR`
+    :return: Сводки сохранённых профилей, новые первыми
+    """
+
+    path = Path(directory or PROFILE_DIR)
+    if not path.exists():
+        return []
+
+    summaries = [json.loads(file.read_text()) for file in path.glob("*.summary.json")]
+
+    return sorted(summaries, key=lambda summary: summary["created_at"], reverse=True)
+
+
+def load_profile(profile_id: str, directory: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    :param profile_id: Идентификатор профиля
+    :param directory: Каталог профилей, по умолчанию `PROFILE_DIR`
+    :return: Документ speedscope или None, если профиля нет
+    """
+
+    # Идентификатор - uuid4 в hex, иначе это не наш файл
+    if len(profile_id) != 32 or any(char not in "0123456789abcdef" for char in profile_id):
+        return None
+
+    path = Path(directory or PROFILE_DIR) / f"{profile_id}.speedscope.json"
+    if not path.exists():
+        return None
+
+    return json.loads(path.read_text())
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                           executemany: bool) -> None:
+    profile = _current_profile.get()
+    if profile is not None:
+        conn.info.setdefault("profile_span_start", []).append(profile.open_span("db"))
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                          executemany: bool) -> None:
+    profile = _current_profile.get()
+    if profile is not None and conn.info.get("profile_span_start"):
+        profile.close_span("db", conn.info["profile_span_start"].pop())
+
+
+def setup_query_profiling(engine: Engine, enabled: bool = PROFILING_ENABLED) -> None:
+    """
+    Подключает спаны запросов к БД в профилируемых запросах к движку.
+
+    :param engine: синхронный движок SQLAlchemy (`AsyncEngine.sync_engine`)
+    :param enabled: включено ли профилирование; при выключенном обработчики не регистрируются
+    :return: None
+    """
+
+    if not enabled:
+        return
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,356 @@
+import asyncio
+import logging
+import os
+from threading import Thread
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, and_, cast, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql.elements import ColumnElement
+
+from org_app.crud.storage import apply_storage_changes
+from org_app.crud.storage_distance import replace_storage_distance_copies
+from org_app.database import AsyncSessionLocal
+from org_app.lifecycle import shutdown_event, sleep_until_shutdown, start_thread
+from org_app.models.organisation import Organisation
+from org_app.models.storage import StorageCopy
+from org_app.models.storage_distance import StorageDistanceCopy
+from org_app.schemas.storage_change import StorageChangeSchema
+from org_app.sync import STORAGE_SERVICE_URL
+from org_app.tracing import inject_trace_headers, start_span
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# Интервал сверки копий с исходными данными, с. 0 - сверка выключена
+RECONCILE_INTERVAL = float(os.getenv("RECONCILE_INTERVAL", "3600"))
+# На сколько частей делится диапазон ID на каждом уровне сверки
+RECONCILE_FANOUT = int(os.getenv("RECONCILE_FANOUT", "16"))
+# Диапазоны, в которых записей не больше этого числа, сверяются построчно
+RECONCILE_LEAF_SIZE = int(os.getenv("RECONCILE_LEAF_SIZE", "1000"))
+
+# Хеш строки считается в SQL по модулю простого числа, чтобы произведения не выходили за 64 бита
+HASH_MODULUS = 2147483647
+HASH_MULTIPLIER = 1000003
+# Координаты входят в хеш целыми числами в миллионных долях градуса, отсутствующие - значением вне диапазона
+COORDINATE_SCALE = 1000000
+MISSING_COORDINATE = 1000 * COORDINATE_SCALE
+
+
+class ReplicatedTable:
+    """
+    Таблица, которая сверяется по контрольным суммам диапазонов ID.
+
+    :param id_column: Целочисленный первичный ключ, по диапазонам которого идёт сверка
+    :param hash_columns: Целочисленные столбцы, входящие в хеш строки (вместе с ID). На обеих сторонах
+    должны совпадать по смыслу и порядку.
+    :param row_columns: Столбцы, которые отдаются для восстановления расхождений
+    :param condition: Условие отбора сверяемых строк, например без удалённых (tombstone) строк
+    """
+
+    def __init__(self,
+                 id_column: ColumnElement,
+                 hash_columns: Sequence[ColumnElement] = (),
+                 row_columns: Sequence[ColumnElement] = (),
+                 condition: Optional[ColumnElement] = None,
+                 ) -> None:
+        self.id_column = id_column
+        self.hash_columns = list(hash_columns)
+        self.row_columns = list(row_columns) or [id_column, *hash_columns]
+        self.condition = condition if condition is not None else true()
+
+    def row_hash(self) -> ColumnElement:
+        """
+        :return: SQL-выражение хеша строки
+        """
+
+        row_hash = self.id_column % HASH_MODULUS
+        for column in self.hash_columns:
+            row_hash = (row_hash * HASH_MULTIPLIER + column % HASH_MODULUS) % HASH_MODULUS
+
+        # Нелинейное перемешивание: иначе сумма хешей не меняется, если значения поменять местами между строками
+        return row_hash * row_hash % HASH_MODULUS + row_hash
+
+
+def scaled_coordinate(coordinate: ColumnElement) -> ColumnElement:
+    """
+    :param coordinate: Столбец широты или долготы, градусы
+    :return: SQL-выражение: координата, округлённая до `1 / COORDINATE_SCALE` градуса, как целое число
+    """
+
+    return func.coalesce(cast(func.round(coordinate * COORDINATE_SCALE), Integer), MISSING_COORDINATE)
+
+
+def capacity_digest(capacity: ColumnElement) -> ColumnElement:
+    """
+    :param capacity: JSON-столбец вместимости `{тип отходов: [занято, всего]}`
+    :return: SQL-выражение: сумма занятых объёмов и удвоенных максимальных по всем типам отходов
+
+    Ключи не используются: SQLite хранит кириллические ключи JSON экранированными (`\\uXXXX`), и путь
+    `$."Пластик"` их не находит.
+    """
+
+    items = func.json_tree(capacity).table_valued("key", "value", "type")
+
+    return (select(func.coalesce(func.sum(items.c.value * (items.c.key + 1)), 0))
+            .where(items.c.type == "integer")
+            .scalar_subquery())
+
+
+# Таблицы, копии которых есть в сервисе Хранилище
+SOURCE_TABLES = {
+    "organisations": ReplicatedTable(Organisation.id,
+                                     [scaled_coordinate(Organisation.latitude), scaled_coordinate(Organisation.longitude)],
+                                     [Organisation.id, Organisation.latitude, Organisation.longitude],
+                                     Organisation.deleted.is_(False)),
+}
+
+# Копии таблиц сервиса Хранилище. Вместимость входит в хеш: изменения отсюда (`update_capacity`) меняют её
+# без новой версии, и потерянное изменение иначе не обнаружить
+REPLICA_TABLES = {
+    "storages": ReplicatedTable(StorageCopy.id,
+                                [StorageCopy.version, StorageCopy.capacity_updates,
+                                 capacity_digest(StorageCopy.capacity)],
+                                [StorageCopy.id, StorageCopy.capacity, StorageCopy.version,
+                                 StorageCopy.capacity_updates],
+                                StorageCopy.deleted.is_(False)),
+    # Расстояния до удалённых (tombstone) хранилищ и организаций не сверяются: они удаляются в фоне
+    "distances": ReplicatedTable(StorageDistanceCopy.id,
+                                 [StorageDistanceCopy.storage_id, StorageDistanceCopy.organisation_id,
+                                  StorageDistanceCopy.distance],
+                                 condition=and_(
+                                     select(StorageCopy.id)
+                                     .where(StorageCopy.id == StorageDistanceCopy.storage_id,
+                                            StorageCopy.deleted.is_(False))
+                                     .exists(),
+                                     select(Organisation.id)
+                                     .where(Organisation.id == StorageDistanceCopy.organisation_id,
+                                            Organisation.deleted.is_(False))
+                                     .exists(),
+                                 )),
+}
+
+
+async def get_bounds(db: AsyncSession, table: ReplicatedTable) -> Tuple[Optional[int], Optional[int]]:
+    """
+    :param db: Асинхронная сессия базы данных
+    :param table: Сверяемая таблица
+    :return: Минимальный и максимальный ID или (None, None) для пустой таблицы
+    """
+
+    result = await db.execute(select(func.min(table.id_column), func.max(table.id_column)).where(table.condition))
+
+    return tuple(result.one())
+
+
+async def get_range_checksums(db: AsyncSession,
+                              table: ReplicatedTable,
+                              start: int,
+                              end: int,
+                              parts: int,
+                              ) -> List[Dict[str, int]]:
+    """
+    Контрольные суммы частей диапазона ID.
+
+    :param db: Асинхронная сессия базы данных
+    :param table: Сверяемая таблица
+    :param start: Начало диапазона (включительно)
+    :param end: Конец диапазона (не включительно)
+    :param parts: Количество частей
+    :return: Для каждой части {"start", "end", "count", "hash"}, где hash - сумма хешей строк
+
+    Суммы считаются одним запросом с группировкой в БД, строки не передаются в приложение.
+    """
+
+    width = max(1, -(-(end - start) // parts))
+    bucket = (table.id_column - start) // width
+    result = await db.execute(
+        select(bucket, func.count(), func.sum(table.row_hash()))
+        .where(table.id_column >= start, table.id_column < end, table.condition)
+        .group_by(bucket)
+    )
+    sums = {index: (count, row_hash) for index, count, row_hash in result}
+
+    checksums = []
+    for index, part_start in enumerate(range(start, end, width)):
+        count, row_hash = sums.get(index, (0, 0))
+        checksums.append({"start": part_start, "end": min(part_start + width, end), "count": count, "hash": row_hash})
+
+    return checksums
+
+
+async def get_range_rows(db: AsyncSession, table: ReplicatedTable, start: int, end: int) -> List[Dict[str, Any]]:
+    """
+    :param db: Асинхронная сессия базы данных
+    :param table: Сверяемая таблица
+    :param start: Начало диапазона (включительно)
+    :param end: Конец диапазона (не включительно)
+    :return: Строки диапазона в порядке ID
+    """
+
+    result = await db.execute(
+        select(*table.row_columns)
+        .where(table.id_column >= start, table.id_column < end, table.condition)
+        .order_by(table.id_column)
+    )
+
+    return [dict(row) for row in result.mappings()]
+
+
+async def reconcile_table(client: "httpx.AsyncClient",
+                          name: str,
+                          table: ReplicatedTable,
+                          repair: Callable[[AsyncSession, int, int, List[Dict[str, Any]]], Awaitable[int]],
+                          session_factory: sessionmaker = AsyncSessionLocal,
+                          fanout: int = RECONCILE_FANOUT,
+                          leaf_size: int = RECONCILE_LEAF_SIZE,
+                          ) -> int:
+    """
+    Сверка копии таблицы с исходной таблицей другого сервиса.
+
+    :param client: HTTP-клиент с `base_url` API сервиса-источника
+    :param name: Имя таблицы в API сервиса-источника (`/replication/{name}/...`)
+    :param table: Локальная копия
+    :param repair: Восстановление диапазона: `repair(db, start, end, rows)` приводит локальные строки
+    с ID из [start, end) к строкам источника и возвращает количество изменённых строк. Транзакцию фиксирует
+    вызывающая сторона.
+    :param session_factory: Фабрика сессий базы данных
+    :param fanout: На сколько частей делится диапазон на каждом уровне
+    :param leaf_size: Диапазоны, в которых записей не больше этого числа, восстанавливаются целиком
+    :return: Количество диапазонов, в которых восстановление изменило строки
+
+    Диапазон ID делится на `fanout` частей, и для каждой части обе стороны считают количество строк и сумму
+    их хешей. Совпавшие части дальше не проверяются, расхождения делятся дальше, как в дереве Меркла.
+    Строки передаются только для небольших разошедшихся диапазонов, поэтому при редких расхождениях
+    сверка стоит несколько агрегирующих запросов по индексу первичного ключа.
+    """
+
+    response = await client.get(f"/replication/{name}/bounds/")
+    response.raise_for_status()
+    remote_bounds = response.json()
+    async with session_factory() as db:
+        local_bounds = await get_bounds(db, table)
+
+    starts = [bound for bound in (remote_bounds["min"], local_bounds[0]) if bound is not None]
+    ends = [bound for bound in (remote_bounds["max"], local_bounds[1]) if bound is not None]
+    if not starts:
+        return 0
+
+    repaired = 0
+    ranges = [(min(starts), max(ends) + 1)]
+    while ranges:
+        start, end = ranges.pop()
+
+        response = await client.get(f"/replication/{name}/checksums/",
+                                    params={"start": start, "end": end, "parts": fanout})
+        response.raise_for_status()
+        async with session_factory() as db:
+            local_checksums = await get_range_checksums(db, table, start, end, fanout)
+
+        for remote, local in zip(response.json(), local_checksums):
+            if (remote["count"], remote["hash"]) == (local["count"], local["hash"]):
+                continue
+
+            if max(remote["count"], local["count"]) > leaf_size and local["end"] - local["start"] > 1:
+                ranges.append((local["start"], local["end"]))
+                continue
+
+            response = await client.get(f"/replication/{name}/rows/",
+                                        params={"start": local["start"], "end": local["end"]})
+            response.raise_for_status()
+            async with session_factory() as db:
+                changed = await repair(db, local["start"], local["end"], response.json())
+                await db.commit()
+            # Расхождение может остаться и после восстановления, например пока изменение вместимости в пути
+            if changed:
+                repaired += 1
+
+    return repaired
+
+
+async def repair_storage_copies(db: AsyncSession, start: int, end: int, rows: List[Dict[str, Any]]) -> int:
+    """
+    Приведение копий хранилищ с ID из диапазона [start, end) к хранилищам сервиса Хранилище.
+
+    :param db: Асинхронная сессия базы данных
+    :param start: Начало диапазона (включительно)
+    :param end: Конец диапазона (не включительно)
+    :param rows: Хранилища диапазона в сервисе Хранилище
+    :return: Количество созданных, изменённых и удалённых копий
+
+    Применяется так же, как изменения из ленты синхронизации: лишние копии удаляются, устаревшие обновляются,
+    кроме копий с ещё не применёнными в сервисе Хранилище изменениями вместимости.
+    """
+
+    remote_ids = {row["id"] for row in rows}
+    result = await db.execute(select(StorageCopy.id).where(StorageCopy.id >= start, StorageCopy.id < end))
+
+    changes = [StorageChangeSchema(version=row["version"], storage_id=row["id"], capacity=row["capacity"],
+                                   latitude=row.get("latitude"), longitude=row.get("longitude"),
+                                   capacity_updates=row.get("capacity_updates", 0))
+               for row in rows]
+    changes += [StorageChangeSchema(version=0, storage_id=storage_id, capacity=None)
+                for storage_id in result.scalars() if storage_id not in remote_ids]
+
+    return await apply_storage_changes(db, changes)
+
+
+async def reconcile(client: "httpx.AsyncClient", session_factory: sessionmaker = AsyncSessionLocal) -> int:
+    """
+    Сверка копий хранилищ и расстояний с сервисом Хранилище.
+
+    :param client: HTTP-клиент с `base_url` = `STORAGE_SERVICE_URL`
+    :param session_factory: Фабрика сессий базы данных
+    :return: Количество восстановленных диапазонов
+
+    Хранилища сверяются первыми: расстояния до отсутствующих хранилищ восстановить нельзя.
+    """
+
+    repaired = await reconcile_table(client, "storages", REPLICA_TABLES["storages"], repair_storage_copies,
+                                     session_factory)
+    repaired += await reconcile_table(client, "distances", REPLICA_TABLES["distances"],
+                                      replace_storage_distance_copies, session_factory)
+
+    return repaired
+
+
+async def run_reconciler(interval: float = RECONCILE_INTERVAL) -> None:
+    """
+    Периодическая сверка копий до остановки процесса (`shutdown_event`).
+
+    :param interval: Интервал между сверками, с
+    :return: None
+    """
+
+    import httpx
+
+    async with httpx.AsyncClient(base_url=STORAGE_SERVICE_URL, timeout=60,
+                                 event_hooks={"request": [inject_trace_headers]}) as client:
+        while not shutdown_event.is_set():
+            try:
+                with start_span("reconcile"):
+                    repaired = await reconcile(client)
+                if repaired:
+                    logger.warning("Replica reconciliation repaired %d ranges", repaired)
+            except Exception as exc:
+                logger.warning("Replica reconciliation failed: %s", exc)
+
+            await sleep_until_shutdown(interval)
+
+
+def start_reconciler() -> Optional[Thread]:
+    """
+    Запуск периодической сверки копий в отдельном потоке.
+
+    :return: Запущенный поток или None, если сверка выключена (`RECONCILE_INTERVAL` = 0)
+
+    Сверка запускается там же, где потребители событий (см. `CONSUMER_MODE`).
+    """
+
+    if RECONCILE_INTERVAL <= 0:
+        return None
+
+    return start_thread(lambda: asyncio.run(run_reconciler()))
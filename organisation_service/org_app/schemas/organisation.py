@@ -1,38 +1,57 @@
-from typing import Dict
-
-from pydantic import BaseModel, ConfigDict
-
-
-class OrganisationBaseSchema(BaseModel):
-    """
-    Базовая модель для организации.
-
-    :param name: Название организации
-    :param capacity: Словарь, где ключ - это тип ресурса (например, стекло, пластик), а значение - список ёмкостей
-    """
-
-    name: str
-    capacity: Dict[str, list]
-
-
-class OrganisationCreateSchema(OrganisationBaseSchema):
-    """
-    Модель для создания организации. Наследует от `OrganisationBase` и используется для создания новых записей.
-    """
-
-    pass
-
-
-class OrganisationSchema(OrganisationBaseSchema):
-    """
-    Модель организации с ID. Используется для представления организации после её создания.
-
-    :param id: Уникальный идентификатор организации
-    :param name: Название организации
-    :param capacity: Словарь типов отходов и их ёмкостей
-    :param model_config: Конфигурация модели для автоматического извлечения значений атрибутов из ORM-модели.
-    """
-
-    id: int
-
-    model_config = ConfigDict(from_attributes=True)  # Включает возможность создания модели из атрибутов объекта
+from typing import Dict, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+class OrganisationBaseSchema(BaseModel):
+    """
+    Базовая модель для организации.
+
+    :param name: Название организации
+    :param capacity: Словарь, где ключ - это тип ресурса (например, стекло, пластик), а значение - список ёмкостей
+    :param latitude: Широта организации в градусах. Необязательна, задаётся вместе с долготой
+    :param longitude: Долгота организации в градусах. Необязательна, задаётся вместе с широтой
+    """
+
+    name: str
+    capacity: Dict[str, list]
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+    @model_validator(mode="after")
+    def check_coordinates(self) -> "OrganisationBaseSchema":
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError("Широта и долгота задаются вместе")
+
+        return self
+
+
+class OrganisationCreateSchema(OrganisationBaseSchema):
+    """
+    Модель для создания организации. Наследует от `OrganisationBase` и используется для создания новых записей.
+    """
+
+    pass
+
+
+class OrganisationSchema(OrganisationBaseSchema):
+    """
+    Модель организации с ID. Используется для представления организации после её создания.
+
+    :param id: Уникальный идентификатор организации
+    :param name: Название организации
+    :param capacity: Словарь типов отходов и их ёмкостей
+    :param model_config: Конфигурация модели для автоматического извлечения значений атрибутов из ORM-модели.
+    """
+
+    id: int
+
+    model_config = ConfigDict(from_attributes=True)  # Включает возможность создания модели из атрибутов объекта
+
+    def is_all_waste_processed(self) -> bool:
+        """
+        Проверяет, все ли отходы переработаны.
+        :return: Если ни для одного типа отходов не осталось непереработанных отходов, возвращает True, иначе False.
+        """
+
+        return all(used <= 0 for used, total in self.capacity.values())
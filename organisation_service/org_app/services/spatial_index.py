@@ -0,0 +1,184 @@
+import heapq
+import itertools
+import math
+import os
+import time
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.models.storage import StorageCopy
+
+# Средний радиус Земли, км
+EARTH_RADIUS_KM = 6371.0088
+
+# Сколько секунд индекс хранилищ используется без перестроения. Изменения копий в этом процессе сбрасывают
+# индекс сразу, изменения в других воркерах (потребителях событий) становятся видны не позже чем через TTL
+SPATIAL_INDEX_TTL = float(os.getenv("SPATIAL_INDEX_TTL", "30"))
+
+# Максимальное количество точек в листе дерева
+LEAF_SIZE = 16
+
+Point = Tuple[float, float, float]
+
+
+def to_unit_vector(latitude: float, longitude: float) -> Point:
+    """
+    :param latitude: Широта, градусы
+    :param longitude: Долгота, градусы
+    :return: Точка на единичной сфере (x, y, z)
+    """
+
+    lat, lon = math.radians(latitude), math.radians(longitude)
+
+    return math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)
+
+
+def chord_to_km(chord: float) -> float:
+    """
+    :param chord: Длина хорды между точками единичной сферы
+    :return: Расстояние по большому кругу, км
+    """
+
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def haversine_km(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """
+    :return: Расстояние по большому кругу между двумя точками, км
+    """
+
+    lat1, lat2 = math.radians(latitude1), math.radians(latitude2)
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin(math.radians(longitude2 - longitude1) / 2) ** 2)
+
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class _Node:
+    __slots__ = ("low", "high", "left", "right", "items")
+
+    def __init__(self, items: List[Tuple[int, Point]]) -> None:
+        self.low = tuple(min(point[axis] for _, point in items) for axis in range(3))
+        self.high = tuple(max(point[axis] for _, point in items) for axis in range(3))
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+        self.items: Optional[List[Tuple[int, Point]]] = None
+
+        if len(items) <= LEAF_SIZE:
+            self.items = items
+            return
+
+        # Делим по оси с наибольшим разбросом точек
+        axis = max(range(3), key=lambda i: self.high[i] - self.low[i])
+        items.sort(key=lambda item: item[1][axis])
+        middle = len(items) // 2
+        self.left, self.right = _Node(items[:middle]), _Node(items[middle:])
+
+    def box_distance2(self, point: Point) -> float:
+        """
+        :param point: Точка запроса
+        :return: Квадрат расстояния от точки до ограничивающего параллелепипеда узла
+        """
+
+        return sum(max(low - value, 0.0, value - high) ** 2 for low, value, high in zip(self.low, point, self.high))
+
+
+class KDTree:
+    """
+    KD-дерево точек с координатами на сфере.
+
+    Точки хранятся как единичные векторы: расстояние по хорде монотонно расстоянию по большому кругу, поэтому
+    ближайшие по евклидовой метрике точки - ближайшие и на поверхности Земли, а ограничивающие параллелепипеды
+    узлов дают точную нижнюю оценку расстояния.
+
+    :param locations: Тройки (ID, широта, долгота)
+    """
+
+    def __init__(self, locations: Sequence[Tuple[int, float, float]]) -> None:
+        self.size = len(locations)
+        items = [(location_id, to_unit_vector(latitude, longitude)) for location_id, latitude, longitude in locations]
+        self._root = _Node(items) if items else None
+
+    def nearest(self, latitude: float, longitude: float) -> Iterator[Tuple[int, float]]:
+        """
+        Точки в порядке возрастания расстояния от заданной.
+
+        :param latitude: Широта, градусы
+        :param longitude: Долгота, градусы
+        :return: Генератор пар (ID, расстояние в км)
+
+        Поиск идёт по мере чтения (best-first): получение k ближайших точек стоит O(k log n), поэтому
+        вызывающая сторона может остановиться, как только найдено достаточно кандидатов.
+        """
+
+        if self._root is None:
+            return
+
+        query = to_unit_vector(latitude, longitude)
+        counter = itertools.count()
+        # (квадрат расстояния, порядковый номер, узел или None, ID точки)
+        heap = [(self._root.box_distance2(query), next(counter), self._root, 0)]
+        while heap:
+            distance2, _, node, location_id = heapq.heappop(heap)
+            if node is None:
+                yield location_id, chord_to_km(math.sqrt(distance2))
+            elif node.items is not None:
+                for item_id, point in node.items:
+                    heapq.heappush(heap, (sum((a - b) ** 2 for a, b in zip(point, query)), next(counter), None,
+                                          item_id))
+            else:
+                for child in (node.left, node.right):
+                    heapq.heappush(heap, (child.box_distance2(query), next(counter), child, 0))
+
+
+class StorageLocationIndex:
+    """
+    Пространственный индекс копий хранилищ с координатами для поиска ближайших хранилищ без заданных расстояний.
+
+    Индекс строится из БД при первом обращении и перестраивается после `invalidate` или по истечении `ttl`.
+    Удалённые после построения хранилища отбрасывает вызывающая сторона: их нет среди снимков копий.
+
+    :param ttl: Время использования индекса без перестроения, с
+    """
+
+    def __init__(self, ttl: float = SPATIAL_INDEX_TTL) -> None:
+        self.ttl = ttl
+        self._tree: Optional[KDTree] = None
+        self._built_at = 0.0
+
+    async def get(self, db: AsyncSession) -> KDTree:
+        """
+        :param db: Асинхронная сессия базы данных
+        :return: Актуальное дерево хранилищ
+        """
+
+        tree = self._tree
+        if tree is None or time.monotonic() - self._built_at > self.ttl:
+            result = await db.execute(
+                select(StorageCopy.id, StorageCopy.latitude, StorageCopy.longitude)
+                .where(StorageCopy.latitude.is_not(None), StorageCopy.longitude.is_not(None),
+                       StorageCopy.deleted.is_(False))
+            )
+            tree = KDTree(result.all())
+            self._tree, self._built_at = tree, time.monotonic()
+
+        return tree
+
+    def invalidate(self) -> None:
+        self._tree = None
+
+    def invalidate_after_commit(self, db: AsyncSession) -> None:
+        """
+        Сброс индекса после фиксации текущей транзакции сессии, в которой созданы или удалены копии хранилищ.
+
+        :param db: Асинхронная сессия базы данных
+        :return: None
+        """
+
+        event.listen(db.sync_session, "after_commit", lambda session: self.invalidate(), once=True)
+
+
+# Копии хранилищ с координатами
+storage_location_index = StorageLocationIndex()
@@ -1,79 +1,227 @@
-from typing import Dict
-
-from fastapi import HTTPException
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from org_app.crud.organisation import get_organisation
-from org_app.crud.storage import get_storage_copy
-from org_app.models.storage_distance import StorageDistanceCopy
-
-
-async def find_nearest_storage(db: AsyncSession, organisation_id: int) -> tuple[
-    Dict[int, Dict[str, int]], Dict[str, int], Dict[str, int]]:
-    """
-    Функция позволяет найти ближайшие хранилища для утилизации отходов организации и вернуть информацию о переработанных отходах.
-
-    :param db: Асинхронная сессия базы данных, используемая для выполнения запросов.
-    :param organisation_id: Идентификатор организации, для которой нужно найти ближайшие хранилища.
-    :return: Словарь с распределением отходов, общий объем переработанных отходов и остатки отходов, которые не поместились.
-    """
-
-    # Получаем данные организации, включая её доступные объёмы отходов
-    organisation = await get_organisation(db, organisation_id)
-    if not organisation:
-        raise ValueError("Organisation not found")
-
-    storage_plan = {}
-    total_sent_waste = {}
-    remaining_waste = {}  # Словарь для отслеживания не поместившихся отходов
-    organisation_capacity = organisation.capacity
-
-    # Получаем все записи расстояний, связанных с данной организацией
-    storage_distances = await db.execute(
-        select(StorageDistanceCopy).where(StorageDistanceCopy.organisation_id == organisation_id)
-    )
-    storage_distances = storage_distances.scalars().all()
-
-    if not storage_distances:
-        raise HTTPException(status_code=404, detail="У организации нет связи с каким либо хранилищем")
-
-    for waste_type, (used, total) in organisation_capacity.items():
-        remaining = used
-        if remaining <= 0:
-            continue
-
-        # Сортируем хранилища по расстоянию от данной организации
-        sorted_distances = sorted(storage_distances, key=lambda x: x.distance)
-
-        for distance in sorted_distances:
-            storage_id = distance.storage_id
-            storage_copy = await get_storage_copy(db, storage_id)
-            if not storage_copy:
-                continue
-
-            if waste_type in storage_copy.capacity:
-                storage_capacity_left = storage_copy.capacity[waste_type][1] - storage_copy.capacity[waste_type][0]
-                if storage_capacity_left > 0:
-                    amount_to_store = min(remaining, storage_capacity_left)
-
-                    # Обновляем план хранения
-                    if storage_id not in storage_plan:
-                        storage_plan[storage_id] = {}
-                    storage_plan[storage_id][waste_type] = amount_to_store
-
-                    # Обновляем общий объем переработанных отходов
-                    if waste_type not in total_sent_waste:
-                        total_sent_waste[waste_type] = 0
-                    total_sent_waste[waste_type] += amount_to_store
-
-                    remaining -= amount_to_store
-
-                    if remaining <= 0:
-                        break
-
-        # Если после всех попыток распределить отходы остался остаток, добавляем его в словарь remaining_waste
-        if remaining > 0:
-            remaining_waste[waste_type] = remaining
-
-    return storage_plan, total_sent_waste, remaining_waste
+import heapq
+import itertools
+import os
+from typing import Callable, Dict, List, Mapping, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.crud.organisation import get_organisation_snapshot
+from org_app.crud.storage import get_storage_copy_snapshots
+from org_app.crud.storage_distance import get_sorted_storage_distances
+from org_app.schemas.organisation import OrganisationSchema
+from org_app.services.spatial_index import storage_location_index
+
+# Распределение: {ID хранилища: {тип отходов: объём}}, отправлено по типам, не поместилось по типам
+Plan = Tuple[Dict[int, Dict[str, int]], Dict[str, int], Dict[str, int]]
+# Планировщик: (отходы организации, отсортированные расстояния, вместимость хранилищ) -> распределение
+Planner = Callable[[Mapping[str, Sequence[int]], Sequence[Tuple[int, int]], Mapping[int, Mapping[str, Sequence[int]]]],
+                   Plan]
+
+
+def plan_by_waste_type(organisation_capacity: Mapping[str, Sequence[int]],
+                       sorted_distances: Sequence[Tuple[int, int]],
+                       storage_capacities: Mapping[int, Mapping[str, Sequence[int]]],
+                       ) -> Plan:
+    """
+    Распределение отходов по ближайшим хранилищам: для каждого типа отходов хранилища перебираются
+    по возрастанию расстояния, пока отходы не закончатся.
+
+    :param organisation_capacity: Отходы организации {тип: [объём, максимум]}
+    :param sorted_distances: Пары (ID хранилища, расстояние) по возрастанию расстояния
+    :param storage_capacities: Вместимость хранилищ {ID: {тип: [занято, максимум]}}. Хранилища без записи пропускаются
+    :return: Распределение, отправленные и не поместившиеся отходы
+    """
+
+    storage_plan = {}
+    total_sent_waste = {}
+    remaining_waste = {}  # Словарь для отслеживания не поместившихся отходов
+
+    for waste_type, (used, total) in organisation_capacity.items():
+        remaining = used
+        if remaining <= 0:
+            continue
+
+        for storage_id, _ in sorted_distances:
+            storage_capacity = storage_capacities.get(storage_id)
+            if not storage_capacity:
+                continue
+
+            if waste_type in storage_capacity:
+                storage_capacity_left = storage_capacity[waste_type][1] - storage_capacity[waste_type][0]
+                if storage_capacity_left > 0:
+                    amount_to_store = min(remaining, storage_capacity_left)
+
+                    # Обновляем план хранения
+                    if storage_id not in storage_plan:
+                        storage_plan[storage_id] = {}
+                    storage_plan[storage_id][waste_type] = amount_to_store
+
+                    # Обновляем общий объем переработанных отходов
+                    if waste_type not in total_sent_waste:
+                        total_sent_waste[waste_type] = 0
+                    total_sent_waste[waste_type] += amount_to_store
+
+                    remaining -= amount_to_store
+
+                    if remaining <= 0:
+                        break
+
+        # Если после всех попыток распределить отходы остался остаток, добавляем его в словарь remaining_waste
+        if remaining > 0:
+            remaining_waste[waste_type] = remaining
+
+    return storage_plan, total_sent_waste, remaining_waste
+
+
+def plan_single_pass(organisation_capacity: Mapping[str, Sequence[int]],
+                     sorted_distances: Sequence[Tuple[int, int]],
+                     storage_capacities: Mapping[int, Mapping[str, Sequence[int]]],
+                     ) -> Plan:
+    """
+    То же распределение за один проход по хранилищам: каждое хранилище принимает все оставшиеся отходы
+    подходящих типов. Проход останавливается, когда отходы закончились.
+
+    :param organisation_capacity: Отходы организации {тип: [объём, максимум]}
+    :param sorted_distances: Пары (ID хранилища, расстояние) по возрастанию расстояния
+    :param storage_capacities: Вместимость хранилищ {ID: {тип: [занято, максимум]}}. Хранилища без записи пропускаются
+    :return: Распределение, отправленные и не поместившиеся отходы
+
+    Результат совпадает с `plan_by_waste_type`: типы отходов распределяются независимо, а порядок хранилищ
+    для каждого типа тот же. Какой планировщик быстрее, зависит от данных (`python -m benchmarks.planner`).
+    """
+
+    remaining = {waste_type: used for waste_type, (used, _) in organisation_capacity.items() if used > 0}
+    storage_plan: Dict[int, Dict[str, int]] = {}
+    total_sent_waste: Dict[str, int] = {}
+
+    for storage_id, _ in sorted_distances:
+        if not remaining:
+            break
+
+        storage_capacity = storage_capacities.get(storage_id)
+        if not storage_capacity:
+            continue
+
+        for waste_type, (used, maximum) in storage_capacity.items():
+            if maximum - used <= 0 or waste_type not in remaining:
+                continue
+
+            amount_to_store = min(remaining[waste_type], maximum - used)
+            storage_plan.setdefault(storage_id, {})[waste_type] = amount_to_store
+            total_sent_waste[waste_type] = total_sent_waste.get(waste_type, 0) + amount_to_store
+            remaining[waste_type] -= amount_to_store
+            if remaining[waste_type] <= 0:
+                del remaining[waste_type]
+
+    return storage_plan, total_sent_waste, remaining
+
+
+PLANNERS: Dict[str, Planner] = {
+    "by_waste_type": plan_by_waste_type,
+    "single_pass": plan_single_pass,
+}
+
+# Планировщик `/recycle/`, см. PLANNERS. Сравнение: python -m benchmarks.planner
+RECYCLE_PLANNER = os.getenv("RECYCLE_PLANNER", "by_waste_type")
+if RECYCLE_PLANNER not in PLANNERS:
+    raise ValueError(f"Unknown RECYCLE_PLANNER: {RECYCLE_PLANNER}")
+
+# Максимальное расстояние до хранилища, найденного по координатам, км. 0 - без ограничения
+SPATIAL_MAX_DISTANCE = float(os.getenv("SPATIAL_MAX_DISTANCE", "0"))
+# Сколько ближайших хранилищ проверяется за один запрос снимков
+SPATIAL_CANDIDATE_BATCH = 64
+
+
+async def find_candidate_storages(db: AsyncSession,
+                                  organisation: OrganisationSchema,
+                                  sorted_distances: Sequence[Tuple[int, int]],
+                                  max_distance: float = SPATIAL_MAX_DISTANCE,
+                                  ) -> Tuple[List[Tuple[int, float]], Dict[int, Dict[str, list]]]:
+    """
+    Ближайшие хранилища со свободной вместимостью для организации с координатами.
+
+    :param db: Асинхронная сессия базы данных
+    :param organisation: Организация с координатами
+    :param sorted_distances: Заданные расстояния организации по возрастанию
+    :param max_distance: Максимальное расстояние до хранилища, найденного по координатам, км. 0 - без ограничения
+    :return: Пары (ID хранилища, расстояние) по возрастанию расстояния и вместимость этих хранилищ
+
+    К заданным расстояниям добавляются хранилища с координатами из `storage_location_index`, расстояние до них
+    считается по большому кругу. Заданное расстояние важнее вычисленного. Хранилища перебираются от ближайшего,
+    пропускаются хранилища без свободного места для отходов организации, и перебор останавливается, как только
+    свободной вместимости найденных хранилищ хватает на все отходы: дальние хранилища планировщик не использует.
+    """
+
+    needed = {waste_type: used for waste_type, (used, _) in organisation.capacity.items() if used > 0}
+    explicit_ids = {storage_id for storage_id, _ in sorted_distances}
+
+    tree = await storage_location_index.get(db)
+    nearest = ((storage_id, distance)
+               for storage_id, distance in tree.nearest(organisation.latitude, organisation.longitude)
+               if storage_id not in explicit_ids)
+    if max_distance > 0:
+        nearest = itertools.takewhile(lambda candidate: candidate[1] <= max_distance, nearest)
+    candidates = heapq.merge(sorted_distances, nearest, key=lambda candidate: candidate[1])
+
+    found, storage_capacities = [], {}
+    while needed:
+        batch = list(itertools.islice(candidates, SPATIAL_CANDIDATE_BATCH))
+        if not batch:
+            break
+
+        storage_copies = await get_storage_copy_snapshots(db, (storage_id for storage_id, _ in batch))
+        for storage_id, distance in batch:
+            storage_copy = storage_copies.get(storage_id)
+            if storage_copy is None:
+                continue
+
+            free = {waste_type: maximum - used for waste_type, (used, maximum) in storage_copy.capacity.items()
+                    if waste_type in needed and maximum - used > 0}
+            if not free:
+                continue
+
+            found.append((storage_id, distance))
+            storage_capacities[storage_id] = storage_copy.capacity
+            for waste_type, amount in free.items():
+                needed[waste_type] -= amount
+                if needed[waste_type] <= 0:
+                    del needed[waste_type]
+            if not needed:
+                break
+
+    return found, storage_capacities
+
+
+async def find_nearest_storage(db: AsyncSession, organisation_id: int) -> Plan:
+    """
+    Функция позволяет найти ближайшие хранилища для утилизации отходов организации и вернуть информацию о переработанных отходах.
+
+    :param db: Асинхронная сессия базы данных, используемая для выполнения запросов.
+    :param organisation_id: Идентификатор организации, для которой нужно найти ближайшие хранилища.
+    :return: Словарь с распределением отходов, общий объем переработанных отходов и остатки отходов, которые не поместились.
+    """
+
+    # Получаем данные организации, включая её доступные объёмы отходов
+    organisation = await get_organisation_snapshot(db, organisation_id)
+    if not organisation:
+        raise ValueError("Organisation not found")
+
+    # Получаем все хранилища, связанные с данной организацией, отсортированные по расстоянию
+    sorted_distances = await get_sorted_storage_distances(db, organisation_id)
+
+    # С координатами организации кандидаты дополняются ближайшими по координатам хранилищами. Если кандидатов
+    # со свободным местом нет, план строится по связанным хранилищам, как для организации без координат
+    if organisation.latitude is not None:
+        candidates, storage_capacities = await find_candidate_storages(db, organisation, sorted_distances)
+        if candidates:
+            return PLANNERS[RECYCLE_PLANNER](organisation.capacity, candidates, storage_capacities)
+
+    if not sorted_distances:
+        raise HTTPException(status_code=404, detail="У организации нет связи с каким либо хранилищем")
+
+    # Снимки всех связанных хранилищ загружаем за один раз (или берём из кеша)
+    storage_copies = await get_storage_copy_snapshots(db, (storage_id for storage_id, _ in sorted_distances))
+    storage_capacities = {storage_id: storage_copy.capacity for storage_id, storage_copy in storage_copies.items()}
+
+    return PLANNERS[RECYCLE_PLANNER](organisation.capacity, sorted_distances, storage_capacities)
@@ -0,0 +1,254 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from threading import Thread
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from org_app.cache import invalidate_after_commit, storage_copy_cache, storage_distances_cache
+from org_app.crud.storage import apply_storage_changes
+from org_app.crud.sync_cursor import get_sync_cursor, set_sync_cursor
+from org_app.database import AsyncSessionLocal
+from org_app.lifecycle import shutdown_event, sleep_until_shutdown, start_thread
+from org_app.models.organisation import Organisation
+from org_app.models.storage import StorageCopy
+from org_app.models.storage_distance import StorageDistanceCopy
+from org_app.schemas.storage_change import StorageChangeSchema
+from org_app.services.spatial_index import storage_location_index
+from org_app.tracing import inject_trace_headers, start_span
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# Адрес API сервиса Хранилище
+STORAGE_SERVICE_URL = os.getenv("STORAGE_SERVICE_URL", "http://storage_service:8001/api/v1/storage")
+# Интервал синхронизации копий хранилищ с лентой изменений, с. 0 - синхронизация выключена
+STORAGE_SYNC_INTERVAL = float(os.getenv("STORAGE_SYNC_INTERVAL", "60"))
+# Количество изменений, запрашиваемых и применяемых за раз
+STORAGE_SYNC_BATCH_SIZE = int(os.getenv("STORAGE_SYNC_BATCH_SIZE", "1000"))
+
+# Начальная загрузка копий при старте с пустой БД: пусто - выключена, http - снимок из сервиса Хранилище
+# (`/snapshot/`), иначе - путь к файлу снимка (`python -m storage_app.snapshot <файл>`)
+STORAGE_SNAPSHOT_SOURCE = os.getenv("STORAGE_SNAPSHOT_SOURCE", "")
+# Сколько ждать сервис Хранилище при начальной загрузке, с
+STORAGE_SNAPSHOT_TIMEOUT = float(os.getenv("STORAGE_SNAPSHOT_TIMEOUT", "60"))
+
+# Имя ленты в `SyncCursor`
+STORAGE_CHANGES_CURSOR = "storage_changes"
+# Версия формата снимка, который умеет загружать сервис
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+async def sync_storage_copies(client: "httpx.AsyncClient",
+                              session_factory: sessionmaker = AsyncSessionLocal,
+                              batch_size: int = STORAGE_SYNC_BATCH_SIZE,
+                              ) -> int:
+    """
+    Догоняет копии хранилищ по ленте изменений сервиса Хранилище.
+
+    :param client: HTTP-клиент с `base_url` = `STORAGE_SERVICE_URL`
+    :param session_factory: Фабрика сессий базы данных
+    :param batch_size: Количество изменений, запрашиваемых и применяемых за раз
+    :return: Количество полученных изменений
+
+    Запрашиваются изменения после версии, сохранённой в `SyncCursor`. Каждая страница применяется
+    в отдельной транзакции вместе с новой позицией, поэтому после сбоя синхронизация продолжается с того же места.
+    Пропущенные события создания, удаления и изменения хранилищ восполняются без полной перезагрузки копий.
+    """
+
+    async with session_factory() as db:
+        since = await get_sync_cursor(db, STORAGE_CHANGES_CURSOR)
+
+    received = 0
+    while True:
+        response = await client.get("/storages/changes/", params={"since": since, "limit": batch_size})
+        response.raise_for_status()
+
+        changes = [StorageChangeSchema.model_validate(item) for item in response.json()]
+        if not changes:
+            return received
+
+        async with session_factory() as db:
+            await apply_storage_changes(db, changes)
+            await set_sync_cursor(db, STORAGE_CHANGES_CURSOR, changes[-1].version)
+            await db.commit()
+
+        since = changes[-1].version
+        received += len(changes)
+        if len(changes) < batch_size:
+            return received
+
+
+async def needs_bootstrap(db: AsyncSession) -> bool:
+    """
+    :param db: Асинхронная сессия базы данных
+    :return: True, если копий хранилищ нет и лента изменений ещё не читалась
+    """
+
+    has_copies = await db.scalar(select(StorageCopy.id).limit(1)) is not None
+
+    return not has_copies and await get_sync_cursor(db, STORAGE_CHANGES_CURSOR) == 0
+
+
+async def load_storage_snapshot(source: str, client: Optional["httpx.AsyncClient"] = None) -> Dict[str, Any]:
+    """
+    Загрузка снимка хранилищ и расстояний.
+
+    :param source: http - запросить снимок у сервиса Хранилище, иначе - путь к файлу снимка (JSON или JSON в gzip)
+    :param client: HTTP-клиент с `base_url` = `STORAGE_SERVICE_URL`, нужен для source = http
+    :return: Снимок
+    """
+
+    if source == "http":
+        response = await client.get("/snapshot/")
+        response.raise_for_status()
+
+        return response.json()
+
+    with open(source, "rb") as file:
+        data = file.read()
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+
+    return json.loads(data)
+
+
+async def apply_storage_snapshot(db: AsyncSession, snapshot: Dict[str, Any]) -> bool:
+    """
+    Загрузка снимка в пустые таблицы копий хранилищ и расстояний.
+
+    :param db: Асинхронная сессия базы данных
+    :param snapshot: Снимок (формат - `storage_app.snapshot.build_snapshot`)
+    :return: True, если снимок загружен, False - если копии уже есть
+    :raises ValueError: неизвестная версия формата снимка
+
+    Копии вставляются пачками в одной транзакции вместе с позицией ленты изменений, с которой продолжится
+    синхронизация. Расстояния до организаций, которых нет в БД, пропускаются.
+    """
+
+    if snapshot.get("v") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format: {snapshot.get('v')}")
+
+    if not await needs_bootstrap(db):
+        return False
+
+    organisation_ids = set((await db.execute(select(Organisation.id))).scalars().all())
+    distances = [distance for distance in snapshot["distances"] if distance["organisation_id"] in organisation_ids]
+
+    if snapshot["storages"]:
+        await db.execute(insert(StorageCopy), snapshot["storages"])
+    if distances:
+        await db.execute(insert(StorageDistanceCopy), distances)
+    await set_sync_cursor(db, STORAGE_CHANGES_CURSOR, snapshot["version"])
+
+    invalidate_after_commit(db, storage_copy_cache)
+    invalidate_after_commit(db, storage_distances_cache)
+    storage_location_index.invalidate_after_commit(db)
+    await db.commit()
+
+    skipped = len(snapshot["distances"]) - len(distances)
+    if skipped:
+        logger.warning("Storage snapshot: %d distances to unknown organisations skipped", skipped)
+
+    return True
+
+
+async def bootstrap_storage_copies(source: str = STORAGE_SNAPSHOT_SOURCE,
+                                   session_factory: sessionmaker = AsyncSessionLocal,
+                                   timeout: float = STORAGE_SNAPSHOT_TIMEOUT,
+                                   ) -> bool:
+    """
+    Начальная загрузка копий хранилищ и расстояний из снимка при старте сервиса с пустой БД.
+
+    :param source: Источник снимка (см. `STORAGE_SNAPSHOT_SOURCE`), пустая строка - загрузка выключена
+    :param session_factory: Фабрика сессий базы данных
+    :param timeout: Сколько повторять запрос снимка, если сервис Хранилище недоступен, с
+    :return: True, если снимок загружен
+
+    Вызывается до приёма запросов. Без неё новая реплика получает копии только из событий и синхронизации.
+    Если снимок получить не удалось, сервис стартует как обычно.
+    """
+
+    if not source:
+        return False
+
+    async with session_factory() as db:
+        if not await needs_bootstrap(db):
+            return False
+
+    import httpx
+
+    started = time.monotonic()
+    async with httpx.AsyncClient(base_url=STORAGE_SERVICE_URL, timeout=timeout,
+                                 event_hooks={"request": [inject_trace_headers]}) as client:
+        while True:
+            try:
+                snapshot = await load_storage_snapshot(source, client)
+                break
+            except (httpx.HTTPError, OSError) as exc:
+                if time.monotonic() - started >= timeout:
+                    logger.warning("Storage snapshot is unavailable, starting without it: %s", exc)
+                    return False
+                await asyncio.sleep(1)
+
+    try:
+        async with session_factory() as db:
+            loaded = await apply_storage_snapshot(db, snapshot)
+    except IntegrityError:
+        # Снимок одновременно загрузил другой воркер
+        return False
+
+    if loaded:
+        logger.info("Storage snapshot loaded in %.1f s: %d storages, %d distances, version %d",
+                    time.monotonic() - started, len(snapshot["storages"]), len(snapshot["distances"]),
+                    snapshot["version"])
+
+    return loaded
+
+
+async def run_storage_sync(interval: float = STORAGE_SYNC_INTERVAL) -> None:
+    """
+    Периодическая синхронизация копий хранилищ до остановки процесса (`shutdown_event`).
+
+    :param interval: Интервал между синхронизациями, с
+    :return: None
+    """
+
+    import httpx
+
+    async with httpx.AsyncClient(base_url=STORAGE_SERVICE_URL, timeout=30,
+                                 event_hooks={"request": [inject_trace_headers]}) as client:
+        while not shutdown_event.is_set():
+            try:
+                with start_span("storage_sync"):
+                    received = await sync_storage_copies(client)
+                if received:
+                    logger.info("Storage copies synced, %d changes applied", received)
+            except Exception as exc:
+                logger.warning("Storage copies sync failed: %s", exc)
+
+            await sleep_until_shutdown(interval)
+
+
+def start_storage_sync() -> Optional[Thread]:
+    """
+    Запуск периодической синхронизации копий хранилищ в отдельном потоке.
+
+    :return: Запущенный поток или None, если синхронизация выключена (`STORAGE_SYNC_INTERVAL` = 0)
+
+    Синхронизация запускается там же, где потребители событий (см. `CONSUMER_MODE`).
+    """
+
+    if STORAGE_SYNC_INTERVAL <= 0:
+        return None
+
+    return start_thread(lambda: asyncio.run(run_storage_sync()))
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+from threading import Thread
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.database import AsyncSessionLocal
+from org_app.lifecycle import shutdown_event, sleep_until_shutdown, start_thread
+from org_app.models.organisation import Organisation
+from org_app.models.storage import StorageCopy
+from org_app.models.storage_distance import StorageDistanceCopy
+
+logger = logging.getLogger(__name__)
+
+# Пауза между проверками, если удалять нечего, с (0 - фоновое удаление выключено)
+TOMBSTONE_PURGE_INTERVAL = float(os.getenv("TOMBSTONE_PURGE_INTERVAL", "1"))
+# Максимальное количество дочерних записей, удаляемых одним запросом (и одной транзакцией)
+TOMBSTONE_PURGE_BATCH = int(os.getenv("TOMBSTONE_PURGE_BATCH", "5000"))
+
+# Таблицы с отложенным каскадным удалением: модель -> столбцы дочерних записей, ссылающиеся на неё
+CASCADES = {
+    StorageCopy: [StorageDistanceCopy.storage_id],
+    Organisation: [StorageDistanceCopy.organisation_id],
+}
+
+
+async def purge_tombstones_batch(db: AsyncSession, batch_size: int = TOMBSTONE_PURGE_BATCH) -> int:
+    """
+    Удаление очередной пачки дочерних записей помеченных на удаление строк (`deleted`).
+
+    :param db: Асинхронная сессия базы данных
+    :param batch_size: Максимальное количество дочерних записей в пачке
+    :return: Количество удалённых строк, 0 - удалять нечего
+
+    Дочерние записи удаляются одним запросом `DELETE ... WHERE id IN (SELECT id ... LIMIT n)` без загрузки
+    в память, каждая пачка - отдельной короткой транзакцией. Сама строка удаляется, когда дочерних записей
+    не осталось, поэтому внешние ключи не нарушаются ни в какой момент.
+    """
+
+    for model, columns in CASCADES.items():
+        row_id = await db.scalar(select(model.id).where(model.deleted.is_(True)).order_by(model.id).limit(1))
+        if row_id is None:
+            continue
+
+        for column in columns:
+            child_id = column.table.c.id
+            result = await db.execute(
+                delete(column.table).where(child_id.in_(select(child_id).where(column == row_id).limit(batch_size)))
+            )
+            if result.rowcount:
+                await db.commit()
+                return result.rowcount
+
+        await db.execute(delete(model).where(model.id == row_id))
+        await db.commit()
+        return 1
+
+    return 0
+
+
+async def run_tombstone_purger(interval: float = TOMBSTONE_PURGE_INTERVAL) -> None:
+    """
+    Фоновое удаление дочерних записей удалённых строк до остановки процесса (`shutdown_event`).
+
+    :param interval: Пауза между проверками, если удалять нечего, с
+    :return: None
+    """
+
+    while not shutdown_event.is_set():
+        try:
+            async with AsyncSessionLocal() as db:
+                purged = await purge_tombstones_batch(db)
+        except Exception as exc:
+            logger.warning("Tombstone purge failed: %s", exc)
+            purged = 0
+
+        if not purged:
+            await sleep_until_shutdown(interval)
+
+
+def start_tombstone_purger() -> Optional[Thread]:
+    """
+    Запуск фонового удаления в отдельном потоке.
+
+    :return: Запущенный поток или None, если фоновое удаление выключено (`TOMBSTONE_PURGE_INTERVAL` = 0)
+
+    Удаление запускается там же, где потребители событий (см. `CONSUMER_MODE`), чтобы одни и те же строки
+    не удаляли несколько воркеров.
+    """
+
+    if TOMBSTONE_PURGE_INTERVAL <= 0:
+        return None
+
+    return start_thread(lambda: asyncio.run(run_tombstone_purger()))
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+import signal
+
+from org_app.database import close_db, init_db
+from org_app.events.consumers import start_listening_events, stop_event_consumers
+from org_app.events.outbox import start_outbox_relay
+from org_app.lifecycle import shutdown_event
+from org_app.reconcile import start_reconciler
+from org_app.sync import start_storage_sync
+from org_app.tombstones import start_tombstone_purger
+
+
+async def shutdown() -> None:
+    """
+    Плавная остановка воркера: потребители, фоновые потоки, outbox, затем подключения к базе данных.
+
+    :return: None
+    """
+
+    await stop_event_consumers()
+    await close_db()
+
+
+def main() -> None:
+    """
+    Запуск отдельного процесса-потребителя событий (режим `CONSUMER_MODE=dedicated`).
+
+    :return: None
+
+    HTTP-воркеры в этом режиме события не слушают и масштабируются независимо (`WEB_CONCURRENCY`),
+    а количество потребителей задаётся через `CONSUMER_CONCURRENCY`. Здесь же работают ретранслятор outbox,
+    синхронизация и сверка копий хранилищ и фоновое удаление дочерних записей удалённых строк. По SIGTERM
+    или SIGINT воркер останавливается плавно (см. `stop_event_consumers`).
+    """
+
+    logging.basicConfig(level=logging.INFO)
+
+    asyncio.run(init_db())
+    start_listening_events()
+    start_outbox_relay()
+    start_storage_sync()
+    start_reconciler()
+    start_tombstone_purger()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: shutdown_event.set())
+    shutdown_event.wait()
+
+    asyncio.run(shutdown())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+from threading import Thread
+from typing import Generator, List
+from unittest.mock import patch
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from pika.spec import Basic, BasicProperties
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.events.broker import InMemoryBroker, InMemoryChannel, connect, set_broker
+from org_app.events.consumers import stop_event_consumers
+from org_app.events.consumers.storage import listen_storage_created_event, listen_storage_deleted_event
+from org_app.events.consumers.storage_distance import listen_distance_deleted_event
+from org_app.events.outbox import relay_outbox_batch
+from org_app.events.producers import publish_events
+from org_app.lifecycle import shutdown_event, start_thread
+from org_app.models.outbox import OutboxEvent
+from org_app.crud.storage_distance import get_sorted_storage_distances
+from org_app.models.storage import StorageCopy
+from .conftest import TestSessionLocal
+from .factories import create_organisation, create_storage, create_distance
+
+
+@pytest.fixture
+def broker() -> Generator[InMemoryBroker, None, None]:
+    """
+    Подключает продюсеры и потребители к брокеру в памяти на время теста.
+
+    :return: Брокер в памяти
+    """
+
+    broker = InMemoryBroker()
+    set_broker(broker)
+    yield broker
+    broker.close()
+    set_broker(None)
+
+
+@pytest.mark.asyncio
+async def test_relay_publishes_to_in_memory_broker(broker: InMemoryBroker,
+                                                   async_client: AsyncClient,
+                                                   db_session: AsyncSession,
+                                                   ) -> None:
+    """
+    Проверяем, что события из outbox публикуются в брокер в памяти без RabbitMQ.
+
+    :param broker: Брокер в памяти.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    response = await async_client.post("/api/v1/organisation/organisation/",
+                                       json={"name": "ОО1", "capacity": {"Пластик": [0, 10]}})
+    assert response.status_code == status.HTTP_200_OK
+
+    assert await relay_outbox_batch(db_session) == 1
+    assert broker.pending() == {"organisation_created": 1}
+
+
+@pytest.mark.asyncio
+async def test_consumer_applies_event_from_in_memory_broker(broker: InMemoryBroker, db_session: AsyncSession) -> None:
+    """
+    Проверяем, что настоящий потребитель в отдельном потоке получает событие из брокера в памяти,
+    применяет его к базе данных и подтверждает, а повторная доставка того же события отбрасывается.
+
+    :param broker: Брокер в памяти.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    event = ("storage_created", {"id": 1, "capacity": {"Пластик": [0, 60]}, "version": 1}, "event-1", None)
+    with patch("org_app.events.consumers.delivery.AsyncSessionLocal", TestSessionLocal):
+        thread = Thread(target=listen_storage_created_event, daemon=True)
+        thread.start()
+        publish_events([event, event])
+        assert broker.join(timeout=5)
+
+    broker.close()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+    storage = await db_session.get(StorageCopy, 1)
+    assert storage.capacity == {"Пластик": [0, 60]}
+    assert (broker.published, broker.acked) == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_consumers_apply_batched_delete_events(broker: InMemoryBroker, db_session: AsyncSession) -> None:
+    """
+    Проверяем, что пакетные события `distance_delete` и `storage_delete` применяются к копиям целиком,
+    а кеш расстояний затронутой организации сбрасывается.
+
+    :param broker: Брокер в памяти.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [50, 50]})
+    storages = [await create_storage(db_session, {"Пластик": [0, 30]}) for _ in range(4)]
+    distances = [await create_distance(db_session, storage.id, organisation.id, distance=10 * (i + 1))
+                 for i, storage in enumerate(storages)]
+    assert len(await get_sorted_storage_distances(db_session, organisation.id)) == 4
+
+    # Потребители запускаются по очереди: тестовая база данных использует одно подключение
+    events = [
+        (listen_distance_deleted_event,
+         ("distance_delete", {"items": [{"id": distances[0].id}, {"id": distances[1].id}]}, "event-1", None)),
+        (listen_storage_deleted_event,
+         ("storage_delete", {"items": [{"id": storages[2].id}, {"id": 404}]}, "event-2", None)),
+    ]
+    threads = []
+    with patch("org_app.events.consumers.delivery.AsyncSessionLocal", TestSessionLocal):
+        for listen, event in events:
+            threads.append(Thread(target=listen, daemon=True))
+            threads[-1].start()
+            publish_events([event])
+            assert broker.join(timeout=5)
+
+    broker.close()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    # Расстояния до удалённого хранилища удаляются в фоне, планировщик пропускает его копию
+    assert await get_sorted_storage_distances(db_session, organisation.id) == [(storages[2].id, 30),
+                                                                               (storages[3].id, 40)]
+    result = await db_session.execute(select(StorageCopy.deleted).order_by(StorageCopy.id))
+    assert result.scalars().all() == [False, False, True, False]
+
+
+def test_nack_requeues_once(broker: InMemoryBroker) -> None:
+    """
+    Проверяем семантику RabbitMQ: `basic_nack(requeue=True)` возвращает сообщение в начало очереди с признаком
+    повторной доставки, а неподтверждённые сообщения закрытого подключения возвращаются в очередь.
+
+    :param broker: Брокер в памяти.
+    :return: None
+    """
+
+    deliveries: List[Basic.Deliver] = []
+
+    def callback(ch: InMemoryChannel, method: Basic.Deliver, properties: BasicProperties, body: bytes) -> None:
+        deliveries.append(method)
+        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=not method.redelivered)
+        if method.redelivered:
+            ch.stop_consuming()
+
+    channel = connect().channel()
+    channel.queue_declare(queue="storage_delete")
+    channel.basic_publish(exchange="", routing_key="storage_delete", body=b"1")
+    channel.basic_consume(queue="storage_delete", on_message_callback=callback)
+    channel.start_consuming()
+
+    assert [method.redelivered for method in deliveries] == [False, True]
+    assert broker.join(timeout=0) and broker.acked == 0
+
+    channel.basic_publish(exchange="", routing_key="storage_delete", body=b"2")
+    connection = connect()
+    unacked_channel = connection.channel()
+    unacked_channel.basic_consume(queue="storage_delete", on_message_callback=lambda ch, *args: ch.stop_consuming())
+    unacked_channel.start_consuming()
+    assert broker.pending() == {"storage_delete": 0}
+
+    connection.close()
+    assert broker.pending() == {"storage_delete": 1}
+
+
+@pytest.mark.asyncio
+async def test_shutdown_stops_consumers_without_foreign_outbox_flush(broker: InMemoryBroker,
+                                                                     async_client: AsyncClient,
+                                                                     db_session: AsyncSession,
+                                                                     ) -> None:
+    """
+    Проверяем, что при остановке простаивающие потребители выходят, новые сообщения остаются в очереди,
+    а outbox не публикуется процессом, в котором ретранслятор не работал (его публикует другой процесс).
+
+    :param broker: Брокер в памяти.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    response = await async_client.post("/api/v1/organisation/organisation/",
+                                       json={"name": "ОО1", "capacity": {"Пластик": [0, 10]}})
+    assert response.status_code == status.HTTP_200_OK
+
+    try:
+        with patch("org_app.events.consumers.delivery.AsyncSessionLocal", TestSessionLocal), \
+                patch("org_app.events.consumers.AsyncSessionLocal", TestSessionLocal):
+            threads = [start_thread(listen_storage_created_event) for _ in range(2)]
+            await stop_event_consumers(timeout=5)
+            publish_events([("storage_created", {"id": 1, "capacity": {"Пластик": [0, 60]}}, "event-1", None)])
+    finally:
+        shutdown_event.clear()
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert broker.pending() == {"storage_created": 1}
+    assert len((await db_session.execute(select(OutboxEvent))).scalars().all()) == 1
@@ -0,0 +1,185 @@
+import time
+
+import fakeredis
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.cache import TTLCache
+from org_app.cache.redis_backend import RedisCache, InvalidationListener
+from org_app.crud.organisation import (get_organisation_snapshot as crud_get_organisation_snapshot,
+                                       update_organisation_capacity as crud_update_organisation_capacity,
+                                       )
+from org_app.crud.storage import (get_storage_copy_snapshots as crud_get_storage_copy_snapshots,
+                                  delete_storage as crud_delete_storage,
+                                  )
+from org_app.crud.storage_distance import (get_sorted_storage_distances as crud_get_sorted_storage_distances,
+                                           delete_distance as crud_delete_distance,
+                                           )
+from .factories import create_organisation, create_storage, create_distance
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    """
+    Проверяем, что при переполнении вытесняется давно не использованная запись.
+
+    :return: None
+    """
+
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.get(1)
+    cache.set(3, "c")
+
+    assert cache.get(1) == "a"
+    assert cache.get(2) is None
+    assert cache.get(3) == "c"
+
+
+def test_ttl_cache_expires_entries() -> None:
+    """
+    Проверяем, что запись пропадает из кеша по истечении времени жизни.
+
+    :return: None
+    """
+
+    cache = TTLCache(max_size=10, ttl=0.01)
+    cache.set(1, "a")
+    time.sleep(0.02)
+
+    assert cache.get(1) is None
+
+
+def test_ttl_cache_skips_stale_value_after_invalidation() -> None:
+    """
+    Проверяем, что значение, прочитанное до инвалидации, не попадает в кеш.
+
+    :return: None
+    """
+
+    cache = TTLCache(max_size=10, ttl=60)
+    generation = cache.generation
+    cache.delete(1)
+    cache.set(1, "stale", generation)
+
+    assert cache.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_organisation_snapshot_is_cached_and_invalidated(db_session: AsyncSession) -> None:
+    """
+    Проверяем, что снимок организации берётся из кеша и сбрасывается при локальном изменении.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [50, 50]})
+    snapshot = await crud_get_organisation_snapshot(db_session, organisation.id)
+    assert snapshot.capacity == {"Пластик": [50, 50]}
+
+    # Изменение в обход CRUD не видно - снимок отдаётся из кеша без обращения к БД
+    organisation.capacity = {"Пластик": [10, 50]}
+    await db_session.commit()
+    assert (await crud_get_organisation_snapshot(db_session, organisation.id)).capacity == {"Пластик": [50, 50]}
+
+    await crud_update_organisation_capacity(db_session, organisation.id, {"Пластик": 10})
+    assert (await crud_get_organisation_snapshot(db_session, organisation.id)).capacity == {"Пластик": [0, 50]}
+
+
+@pytest.mark.asyncio
+async def test_storage_copy_snapshots_are_invalidated_on_delete(db_session: AsyncSession) -> None:
+    """
+    Проверяем, что снимок копии хранилища пропадает после её удаления.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    storage = await create_storage(db_session, {"Пластик": [0, 30]})
+    snapshots = await crud_get_storage_copy_snapshots(db_session, [storage.id, storage.id, 100])
+    assert list(snapshots) == [storage.id]
+
+    await crud_delete_storage(db_session, storage.id)
+
+    assert await crud_get_storage_copy_snapshots(db_session, [storage.id]) == {}
+
+
+@pytest.mark.asyncio
+async def test_sorted_storage_distances_are_cached_and_invalidated(db_session: AsyncSession) -> None:
+    """
+    Проверяем, что отсортированный список расстояний кешируется и сбрасывается при удалении расстояния.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [50, 50]})
+    storage1 = await create_storage(db_session, {"Пластик": [0, 30]})
+    storage2 = await create_storage(db_session, {"Пластик": [0, 30]})
+    far = await create_distance(db_session, storage1.id, organisation.id, distance=100)
+    await create_distance(db_session, storage2.id, organisation.id, distance=10)
+
+    distances = await crud_get_sorted_storage_distances(db_session, organisation.id)
+    assert distances == [(storage2.id, 10), (storage1.id, 100)]
+
+    await crud_delete_distance(db_session, far.id)
+
+    assert await crud_get_sorted_storage_distances(db_session, organisation.id) == [(storage2.id, 10)]
+
+
+def test_redis_cache_is_shared_between_replicas() -> None:
+    """
+    Проверяем, что реплики видят данные друг друга, а инвалидация на одной сбрасывает локальный кеш другой.
+
+    :return: None
+    """
+
+    server = fakeredis.FakeServer()
+    first = RedisCache(fakeredis.FakeRedis(server=server), "storage_copy", ttl=60,
+                       local=TTLCache(max_size=10, ttl=60), instance_id="first")
+    second = RedisCache(fakeredis.FakeRedis(server=server), "storage_copy", ttl=60,
+                        local=TTLCache(max_size=10, ttl=60), instance_id="second")
+    listener = InvalidationListener(fakeredis.FakeRedis(server=server), {"storage_copy": second}, instance_id="second")
+
+    first.set_many({1: {"id": 1, "capacity": {"Пластик": [0, 30]}}, 2: {"id": 2, "capacity": {}}})
+    assert second.get_many([1, 2, 3]) == {1: {"id": 1, "capacity": {"Пластик": [0, 30]}}, 2: {"id": 2, "capacity": {}}}
+    assert second.local.get(1) is not None
+
+    first.delete(1)
+    # Первым приходит подтверждение подписки, затем оповещение
+    listener.poll(timeout=1)
+    listener.poll(timeout=1)
+
+    assert second.local.get(1) is None
+    assert second.get(1) is None
+    assert second.get(2) == {"id": 2, "capacity": {}}
+
+
+def test_redis_cache_skips_stale_write_after_invalidation_on_other_replica() -> None:
+    """
+    Проверяем, что значение, прочитанное одной репликой до инвалидации на другой, не попадает в общий кеш,
+    с локальным кешем и без него, а после инвалидации запись со свежим счётчиком проходит.
+
+    :return: None
+    """
+
+    for local in (None, TTLCache(max_size=10, ttl=60)):
+        server = fakeredis.FakeServer()
+        first = RedisCache(fakeredis.FakeRedis(server=server), "storage_copy", ttl=60, instance_id="first")
+        second = RedisCache(fakeredis.FakeRedis(server=server), "storage_copy", ttl=60, local=local,
+                            instance_id="second")
+
+        generation = second.generation
+        first.delete(1)
+        second.set(1, {"id": 1, "capacity": {"Пластик": [0, 30]}}, generation)
+        assert first.get(1) is None
+        assert second.get(1) is None
+
+        second.set(1, {"id": 1, "capacity": {"Пластик": [5, 30]}}, second.generation)
+        assert first.get(1) == {"id": 1, "capacity": {"Пластик": [5, 30]}}
+
+        generation = first.generation
+        second.clear()
+        first.set(2, {"id": 2, "capacity": {}}, generation)
+        assert second.get(2) is None
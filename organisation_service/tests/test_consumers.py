@@ -0,0 +1,76 @@
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from org_app.events.consumers import start_event_consumers
+from org_app.events.leader import ConsumerLeaderLock
+
+
+def test_only_one_process_becomes_leader(tmp_path: Path) -> None:
+    """
+    Проверяем, что блокировку лидера может держать только один владелец, а после освобождения её захватывает другой.
+
+    :param tmp_path: Временная директория для файла блокировки.
+    :return: None
+    """
+
+    lock_path = str(tmp_path / "consumers.lock")
+    leader = ConsumerLeaderLock(lock_path)
+    follower = ConsumerLeaderLock(lock_path)
+
+    assert leader.acquire(blocking=False)
+    assert not follower.acquire(blocking=False)
+
+    leader.release()
+
+    assert follower.acquire(blocking=False)
+    follower.release()
+
+
+@patch("org_app.events.consumers.start_tombstone_purger")
+@patch("org_app.events.consumers.start_reconciler")
+@patch("org_app.events.consumers.start_storage_sync")
+@patch("org_app.events.consumers.start_outbox_relay")
+@patch("org_app.events.consumers.start_listening_events")
+def test_dedicated_mode_does_not_start_consumers(mock_start: MagicMock,
+                                                 mock_start_relay: MagicMock,
+                                                 mock_start_sync: MagicMock,
+                                                 mock_start_reconciler: MagicMock,
+                                                 mock_start_purger: MagicMock,
+                                                 ) -> None:
+    """
+    Проверяем, что в режиме dedicated HTTP-процесс не запускает потребителей, а в режиме embedded - запускает.
+
+    :param mock_start: Мок-функция запуска потребителей.
+    :param mock_start_relay: Мок-функция запуска ретранслятора outbox.
+    :param mock_start_sync: Мок-функция запуска синхронизации копий хранилищ.
+    :param mock_start_reconciler: Мок-функция запуска сверки копий хранилищ.
+    :param mock_start_purger: Мок-функция запуска фонового удаления.
+    :return: None
+    """
+
+    start_event_consumers("dedicated")
+    mock_start.assert_not_called()
+    mock_start_relay.assert_not_called()
+    mock_start_sync.assert_not_called()
+    mock_start_reconciler.assert_not_called()
+    mock_start_purger.assert_not_called()
+
+    start_event_consumers("embedded")
+    mock_start.assert_called_once()
+    mock_start_relay.assert_called_once()
+    mock_start_sync.assert_called_once()
+    mock_start_reconciler.assert_called_once()
+    mock_start_purger.assert_called_once()
+
+
+def test_unknown_consumer_mode() -> None:
+    """
+    Проверяем, что неизвестный режим приводит к ошибке при старте.
+
+    :return: None
+    """
+
+    with pytest.raises(ValueError):
+        start_event_consumers("everywhere")
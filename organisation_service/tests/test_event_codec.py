@@ -0,0 +1,78 @@
+import json
+
+import msgpack
+import pytest
+
+from org_app.events.codec import decode_event, encode_event, MSGPACK_CONTENT_TYPE, JSON_CONTENT_TYPE
+
+
+def test_msgpack_event_roundtrip() -> None:
+    """
+    Проверяем, что событие в msgpack распаковывается в исходные данные, а известные типы отходов
+    передаются кодами и занимают меньше места, чем в JSON.
+
+    :return: None
+    """
+
+    data = {"storage_id": 1, "updated_capacity": {"Пластик": 10, "Биоотходы": 50, "Металл": 5}}
+
+    body, content_type = encode_event("update_capacity", data, codec="msgpack")
+    json_body, json_content_type = encode_event("update_capacity", data, codec="json")
+
+    assert content_type == MSGPACK_CONTENT_TYPE
+    assert "Биоотходы".encode() not in body
+    assert len(body) < len(json_body)
+    assert decode_event(body, content_type) == {"v": 1, "type": "update_capacity", "data": data}
+    assert decode_event(json_body, json_content_type) == decode_event(body, content_type)
+
+
+def test_legacy_json_event_is_accepted() -> None:
+    """
+    Проверяем, что JSON без конверта от предыдущих версий сервисов принимается как данные события.
+
+    :return: None
+    """
+
+    body = json.dumps({"id": 1, "storage_id": 2, "organisation_id": 3, "distance": 100}).encode()
+
+    assert decode_event(body, None)["data"] == {"id": 1, "storage_id": 2, "organisation_id": 3, "distance": 100}
+
+
+def test_newer_event_version_is_rejected() -> None:
+    """
+    Проверяем, что событие неизвестной (более новой) версии конверта не обрабатывается.
+
+    :return: None
+    """
+
+    body = json.dumps({"v": 100, "type": "storage_created", "data": {}}).encode()
+
+    with pytest.raises(ValueError):
+        decode_event(body, JSON_CONTENT_TYPE)
+
+
+def test_unknown_waste_type_code_is_rejected() -> None:
+    """
+    Проверяем, что код типа отходов вне `WASTE_TYPES` отклоняется с понятной ошибкой, а не `IndexError`.
+
+    :return: None
+    """
+
+    body = msgpack.packb({"v": 1, "type": "update_capacity", "data": {"storage_id": 1, "updated_capacity": {99: 10}}})
+
+    with pytest.raises(ValueError, match="Unknown waste type code: 99"):
+        decode_event(body, MSGPACK_CONTENT_TYPE)
+
+
+def test_newer_msgpack_version_is_rejected_before_decoding_data() -> None:
+    """
+    Проверяем, что версия конверта msgpack проверяется до разбора данных: данные новой версии с незнакомыми
+    кодами отклоняются как неподдерживаемая версия.
+
+    :return: None
+    """
+
+    body = msgpack.packb({"v": 100, "type": "update_capacity", "data": {"storage_id": 1, "updated_capacity": {99: 10}}})
+
+    with pytest.raises(ValueError, match="Unsupported event envelope version: 100"):
+        decode_event(body, MSGPACK_CONTENT_TYPE)
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.crud.storage import create_storage_copy
+from org_app.events.consumers.delivery import process_event_once
+from org_app.models.storage import StorageCopy
+from org_app.schemas.storage import StorageCopySchema
+from .conftest import TestSessionLocal
+
+
+@pytest.mark.asyncio
+async def test_redelivered_storage_created_event_is_skipped(db_session: AsyncSession) -> None:
+    """
+    Проверяем, что повторная доставка события о создании хранилища не приводит к ошибке вставки,
+    а событие без идентификатора (от предыдущих версий сервисов) обрабатывается как раньше.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    async def handler(db: AsyncSession) -> None:
+        await create_storage_copy(db, StorageCopySchema(id=1, capacity={"Пластик": [0, 30]}))
+
+    assert await process_event_once("event-1", handler, session_factory=TestSessionLocal)
+    assert not await process_event_once("event-1", handler, session_factory=TestSessionLocal)
+
+    result = await db_session.execute(select(StorageCopy))
+    assert len(result.scalars().all()) == 1
+
+    async def other_handler(db: AsyncSession) -> None:
+        await create_storage_copy(db, StorageCopySchema(id=2, capacity={"Пластик": [0, 30]}))
+
+    assert await process_event_once(None, other_handler, session_factory=TestSessionLocal)
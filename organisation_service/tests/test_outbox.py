@@ -0,0 +1,100 @@
+from unittest.mock import patch, MagicMock
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.events.outbox import relay_outbox_batch
+from org_app.models.outbox import OutboxEvent
+
+
+async def get_outbox_events(db_session: AsyncSession) -> list[OutboxEvent]:
+    """
+    Возвращает события, ожидающие публикации.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: События outbox в порядке записи
+    """
+
+    result = await db_session.execute(select(OutboxEvent).order_by(OutboxEvent.id).execution_options(populate_existing=True))
+
+    return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+@patch("org_app.events.outbox.publish_events")
+async def test_event_is_relayed_from_outbox(mock_publish: MagicMock,
+                                            async_client: AsyncClient,
+                                            db_session: AsyncSession,
+                                            ) -> None:
+    """
+    Проверяем, что событие о создании организации записывается в outbox вместе с организацией,
+    а после публикации ретранслятором удаляется из него.
+
+    :param mock_publish: Мок-функция публикации пачки событий в RabbitMQ.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    response = await async_client.post("/api/v1/organisation/organisation/",
+                                       json={"name": "ОО1", "capacity": {"Пластик": [0, 50]}},
+                                       )
+    organisation_id = response.json()["id"]
+
+    events = await get_outbox_events(db_session)
+    assert [(event.queue, event.payload) for event in events] == [("organisation_created", {"id": organisation_id})]
+    mock_publish.assert_not_called()
+
+    assert await relay_outbox_batch(db_session) == 1
+
+    # Вне трассы событие публикуется без traceparent
+    mock_publish.assert_called_once_with([("organisation_created", {"id": organisation_id}, events[0].event_id, None)])
+    assert await get_outbox_events(db_session) == []
+
+
+@pytest.mark.asyncio
+@patch("org_app.events.outbox.publish_events", side_effect=ConnectionError("broker is down"))
+async def test_failed_relay_keeps_events(mock_publish: MagicMock,
+                                         async_client: AsyncClient,
+                                         db_session: AsyncSession,
+                                         ) -> None:
+    """
+    Проверяем, что при недоступном брокере запрос выполняется, а событие остаётся в outbox для повтора.
+
+    :param mock_publish: Мок-функция публикации, имитирующая недоступность брокера.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    response = await async_client.post("/api/v1/organisation/organisation/",
+                                       json={"name": "ОО1", "capacity": {"Пластик": [0, 50]}},
+                                       )
+    assert response.status_code == 200
+
+    with pytest.raises(ConnectionError):
+        await relay_outbox_batch(db_session)
+
+    events = await get_outbox_events(db_session)
+    assert len(events) == 1
+    assert events[0].attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_request_does_not_stage_event(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем, что при ошибке запроса событие в outbox не попадает.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    response = await async_client.post("/api/v1/organisation/organisation/",
+                                       json={"name": "ОО1", "capacity": {"Пластик": [70, 50]}},
+                                       )
+    assert response.status_code == 400
+
+    assert await get_outbox_events(db_session) == []
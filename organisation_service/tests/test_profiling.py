@@ -0,0 +1,130 @@
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.profiling import Profile, setup_query_profiling, should_profile
+from .conftest import test_engine
+from .factories import create_organisation, create_storage, create_distance
+
+
+@pytest.mark.asyncio
+@patch("org_app.profiling.PROFILE_TOKEN", "secret")
+@patch("org_app.api.send_update_capacity_event")
+async def test_recycle_profile_by_header(mock_update_storage: AsyncMock,
+                                         async_client: AsyncClient,
+                                         db_session: AsyncSession,
+                                         tmp_path: Path,
+                                         ) -> None:
+    """
+    Проверяем, что запрос с заголовком `X-Profile` профилируется, а профиль можно скачать в формате speedscope
+    и folded со спанами БД, планирования и публикации.
+
+    :param mock_update_storage: Мок-функция для отправки события об обновлении ёмкости хранилища.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания данных в тестах.
+    :param tmp_path: Временный каталог для профилей.
+    :return: None
+    """
+
+    setup_query_profiling(test_engine.sync_engine, enabled=True)
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [50, 50]})
+    storage = await create_storage(db_session, {"Пластик": [0, 30]})
+    await create_distance(db_session, storage.id, organisation.id, distance=10)
+
+    with patch("org_app.profiling.PROFILE_DIR", str(tmp_path)):
+        response = await async_client.post("/api/v1/organisation/recycle/", json={"organisation_id": organisation.id},
+                                           headers={"X-Profile": "secret"})
+        assert response.status_code == status.HTTP_200_OK
+        profile_id = response.headers["X-Profile-Id"]
+
+        profiles = (await async_client.get("/api/v1/organisation/profiles/", headers={"X-Profile": "secret"})).json()
+        assert [profile["id"] for profile in profiles] == [profile_id]
+        assert {"db", "planning", "publish", "commit"} <= set(profiles[0]["spans"])
+        assert profiles[0]["spans"]["planning"] <= profiles[0]["duration"]
+
+        response = await async_client.get(f"/api/v1/organisation/profiles/{profile_id}/",
+                                          headers={"X-Profile": "secret"})
+        assert response.status_code == status.HTTP_200_OK
+        document = response.json()
+        assert [profile["type"] for profile in document["profiles"]] == ["sampled", "evented"]
+        events = document["profiles"][1]["events"]
+        assert [event["type"] for event in events].count("O") == [event["type"] for event in events].count("C")
+
+        response = await async_client.get(f"/api/v1/organisation/profiles/{profile_id}/", params={"format": "folded"},
+                                          headers={"X-Profile": "secret"})
+        assert response.status_code == status.HTTP_200_OK
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in response.text.splitlines())
+
+        response = await async_client.post("/api/v1/organisation/recycle/", json={"organisation_id": organisation.id},
+                                           headers={"X-Profile": "wrong"})
+        assert "X-Profile-Id" not in response.headers
+
+        response = await async_client.get("/api/v1/organisation/profiles/../../etc/passwd/",
+                                          headers={"X-Profile": "secret"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("token, header", [("secret", None), ("secret", "wrong"), ("", ""), ("", None)])
+async def test_profiles_require_token(async_client: AsyncClient, tmp_path: Path, token: str, header: str) -> None:
+    """
+    Проверяем, что сохранённые профили без заголовка `X-Profile`, совпадающего с `PROFILE_TOKEN`, не отдаются:
+    в том числе когда `PROFILE_TOKEN` не задан и профили сняты выборкой `PROFILE_SAMPLE_RATE`.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param tmp_path: Временный каталог для профилей.
+    :param token: Значение `PROFILE_TOKEN`.
+    :param header: Значение заголовка `X-Profile`, None - без заголовка.
+    :return: None
+    """
+
+    profile_id = "0" * 32
+    (tmp_path / f"{profile_id}.speedscope.json").write_text("{}")
+    (tmp_path / f"{profile_id}.summary.json").write_text(f'{{"id": "{profile_id}", "created_at": 0}}')
+    headers = {} if header is None else {"X-Profile": header}
+
+    with patch("org_app.profiling.PROFILE_TOKEN", token), patch("org_app.profiling.PROFILE_DIR", str(tmp_path)):
+        response = await async_client.get("/api/v1/organisation/profiles/", headers=headers)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        response = await async_client.get(f"/api/v1/organisation/profiles/{profile_id}/", headers=headers)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_profile_closes_unfinished_spans() -> None:
+    """
+    Проверяем, что спаны, не закрытые из-за исключения, закрываются при завершении профиля
+    и события спанов остаются корректно вложенными.
+
+    :return: None
+    """
+
+    profile = Profile("test", interval=0.0005)
+    profile.begin()
+    planning = profile.open_span("planning")
+    profile.open_span("db")
+    profile.close_span("planning", planning)
+    profile.open_span("publish")
+    profile.end()
+
+    assert [(kind, name) for kind, name, _ in profile.span_events] == [
+        ("O", "planning"), ("O", "db"), ("C", "db"), ("C", "planning"), ("O", "publish"), ("C", "publish"),
+    ]
+    assert set(profile.summary()["spans"]) == {"planning", "db", "publish"}
+
+
+def test_should_profile_by_sample_rate() -> None:
+    """
+    Проверяем выборку запросов для профилирования без заголовка.
+
+    :return: None
+    """
+
+    assert not should_profile(None, sample_rate=0)
+    assert should_profile(None, sample_rate=1)
+    # Без PROFILE_TOKEN заголовок не включает профилирование
+    assert not should_profile("", sample_rate=0)
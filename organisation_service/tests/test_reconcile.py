@@ -0,0 +1,187 @@
+from typing import AsyncGenerator
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from org_app.events.outbox import stage_event
+from org_app.models import Base
+from org_app.models.storage import StorageCopy
+from org_app.models.storage_distance import StorageDistanceCopy
+from org_app.reconcile import REPLICA_TABLES, get_bounds, get_range_checksums, get_range_rows, reconcile
+from org_app.tombstones import purge_tombstones_batch
+from .conftest import TestSessionLocal
+from .factories import create_organisation
+
+
+@pytest_asyncio.fixture
+async def remote_session_factory() -> AsyncGenerator[sessionmaker, None]:
+    """
+    Отдельная БД, которая изображает исходные таблицы хранилищ и расстояний в сервисе Хранилище.
+
+    :return: Фабрика сессий этой БД
+    """
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    await engine.dispose()
+
+
+def storage_service_client(session_factory: sessionmaker) -> httpx.AsyncClient:
+    """
+    HTTP-клиент, который отвечает на запросы сверки вместо сервиса Хранилище.
+
+    :param session_factory: Фабрика сессий БД с исходными хранилищами и расстояниями
+    :return: HTTP-клиент
+    """
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        # Путь: /api/v1/storage/replication/{table}/{method}/
+        *_, name, method = request.url.path.strip("/").split("/")
+        table = REPLICA_TABLES[name]
+        params = {key: int(value) for key, value in request.url.params.items()}
+        async with session_factory() as db:
+            if method == "bounds":
+                min_id, max_id = await get_bounds(db, table)
+                return httpx.Response(200, json={"min": min_id, "max": max_id})
+            if method == "checksums":
+                return httpx.Response(200, json=await get_range_checksums(db, table, **params))
+            return httpx.Response(200, json=await get_range_rows(db, table, **params))
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://storage_service/api/v1/storage")
+
+
+@pytest.mark.asyncio
+async def test_reconcile_storage_copies(db_session: AsyncSession, remote_session_factory: sessionmaker) -> None:
+    """
+    Проверяем, что сверка восстанавливает копии хранилищ и расстояний, в том числе разошедшуюся вместимость
+    при той же версии, не затирая ещё не опубликованные изменения вместимости.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :param remote_session_factory: Фабрика сессий БД с исходными хранилищами и расстояниями.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [0, 50]})
+    remote_storages = [{"id": storage_id, "capacity": {"Пластик": [0, storage_id]}, "version": 2}
+                       for storage_id in range(1, 101)]
+    remote_distances = [{"id": storage_id, "storage_id": storage_id, "organisation_id": organisation.id,
+                         "distance": storage_id * 10} for storage_id in range(1, 101)]
+    async with remote_session_factory() as remote_db:
+        await create_organisation(remote_db, name="ОО1", capacity={"Пластик": [0, 50]})
+        await remote_db.execute(insert(StorageCopy), remote_storages)
+        await remote_db.execute(insert(StorageDistanceCopy), remote_distances)
+        await remote_db.commit()
+
+    # Локально: нет хранилища 10, хранилище 20 устарело, хранилище 30 устарело, но его вместимость ещё
+    # не применена в сервисе Хранилище, у хранилища 50 той же версии разошлась вместимость, хранилища 500 уже нет
+    # в сервисе Хранилище, расстояние 40 изменилось
+    local_storages = [dict(storage, capacity_updates=0) for storage in remote_storages if storage["id"] != 10]
+    local_storages[18].update(capacity={}, version=1)
+    local_storages[28].update(capacity={"Пластик": [5, 30]}, version=1, capacity_updates=1)
+    local_storages[48].update(capacity={"Пластик": [7, 50]})
+    local_storages.append({"id": 500, "capacity": {}, "version": 1, "capacity_updates": 0})
+    local_distances = [dict(distance) for distance in remote_distances if distance["storage_id"] != 10]
+    local_distances[38]["distance"] = 1
+    local_distances.append({"id": 500, "storage_id": 500, "organisation_id": organisation.id, "distance": 5})
+    await db_session.execute(insert(StorageCopy), local_storages)
+    await db_session.execute(insert(StorageDistanceCopy), local_distances)
+    stage_event(db_session, "update_capacity", {"storage_id": 30, "updated_capacity": {"Пластик": 5}})
+    await db_session.commit()
+
+    async with storage_service_client(remote_session_factory) as client:
+        # Хранилища: диапазоны с ID 10-30, 50 и 500, расстояния: диапазоны с ID 10 и 40. Расстояние 500
+        # до удалённого хранилища не сверяется, его удаляет фоновая очистка
+        assert await reconcile(client, session_factory=TestSessionLocal) == 5
+        # Хранилище 30 расходится, пока его изменение вместимости в пути, но восстановлением это не считается
+        assert await reconcile(client, session_factory=TestSessionLocal) == 0
+
+    # Хранилище 500 помечено удалённым и удаляется в фоне
+    while await purge_tombstones_batch(db_session):
+        pass
+
+    result = await db_session.execute(select(StorageCopy).order_by(StorageCopy.id)
+                                      .execution_options(populate_existing=True))
+    storages = {storage.id: (storage.capacity, storage.version) for storage in result.scalars()}
+    assert list(storages) == list(range(1, 101))
+    assert storages[10] == ({"Пластик": [0, 10]}, 2)
+    assert storages[20] == ({"Пластик": [0, 20]}, 2)
+    assert storages[30] == ({"Пластик": [5, 30]}, 1)
+    assert storages[50] == ({"Пластик": [0, 50]}, 2)
+
+    result = await db_session.execute(select(StorageDistanceCopy.id, StorageDistanceCopy.distance)
+                                      .order_by(StorageDistanceCopy.id))
+    assert result.all() == [(distance["id"], distance["distance"]) for distance in remote_distances]
+
+
+@pytest.mark.asyncio
+async def test_reconcile_skips_distances_of_deleted_storages(db_session: AsyncSession,
+                                                             remote_session_factory: sessionmaker,
+                                                             ) -> None:
+    """
+    Проверяем, что расстояния до удалённых хранилищ, которые ещё не удалены в фоне на одной из сторон,
+    не считаются расхождением.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :param remote_session_factory: Фабрика сессий БД с исходными хранилищами и расстояниями.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [0, 50]})
+    storages = [{"id": storage_id, "capacity": {"Пластик": [0, 10]}, "version": 1, "deleted": storage_id > 1}
+                for storage_id in range(1, 4)]
+    distances = [{"id": storage_id, "storage_id": storage_id, "organisation_id": organisation.id, "distance": 10}
+                 for storage_id in range(1, 4)]
+    # Расстояние до хранилища 2 ещё не удалено в сервисе Хранилище, до хранилища 3 - здесь
+    async with remote_session_factory() as remote_db:
+        await create_organisation(remote_db, name="ОО1", capacity={"Пластик": [0, 50]})
+        await remote_db.execute(insert(StorageCopy), storages)
+        await remote_db.execute(insert(StorageDistanceCopy), distances[:2])
+        await remote_db.commit()
+    await db_session.execute(insert(StorageCopy), storages)
+    await db_session.execute(insert(StorageDistanceCopy), [distances[0], distances[2]])
+    await db_session.commit()
+
+    async with storage_service_client(remote_session_factory) as client:
+        assert await reconcile(client, session_factory=TestSessionLocal) == 0
+
+
+@pytest.mark.asyncio
+async def test_replication_endpoints(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем API сверки для сервиса Хранилище: границы, контрольные суммы и строки диапазона.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания записей в тестах.
+    :return: None
+    """
+
+    first = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [0, 50]},
+                                      latitude=55.75, longitude=37.62)
+    second = await create_organisation(db_session, name="ОО2", capacity={"Пластик": [0, 50]})
+
+    bounds = (await async_client.get("/api/v1/organisation/replication/organisations/bounds/")).json()
+    assert bounds == {"min": first.id, "max": second.id}
+
+    response = await async_client.get("/api/v1/organisation/replication/organisations/checksums/",
+                                      params={"start": first.id, "end": second.id + 1, "parts": 1})
+    assert [(part["start"], part["end"], part["count"]) for part in response.json()] == [
+        (first.id, second.id + 1, 2),
+    ]
+
+    rows = (await async_client.get("/api/v1/organisation/replication/organisations/rows/",
+                                   params={"start": first.id, "end": second.id + 1})).json()
+    assert rows == [{"id": first.id, "latitude": 55.75, "longitude": 37.62},
+                    {"id": second.id, "latitude": None, "longitude": None}]
+
+    response = await async_client.get("/api/v1/organisation/replication/storages/bounds/")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
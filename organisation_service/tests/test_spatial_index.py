@@ -0,0 +1,94 @@
+import random
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.crud.storage import create_storage_copies
+from org_app.schemas.storage import StorageCopySchema
+from org_app.services.spatial_index import KDTree, haversine_km
+from .factories import create_organisation, create_storage, create_distance
+
+# Москва
+LATITUDE, LONGITUDE = 55.75, 37.62
+
+
+def test_kd_tree_nearest_matches_brute_force() -> None:
+    """
+    Проверяем, что дерево выдаёт точки в порядке возрастания расстояния по большому кругу, включая точки
+    по разные стороны от 180-го меридиана и у полюсов.
+
+    :return: None
+    """
+
+    rng = random.Random(1)
+    locations = [(i, rng.uniform(-90, 90), rng.uniform(-180, 180)) for i in range(500)]
+    tree = KDTree(locations)
+
+    for latitude, longitude in ((LATITUDE, LONGITUDE), (0, 179.9), (-89, 0)):
+        expected = sorted((haversine_km(latitude, longitude, lat, lon), location_id)
+                          for location_id, lat, lon in locations)
+        nearest = list(tree.nearest(latitude, longitude))
+
+        assert [location_id for location_id, _ in nearest] == [location_id for _, location_id in expected]
+        assert all(distance == pytest.approx(expected_distance, abs=1e-6)
+                   for (_, distance), (expected_distance, _) in zip(nearest, expected))
+
+    assert list(KDTree([]).nearest(LATITUDE, LONGITUDE)) == []
+
+
+@pytest.mark.asyncio
+async def test_recycle_to_nearest_storages_by_coordinates(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем, что для организации с координатами отходы отправляются в ближайшие по координатам хранилища
+    со свободным местом без заданных расстояний, а заданное расстояние важнее вычисленного.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания данных в тестах.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [50, 50]},
+                                             latitude=LATITUDE, longitude=LONGITUDE)
+    # Тверь, Санкт-Петербург и Владивосток. Тверь ближе всех, но заполнена
+    full = await create_storage(db_session, {"Пластик": [30, 30]}, latitude=56.86, longitude=35.9)
+    near = await create_storage(db_session, {"Пластик": [0, 30]}, latitude=59.94, longitude=30.31)
+    far = await create_storage(db_session, {"Пластик": [0, 100]}, latitude=43.12, longitude=131.89)
+    # Хранилище без координат доступно только по заданному расстоянию
+    linked = await create_storage(db_session, {"Пластик": [0, 10]})
+    await create_distance(db_session, linked.id, organisation.id, distance=1)
+
+    response = await async_client.post("/api/v1/organisation/recycle/", json={"organisation_id": organisation.id})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["waste_distribution"] == {
+        str(linked.id): {"Пластик": 10},
+        str(near.id): {"Пластик": 30},
+        str(far.id): {"Пластик": 10},
+    }
+    assert str(full.id) not in response.json()["waste_distribution"]
+
+
+@pytest.mark.asyncio
+async def test_new_storage_copies_are_indexed(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем, что копии хранилищ, созданные после построения индекса, сразу доступны для поиска по координатам.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания данных в тестах.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [10, 50]},
+                                             latitude=LATITUDE, longitude=LONGITUDE)
+
+    response = await async_client.post("/api/v1/organisation/recycle/", json={"organisation_id": organisation.id})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    await create_storage_copies(db_session, [StorageCopySchema(id=7, capacity={"Пластик": [0, 60]},
+                                                               latitude=59.94, longitude=30.31)])
+
+    response = await async_client.post("/api/v1/organisation/recycle/", json={"organisation_id": organisation.id})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["waste_distribution"] == {"7": {"Пластик": 10}}
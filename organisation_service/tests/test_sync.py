@@ -0,0 +1,297 @@
+import gzip
+import json
+from pathlib import Path
+from threading import Thread
+from typing import Dict, List
+from unittest.mock import patch
+
+import httpx
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.crud.storage import create_storage_copies as crud_create_storage_copies
+from org_app.crud.storage import update_storage_copy_capacity as crud_update_storage_copy_capacity
+from org_app.crud.sync_cursor import get_sync_cursor as crud_get_sync_cursor
+from org_app.events.broker import InMemoryBroker, set_broker
+from org_app.events.consumers.storage_distance import listen_storage_distance_created_event
+from org_app.events.producers import publish_events
+from org_app.events.producers.storage import send_update_capacity_event
+from org_app.models.outbox import OutboxEvent
+from org_app.models.storage import StorageCopy
+from org_app.models.storage_distance import StorageDistanceCopy
+from org_app.schemas.storage import StorageCopySchema
+from org_app.reconcile import repair_storage_copies
+from org_app.sync import STORAGE_CHANGES_CURSOR, bootstrap_storage_copies, load_storage_snapshot, sync_storage_copies
+from org_app.tombstones import purge_tombstones_batch
+from .conftest import TestSessionLocal
+from .factories import create_organisation, create_storage, create_distance
+
+
+def storage_service_client(changes: List[Dict], requests: List[httpx.Request]) -> httpx.AsyncClient:
+    """
+    HTTP-клиент, который вместо сервиса Хранилище отдаёт ленту изменений из списка.
+
+    :param changes: Изменения в порядке возрастания версии
+    :param requests: Список, в который складываются выполненные запросы
+    :return: HTTP-клиент
+    """
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        since = int(request.url.params["since"])
+        limit = int(request.url.params["limit"])
+
+        return httpx.Response(200, json=[change for change in changes if change["version"] > since][:limit])
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://storage_service/api/v1/storage")
+
+
+async def get_storage_copies(db_session: AsyncSession) -> Dict[int, StorageCopy]:
+    """
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: Копии хранилищ по ID
+    """
+
+    result = await db_session.execute(select(StorageCopy).execution_options(populate_existing=True))
+
+    return {storage.id: storage for storage in result.scalars()}
+
+
+@pytest.mark.asyncio
+async def test_sync_storage_copies(db_session: AsyncSession) -> None:
+    """
+    Проверяем, что синхронизация создает недостающие копии, обновляет устаревшие и удаляет удалённые хранилища.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [0, 50]})
+    updated = await create_storage(db_session, {"Пластик": [0, 30]})
+    deleted = await create_storage(db_session, {"Пластик": [0, 30]})
+    await create_distance(db_session, deleted.id, organisation.id, distance=10)
+
+    changes = [
+        {"version": 5, "storage_id": updated.id, "capacity": {"Пластик": [20, 30]}},
+        {"version": 6, "storage_id": deleted.id, "capacity": None},
+        {"version": 7, "storage_id": 100, "capacity": {"Стекло": [0, 10]}},
+    ]
+    requests = []
+    async with storage_service_client(changes, requests) as client:
+        assert await sync_storage_copies(client, session_factory=TestSessionLocal, batch_size=2) == 3
+        assert await sync_storage_copies(client, session_factory=TestSessionLocal, batch_size=2) == 0
+
+    assert [request.url.params["since"] for request in requests] == ["0", "6", "7"]
+    assert await crud_get_sync_cursor(db_session, STORAGE_CHANGES_CURSOR) == 7
+
+    # Удалённое хранилище помечено, копии расстояний до него удаляются в фоне
+    assert (await get_storage_copies(db_session))[deleted.id].deleted
+    while await purge_tombstones_batch(db_session):
+        pass
+
+    copies = await get_storage_copies(db_session)
+    assert {storage_id: (copy.capacity, copy.version) for storage_id, copy in copies.items()} == {
+        updated.id: ({"Пластик": [20, 30]}, 5),
+        100: ({"Стекло": [0, 10]}, 7),
+    }
+    assert (await db_session.execute(select(StorageDistanceCopy))).first() is None
+
+    # Запоздавшее событие о создании уже синхронизированного хранилища ничего не ломает
+    await crud_create_storage_copies(db_session, [StorageCopySchema(id=100, capacity={"Стекло": [0, 10]}, version=7)])
+
+
+@pytest.mark.asyncio
+async def test_sync_keeps_capacity_with_pending_updates(db_session: AsyncSession) -> None:
+    """
+    Проверяем, что синхронизация не затирает вместимость копии, изменения которой ещё не отправлены из outbox.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    storage = await create_storage(db_session, {"Пластик": [0, 30]})
+    await crud_update_storage_copy_capacity(db_session, storage.id, {"Пластик": 10}, commit=False)
+    send_update_capacity_event(db_session, storage.id, {"Пластик": 10})
+    await db_session.commit()
+
+    changes = [{"version": 3, "storage_id": storage.id, "capacity": {"Пластик": [0, 30]}}]
+    async with storage_service_client(changes, []) as client:
+        await sync_storage_copies(client, session_factory=TestSessionLocal)
+
+    assert (await get_storage_copies(db_session))[storage.id].capacity == {"Пластик": [10, 30]}
+    assert await crud_get_sync_cursor(db_session, STORAGE_CHANGES_CURSOR) == 3
+
+
+@pytest.mark.asyncio
+async def test_sync_keeps_capacity_until_update_is_applied(db_session: AsyncSession) -> None:
+    """
+    Проверяем, что опубликованное, но ещё не применённое в сервисе Хранилище изменение вместимости
+    не затирается ни синхронизацией, ни сверкой, а после его применения копия снова обновляется по ленте.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    storage = await create_storage(db_session, {"Пластик": [0, 30]})
+    await crud_update_storage_copy_capacity(db_session, storage.id, {"Пластик": 10}, commit=False)
+    send_update_capacity_event(db_session, storage.id, {"Пластик": 10})
+    await db_session.commit()
+    # Ретранслятор опубликовал событие и удалил его из outbox, сервис Хранилище его ещё не обработал
+    await db_session.execute(delete(OutboxEvent))
+    await db_session.commit()
+
+    changes = [{"version": 3, "storage_id": storage.id, "capacity": {"Пластик": [5, 30]}, "capacity_updates": 0}]
+    async with storage_service_client(changes, []) as client:
+        await sync_storage_copies(client, session_factory=TestSessionLocal)
+    await repair_storage_copies(db_session, storage.id, storage.id + 1,
+                                [{"id": storage.id, "capacity": {"Пластик": [5, 30]}, "version": 3,
+                                  "capacity_updates": 0}])
+    await db_session.commit()
+    assert (await get_storage_copies(db_session))[storage.id].capacity == {"Пластик": [10, 30]}
+
+    changes = [{"version": 4, "storage_id": storage.id, "capacity": {"Пластик": [15, 30]}, "capacity_updates": 1}]
+    async with storage_service_client(changes, []) as client:
+        await sync_storage_copies(client, session_factory=TestSessionLocal)
+
+    copy = (await get_storage_copies(db_session))[storage.id]
+    assert (copy.capacity, copy.version) == ({"Пластик": [15, 30]}, 4)
+
+
+@pytest.mark.asyncio
+async def test_sync_converges_after_lost_capacity_update(db_session: AsyncSession) -> None:
+    """
+    Проверяем, что копия не остаётся с устаревшей вместимостью навсегда, если событие `update_capacity` потеряно:
+    пока оно может быть в пути, вместимость копии сохраняется, а по истечении `CAPACITY_UPDATE_TIMEOUT` копия
+    перезаписывается сверкой с той же версией, и счётчик выравнивается, так что следующие изменения применяются.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    storage = await create_storage(db_session, {"Пластик": [0, 30]})
+    await crud_update_storage_copy_capacity(db_session, storage.id, {"Пластик": 10}, commit=False)
+    send_update_capacity_event(db_session, storage.id, {"Пластик": 10})
+    await db_session.commit()
+    # Событие опубликовано, но сервис Хранилище его отбросил: счётчик в ленте так и остался 0
+    await db_session.execute(delete(OutboxEvent))
+    await db_session.commit()
+
+    rows = [{"id": storage.id, "capacity": {"Пластик": [5, 30]}, "version": 3, "capacity_updates": 0}]
+    changes = [{"version": 3, "storage_id": storage.id, "capacity": {"Пластик": [5, 30]}, "capacity_updates": 0}]
+    async with storage_service_client(changes, []) as client:
+        await sync_storage_copies(client, session_factory=TestSessionLocal)
+    assert (await get_storage_copies(db_session))[storage.id].capacity == {"Пластик": [10, 30]}
+
+    with patch("org_app.crud.storage.CAPACITY_UPDATE_TIMEOUT", 0):
+        await repair_storage_copies(db_session, storage.id, storage.id + 1, rows)
+        await db_session.commit()
+
+    copy = (await get_storage_copies(db_session))[storage.id]
+    assert (copy.capacity, copy.version, copy.capacity_updates) == ({"Пластик": [5, 30]}, 3, 0)
+
+    changes = [{"version": 4, "storage_id": storage.id, "capacity": {"Пластик": [8, 30]}, "capacity_updates": 0}]
+    async with storage_service_client(changes, []) as client:
+        await sync_storage_copies(client, session_factory=TestSessionLocal)
+    assert (await get_storage_copies(db_session))[storage.id].capacity == {"Пластик": [8, 30]}
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_storage_copies_from_file(db_session: AsyncSession, tmp_path: Path) -> None:
+    """
+    Проверяем начальную загрузку копий из файла снимка: только в пустую БД и с позицией ленты изменений.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :param tmp_path: Временная директория для файла снимка.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [0, 50]})
+    snapshot = {
+        "v": 1,
+        "version": 12,
+        "storages": [{"id": 1, "capacity": {"Пластик": [0, 30]}, "version": 3},
+                     {"id": 2, "capacity": {"Стекло": [5, 10]}, "version": 12}],
+        "distances": [{"id": 7, "storage_id": 1, "organisation_id": organisation.id, "distance": 10},
+                      {"id": 8, "storage_id": 2, "organisation_id": 100, "distance": 20}],
+    }
+    path = tmp_path / "storage_snapshot.json.gz"
+    path.write_bytes(gzip.compress(json.dumps(snapshot).encode()))
+
+    assert await bootstrap_storage_copies(str(path), session_factory=TestSessionLocal)
+    assert not await bootstrap_storage_copies(str(path), session_factory=TestSessionLocal)
+
+    copies = await get_storage_copies(db_session)
+    assert {storage_id: (copy.capacity, copy.version) for storage_id, copy in copies.items()} == {
+        1: ({"Пластик": [0, 30]}, 3),
+        2: ({"Стекло": [5, 10]}, 12),
+    }
+    distances = (await db_session.execute(select(StorageDistanceCopy.id))).scalars().all()
+    assert distances == [7]
+    assert await crud_get_sync_cursor(db_session, STORAGE_CHANGES_CURSOR) == 12
+
+
+@pytest.mark.asyncio
+async def test_distance_event_after_bootstrap(db_session: AsyncSession, tmp_path: Path) -> None:
+    """
+    Проверяем, что событие `storage_distance_created` с расстояниями, уже загруженными из снимка, обрабатывается:
+    существующие копии пропускаются, новые создаются, сообщение подтверждается.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :param tmp_path: Временная директория для файла снимка.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [0, 50]})
+    snapshot = {
+        "v": 1,
+        "version": 1,
+        "storages": [{"id": 1, "capacity": {"Пластик": [0, 30]}, "version": 1},
+                     {"id": 2, "capacity": {"Пластик": [0, 30]}, "version": 1}],
+        "distances": [{"id": 7, "storage_id": 1, "organisation_id": organisation.id, "distance": 10}],
+    }
+    path = tmp_path / "storage_snapshot.json.gz"
+    path.write_bytes(gzip.compress(json.dumps(snapshot).encode()))
+    assert await bootstrap_storage_copies(str(path), session_factory=TestSessionLocal)
+
+    broker = InMemoryBroker()
+    set_broker(broker)
+    try:
+        with patch("org_app.events.consumers.delivery.AsyncSessionLocal", TestSessionLocal):
+            thread = Thread(target=listen_storage_distance_created_event, daemon=True)
+            thread.start()
+            publish_events([("storage_distance_created",
+                             {"items": [{"id": 7, "storage_id": 1, "organisation_id": organisation.id,
+                                         "distance": 10},
+                                        {"id": 9, "storage_id": 2, "organisation_id": organisation.id,
+                                         "distance": 20}]},
+                             "event-1", None)])
+            assert broker.join(timeout=5)
+    finally:
+        broker.close()
+        set_broker(None)
+    thread.join(timeout=5)
+
+    assert broker.acked == 1
+    distances = (await db_session.execute(select(StorageDistanceCopy.id).order_by(StorageDistanceCopy.id)))
+    assert distances.scalars().all() == [7, 9]
+
+
+@pytest.mark.asyncio
+async def test_load_storage_snapshot_over_http() -> None:
+    """
+    Проверяем, что снимок, отданный сервисом Хранилище со сжатием gzip, распаковывается.
+
+    :return: None
+    """
+
+    snapshot = {"v": 1, "version": 0, "storages": [], "distances": []}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/v1/storage/snapshot/"
+        return httpx.Response(200, content=gzip.compress(json.dumps(snapshot).encode()),
+                              headers={"Content-Encoding": "gzip", "Content-Type": "application/json"})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler),
+                                 base_url="http://storage_service/api/v1/storage") as client:
+        assert await load_storage_snapshot("http", client) == snapshot
@@ -0,0 +1,100 @@
+from unittest.mock import patch, AsyncMock
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.crud.storage import delete_storage
+from org_app.models.organisation import Organisation
+from org_app.models.storage import StorageCopy
+from org_app.models.storage_distance import StorageDistanceCopy
+from org_app.tombstones import purge_tombstones_batch
+from .factories import create_organisation, create_storage, create_distance
+
+
+async def count_distances(db_session: AsyncSession) -> int:
+    """
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: Количество копий расстояний, включая ещё не удалённые в фоне.
+    """
+
+    result = await db_session.execute(select(StorageDistanceCopy.id))
+
+    return len(result.all())
+
+
+@pytest.mark.asyncio
+@patch("org_app.api.send_organisation_delete_event")
+async def test_delete_organisation_purges_distances_in_background(mock_delete_event: AsyncMock,
+                                                                  async_client: AsyncClient,
+                                                                  db_session: AsyncSession,
+                                                                  ) -> None:
+    """
+    Проверяем, что удалённая организация сразу скрыта и освобождает имя, а копии расстояний до неё удаляются
+    в фоне, после чего удаляется и сама организация.
+
+    :param mock_delete_event: Мок-функция для отправки события об удалении организации.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [10, 50]})
+    storage = await create_storage(db_session, {"Пластик": [0, 60]})
+    await create_distance(db_session, storage.id, organisation.id, distance=10)
+
+    response = await async_client.delete(f"/api/v1/organisation/organisation/{organisation.id}/")
+    assert response.status_code == status.HTTP_200_OK
+    assert mock_delete_event.call_count == 1
+
+    assert (await async_client.get("/api/v1/organisation/organisations/")).json() == []
+    response = await async_client.post("/api/v1/organisation/recycle/", json={"organisation_id": organisation.id})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await async_client.delete(f"/api/v1/organisation/organisation/{organisation.id}/")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await async_client.post("/api/v1/organisation/organisation/",
+                                       json={"name": "ОО1", "capacity": {"Пластик": [10, 50]}})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["id"] != organisation.id
+
+    assert await count_distances(db_session) == 1
+    assert [await purge_tombstones_batch(db_session) for _ in range(3)] == [1, 1, 0]
+    assert await count_distances(db_session) == 0
+    assert await db_session.get(Organisation, organisation.id, populate_existing=True) is None
+
+
+@pytest.mark.asyncio
+@patch("org_app.api.send_update_capacity_event")
+async def test_deleted_storage_copy_is_skipped_by_recycle(mock_update_storage: AsyncMock,
+                                                          async_client: AsyncClient,
+                                                          db_session: AsyncSession,
+                                                          ) -> None:
+    """
+    Проверяем, что отходы не распределяются в удалённое хранилище, пока его расстояния ещё не удалены в фоне.
+
+    :param mock_update_storage: Мок-функция для отправки события об обновлении ёмкости хранилища.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [50, 50]})
+    nearest = await create_storage(db_session, {"Пластик": [0, 60]})
+    farthest = await create_storage(db_session, {"Пластик": [0, 60]})
+    await create_distance(db_session, nearest.id, organisation.id, distance=10)
+    await create_distance(db_session, farthest.id, organisation.id, distance=20)
+
+    assert await delete_storage(db_session, nearest.id) is not None
+    assert await count_distances(db_session) == 2
+
+    response = await async_client.post("/api/v1/organisation/recycle/", json={"organisation_id": organisation.id})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["waste_distribution"] == {str(farthest.id): {"Пластик": 50}}
+
+    while await purge_tombstones_batch(db_session):
+        pass
+
+    assert await count_distances(db_session) == 1
+    assert await db_session.get(StorageCopy, nearest.id, populate_existing=True) is None
@@ -0,0 +1,174 @@
+from typing import Generator, List, Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from org_app.events.codec import encode_event
+from org_app.events.consumers.delivery import handle_delivery
+from org_app.events.outbox import relay_outbox_batch
+from org_app.events.producers import publish_events
+from org_app.tracing import (InMemorySpanExporter, Span, SpanContext, get_current_span, parse_traceparent,
+                             set_span_exporter, setup_query_tracing, start_span)
+from .conftest import test_engine
+from .factories import create_organisation, create_storage, create_distance
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def span_exporter() -> Generator[InMemorySpanExporter, None, None]:
+    """
+    Включает трассировку с выгрузкой спанов в память на время теста.
+
+    :return: Получатель спанов
+    """
+
+    exporter = InMemorySpanExporter()
+    set_span_exporter(exporter)
+    setup_query_tracing(test_engine.sync_engine)
+    yield exporter
+    set_span_exporter(None)
+
+
+def find_spans(spans: List[Span], prefix: str) -> List[Span]:
+    """
+    :param spans: Выгруженные спаны
+    :param prefix: Начало названия спана
+    :return: Спаны с таким началом названия
+    """
+
+    return [span for span in spans if span.name.startswith(prefix)]
+
+
+@pytest.mark.asyncio
+@patch("org_app.events.outbox.publish_events")
+async def test_recycle_trace_from_http_to_rabbitmq(mock_publish: MagicMock,
+                                                   span_exporter: InMemorySpanExporter,
+                                                   async_client: AsyncClient,
+                                                   db_session: AsyncSession,
+                                                   ) -> None:
+    """
+    Проверяем, что запрос /recycle/ продолжает трассу из заголовка `traceparent`, запросы к БД и планирование
+    записываются дочерними спанами, а событие об обновлении хранилища публикуется с `traceparent` спана публикации.
+
+    :param mock_publish: Мок-функция публикации пачки событий в RabbitMQ.
+    :param span_exporter: Получатель спанов в памяти.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания данных в тестах.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session, name="ОО1", capacity={"Пластик": [50, 50]})
+    storage = await create_storage(db_session, {"Пластик": [0, 30]})
+    await create_distance(db_session, storage.id, organisation.id, distance=10)
+
+    response = await async_client.post("/api/v1/organisation/recycle/", json={"organisation_id": organisation.id},
+                                       headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+    assert response.status_code == status.HTTP_200_OK
+
+    server = find_spans(span_exporter.spans, "POST")[0]
+    assert server.name.endswith("/recycle/")
+    assert (server.context.trace_id, server.parent_id, server.kind) == (TRACE_ID, PARENT_ID, "server")
+    assert server.attributes["http.status_code"] == status.HTTP_200_OK
+    assert parse_traceparent(response.headers["traceparent"]) == server.context
+
+    planner = find_spans(span_exporter.spans, "find_nearest_storage")[0]
+    assert planner.parent_id == server.context.span_id
+    db_spans = find_spans(span_exporter.spans, "db ")
+    assert any(span.parent_id == planner.context.span_id for span in db_spans)
+    assert all(span.context.trace_id == TRACE_ID for span in db_spans)
+    assert all(span.duration <= server.duration for span in db_spans + [planner])
+
+    span_exporter.clear()
+    assert await relay_outbox_batch(db_session) == 1
+
+    publish = find_spans(span_exporter.spans, "publish update_capacity")[0]
+    assert (publish.context.trace_id, publish.parent_id, publish.kind) == (TRACE_ID, server.context.span_id, "producer")
+    (queue, _, _, traceparent), = mock_publish.call_args.args[0]
+    assert queue == "update_capacity"
+    assert traceparent == publish.context.to_traceparent()
+
+
+@patch("pika.BlockingConnection")
+def test_publish_event_sets_traceparent_header(mock_connection: MagicMock) -> None:
+    """
+    Проверяем, что `traceparent` передаётся в заголовках сообщения, а без него заголовков нет.
+
+    :param mock_connection: Мок подключения к RabbitMQ.
+    :return: None
+    """
+
+    traceparent = f"00-{TRACE_ID}-{PARENT_ID}-01"
+    publish_events([("organisation_created", {"id": 1}, "event-1", traceparent),
+                    ("organisation_created", {"id": 2}, "event-2", None)])
+
+    channel = mock_connection.return_value.channel.return_value
+    traced, untraced = [call.kwargs["properties"] for call in channel.basic_publish.call_args_list]
+
+    assert traced.headers == {"traceparent": traceparent}
+    assert untraced.headers is None
+
+
+def test_consumer_continues_publisher_trace(span_exporter: InMemorySpanExporter) -> None:
+    """
+    Проверяем, что обработка сообщения записывается спаном трассы издателя и обработчик выполняется внутри него.
+
+    :param span_exporter: Получатель спанов в памяти.
+    :return: None
+    """
+
+    handler_spans: List[Optional[Span]] = []
+
+    async def process(*args) -> bool:
+        handler_spans.append(get_current_span())
+        return True
+
+    queue = "storage_created"
+    body, content_type = encode_event(queue, {"id": 1}, event_id="event-1")
+    method = MagicMock(routing_key=queue, delivery_tag=1, redelivered=False)
+    properties = MagicMock(content_type=content_type, message_id="event-1",
+                           headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+
+    with patch("org_app.events.consumers.delivery.process_event_once", new=AsyncMock(side_effect=process)):
+        handle_delivery(MagicMock(), method, properties, body, AsyncMock())
+
+    consume, = span_exporter.spans
+    assert (consume.name, consume.kind) == ("consume storage_created", "consumer")
+    assert (consume.context.trace_id, consume.parent_id) == (TRACE_ID, PARENT_ID)
+    assert consume.attributes["messaging.message_id"] == "event-1"
+    assert handler_spans == [consume]
+
+
+def test_unsampled_trace_is_not_exported(span_exporter: InMemorySpanExporter) -> None:
+    """
+    Проверяем, что решение издателя не записывать трассу соблюдается, а контекст всё равно передаётся дальше.
+
+    :param span_exporter: Получатель спанов в памяти.
+    :return: None
+    """
+
+    with start_span("outer", parent=SpanContext(TRACE_ID, PARENT_ID, sampled=False)) as outer:
+        with start_span("inner") as inner:
+            assert inner.context.trace_id == TRACE_ID
+            assert inner.context.to_traceparent().endswith("-00")
+
+    assert outer.end_time is not None
+    assert span_exporter.spans == []
+
+
+def test_parse_traceparent() -> None:
+    """
+    Проверяем разбор заголовка `traceparent`: некорректные значения игнорируются.
+
+    :return: None
+    """
+
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == SpanContext(TRACE_ID, PARENT_ID, True)
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00".encode()) == SpanContext(TRACE_ID, PARENT_ID, False)
+    assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
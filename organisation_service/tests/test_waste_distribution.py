@@ -0,0 +1,43 @@
+import pytest
+
+from benchmarks.planner import FILL_LEVELS, GENERATORS, WASTE_MIXES, check_equivalence, generate_graph
+from org_app.services.waste_distribution import PLANNERS
+
+
+@pytest.mark.parametrize("planner", list(PLANNERS))
+def test_planner_distributes_by_distance(planner: str) -> None:
+    """
+    Проверяем, что отходы каждого типа отправляются в ближайшие хранилища с местом, а остаток возвращается.
+
+    :param planner: Имя планировщика.
+    :return: None
+    """
+
+    organisation_capacity = {"Пластик": [70, 70], "Стекло": [20, 20], "Биоотходы": [0, 10]}
+    sorted_distances = [(3, 10), (1, 20), (2, 30), (4, 40)]
+    storage_capacities = {
+        1: {"Пластик": [0, 50], "Стекло": [0, 100]},
+        2: {"Пластик": [0, 10]},
+        3: {"Пластик": [40, 40], "Стекло": [90, 100]},
+    }
+
+    storage_plan, total_sent_waste, remaining_waste = PLANNERS[planner](organisation_capacity, sorted_distances,
+                                                                        storage_capacities)
+
+    assert storage_plan == {3: {"Стекло": 10}, 1: {"Пластик": 50, "Стекло": 10}, 2: {"Пластик": 10}}
+    assert total_sent_waste == {"Пластик": 60, "Стекло": 20}
+    assert remaining_waste == {"Пластик": 10}
+
+
+@pytest.mark.parametrize("kind", list(GENERATORS))
+def test_planners_are_equivalent(kind: str) -> None:
+    """
+    Проверяем на синтетических графах, что все планировщики дают тот же результат, что и эталонный.
+
+    :param kind: Вид графа.
+    :return: None
+    """
+
+    for waste_mix in WASTE_MIXES:
+        for fill in FILL_LEVELS:
+            check_equivalence(generate_graph(kind, 50, 40, 10, waste_mix, fill), PLANNERS)
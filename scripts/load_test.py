@@ -0,0 +1,712 @@
+"""
+Нагрузочное тестирование сервисов organisation и storage.
+
+Заполняет БД заданным количеством организаций, хранилищ и расстояний, затем выполняет смешанную нагрузку
+(`/recycle/`, списки и создание записей) заданным числом конкурентных клиентов и выводит p50/p99 задержки,
+RPS и количество запросов к БД на запрос. Результат сохраняется в JSON для сравнения между коммитами.
+
+Запуск из корня репозитория:
+
+    # приложения ASGI в этом процессе, временные БД SQLite, без RabbitMQ
+    python scripts/load_test.py run --organisations 1000 --storages 200 --duration 30
+    # то же с доставкой событий между сервисами через брокер в памяти (outbox -> брокер -> потребители)
+    python scripts/load_test.py run --events --duration 30
+    # через nginx (docker compose up) или напрямую: --organisation-url http://localhost:8000 ...
+    python scripts/load_test.py run --url http://localhost --duration 30
+    # сравнение двух прогонов
+    python scripts/load_test.py compare load_test_results/<до>.json load_test_results/<после>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+ORGANISATION_API = "/api/v1/organisation"
+STORAGE_API = "/api/v1/storage"
+
+WASTE_TYPES = ["Пластик", "Стекло", "Биоотходы"]
+SEED_BATCH_SIZE = 5000
+
+# Операция нагрузки: (сервис, метод, путь, шаблон пути в метках метрик)
+OPERATIONS: Dict[str, Tuple[str, str, str, str]] = {
+    "recycle": ("organisation", "POST", f"{ORGANISATION_API}/recycle/", "/recycle/"),
+    "list_organisations": ("organisation", "GET", f"{ORGANISATION_API}/organisations/", "/organisations/"),
+    "create_organisation": ("organisation", "POST", f"{ORGANISATION_API}/organisation/", "/organisation/"),
+    "list_storages": ("storage", "GET", f"{STORAGE_API}/storages/", "/storages/"),
+    "create_storage": ("storage", "POST", f"{STORAGE_API}/storage/", "/storage/"),
+}
+
+DEFAULT_MIX = "recycle=6,list_organisations=1,list_storages=1,create_organisation=1,create_storage=1"
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """
+    :param value: Веса операций в виде `операция=вес,...`
+    :return: Веса по операциям
+    :raises argparse.ArgumentTypeError: неизвестная операция или неположительный вес
+    """
+
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Неизвестная операция {name}, доступны: {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+        if mix[name] <= 0:
+            raise argparse.ArgumentTypeError(f"Вес операции {name} должен быть больше 0")
+
+    return mix
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    :param values: Отсортированные значения
+    :param q: Перцентиль, 0-100
+    :return: Значение перцентиля (nearest rank) или 0 для пустого списка
+    """
+
+    if not values:
+        return 0.0
+
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """
+    :param text: Метрики в текстовом формате Prometheus
+    :return: Значения метрик по строке `имя{метки}`
+    """
+
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+
+    return samples
+
+
+@dataclass
+class Target:
+    """
+    Сервисы под нагрузкой.
+
+    :param name: asgi, asgi+events или URL
+    :param clients: HTTP-клиенты по сервисам
+    :param close: Освобождение ресурсов после прогона
+    :param pipeline: Конвейер событий в этом процессе (для asgi+events)
+    """
+
+    name: str
+    clients: Dict[str, httpx.AsyncClient]
+    close: Callable[[], Awaitable[None]]
+    pipeline: Optional["EventPipeline"] = None
+
+
+@dataclass
+class EventPipeline:
+    """
+    Доставка событий между сервисами в этом процессе: ретрансляторы outbox, брокер в памяти и потребители.
+
+    :param broker: Общий брокер обоих сервисов
+    :param outbox_sizes: Количество неопубликованных событий в outbox каждого сервиса
+    """
+
+    broker: Any
+    outbox_sizes: Callable[[], Awaitable[List[int]]]
+
+    async def drain(self, timeout: float) -> float:
+        """
+        Ожидание публикации и обработки всех событий.
+
+        :param timeout: Максимальное время ожидания, с
+        :return: Время ожидания, с
+        :raises TimeoutError: события не обработаны за `timeout`
+        """
+
+        started = time.perf_counter()
+
+        async def drained() -> bool:
+            return not any(await self.outbox_sizes()) and self.broker.join(timeout=0)
+
+        await wait_for(drained, "Обработка событий", timeout)
+
+        return time.perf_counter() - started
+
+
+@dataclass
+class OperationStats:
+    """
+    Результаты одной операции.
+
+    :param latencies: Задержки успешных и неуспешных запросов, с
+    :param statuses: Количество ответов по коду (`error` - исключение клиента)
+    """
+
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, latency: float, status: str) -> None:
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def merge(self, other: "OperationStats") -> None:
+        self.latencies.extend(other.latencies)
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+    def summary(self, elapsed: float, db_queries: Optional[float]) -> Dict[str, Any]:
+        """
+        :param elapsed: Длительность прогона, с
+        :param db_queries: Среднее количество запросов к БД на запрос или None, если метрики недоступны
+        :return: Сводка операции, задержки в мс
+        """
+
+        latencies = sorted(self.latencies)
+        errors = sum(count for status, count in self.statuses.items() if not status.startswith("2"))
+
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "statuses": dict(sorted(self.statuses.items())),
+            "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            "db_queries_per_request": None if db_queries is None else round(db_queries, 2),
+        }
+
+
+async def create_asgi_target(data_dir: str, events: bool = False) -> Target:
+    """
+    Приложения обоих сервисов в этом процессе с пустыми БД SQLite в `data_dir`.
+
+    :param data_dir: Каталог для БД
+    :param events: Доставлять события между сервисами через брокер в памяти
+    :return: Сервисы под нагрузкой
+
+    Приложения запускаются без lifespan и RabbitMQ. Без `events` события остаются в outbox: это замер самих
+    обработчиков запросов и БД. С `events` ретрансляторы outbox и потребители обоих сервисов работают в потоках
+    этого процесса с общим брокером в памяти, как с `EVENT_BROKER=memory`.
+    """
+
+    sys.path[:0] = [str(ROOT / "organisation_service"), str(ROOT / "storage_service")]
+
+    # Количество запросов к БД на запрос берётся из `/metrics`, выключенных по умолчанию
+    os.environ.setdefault("METRICS_ENABLED", "true")
+    # Адрес БД читается при импорте модуля database, поэтому сервисы импортируются по очереди
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{data_dir}/organisation_service.db"
+    from org_app.database import engine as organisation_engine, init_db as init_organisation_db
+    from org_app.main import app as organisation_app
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{data_dir}/storage_service.db"
+    from storage_app.database import engine as storage_engine, init_db as init_storage_db
+    from storage_app.main import app as storage_app
+
+    await init_organisation_db()
+    await init_storage_db()
+
+    pipeline = await start_event_pipeline() if events else None
+
+    clients = {
+        "organisation": httpx.AsyncClient(transport=httpx.ASGITransport(app=organisation_app),
+                                          base_url="http://organisation", timeout=60),
+        "storage": httpx.AsyncClient(transport=httpx.ASGITransport(app=storage_app),
+                                     base_url="http://storage", timeout=60),
+    }
+
+    async def close() -> None:
+        for client in clients.values():
+            await client.aclose()
+        await organisation_engine.dispose()
+        await storage_engine.dispose()
+
+    return Target("asgi+events" if events else "asgi", clients, close, pipeline)
+
+
+async def start_event_pipeline() -> EventPipeline:
+    """
+    Запуск ретрансляторов outbox и потребителей событий обоих сервисов с общим брокером в памяти.
+
+    :return: Конвейер событий
+    """
+
+    from sqlalchemy import func, select
+
+    from org_app.database import AsyncSessionLocal as OrganisationSessionLocal
+    from org_app.events.broker import InMemoryBroker, set_broker as set_organisation_broker
+    from org_app.events.consumers import start_listening_events as start_organisation_consumers
+    from org_app.events.outbox import start_outbox_relay as start_organisation_relay
+    from org_app.models.outbox import OutboxEvent as OrganisationOutboxEvent
+    from storage_app.database import AsyncSessionLocal as StorageSessionLocal
+    from storage_app.events.broker import set_broker as set_storage_broker
+    from storage_app.events.consumers import start_listening_events as start_storage_consumers
+    from storage_app.events.outbox import start_outbox_relay as start_storage_relay
+    from storage_app.models.outbox import OutboxEvent as StorageOutboxEvent
+
+    broker = InMemoryBroker()
+    set_organisation_broker(broker)
+    set_storage_broker(broker)
+    start_organisation_consumers()
+    start_storage_consumers()
+    start_organisation_relay()
+    start_storage_relay()
+
+    async def outbox_sizes() -> List[int]:
+        sizes = []
+        for session_factory, model in ((OrganisationSessionLocal, OrganisationOutboxEvent),
+                                       (StorageSessionLocal, StorageOutboxEvent)):
+            async with session_factory() as db:
+                sizes.append(await db.scalar(select(func.count()).select_from(model)))
+        return sizes
+
+    return EventPipeline(broker, outbox_sizes)
+
+
+def create_http_target(organisation_url: str, storage_url: str) -> Target:
+    """
+    :param organisation_url: Адрес сервиса organisation (nginx или uvicorn)
+    :param storage_url: Адрес сервиса storage
+    :return: Сервисы под нагрузкой
+    """
+
+    clients = {
+        "organisation": httpx.AsyncClient(base_url=organisation_url, timeout=60),
+        "storage": httpx.AsyncClient(base_url=storage_url, timeout=60),
+    }
+
+    async def close() -> None:
+        for client in clients.values():
+            await client.aclose()
+
+    return Target(organisation_url if organisation_url == storage_url else f"{organisation_url} {storage_url}",
+                  clients, close)
+
+
+async def post_in_batches(client: httpx.AsyncClient, path: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Создание записей массовым эндпоинтом пачками по `SEED_BATCH_SIZE`.
+
+    :param client: HTTP-клиент сервиса
+    :param path: Путь массового эндпоинта
+    :param items: Записи
+    :return: Созданные записи
+    :raises httpx.HTTPStatusError: сервис отклонил пачку
+    """
+
+    created = []
+    for start in range(0, len(items), SEED_BATCH_SIZE):
+        response = await client.post(path, json=items[start:start + SEED_BATCH_SIZE])
+        response.raise_for_status()
+        created.extend(response.json())
+
+    return created
+
+
+async def wait_for(check: Callable[[], Awaitable[bool]], what: str, timeout: float) -> None:
+    """
+    Ожидание доставки событий между сервисами.
+
+    :param check: Проверка, вернёт True, когда данные доставлены
+    :param what: Что ожидается, для сообщения об ошибке
+    :param timeout: Максимальное время ожидания, с
+    :raises TimeoutError: данные не доставлены за `timeout`
+    """
+
+    deadline = time.monotonic() + timeout
+    while not await check():
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{what}: не дождались за {timeout:.0f} с")
+        await asyncio.sleep(0.5)
+
+
+async def seed(target: Target, organisations: int, storages: int, distances: int, rng: random.Random,
+               timeout: float) -> List[int]:
+    """
+    Заполнение сервисов данными.
+
+    :param target: Сервисы под нагрузкой
+    :param organisations: Количество организаций
+    :param storages: Количество хранилищ
+    :param distances: Количество расстояний от каждой организации до случайных хранилищ
+    :param rng: Генератор случайных чисел прогона
+    :param timeout: Время ожидания доставки событий между сервисами (для сервисов по HTTP), с
+    :return: Идентификаторы организаций для нагрузки
+
+    Отходов у организации хватает на одну полную утилизацию, ёмкости хранилищ - на все организации.
+    Для ASGI без событий копии организаций и хранилищ загружаются в БД соседнего сервиса так же, как их загружают
+    обработчик события `organisation_created` и начальная загрузка из снимка (`STORAGE_SNAPSHOT_SOURCE`).
+    """
+
+    organisation_client, storage_client = target.clients["organisation"], target.clients["storage"]
+
+    created = await post_in_batches(organisation_client, f"{ORGANISATION_API}/organisations/bulk/", [
+        {"name": f"ОО{i}", "capacity": {waste_type: [rng.randint(1, 50), 50] for waste_type in WASTE_TYPES}}
+        for i in range(1, organisations + 1)
+    ])
+    organisation_ids = [organisation["id"] for organisation in created]
+
+    if target.name == "asgi":
+        from storage_app.crud.organisation import create_organisation_copies
+        from storage_app.database import AsyncSessionLocal as StorageSessionLocal
+        from storage_app.schemas.organisation import OrganisationCopySchema
+
+        async with StorageSessionLocal() as db:
+            await create_organisation_copies(db, [OrganisationCopySchema(id=org_id) for org_id in organisation_ids])
+
+    max_capacity = 50 * max(1, organisations * distances // max(1, storages))
+    created = await post_in_batches(storage_client, f"{STORAGE_API}/storages/bulk/", [
+        {"name": f"МНО{i}", "location": "Москва",
+         "capacity": {waste_type: [0, max_capacity] for waste_type in rng.sample(WASTE_TYPES, rng.randint(1, 3))}}
+        for i in range(1, storages + 1)
+    ])
+    storage_ids = [storage["id"] for storage in created]
+
+    distance_rows = [
+        {"storage_id": storage_id, "organisation_id": org_id, "distance": rng.randint(1, 1000)}
+        for org_id in organisation_ids
+        for storage_id in rng.sample(storage_ids, min(distances, len(storage_ids)))
+    ]
+
+    if target.name == "asgi":
+        await post_in_batches(storage_client, f"{STORAGE_API}/distances/bulk/", distance_rows)
+
+        from org_app.database import AsyncSessionLocal as OrganisationSessionLocal
+        from org_app.sync import apply_storage_snapshot
+
+        response = await storage_client.get(f"{STORAGE_API}/snapshot/")
+        response.raise_for_status()
+        async with OrganisationSessionLocal() as db:
+            await apply_storage_snapshot(db, response.json())
+
+        return organisation_ids
+
+    # Копии организаций приходят в storage событием, до этого расстояния отклоняются
+    async def create_distances() -> bool:
+        try:
+            await post_in_batches(storage_client, f"{STORAGE_API}/distances/bulk/", distance_rows)
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code != 400 or "организаций не существует" not in exc.response.text:
+                raise
+            return False
+        return True
+
+    await wait_for(create_distances, "Копии организаций в storage", timeout)
+
+    # Копии хранилищ и расстояний приходят в organisation событиями. Готовность проверяется утилизацией отходов
+    # последней организации: до доставки копий для неё нет хранилищ. Эта организация в нагрузку не входит
+    async def recycled() -> bool:
+        response = await organisation_client.post(f"{ORGANISATION_API}/recycle/",
+                                                  json={"organisation_id": organisation_ids[-1]})
+        if response.status_code not in (200, 404):
+            response.raise_for_status()
+        return response.status_code == 200
+
+    if organisation_ids and distance_rows:
+        await wait_for(recycled, "Копии хранилищ и расстояний в organisation", timeout)
+        organisation_ids = organisation_ids[:-1]
+
+    return organisation_ids
+
+
+async def scrape_db_queries(target: Target) -> Dict[Tuple[str, str], Tuple[float, float]]:
+    """
+    :param target: Сервисы под нагрузкой
+    :return: Сумма и количество `db_queries_per_request` по (сервис, шаблон пути). Пусто, если `/metrics` недоступен
+
+    Через nginx `/metrics` не публикуется, количество запросов к БД доступно для ASGI и прямых адресов сервисов.
+    """
+
+    queries = {}
+    for service, client in target.clients.items():
+        try:
+            response = await client.get("/metrics")
+        except httpx.HTTPError:
+            continue
+        if response.status_code != 200:
+            continue
+
+        samples = parse_metrics(response.text)
+        for name, value in samples.items():
+            if not name.startswith("db_queries_per_request_sum{"):
+                continue
+            route = name.split('route="', 1)[1].split('"', 1)[0]
+            count = samples.get(name.replace("_sum{", "_count{", 1), 0.0)
+            queries[(service, route)] = (value, count)
+
+    return queries
+
+
+async def run_load(target: Target,
+                   organisation_ids: List[int],
+                   mix: Dict[str, float],
+                   concurrency: int,
+                   duration: float,
+                   requests: Optional[int],
+                   rng: random.Random,
+                   ) -> Tuple[Dict[str, OperationStats], float]:
+    """
+    Смешанная нагрузка конкурентными клиентами.
+
+    :param target: Сервисы под нагрузкой
+    :param organisation_ids: Организации для `/recycle/`, перебираются по кругу в случайном порядке
+    :param mix: Веса операций
+    :param concurrency: Количество одновременных клиентов
+    :param duration: Длительность нагрузки, с (если не задано `requests`)
+    :param requests: Общее количество запросов или None
+    :param rng: Генератор случайных чисел прогона
+    :return: Результаты по операциям и фактическая длительность, с
+    """
+
+    names, weights = list(mix), list(mix.values())
+    # Заранее выбранная последовательность операций одинакова для прогонов с одним --seed
+    plan = rng.choices(names, weights, k=requests) if requests else None
+    recycle_queue = rng.sample(organisation_ids, len(organisation_ids))
+    stats = {name: OperationStats() for name in names}
+    counter = 0
+    created = 0
+    deadline = time.perf_counter() + duration
+
+    def next_operation() -> Optional[str]:
+        nonlocal counter
+        if plan is not None:
+            if counter >= len(plan):
+                return None
+            name = plan[counter]
+        else:
+            if time.perf_counter() >= deadline:
+                return None
+            name = rng.choices(names, weights)[0]
+        counter += 1
+        return name
+
+    def request_body(name: str) -> Optional[Dict[str, Any]]:
+        nonlocal created
+        if name == "recycle":
+            return {"organisation_id": recycle_queue[counter % len(recycle_queue)] if recycle_queue else 0}
+        if name == "create_organisation":
+            created += 1
+            return {"name": f"ОО-нагрузка-{created}", "capacity": {"Пластик": [10, 50]}}
+        if name == "create_storage":
+            created += 1
+            return {"name": f"МНО-нагрузка-{created}", "location": "Москва", "capacity": {"Пластик": [0, 500]}}
+        return None
+
+    async def worker() -> None:
+        while (name := next_operation()) is not None:
+            service, method, path, _ = OPERATIONS[name]
+            body = request_body(name)
+            start = time.perf_counter()
+            try:
+                response = await target.clients[service].request(method, path, json=body)
+                status = str(response.status_code)
+            except httpx.HTTPError:
+                status = "error"
+            stats[name].record(time.perf_counter() - start, status)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return stats, time.perf_counter() - started
+
+
+def git_commit() -> Optional[str]:
+    """
+    :return: Текущий коммит репозитория или None вне git
+    """
+
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    """
+    :param result: Результат прогона
+    :return: None
+    """
+
+    print(f"\n{result['target']}  commit {result['commit']}  {result['elapsed_s']:.1f} s  "
+          f"concurrency {result['config']['concurrency']}")
+    print(f"{'operation':<20} {'requests':>8} {'errors':>6} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'db q/req':>8}")
+    for name, summary in {**result["operations"], "total": result["total"]}.items():
+        db_queries = summary["db_queries_per_request"]
+        print(f"{name:<20} {summary['requests']:>8} {summary['errors']:>6} {summary['rps']:>8.1f} "
+              f"{summary['p50_ms']:>8.2f} {summary['p99_ms']:>8.2f} "
+              f"{'-' if db_queries is None else f'{db_queries:.1f}':>8}")
+    if result.get("events"):
+        events = result["events"]
+        print(f"events: {events['published']} published, drained in {events['drain_s']:.2f} s, "
+              f"{events['events_per_s']:.1f} events/s")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Прогон: заполнение данными, нагрузка и сводка.
+
+    :param args: Аргументы командной строки
+    :return: Результат прогона
+    """
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory(prefix="load_test_") as data_dir:
+        if args.url or args.organisation_url or args.storage_url:
+            target = create_http_target(args.organisation_url or args.url, args.storage_url or args.url)
+        else:
+            target = await create_asgi_target(data_dir, events=args.events)
+
+        try:
+            started = time.perf_counter()
+            organisation_ids = await seed(target, args.organisations, args.storages, args.distances, rng,
+                                          args.sync_timeout)
+            seed_time = time.perf_counter() - started
+
+            queries_before = await scrape_db_queries(target)
+            published_before = target.pipeline.broker.published if target.pipeline else 0
+            stats, elapsed = await run_load(target, organisation_ids, args.mix, args.concurrency, args.duration,
+                                            args.requests, rng)
+            queries_after = await scrape_db_queries(target)
+
+            events = None
+            if target.pipeline is not None:
+                drain_time = await target.pipeline.drain(args.sync_timeout)
+                published = target.pipeline.broker.published - published_before
+                events = {
+                    "published": published,
+                    "drain_s": round(drain_time, 3),
+                    "events_per_s": round(published / (elapsed + drain_time), 2) if published else 0.0,
+                }
+        finally:
+            await target.close()
+
+    def db_queries(name: str) -> Optional[float]:
+        service, _, _, route = OPERATIONS[name]
+        key = (service, route)
+        if key not in queries_after:
+            return None
+        total, count = queries_after[key]
+        total_before, count_before = queries_before.get(key, (0.0, 0.0))
+        return (total - total_before) / (count - count_before) if count > count_before else None
+
+    total = OperationStats()
+    for operation in stats.values():
+        total.merge(operation)
+
+    return {
+        "target": target.name,
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "organisations": args.organisations,
+            "storages": args.storages,
+            "distances": args.distances,
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "duration": None if args.requests else args.duration,
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "seed_s": round(seed_time, 3),
+        "elapsed_s": round(elapsed, 3),
+        "operations": {name: summary.summary(elapsed, db_queries(name)) for name, summary in stats.items()},
+        "total": total.summary(elapsed, None),
+        "events": events,
+    }
+
+
+def compare(baseline_path: str, current_path: str) -> None:
+    """
+    Сравнение двух сохранённых прогонов: изменение RPS и задержек в процентах.
+
+    :param baseline_path: Файл исходного прогона
+    :param current_path: Файл нового прогона
+    :return: None
+    """
+
+    baseline = json.loads(Path(baseline_path).read_text())
+    current = json.loads(Path(current_path).read_text())
+    if baseline["config"] != current["config"]:
+        print("Внимание: параметры прогонов различаются, сравнение может быть некорректным")
+
+    def change(old: Optional[float], new: Optional[float]) -> str:
+        if old is None or new is None:
+            return "-"
+        if not old:
+            return f"{new:.1f}"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    print(f"{baseline['commit']} -> {current['commit']}")
+    print(f"{'operation':<20} {'rps':>9} {'p50':>9} {'p99':>9} {'db q/req':>9}")
+    operations = {**current["operations"], "total": current["total"]}
+    for name, new in operations.items():
+        old = baseline["operations"].get(name) if name != "total" else baseline["total"]
+        if old is None:
+            continue
+        print(f"{name:<20} {change(old['rps'], new['rps']):>9} {change(old['p50_ms'], new['p50_ms']):>9} "
+              f"{change(old['p99_ms'], new['p99_ms']):>9} "
+              f"{change(old['db_queries_per_request'], new['db_queries_per_request']):>9}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="заполнить данными и выполнить нагрузку")
+    run_parser.add_argument("--organisations", type=int, default=1000)
+    run_parser.add_argument("--storages", type=int, default=200)
+    run_parser.add_argument("--distances", type=int, default=5, help="расстояний на организацию")
+    run_parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                            help=f"веса операций, по умолчанию {DEFAULT_MIX}")
+    run_parser.add_argument("--concurrency", type=int, default=10)
+    run_parser.add_argument("--duration", type=float, default=30, help="длительность нагрузки, с")
+    run_parser.add_argument("--requests", type=int, help="общее количество запросов вместо --duration")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--url", help="адрес nginx для обоих сервисов, без него - ASGI в этом процессе")
+    run_parser.add_argument("--organisation-url", help="адрес сервиса organisation, например http://localhost:8000")
+    run_parser.add_argument("--storage-url", help="адрес сервиса storage, например http://localhost:8001")
+    run_parser.add_argument("--sync-timeout", type=float, default=120,
+                            help="ожидание доставки данных между сервисами при заполнении, с")
+    run_parser.add_argument("--events", action="store_true",
+                            help="ASGI: доставлять события между сервисами через брокер в памяти")
+    run_parser.add_argument("--output", help="файл результата, по умолчанию load_test_results/<время>-<коммит>.json")
+
+    compare_parser = commands.add_parser("compare", help="сравнить два сохранённых прогона")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args.baseline, args.current)
+        return
+
+    if (args.organisation_url is None) != (args.storage_url is None) and args.url is None:
+        parser.error("--organisation-url и --storage-url задаются вместе")
+    if args.events and (args.url or args.organisation_url):
+        parser.error("--events используется только без --url: для сервисов по HTTP события доставляет RabbitMQ")
+
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    output = Path(args.output or f"load_test_results/{time.strftime('%Y%m%d-%H%M%S')}-{result['commit']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, ensure_ascii=False, indent=2))
+    print(f"\nРезультат сохранён в {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Сравнение размера и скорости кодирования событий `storage_created` в JSON и msgpack.
+
+Запуск из каталога storage_service:
+
+    python -m benchmarks.event_codec 100000
+"""
+import argparse
+import time
+
+from storage_app.events.codec import decode_event, encode_event
+
+WASTE_TYPES = ["Пластик", "Стекло", "Биоотходы"]
+
+
+def run(count: int) -> None:
+    """
+    Кодирование и разбор `count` событий каждым форматом.
+
+    :param count: Количество событий
+    :return: None
+    """
+
+    events = [
+        {"id": i, "capacity": {waste_type: [i % 50, 50 + j * 10] for j, waste_type in enumerate(WASTE_TYPES)}}
+        for i in range(count)
+    ]
+
+    for codec in ("json", "msgpack"):
+        start = time.perf_counter()
+        bodies = [encode_event("storage_created", data, codec=codec) for data in events]
+        encoded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for body, content_type in bodies:
+            decode_event(body, content_type)
+        decoded = time.perf_counter() - start
+
+        size = sum(len(body) for body, _ in bodies) / count
+        print(f"{codec:<8} {size:>6.1f} B/event  encode {encoded / count * 1e6:>5.2f} us/event  "
+              f"decode {decoded / count * 1e6:>5.2f} us/event")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("count", nargs="?", type=int, default=100_000)
+    args = parser.parse_args()
+
+    run(args.count)
+
+
+if __name__ == "__main__":
+    main()
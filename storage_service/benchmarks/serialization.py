@@ -0,0 +1,110 @@
+"""
+Сравнение способов сериализации списка хранилищ для ответа `/storages/`.
+
+Запуск из каталога storage_service:
+
+    python -m benchmarks.serialization 1000 100000 1000000
+"""
+import argparse
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+import orjson
+from pydantic import TypeAdapter
+
+from storage_app.schemas.storage import StorageSchema
+
+WASTE_TYPES = ["Пластик", "Стекло", "Биоотходы"]
+
+
+def make_rows(size: int) -> List[Dict[str, Any]]:
+    """
+    Генерация строк хранилищ в том виде, в котором их возвращает `get_all_storage_rows`.
+
+    :param size: Количество хранилищ
+    :return: Список словарей
+    """
+
+    return [
+        {
+            "name": f"МНО{i}",
+            "location": "Москва",
+            "capacity": {waste_type: [i % 50, 50 + j * 10] for j, waste_type in enumerate(WASTE_TYPES)},
+            "id": i,
+        }
+        for i in range(1, size + 1)
+    ]
+
+
+def pydantic_json(rows: List[Dict[str, Any]]) -> bytes:
+    """
+    Путь по умолчанию: ORM-объекты валидируются через `response_model` и сериализуются стандартным json.
+    """
+
+    objects = [SimpleNamespace(**row) for row in rows]
+    adapter = TypeAdapter(list[StorageSchema])
+    content = adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")
+
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def rows_json(rows: List[Dict[str, Any]]) -> bytes:
+    """
+    Строки из БД без Pydantic, стандартный json.
+    """
+
+    return json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def rows_orjson(rows: List[Dict[str, Any]]) -> bytes:
+    """
+    Строки из БД без Pydantic, orjson (`FAST_JSON=true`).
+    """
+
+    return orjson.dumps(rows, option=orjson.OPT_NON_STR_KEYS)
+
+
+SERIALIZERS: Dict[str, Callable[[List[Dict[str, Any]]], bytes]] = {
+    "pydantic+json": pydantic_json,
+    "rows+json": rows_json,
+    "rows+orjson": rows_orjson,
+}
+
+
+def run(size: int) -> None:
+    """
+    Замер времени сериализации для одного размера списка.
+
+    :param size: Количество хранилищ
+    :return: None
+    """
+
+    rows = make_rows(size)
+    reference = rows_json(rows)
+    baseline = None
+
+    for name, serializer in SERIALIZERS.items():
+        start = time.perf_counter()
+        body = serializer(rows)
+        elapsed = time.perf_counter() - start
+
+        # Все способы должны давать одинаковый ответ
+        assert body == reference, name
+        baseline = baseline or elapsed
+        print(f"{size:>9} {name:<15} {elapsed * 1000:>10.1f} ms {len(body) / 1024 / 1024:>8.1f} MiB "
+              f"x{baseline / elapsed:.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sizes", nargs="*", type=int, default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
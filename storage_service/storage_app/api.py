@@ -1,129 +1,428 @@
-from typing import Sequence
-
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from storage_app.crud.storage import (create_storage as crud_create_storage,
-                                      get_all_storages as crud_get_all_storages,
-                                      delete_storage as crud_delete_storage,
-                                      )
-from storage_app.crud.storage_distance import (get_all_storage_distances as crud_get_all_storage_distances,
-                                               create_storage_distance as crud_create_storage_distance,
-                                               delete_distance as crud_delete_distance,
-                                               )
-from storage_app.events.producers.storage import send_storage_created_event, send_storage_deleted_event
-from storage_app.events.producers.storage_distance import send_storage_distance_created_event, \
-    send_distance_deleted_event
-from storage_app.models.storage import Storage
-from storage_app.models.storage_distance import StorageDistance
-from storage_app.schemas.storage import StorageSchema, StorageCreateSchema
-from storage_app.schemas.storage_distance import StorageDistanceSchema, StorageDistanceBaseSchema
-from .database import get_db
-
-router = APIRouter()
-
-
-@router.get("/health/")
-async def health_check():
-    return {"status": "OK"}
-
-
-@router.post("/storage/", response_model=StorageSchema)
-async def create_storage(
-        storage: StorageCreateSchema,
-        db: AsyncSession = Depends(get_db),
-) -> Storage:
-    """
-    :param storage: Данные для создания нового хранилища
-    :param db: Сессия базы данных
-    :return: Созданное хранилище
-
-    Создает новое хранилище в базе данных, вызывает событие `send_storage_created_event` и возвращает созданное хранилище.
-    """
-
-    db_storage = await crud_create_storage(db, storage)
-    send_storage_created_event(db_storage)
-
-    return db_storage
-
-
-@router.post("/distance/", response_model=StorageDistanceSchema)
-async def create_storage_distance(
-        distance: StorageDistanceBaseSchema,
-        db: AsyncSession = Depends(get_db),
-) -> StorageDistance:
-    """
-    :param distance: Данные для создания записи о расстоянии
-    :param db: Сессия базы данных
-    :return: Созданная запись о расстоянии
-
-    Создает новую запись о расстоянии, вызывает событие `send_storage_distance_created_event` и возвращает созданную запись.
-    """
-
-    db_distance = await crud_create_storage_distance(db, distance)
-    send_storage_distance_created_event(db_distance)
-
-    return db_distance
-
-
-@router.get("/storages/", response_model=list[StorageSchema])
-async def get_storages(db: AsyncSession = Depends(get_db)) -> Sequence[Storage]:
-    """
-    :param db: Сессия базы данных
-    :return: Список хранилищ
-
-    Возвращает все хранилища из базы данных.
-    """
-
-    return await crud_get_all_storages(db)
-
-
-@router.get("/distances/", response_model=list[StorageDistanceSchema])
-async def get_storage_distances(
-        db: AsyncSession = Depends(get_db),
-) -> Sequence[StorageDistance]:
-    """
-    :param db: Сессия базы данных
-    :return: Список записей о расстояниях
-
-    Возвращает все записи о расстояниях из базы данных.
-    """
-
-    return await crud_get_all_storage_distances(db)
-
-
-@router.delete("/storage/{storage_id}/")
-async def delete_storage(storage_id: int, db: AsyncSession = Depends(get_db)) -> JSONResponse:
-    """
-    :param storage_id: ID хранилища
-    :param db: сессия базы данных
-    :return: сообщение о том, что хранилище удалено
-    :raises HTTPException: если организация для удаления не найдены
-    """
-
-    storage = await crud_delete_storage(db, storage_id)
-    if not storage:
-        raise HTTPException(status_code=404, detail="Не найдено хранилища для удаления")
-
-    send_storage_deleted_event(storage)
-
-    return JSONResponse(content={"message": "Хранилище успешно удалено"}, status_code=200)
-
-
-@router.delete("/distance/{distance_id}/")
-async def delete_storage_distance(distance_id: int, db: AsyncSession = Depends(get_db)) -> JSONResponse:
-    """
-    :param distance_id: ID расстояния
-    :param db: сессия базы данных
-    :return: сообщение о том, что расстояние удалено
-    :raises HTTPException: если расстояние для удаления не найдены
-    """
-
-    distance = await crud_delete_distance(db, distance_id)
-    if not distance:
-        raise HTTPException(status_code=404, detail="Не найдено расстояние между МНО и ОО для удаления")
-
-    send_distance_deleted_event(distance)
-
-    return JSONResponse(content={"message": "Расстояние между ОО и МНО успешно удалено"}, status_code=200)
+import os
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.crud.storage import (create_storage as crud_create_storage,
+                                      create_storages as crud_create_storages,
+                                      get_all_storages as crud_get_all_storages,
+                                      get_all_storage_rows as crud_get_all_storage_rows,
+                                      delete_storage as crud_delete_storage,
+                                      delete_storages as crud_delete_storages,
+                                      )
+from storage_app.crud.storage_change import get_storage_changes as crud_get_storage_changes
+from storage_app.crud.storage_distance import (get_all_storage_distances as crud_get_all_storage_distances,
+                                               get_all_storage_distance_rows as crud_get_all_storage_distance_rows,
+                                               create_storage_distance as crud_create_storage_distance,
+                                               create_storage_distances as crud_create_storage_distances,
+                                               compute_storage_distances as crud_compute_storage_distances,
+                                               delete_distance as crud_delete_distance,
+                                               delete_distances as crud_delete_distances,
+                                               )
+from storage_app.events.producers.storage import (send_storage_created_event,
+                                                  send_storages_created_event,
+                                                  send_storage_deleted_event,
+                                                  send_storages_deleted_event,
+                                                  )
+from storage_app.events.producers.storage_distance import (send_storage_distance_created_event,
+                                                           send_storage_distances_created_event,
+                                                           send_distance_deleted_event,
+                                                           send_distances_deleted_event,
+                                                           )
+from storage_app.geo import AUTO_DISTANCES
+from storage_app.models.storage import Storage
+from storage_app.reconcile import (SOURCE_TABLES, ReplicatedTable, get_bounds, get_range_checksums,
+                                   get_range_rows)
+from storage_app.models.storage_change import StorageChange
+from storage_app.models.storage_distance import StorageDistance
+from storage_app.schemas.storage import StorageSchema, StorageCreateSchema, StorageBulkDeleteSchema
+from storage_app.schemas.storage_change import StorageChangeSchema
+from storage_app.schemas.storage_distance import (StorageDistanceSchema, StorageDistanceBaseSchema,
+                                                  StorageDistanceComputeSchema, StorageDistanceBulkDeleteSchema)
+from storage_app.serialization import FAST_JSON, FastJSONResponse
+from storage_app.snapshot import build_snapshot, encode_snapshot
+from .database import get_db
+
+# Максимальное количество записей в одном запросе на массовое создание
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "50000"))
+# Максимальное количество изменений в одном ответе ленты синхронизации
+CHANGES_MAX_LIMIT = int(os.getenv("CHANGES_MAX_LIMIT", "10000"))
+
+router = APIRouter()
+
+
+def check_bulk_size(items: list) -> None:
+    """
+    :param items: Записи запроса на массовое создание
+    :return: None
+    :raises HTTPException: если записей больше `BULK_MAX_ITEMS`
+    """
+
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413,
+                            detail=f"Слишком много записей в запросе: {len(items)}, максимум {BULK_MAX_ITEMS}",
+                            )
+
+
+@router.get("/health/")
+async def health_check():
+    return {"status": "OK"}
+
+
+@router.post("/storage/", response_model=StorageSchema)
+async def create_storage(
+        storage: StorageCreateSchema,
+        db: AsyncSession = Depends(get_db),
+) -> Storage:
+    """
+    :param storage: Данные для создания нового хранилища
+    :param db: Сессия базы данных
+    :return: Созданное хранилище
+
+    Создает новое хранилище в базе данных, вызывает событие `send_storage_created_event` и возвращает созданное хранилище.
+    При `AUTO_DISTANCES` для хранилища с координатами в той же транзакции вычисляются расстояния до организаций.
+    """
+
+    db_storage = await crud_create_storage(db, storage, commit=False)
+    send_storage_created_event(db, db_storage)
+    if AUTO_DISTANCES and db_storage.latitude is not None:
+        await compute_distances(db, storage_ids=[db_storage.id])
+    await db.commit()
+
+    return db_storage
+
+
+@router.post("/distance/", response_model=StorageDistanceSchema)
+async def create_storage_distance(
+        distance: StorageDistanceBaseSchema,
+        db: AsyncSession = Depends(get_db),
+) -> StorageDistance:
+    """
+    :param distance: Данные для создания записи о расстоянии
+    :param db: Сессия базы данных
+    :return: Созданная запись о расстоянии
+
+    Создает новую запись о расстоянии, вызывает событие `send_storage_distance_created_event` и возвращает созданную запись.
+    """
+
+    db_distance = await crud_create_storage_distance(db, distance, commit=False)
+    send_storage_distance_created_event(db, db_distance)
+    await db.commit()
+
+    return db_distance
+
+
+@router.post("/storages/bulk/", response_model=list[StorageSchema])
+async def create_storages(
+        storages: List[StorageCreateSchema],
+        db: AsyncSession = Depends(get_db),
+) -> List[Storage]:
+    """
+    :param storages: Данные для создания хранилищ
+    :param db: Сессия базы данных
+    :return: Созданные хранилища
+
+    Создает хранилища одним запросом к базе данных и отправляет одно пакетное событие `storage_created`.
+    При `AUTO_DISTANCES` для хранилищ с координатами вычисляются расстояния до организаций.
+    """
+
+    check_bulk_size(storages)
+
+    db_storages = await crud_create_storages(db, storages, commit=False)
+    if db_storages:
+        send_storages_created_event(db, db_storages)
+        if AUTO_DISTANCES:
+            await compute_distances(db, storage_ids=[db_storage.id for db_storage in db_storages
+                                                     if db_storage.latitude is not None])
+        await db.commit()
+
+    return db_storages
+
+
+@router.post("/distances/bulk/", response_model=list[StorageDistanceSchema])
+async def create_storage_distances(
+        distances: List[StorageDistanceBaseSchema],
+        db: AsyncSession = Depends(get_db),
+) -> List[StorageDistance]:
+    """
+    :param distances: Данные для создания записей о расстоянии
+    :param db: Сессия базы данных
+    :return: Созданные записи о расстоянии
+
+    Создает записи о расстоянии одним запросом к базе данных и отправляет одно пакетное событие
+    `storage_distance_created`.
+    """
+
+    check_bulk_size(distances)
+
+    db_distances = await crud_create_storage_distances(db, distances, commit=False)
+    if db_distances:
+        send_storage_distances_created_event(db, db_distances)
+        await db.commit()
+
+    return db_distances
+
+
+async def compute_distances(db: AsyncSession,
+                            storage_ids: Sequence[int] = (),
+                            organisation_ids: Sequence[int] = (),
+                            ) -> List[StorageDistance]:
+    """
+    :param db: Сессия базы данных
+    :param storage_ids: ID хранилищ, расстояния от которых вычисляются до всех организаций
+    :param organisation_ids: ID копий организаций, расстояния от которых вычисляются до всех хранилищ
+    :return: Созданные записи о расстоянии
+
+    Вычисляет расстояния по координатам (см. `compute_storage_distances`) и записывает одно пакетное событие
+    `storage_distance_created`. Транзакцию фиксирует вызывающая сторона.
+    """
+
+    db_distances = await crud_compute_storage_distances(db, storage_ids, organisation_ids)
+    if db_distances:
+        send_storage_distances_created_event(db, db_distances)
+
+    return db_distances
+
+
+@router.post("/distances/compute/")
+async def compute_storage_distances(
+        request: StorageDistanceComputeSchema,
+        db: AsyncSession = Depends(get_db),
+) -> Dict[str, int]:
+    """
+    :param request: ID хранилищ и (или) копий организаций
+    :param db: Сессия базы данных
+    :return: Количество созданных записей о расстоянии
+
+    Вычисляет расстояния по координатам от хранилищ до всех организаций и от организаций до всех хранилищ.
+    Записи без координат и пары с уже заданным расстоянием пропускаются.
+    """
+
+    check_bulk_size(request.storage_ids + request.organisation_ids)
+
+    db_distances = await compute_distances(db, request.storage_ids, request.organisation_ids)
+    await db.commit()
+
+    return {"created": len(db_distances)}
+
+
+@router.get("/storages/", response_model=list[StorageSchema])
+async def get_storages(db: AsyncSession = Depends(get_db)) -> Union[Sequence[Storage], FastJSONResponse]:
+    """
+    :param db: Сессия базы данных
+    :return: Список хранилищ
+
+    Возвращает все хранилища из базы данных. При `FAST_JSON` строки из БД сериализуются напрямую,
+    без ORM-объектов и валидации через `response_model`.
+    """
+
+    if FAST_JSON:
+        return FastJSONResponse(await crud_get_all_storage_rows(db))
+
+    return await crud_get_all_storages(db)
+
+
+@router.get("/storages/changes/", response_model=list[StorageChangeSchema])
+async def get_storage_changes(
+        since: int = Query(0, ge=0),
+        limit: int = Query(1000, ge=1, le=CHANGES_MAX_LIMIT),
+        db: AsyncSession = Depends(get_db),
+) -> Sequence[StorageChange]:
+    """
+    :param since: Последняя полученная версия, 0 - снимок всех хранилищ
+    :param limit: Максимальное количество изменений в ответе
+    :param db: Сессия базы данных
+    :return: Изменения хранилищ в порядке возрастания версии
+
+    Лента синхронизации копий хранилищ: для каждого хранилища, изменённого после версии `since`, возвращается
+    его текущая вместимость и версия; удалённые хранилища возвращаются с `capacity` = null. Если изменений
+    ровно `limit`, следующую страницу нужно запросить с `since` равным версии последнего изменения.
+    """
+
+    return await crud_get_storage_changes(db, since, limit)
+
+
+@router.get("/snapshot/")
+async def get_snapshot(db: AsyncSession = Depends(get_db)) -> Response:
+    """
+    :param db: Сессия базы данных
+    :return: Снимок хранилищ и расстояний в JSON, сжатом gzip
+
+    Используется сервисом organisation для начальной загрузки копий при старте с пустой БД. Ответ отдаётся
+    с `Content-Encoding: gzip`, HTTP-клиенты распаковывают его сами. Формат - см. `build_snapshot`.
+    """
+
+    return Response(encode_snapshot(await build_snapshot(db)),
+                    media_type="application/json",
+                    headers={"Content-Encoding": "gzip"},
+                    )
+
+
+def get_source_table(table: str) -> ReplicatedTable:
+    """
+    :param table: Имя таблицы в API сверки
+    :return: Таблица
+    :raises HTTPException: если таблица не сверяется
+    """
+
+    if table not in SOURCE_TABLES:
+        raise HTTPException(status_code=404, detail=f"Таблица {table} не сверяется")
+
+    return SOURCE_TABLES[table]
+
+
+@router.get("/replication/{table}/bounds/")
+async def get_replication_bounds(table: str, db: AsyncSession = Depends(get_db)) -> Dict[str, Optional[int]]:
+    """
+    :param table: Имя таблицы: storages или distances
+    :param db: Сессия базы данных
+    :return: Минимальный и максимальный ID таблицы
+
+    Начальный диапазон сверки копий в сервисе organisation (см. `storage_app.reconcile`).
+    """
+
+    min_id, max_id = await get_bounds(db, get_source_table(table))
+
+    return {"min": min_id, "max": max_id}
+
+
+@router.get("/replication/{table}/checksums/")
+async def get_replication_checksums(table: str,
+                                    start: int,
+                                    end: int,
+                                    parts: int = Query(16, ge=1, le=1024),
+                                    db: AsyncSession = Depends(get_db),
+                                    ) -> List[Dict[str, int]]:
+    """
+    :param table: Имя таблицы: storages или distances
+    :param start: Начало диапазона ID (включительно)
+    :param end: Конец диапазона ID (не включительно)
+    :param parts: Количество частей диапазона
+    :param db: Сессия базы данных
+    :return: Количество строк и сумма их хешей для каждой части диапазона
+    """
+
+    return await get_range_checksums(db, get_source_table(table), start, end, parts)
+
+
+@router.get("/replication/{table}/rows/")
+async def get_replication_rows(table: str,
+                               start: int,
+                               end: int,
+                               db: AsyncSession = Depends(get_db),
+                               ) -> List[Dict[str, Any]]:
+    """
+    :param table: Имя таблицы: storages или distances
+    :param start: Начало диапазона ID (включительно)
+    :param end: Конец диапазона ID (не включительно)
+    :param db: Сессия базы данных
+    :return: Строки диапазона для восстановления копий
+    """
+
+    return await get_range_rows(db, get_source_table(table), start, end)
+
+
+@router.get("/distances/", response_model=list[StorageDistanceSchema])
+async def get_storage_distances(
+        db: AsyncSession = Depends(get_db),
+) -> Union[Sequence[StorageDistance], FastJSONResponse]:
+    """
+    :param db: Сессия базы данных
+    :return: Список записей о расстояниях
+
+    Возвращает все записи о расстояниях из базы данных. При `FAST_JSON` строки из БД сериализуются напрямую,
+    без ORM-объектов и валидации через `response_model`.
+    """
+
+    if FAST_JSON:
+        return FastJSONResponse(await crud_get_all_storage_distance_rows(db))
+
+    return await crud_get_all_storage_distances(db)
+
+
+@router.delete("/storage/{storage_id}/")
+async def delete_storage(storage_id: int, db: AsyncSession = Depends(get_db)) -> JSONResponse:
+    """
+    :param storage_id: ID хранилища
+    :param db: сессия базы данных
+    :return: сообщение о том, что хранилище удалено
+    :raises HTTPException: если организация для удаления не найдены
+    """
+
+    storage = await crud_delete_storage(db, storage_id, commit=False)
+    if not storage:
+        raise HTTPException(status_code=404, detail="Не найдено хранилища для удаления")
+
+    send_storage_deleted_event(db, storage)
+    await db.commit()
+
+    return JSONResponse(content={"message": "Хранилище успешно удалено"}, status_code=200)
+
+
+@router.delete("/distance/{distance_id}/")
+async def delete_storage_distance(distance_id: int, db: AsyncSession = Depends(get_db)) -> JSONResponse:
+    """
+    :param distance_id: ID расстояния
+    :param db: сессия базы данных
+    :return: сообщение о том, что расстояние удалено
+    :raises HTTPException: если расстояние для удаления не найдены
+    """
+
+    distance = await crud_delete_distance(db, distance_id, commit=False)
+    if not distance:
+        raise HTTPException(status_code=404, detail="Не найдено расстояние между МНО и ОО для удаления")
+
+    send_distance_deleted_event(db, distance)
+    await db.commit()
+
+    return JSONResponse(content={"message": "Расстояние между ОО и МНО успешно удалено"}, status_code=200)
+
+
+@router.post("/storages/delete/")
+async def delete_storages(
+        request: StorageBulkDeleteSchema,
+        db: AsyncSession = Depends(get_db),
+) -> Dict[str, int]:
+    """
+    :param request: ID хранилищ и (или) местоположения, все хранилища в которых удаляются
+    :param db: Сессия базы данных
+    :return: Количество удалённых хранилищ
+
+    Удаляет хранилища set-based запросами в одной транзакции и отправляет одно пакетное событие `storage_delete`.
+    """
+
+    check_bulk_size(request.ids + request.locations)
+
+    storage_ids = await crud_delete_storages(db, request.ids, request.locations, commit=False)
+    if storage_ids:
+        send_storages_deleted_event(db, storage_ids)
+        await db.commit()
+
+    return {"deleted": len(storage_ids)}
+
+
+@router.post("/distances/delete/")
+async def delete_storage_distances(
+        request: StorageDistanceBulkDeleteSchema,
+        db: AsyncSession = Depends(get_db),
+) -> Dict[str, int]:
+    """
+    :param request: ID записей о расстоянии, хранилищ и (или) копий организаций
+    :param db: Сессия базы данных
+    :return: Количество удалённых записей о расстоянии
+
+    Удаляет записи о расстоянии set-based запросами в одной транзакции и отправляет одно пакетное событие
+    `distance_delete`.
+    """
+
+    check_bulk_size(request.ids + request.storage_ids + request.organisation_ids)
+
+    distance_ids = await crud_delete_distances(db, request.ids, request.storage_ids, request.organisation_ids,
+                                               commit=False)
+    if distance_ids:
+        send_distances_deleted_event(db, distance_ids)
+        await db.commit()
+
+    return {"deleted": len(distance_ids)}
@@ -1,38 +1,112 @@
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-
-from storage_app.models.organisation import OrganisationCopy
-from storage_app.schemas.organisation import OrganisationCopySchema
-
-
-async def create_organisation_copy(db: AsyncSession, organisation: OrganisationCopySchema) -> OrganisationCopy:
-    """
-    Создание копии записи об организации.
-
-    :param db: Сессия базы данных
-    :param organisation: данные для создания организации
-    :return: `OrganisationCopy`
-    """
-
-    db_org_copy = OrganisationCopy(id=organisation.id)
-    db.add(db_org_copy)
-    await db.commit()
-
-    return db_org_copy
-
-
-async def delete_organisation_by_id(db: AsyncSession, organisation_id: int) -> None:
-    """
-    Удаление организации по ID.
-
-    :param db: Сессия базы данных
-    :param organisation_id: Идентификатор организации
-    :return: None
-    """
-
-    result = await db.execute(select(OrganisationCopy).filter(OrganisationCopy.id == organisation_id))
-    organisation = result.scalars().first()
-
-    if organisation:
-        await db.delete(organisation)
-        await db.commit()
+from typing import Any, Dict, List
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from storage_app.crud import chunks
+from storage_app.models.organisation import OrganisationCopy
+from storage_app.models.storage_distance import StorageDistance
+from storage_app.schemas.organisation import OrganisationCopySchema
+
+
+async def create_organisation_copy(db: AsyncSession, organisation: OrganisationCopySchema) -> OrganisationCopy:
+    """
+    Создание копии записи об организации.
+
+    :param db: Сессия базы данных
+    :param organisation: данные для создания организации
+    :return: `OrganisationCopy`
+    """
+
+    db_org_copy = OrganisationCopy(id=organisation.id, latitude=organisation.latitude, longitude=organisation.longitude)
+    db.add(db_org_copy)
+    await db.commit()
+
+    return db_org_copy
+
+
+async def create_organisation_copies(db: AsyncSession,
+                                     organisations: List[OrganisationCopySchema],
+                                     commit: bool = True,
+                                     ) -> None:
+    """
+    Создание копий нескольких организаций одним запросом.
+
+    :param db: Сессия базы данных
+    :param organisations: данные для создания организаций
+    :param commit: Зафиксировать транзакцию. При False транзакцию фиксирует вызывающая сторона
+    :return: None
+
+    Копии, которые уже восстановлены сверкой (`replace_organisation_copies`), пропускаются.
+    """
+
+    existing_ids = set()
+    for ids_chunk in chunks([organisation.id for organisation in organisations]):
+        result = await db.execute(select(OrganisationCopy.id).where(OrganisationCopy.id.in_(ids_chunk)))
+        existing_ids.update(result.scalars().all())
+
+    organisations = [organisation for organisation in organisations if organisation.id not in existing_ids]
+    if organisations:
+        await db.execute(insert(OrganisationCopy), [organisation.model_dump() for organisation in organisations])
+    if commit:
+        await db.commit()
+
+
+async def replace_organisation_copies(db: AsyncSession,
+                                      start: int,
+                                      end: int,
+                                      organisations: List[Dict[str, Any]],
+                                      ) -> int:
+    """
+    Приведение копий организаций с ID из диапазона [start, end) к списку организаций сервиса organisation.
+
+    :param db: Сессия базы данных
+    :param start: Начало диапазона (включительно)
+    :param end: Конец диапазона (не включительно)
+    :param organisations: Организации диапазона в сервисе organisation: ID и координаты
+    :return: Количество созданных, изменённых и удалённых копий
+
+    Недостающие копии создаются, у существующих обновляются изменившиеся координаты, лишние копии удаляются
+    вместе с расстояниями. Транзакцию фиксирует вызывающая сторона.
+    """
+
+    result = await db.execute(
+        select(OrganisationCopy.id, OrganisationCopy.latitude, OrganisationCopy.longitude)
+        .where(OrganisationCopy.id >= start, OrganisationCopy.id < end)
+    )
+    local = {organisation_id: (latitude, longitude) for organisation_id, latitude, longitude in result.all()}
+    local_ids = set(local)
+    remote_ids = {organisation["id"] for organisation in organisations}
+
+    remote = [OrganisationCopySchema(**organisation).model_dump()
+              for organisation in sorted(organisations, key=lambda organisation: organisation["id"])]
+    missing = [organisation for organisation in remote if organisation["id"] not in local_ids]
+    moved = [organisation for organisation in remote if organisation["id"] in local_ids
+             and local[organisation["id"]] != (organisation["latitude"], organisation["longitude"])]
+    if missing:
+        await db.execute(insert(OrganisationCopy), missing)
+    if moved:
+        await db.execute(update(OrganisationCopy), moved)
+
+    extra_ids = sorted(local_ids - remote_ids)
+    for ids_chunk in chunks(extra_ids):
+        await db.execute(delete(StorageDistance).where(StorageDistance.organisation_id.in_(ids_chunk)))
+        await db.execute(delete(OrganisationCopy).where(OrganisationCopy.id.in_(ids_chunk)))
+
+    return len(missing) + len(moved) + len(extra_ids)
+
+
+async def delete_organisation_by_id(db: AsyncSession, organisation_id: int) -> None:
+    """
+    Удаление организации по ID.
+
+    :param db: Сессия базы данных
+    :param organisation_id: Идентификатор организации
+    :return: None
+
+    Копия только помечается удалённой (tombstone), расстояния до неё удаляются в фоне (`storage_app.tombstones`).
+    """
+
+    await db.execute(update(OrganisationCopy).where(OrganisationCopy.id == organisation_id).values(deleted=True))
+    await db.commit()
@@ -1,102 +1,236 @@
-from typing import Sequence
-from typing import Union
-
-from fastapi import HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from sqlalchemy.orm.attributes import flag_modified
-
-from storage_app.models.storage import Storage
-from storage_app.schemas.storage import StorageCreateSchema
-
-
-async def create_storage(db: AsyncSession, storage: StorageCreateSchema) -> Storage:
-    """
-    :param db: Сессия базы данных
-    :param storage: Данные для создания хранилища
-    :return: Созданное хранилище
-
-    Создает новое хранилище в базе данных и возвращает созданную запись.
-    """
-
-    # Проверяем, существует ли хранилище с таким именем
-    existing_storage = await db.execute(select(Storage).where(Storage.name == storage.name))
-    if existing_storage.scalars().first():
-        raise HTTPException(
-            status_code=400,
-            detail=f"Хранилище с именем {storage.name} уже существует",
-        )
-
-    # Проверяем, чтобы количество отходов не превышало вместимость
-    for waste_type, values in storage.capacity.items():
-        if values[0] > values[1]:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Переполнение для отхода {waste_type}: {values[0]} превышает вместимость {values[1]}"
-            )
-
-    db_storage = Storage(name=storage.name, location=storage.location, capacity=storage.capacity)
-    db.add(db_storage)
-    await db.commit()
-    await db.refresh(db_storage)
-
-    return db_storage
-
-
-async def get_all_storages(db: AsyncSession) -> Sequence[Storage]:
-    """
-    :param db: Сессия базы данных
-    :return: Список хранилищ
-
-    Возвращает список всех хранилищ в базе данных.
-    """
-
-    result = await db.execute(select(Storage))
-
-    return result.scalars().all()
-
-
-async def delete_storage(db: AsyncSession, storage_id: int) -> Union[Storage, None]:
-    """
-    :param db: асинхронная сессия базы данных
-    :param storage_id: Идентификатор хранилища
-    :return: объект удаленного хранилища
-    """
-
-    result = await db.execute(select(Storage).filter_by(id=storage_id))
-    storage = result.scalars().first()
-
-    if not storage:
-        return None
-
-    await db.delete(storage)
-    await db.commit()
-
-    return storage
-
-
-async def update_storage_capacity(db: AsyncSession, storage_id: int, waste_data: dict) -> Union[Storage, None]:
-    """
-    :param db: Асинхронная сессия базы данных
-    :param storage_id: Идентификатор хранилища
-    :param waste_data: Словарь отходов, которые помещены в данное хранилище утилизировать - {"Пластик": 10, "Биоотходы": 50}
-    :return: Обновленное хранилище
-    """
-
-    result = await db.execute(select(Storage).filter_by(id=storage_id))
-    storage = result.scalars().first()
-
-    if storage:
-        # Обновляем capacity для каждого типа отходов
-        for waste_type, amount in waste_data.items():
-            # Обновляем текущий объем отходов
-            storage.capacity[waste_type][0] += amount
-
-        flag_modified(storage, 'capacity')
-
-        db.add(storage)
-        await db.commit()
-
-        return storage
-    else:
-        return None
+from collections import Counter
+from typing import Any, Dict, List, Sequence
+from typing import Union
+
+from fastapi import HTTPException
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm.attributes import flag_modified
+
+from storage_app.crud import chunks
+from storage_app.crud.storage_change import record_storage_changes
+from storage_app.models.storage import Storage
+from storage_app.schemas.storage import StorageCreateSchema
+
+
+def validate_capacity(capacity: Dict[str, list]) -> None:
+    """
+    :param capacity: Вместимость хранилища
+    :return: None
+    :raises HTTPException: если количество отходов превышает вместимость
+
+    Проверяет, чтобы количество отходов не превышало вместимость.
+    """
+
+    for waste_type, values in capacity.items():
+        if values[0] > values[1]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Переполнение для отхода {waste_type}: {values[0]} превышает вместимость {values[1]}"
+            )
+
+
+async def create_storage(db: AsyncSession, storage: StorageCreateSchema, commit: bool = True) -> Storage:
+    """
+    :param db: Сессия базы данных
+    :param storage: Данные для создания хранилища
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: Созданное хранилище
+
+    Создает новое хранилище в базе данных и возвращает созданную запись.
+    """
+
+    # Проверяем, существует ли хранилище с таким именем
+    existing_storage = await db.execute(select(Storage).where(Storage.name == storage.name))
+    if existing_storage.scalars().first():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Хранилище с именем {storage.name} уже существует",
+        )
+
+    validate_capacity(storage.capacity)
+
+    db_storage = Storage(name=storage.name, location=storage.location, capacity=storage.capacity,
+                         latitude=storage.latitude, longitude=storage.longitude)
+    db.add(db_storage)
+    await db.flush()
+    await record_storage_changes(db, [db_storage])
+    if commit:
+        await db.commit()
+        await db.refresh(db_storage)
+    else:
+        await db.flush()
+
+    return db_storage
+
+
+async def create_storages(db: AsyncSession, storages: List[StorageCreateSchema], commit: bool = True) -> List[Storage]:
+    """
+    :param db: Сессия базы данных
+    :param storages: Данные для создания хранилищ
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: Созданные хранилища в порядке входных данных
+
+    Создает хранилища одним запросом. Проверки выполняются для всей пачки сразу: если хотя бы одно хранилище
+    не проходит проверку, не создается ни одно.
+    """
+
+    if not storages:
+        return []
+
+    names = [storage.name for storage in storages]
+    duplicates = sorted(name for name, count in Counter(names).items() if count > 1)
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Имена хранилищ повторяются: {', '.join(duplicates)}")
+
+    for storage in storages:
+        validate_capacity(storage.capacity)
+
+    existing = []
+    for names_chunk in chunks(names):
+        result = await db.execute(select(Storage.name).where(Storage.name.in_(names_chunk)))
+        existing.extend(result.scalars().all())
+    if existing:
+        raise HTTPException(status_code=400, detail=f"Хранилища с именами {', '.join(sorted(existing))} уже существуют")
+
+    result = await db.scalars(
+        insert(Storage).returning(Storage, sort_by_parameter_order=True),
+        [storage.model_dump() for storage in storages],
+    )
+    db_storages = list(result.all())
+    await record_storage_changes(db, db_storages)
+
+    if commit:
+        await db.commit()
+    else:
+        await db.flush()
+
+    return db_storages
+
+
+async def get_all_storages(db: AsyncSession) -> Sequence[Storage]:
+    """
+    :param db: Сессия базы данных
+    :return: Список хранилищ
+
+    Возвращает список всех хранилищ в базе данных.
+    """
+
+    result = await db.execute(select(Storage).where(Storage.deleted.is_(False)))
+
+    return result.scalars().all()
+
+
+async def get_all_storage_rows(db: AsyncSession) -> List[Dict[str, Any]]:
+    """
+    :param db: Сессия базы данных
+    :return: Список хранилищ в формате `StorageSchema`
+
+    Возвращает все хранилища в виде словарей, без создания ORM-объектов.
+    """
+
+    result = await db.execute(select(Storage.name, Storage.location, Storage.capacity, Storage.latitude,
+                                     Storage.longitude, Storage.id).where(Storage.deleted.is_(False)))
+
+    return [dict(row) for row in result.mappings()]
+
+
+async def delete_storage(db: AsyncSession, storage_id: int, commit: bool = True) -> Union[Storage, None]:
+    """
+    :param db: асинхронная сессия базы данных
+    :param storage_id: Идентификатор хранилища
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: объект удаленного хранилища
+
+    Хранилище только помечается удалённым (tombstone) и освобождает имя. Расстояния до него не загружаются
+    в память: их пачками удаляет фоновый процесс (`storage_app.tombstones`), а затем и само хранилище.
+    """
+
+    result = await db.execute(select(Storage).filter_by(id=storage_id, deleted=False))
+    storage = result.scalars().first()
+
+    if not storage:
+        return None
+
+    storage.deleted = True
+    storage.name = None
+    await record_storage_changes(db, [storage], deleted=True)
+    if commit:
+        await db.commit()
+    else:
+        await db.flush()
+
+    return storage
+
+
+async def delete_storages(db: AsyncSession,
+                          storage_ids: Sequence[int] = (),
+                          locations: Sequence[str] = (),
+                          commit: bool = True,
+                          ) -> List[int]:
+    """
+    Массовое удаление хранилищ по ID и (или) местоположению.
+
+    :param db: асинхронная сессия базы данных
+    :param storage_ids: Идентификаторы хранилищ
+    :param locations: Местоположения, все хранилища в которых удаляются
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: ID удалённых хранилищ по возрастанию
+
+    Хранилища выбираются и помечаются удалёнными set-based запросами по частям `IN (...)`, без загрузки объектов
+    в память. Как и в `delete_storage`, расстояния до них удаляет фоновый процесс (`storage_app.tombstones`).
+    """
+
+    rows = {}
+    for field, field_values in ((Storage.id, storage_ids), (Storage.location, locations)):
+        for values_chunk in chunks(list(field_values)):
+            result = await db.execute(select(Storage.id, Storage.latitude, Storage.longitude)
+                                      .where(field.in_(values_chunk), Storage.deleted.is_(False)))
+            rows.update((row.id, row) for row in result.all())
+
+    deleted_ids = sorted(rows)
+    for ids_chunk in chunks(deleted_ids):
+        await db.execute(update(Storage).where(Storage.id.in_(ids_chunk)).values(deleted=True, name=None))
+    await record_storage_changes(db, [rows[storage_id] for storage_id in deleted_ids], deleted=True)
+
+    if commit:
+        await db.commit()
+    else:
+        await db.flush()
+
+    return deleted_ids
+
+
+async def update_storage_capacity(db: AsyncSession, storage_id: int, waste_data: dict) -> Union[Storage, None]:
+    """
+    :param db: Асинхронная сессия базы данных
+    :param storage_id: Идентификатор хранилища
+    :param waste_data: Словарь отходов, которые помещены в данное хранилище утилизировать - {"Пластик": 10, "Биоотходы": 50}
+    :return: Обновленное хранилище
+    """
+
+    result = await db.execute(select(Storage).filter_by(id=storage_id, deleted=False))
+    storage = result.scalars().first()
+
+    if storage:
+        # Обновляем capacity для каждого типа отходов
+        for waste_type, amount in waste_data.items():
+            # Обновляем текущий объем отходов
+            storage.capacity[waste_type][0] += amount
+
+        flag_modified(storage, 'capacity')
+        # Сервис Организация сравнивает счётчик со своим, чтобы не затереть копию до применения его изменений
+        storage.capacity_updates += 1
+
+        db.add(storage)
+        await record_storage_changes(db, [storage])
+        await db.commit()
+
+        return storage
+    else:
+        return None
@@ -0,0 +1,86 @@
+from typing import Sequence
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.crud import chunks
+from storage_app.models.storage import Storage
+from storage_app.models.storage_change import StorageChange
+
+
+async def record_storage_changes(db: AsyncSession, storages: Sequence[Storage], deleted: bool = False) -> None:
+    """
+    Запись изменений хранилищ в ленту синхронизации.
+
+    :param db: Асинхронная сессия базы данных, в транзакции которой изменены хранилища
+    :param storages: Изменённые (уже отправленные в БД) хранилища
+    :param deleted: Хранилища удалены: в ленту записывается capacity = None
+    :return: None
+
+    Каждое изменение получает новую версию, предыдущие изменения тех же хранилищ удаляются. Версия
+    записывается и в `Storage.version`. Транзакцию фиксирует вызывающая сторона.
+    """
+
+    if not storages:
+        return
+
+    storage_ids = [storage.id for storage in storages]
+    for ids_chunk in chunks(storage_ids):
+        await db.execute(delete(StorageChange).where(StorageChange.storage_id.in_(ids_chunk)))
+
+    result = await db.execute(
+        insert(StorageChange).returning(StorageChange.version, sort_by_parameter_order=True),
+        [{"storage_id": storage.id, "capacity": None if deleted else storage.capacity,
+          "latitude": storage.latitude, "longitude": storage.longitude,
+          "capacity_updates": 0 if deleted else storage.capacity_updates or 0}
+         for storage in storages],
+    )
+
+    if not deleted:
+        for storage, version in zip(storages, result.scalars()):
+            storage.version = version
+
+
+async def get_storage_changes(db: AsyncSession, since: int, limit: int) -> Sequence[StorageChange]:
+    """
+    Возвращает изменения хранилищ после указанной версии.
+
+    :param db: Асинхронная сессия базы данных
+    :param since: Последняя полученная версия, 0 - все хранилища с начала
+    :param limit: Максимальное количество изменений
+    :return: Изменения в порядке возрастания версии
+    """
+
+    result = await db.execute(
+        select(StorageChange).where(StorageChange.version > since).order_by(StorageChange.version).limit(limit)
+    )
+
+    return result.scalars().all()
+
+
+async def backfill_storage_changes(db: AsyncSession) -> None:
+    """
+    Запись в ленту синхронизации хранилищ, созданных до её появления.
+
+    :param db: Асинхронная сессия базы данных
+    :return: None
+    """
+
+    known_ids = select(StorageChange.storage_id)
+    await db.execute(
+        insert(StorageChange).from_select(
+            ["storage_id", "capacity", "latitude", "longitude", "capacity_updates"],
+            select(Storage.id, Storage.capacity, Storage.latitude, Storage.longitude, Storage.capacity_updates)
+            .where(Storage.id.not_in(known_ids))
+            .order_by(Storage.id),
+        )
+    )
+    await db.execute(
+        update(Storage)
+        .where(Storage.version == 0)
+        .values(version=select(StorageChange.version)
+                .where(StorageChange.storage_id == Storage.id)
+                .scalar_subquery())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
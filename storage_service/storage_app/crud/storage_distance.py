@@ -1,90 +1,350 @@
-from typing import Sequence, Union
-
-from fastapi import HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-
-from storage_app.models.organisation import OrganisationCopy
-from storage_app.models.storage import Storage
-from storage_app.models.storage_distance import StorageDistance
-from storage_app.schemas.storage_distance import StorageDistanceBaseSchema
-
-
-async def create_storage_distance(db: AsyncSession, distance: StorageDistanceBaseSchema) -> StorageDistance:
-    """
-    :param db: Сессия базы данных
-    :param distance: Данные для создания записи о расстоянии
-    :return: Созданная запись о расстоянии
-
-    Создает запись о расстоянии и возвращает её.
-    """
-
-    existing_distance = await db.execute(
-        select(StorageDistance).where(
-            StorageDistance.storage_id == distance.storage_id,
-            StorageDistance.organisation_id == distance.organisation_id,
-            StorageDistance.distance == distance.distance
-        )
-    )
-    if existing_distance.scalar():
-        raise HTTPException(
-            status_code=400,
-            detail="Такая запись уже существует"
-        )
-
-    # Проверка существования storage_id
-    storage_exists = await db.execute(select(Storage.id).where(Storage.id == distance.storage_id))
-    if not storage_exists.scalar():
-        raise HTTPException(status_code=400, detail="Указанного хранилища не существует")
-
-    # Проверка существования organisation_id
-    organisation_exists = await db.execute(
-        select(OrganisationCopy.id).where(OrganisationCopy.id == distance.organisation_id))
-    if not organisation_exists.scalar():
-        raise HTTPException(status_code=400, detail="Указанной организации не существует")
-
-    db_distance = StorageDistance(
-        storage_id=distance.storage_id,
-        organisation_id=distance.organisation_id,
-        distance=distance.distance
-    )
-
-    db.add(db_distance)
-    await db.commit()
-    await db.refresh(db_distance)
-
-    return db_distance
-
-
-async def delete_distance(db: AsyncSession, distance_id: int) -> Union[StorageDistance, None]:
-    """
-    Удаление `StorageDistance`.
-
-    :param db: асинхронная сессия базы данных
-    :param distance_id: Идентификатор расстояния
-    :return: обхект удаленного расстояния между ОО и МНО
-    """
-
-    result = await db.execute(select(StorageDistance).filter_by(id=distance_id))
-    distance = result.scalars().first()
-
-    if not distance:
-        return None
-
-    await db.delete(distance)
-    await db.commit()
-
-    return distance
-
-
-async def get_all_storage_distances(db: AsyncSession) -> Sequence[StorageDistance]:
-    """
-    :param db: Сессия базы данных
-    :return: Список записей о расстояниях
-
-    Получение всех записей о расстояниях между хранилищами и организациями. Возвращает список всех записей о расстояниях.
-    """
-
-    result = await db.execute(select(StorageDistance))
-
-    return result.scalars().all()
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, Select, column, delete, insert, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from storage_app.crud import chunks
+from storage_app.geo import DISTANCE_MATRIX_MAX_KM, Locations
+from storage_app.models.organisation import OrganisationCopy
+from storage_app.models.storage import Storage
+from storage_app.models.storage_distance import StorageDistance
+from storage_app.schemas.storage_distance import StorageDistanceBaseSchema
+
+
+def live_distances(query: Select) -> Select:
+    """
+    :param query: Запрос к расстояниям
+    :return: Запрос без расстояний до удалённых хранилищ и организаций, которые ещё не удалены в фоне
+    """
+
+    return (query
+            .join(Storage, Storage.id == StorageDistance.storage_id)
+            .join(OrganisationCopy, OrganisationCopy.id == StorageDistance.organisation_id)
+            .where(Storage.deleted.is_(False), OrganisationCopy.deleted.is_(False)))
+
+
+async def _check_storage_distances(db: AsyncSession,
+                                   keys: Sequence[Tuple[int, int, int]],
+                                   ) -> Tuple[Set[int], Set[int], bool]:
+    """
+    Проверка записей о расстоянии перед созданием.
+
+    :param db: Сессия базы данных
+    :param keys: Тройки (ID хранилища, ID организации, расстояние)
+    :return: ID несуществующих хранилищ, ID несуществующих организаций и признак того, что хотя бы одна
+    запись уже есть в БД
+
+    Входные данные передаются в БД как таблица `VALUES` и соединяются с хранилищами, копиями организаций и
+    расстояниями, так что все три проверки выполняются одним запросом на каждые `IN_CHUNK_SIZE` записей.
+    """
+
+    missing_storages, missing_organisations, existing = set(), set(), False
+
+    for keys_chunk in chunks(keys):
+        payload = values(
+            column("storage_id", Integer),
+            column("organisation_id", Integer),
+            column("distance", Integer),
+            name="payload",
+        ).data(list(keys_chunk)).cte("payload")
+
+        result = await db.execute(
+            select(
+                payload.c.storage_id,
+                payload.c.organisation_id,
+                Storage.id.is_(None),
+                OrganisationCopy.id.is_(None),
+                StorageDistance.id.is_not(None),
+            )
+            .select_from(payload)
+            .outerjoin(Storage, (Storage.id == payload.c.storage_id) & Storage.deleted.is_(False))
+            .outerjoin(OrganisationCopy, (OrganisationCopy.id == payload.c.organisation_id)
+                       & OrganisationCopy.deleted.is_(False))
+            .outerjoin(StorageDistance, (StorageDistance.storage_id == payload.c.storage_id)
+                       & (StorageDistance.organisation_id == payload.c.organisation_id)
+                       & (StorageDistance.distance == payload.c.distance))
+            .where(Storage.id.is_(None) | OrganisationCopy.id.is_(None) | StorageDistance.id.is_not(None))
+        )
+
+        for storage_id, organisation_id, no_storage, no_organisation, exists in result:
+            if no_storage:
+                missing_storages.add(storage_id)
+            if no_organisation:
+                missing_organisations.add(organisation_id)
+            existing = existing or bool(exists)
+
+    return missing_storages, missing_organisations, existing
+
+
+async def create_storage_distance(db: AsyncSession,
+                                  distance: StorageDistanceBaseSchema,
+                                  commit: bool = True,
+                                  ) -> StorageDistance:
+    """
+    :param db: Сессия базы данных
+    :param distance: Данные для создания записи о расстоянии
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: Созданная запись о расстоянии
+
+    Создает запись о расстоянии и возвращает её.
+    """
+
+    missing_storages, missing_organisations, existing = await _check_storage_distances(
+        db, [(distance.storage_id, distance.organisation_id, distance.distance)]
+    )
+    if existing:
+        raise HTTPException(
+            status_code=400,
+            detail="Такая запись уже существует"
+        )
+    if missing_storages:
+        raise HTTPException(status_code=400, detail="Указанного хранилища не существует")
+    if missing_organisations:
+        raise HTTPException(status_code=400, detail="Указанной организации не существует")
+
+    db_distance = StorageDistance(
+        storage_id=distance.storage_id,
+        organisation_id=distance.organisation_id,
+        distance=distance.distance
+    )
+
+    db.add(db_distance)
+    if commit:
+        await db.commit()
+        await db.refresh(db_distance)
+    else:
+        await db.flush()
+
+    return db_distance
+
+
+async def create_storage_distances(db: AsyncSession,
+                                   distances: List[StorageDistanceBaseSchema],
+                                   commit: bool = True,
+                                   ) -> List[StorageDistance]:
+    """
+    :param db: Сессия базы данных
+    :param distances: Данные для создания записей о расстоянии
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: Созданные записи в порядке входных данных
+
+    Создает записи о расстоянии одним запросом. Проверки выполняются для всей пачки сразу: если хотя бы одна
+    запись не проходит проверку, не создается ни одна.
+    """
+
+    if not distances:
+        return []
+
+    keys = [(distance.storage_id, distance.organisation_id, distance.distance) for distance in distances]
+    if len(set(keys)) != len(keys):
+        raise HTTPException(status_code=400, detail="Записи о расстоянии повторяются")
+
+    missing_storages, missing_organisations, existing = await _check_storage_distances(db, keys)
+    if missing_storages:
+        ids = ", ".join(str(storage_id) for storage_id in sorted(missing_storages))
+        raise HTTPException(status_code=400, detail=f"Указанных хранилищ не существует: {ids}")
+    if missing_organisations:
+        ids = ", ".join(str(org_id) for org_id in sorted(missing_organisations))
+        raise HTTPException(status_code=400, detail=f"Указанных организаций не существует: {ids}")
+    if existing:
+        raise HTTPException(status_code=400, detail="Такая запись уже существует")
+
+    result = await db.scalars(
+        insert(StorageDistance).returning(StorageDistance, sort_by_parameter_order=True),
+        [distance.model_dump() for distance in distances],
+    )
+    db_distances = list(result.all())
+
+    if commit:
+        await db.commit()
+    else:
+        await db.flush()
+
+    return db_distances
+
+
+async def _get_locations(db: AsyncSession, model: type, ids: Optional[Sequence[int]] = None) -> Locations:
+    """
+    :param db: Сессия базы данных
+    :param model: `Storage` или `OrganisationCopy`
+    :param ids: ID записей, по умолчанию - все записи
+    :return: Записи с заданными координатами
+    """
+
+    query = (select(model.id, model.latitude, model.longitude)
+             .where(model.latitude.is_not(None), model.longitude.is_not(None), model.deleted.is_(False))
+             .order_by(model.id))
+    if ids is None:
+        return Locations((await db.execute(query)).all())
+
+    rows = []
+    for ids_chunk in chunks(sorted(set(ids))):
+        rows.extend((await db.execute(query.where(model.id.in_(ids_chunk)))).all())
+
+    return Locations(rows)
+
+
+async def compute_storage_distances(db: AsyncSession,
+                                    storage_ids: Sequence[int] = (),
+                                    organisation_ids: Sequence[int] = (),
+                                    max_distance: Optional[float] = None,
+                                    ) -> List[StorageDistance]:
+    """
+    Вычисление расстояний по координатам: от хранилищ `storage_ids` до всех организаций и от организаций
+    `organisation_ids` до всех хранилищ.
+
+    :param db: Сессия базы данных
+    :param storage_ids: ID хранилищ
+    :param organisation_ids: ID копий организаций
+    :param max_distance: Максимальное расстояние, км (0 - без ограничения), по умолчанию `DISTANCE_MATRIX_MAX_KM`.
+    Более дальние пары не сохраняются
+    :return: Созданные записи о расстоянии
+
+    Расстояния по большому кругу от каждой точки до всех точек другой стороны считаются одним векторным
+    вычислением (см. `storage_app.geo.Locations`), все записи создаются одним запросом. Записи без координат
+    и пары, для которых расстояние уже задано, пропускаются. Транзакцию фиксирует вызывающая сторона.
+    """
+
+    distances: Dict[Tuple[int, int], int] = {}
+
+    if storage_ids:
+        storages = await _get_locations(db, Storage, storage_ids)
+        organisations = await _get_locations(db, OrganisationCopy) if len(storages) else Locations([])
+        for storage_id, latitude, longitude in storages.rows:
+            for organisation_id, distance in zip(organisations.ids, organisations.distances_km(latitude, longitude)):
+                distances[storage_id, organisation_id] = distance
+
+    if organisation_ids:
+        organisations = await _get_locations(db, OrganisationCopy, organisation_ids)
+        storages = await _get_locations(db, Storage) if len(organisations) else Locations([])
+        for organisation_id, latitude, longitude in organisations.rows:
+            for storage_id, distance in zip(storages.ids, storages.distances_km(latitude, longitude)):
+                distances[storage_id, organisation_id] = distance
+
+    if max_distance is None:
+        max_distance = DISTANCE_MATRIX_MAX_KM
+    if max_distance > 0:
+        distances = {pair: distance for pair, distance in distances.items() if distance <= max_distance}
+    if not distances:
+        return []
+
+    for ids_chunk in chunks(sorted(set(storage_ids))):
+        result = await db.execute(select(StorageDistance.storage_id, StorageDistance.organisation_id)
+                                  .where(StorageDistance.storage_id.in_(ids_chunk)))
+        for pair in result.all():
+            distances.pop(tuple(pair), None)
+    for ids_chunk in chunks(sorted(set(organisation_ids))):
+        result = await db.execute(select(StorageDistance.storage_id, StorageDistance.organisation_id)
+                                  .where(StorageDistance.organisation_id.in_(ids_chunk)))
+        for pair in result.all():
+            distances.pop(tuple(pair), None)
+    if not distances:
+        return []
+
+    result = await db.scalars(
+        insert(StorageDistance).returning(StorageDistance, sort_by_parameter_order=True),
+        [{"storage_id": storage_id, "organisation_id": organisation_id, "distance": distance}
+         for (storage_id, organisation_id), distance in sorted(distances.items())],
+    )
+    db_distances = list(result.all())
+    await db.flush()
+
+    return db_distances
+
+
+async def delete_distance(db: AsyncSession, distance_id: int, commit: bool = True) -> Union[StorageDistance, None]:
+    """
+    Удаление `StorageDistance`.
+
+    :param db: асинхронная сессия базы данных
+    :param distance_id: Идентификатор расстояния
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: обхект удаленного расстояния между ОО и МНО
+    """
+
+    result = await db.execute(select(StorageDistance).filter_by(id=distance_id))
+    distance = result.scalars().first()
+
+    if not distance:
+        return None
+
+    await db.delete(distance)
+    if commit:
+        await db.commit()
+    else:
+        await db.flush()
+
+    return distance
+
+
+async def delete_distances(db: AsyncSession,
+                           distance_ids: Sequence[int] = (),
+                           storage_ids: Sequence[int] = (),
+                           organisation_ids: Sequence[int] = (),
+                           commit: bool = True,
+                           ) -> List[int]:
+    """
+    Массовое удаление `StorageDistance` по ID записей, хранилищ и (или) организаций.
+
+    :param db: асинхронная сессия базы данных
+    :param distance_ids: Идентификаторы записей о расстоянии
+    :param storage_ids: Идентификаторы хранилищ, все расстояния от которых удаляются
+    :param organisation_ids: Идентификаторы копий организаций, все расстояния до которых удаляются
+    :param commit: Зафиксировать транзакцию. При False изменения только отправляются в БД (flush),
+    транзакцию фиксирует вызывающая сторона
+    :return: ID удалённых записей по возрастанию
+
+    Записи удаляются set-based запросами `DELETE ... WHERE id IN (...)` по частям, без загрузки объектов в память.
+    """
+
+    deleted_ids = set()
+    for field, field_values in ((StorageDistance.id, distance_ids),
+                                (StorageDistance.storage_id, storage_ids),
+                                (StorageDistance.organisation_id, organisation_ids)):
+        for values_chunk in chunks(list(field_values)):
+            result = await db.execute(select(StorageDistance.id).where(field.in_(values_chunk)))
+            deleted_ids.update(result.scalars())
+
+    deleted_ids = sorted(deleted_ids)
+    for ids_chunk in chunks(deleted_ids):
+        await db.execute(delete(StorageDistance).where(StorageDistance.id.in_(ids_chunk)))
+
+    if commit:
+        await db.commit()
+    else:
+        await db.flush()
+
+    return deleted_ids
+
+
+async def get_all_storage_distances(db: AsyncSession) -> Sequence[StorageDistance]:
+    """
+    :param db: Сессия базы данных
+    :return: Список записей о расстояниях
+
+    Получение всех записей о расстояниях между хранилищами и организациями. Возвращает список всех записей о расстояниях.
+    """
+
+    result = await db.execute(live_distances(select(StorageDistance)))
+
+    return result.scalars().all()
+
+
+async def get_all_storage_distance_rows(db: AsyncSession) -> List[Dict[str, Any]]:
+    """
+    :param db: Сессия базы данных
+    :return: Список записей о расстояниях в формате `StorageDistanceSchema`
+
+    Возвращает все записи о расстояниях в виде словарей, без создания ORM-объектов.
+    """
+
+    result = await db.execute(live_distances(
+        select(StorageDistance.storage_id, StorageDistance.organisation_id, StorageDistance.distance, StorageDistance.id)
+    ))
+
+    return [dict(row) for row in result.mappings()]
@@ -1,60 +1,152 @@
-import os
-
-from sqlalchemy import event
-from sqlalchemy.dialects.sqlite.aiosqlite import AsyncAdapt_aiosqlite_connection
-from sqlalchemy.engine import Engine
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool.base import _ConnectionRecord
-
-from storage_app.models import Base
-
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL",
-                                    "sqlite+aiosqlite:///../storage_service.db"
-                                    )
-
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=True)
-
-# Сессия для работы с базой данных
-AsyncSessionLocal = sessionmaker(
-    bind=engine, class_=AsyncSession, expire_on_commit=False
-)
-
-
-async def init_db() -> None:
-    """
-    :return: None
-
-    Используется для создания всех таблиц, определённых в модели базы данных, при старте приложения.
-    """
-
-    async with engine.begin() as conn:
-        # Создание всех таблиц в базе данных
-        await conn.run_sync(Base.metadata.create_all)
-
-
-async def get_db() -> AsyncSession:
-    """
-    :return: AsyncSession
-
-    Открывает сессию базы данных и предоставляет её для дальнейших операций.
-    """
-
-    async with AsyncSessionLocal() as session:
-        yield session
-
-
-@event.listens_for(Engine, "connect")
-def set_sqlite_pragma(dbapi_connection: AsyncAdapt_aiosqlite_connection, connection_record: _ConnectionRecord) -> None:
-    """
-    :param dbapi_connection: подключение к базе данных
-    :param connection_record: запись подключения
-    :return: None
-
-    Включает поддержку внешних ключей в базе данных SQLite.
-    """
-
-    if isinstance(dbapi_connection, AsyncAdapt_aiosqlite_connection):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
+import os
+from typing import List, Tuple
+
+from sqlalchemy import Column, event, inspect, text
+from sqlalchemy.dialects.sqlite.aiosqlite import AsyncAdapt_aiosqlite_connection
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool.base import _ConnectionRecord
+from sqlalchemy.schema import CreateColumn
+
+from storage_app.metrics import setup_query_metrics
+from storage_app.models import Base
+from storage_app.query_log import SQL_ECHO, setup_query_logging
+from storage_app.tracing import setup_query_tracing
+
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL",
+                                    "sqlite+aiosqlite:///../storage_service.db"
+                                    )
+
+# Подготовка схемы при старте: create - создать недостающие таблицы и столбцы, check - только проверить,
+# что они есть
+DB_INIT_MODE = os.getenv("DB_INIT_MODE", "create")
+
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=SQL_ECHO)
+setup_query_logging(engine.sync_engine)
+setup_query_metrics(engine.sync_engine)
+setup_query_tracing(engine.sync_engine)
+
+# Сессия для работы с базой данных
+AsyncSessionLocal = sessionmaker(
+    bind=engine, class_=AsyncSession, expire_on_commit=False
+)
+
+
+def _missing_schema(sync_conn: Connection) -> Tuple[List[str], List[Column]]:
+    """
+    Сравнение схемы базы данных с моделью.
+
+    :param sync_conn: Подключение к базе данных
+    :return: Имена недостающих таблиц и недостающие столбцы существующих таблиц
+    """
+
+    inspector = inspect(sync_conn)
+    existing = set(inspector.get_table_names())
+    missing_tables = sorted(set(Base.metadata.tables) - existing)
+
+    missing_columns = []
+    for name in sorted(set(Base.metadata.tables) & existing):
+        columns = {column["name"] for column in inspector.get_columns(name)}
+        missing_columns += [column for column in Base.metadata.tables[name].columns if column.name not in columns]
+
+    return missing_tables, missing_columns
+
+
+def _add_columns(sync_conn: Connection, columns: List[Column]) -> None:
+    """
+    Добавление недостающих столбцов в существующие таблицы (`ALTER TABLE ... ADD COLUMN`) и индексов по ним.
+
+    :param sync_conn: Подключение к базе данных
+    :param columns: Недостающие столбцы
+    :return: None
+    :raises RuntimeError: если обязательный столбец не имеет значения по умолчанию на стороне базы данных
+    """
+
+    preparer = sync_conn.dialect.identifier_preparer
+    for column in columns:
+        if not column.nullable and column.server_default is None:
+            raise RuntimeError(f"Cannot add column {column.table.name}.{column.name} without a server default, "
+                               f"migrate the database schema manually")
+
+        ddl = CreateColumn(column).compile(dialect=sync_conn.dialect)
+        sync_conn.execute(text(f"ALTER TABLE {preparer.format_table(column.table)} ADD COLUMN {ddl}"))
+        for index in column.table.indexes:
+            if column.name in index.columns:
+                index.create(sync_conn, checkfirst=True)
+
+
+async def init_db(mode: str = DB_INIT_MODE) -> None:
+    """
+    :param mode: Режим `DB_INIT_MODE`: create или check
+    :return: None
+    :raises RuntimeError: если в режиме check в базе данных нет каких-то таблиц или столбцов модели
+
+    Проверяет при старте приложения, что все таблицы и столбцы, определённые в модели базы данных, существуют.
+    Таблицы и их столбцы читаются из каталога базы данных, DDL выполняется, только если чего-то не хватает,
+    поэтому обычный перезапуск реплики не проверяет каждый индекс по отдельности.
+    В режиме create недостающие таблицы создаются (`create_all`), а недостающие столбцы существующих таблиц
+    добавляются `ALTER TABLE ... ADD COLUMN` - так обновляется база данных предыдущей версии сервиса.
+    В режиме check схема не меняется, а старт завершается ошибкой со списком недостающих таблиц
+    и столбцов `таблица.столбец`: схему готовит отдельный шаг развёртывания.
+    """
+
+    if mode not in ("create", "check"):
+        raise ValueError(f"Unknown DB_INIT_MODE: {mode}")
+
+    async with engine.begin() as conn:
+        missing_tables, missing_columns = await conn.run_sync(_missing_schema)
+        if not missing_tables and not missing_columns:
+            return
+
+        if mode == "check":
+            missing = []
+            if missing_tables:
+                missing.append(f"missing tables: {', '.join(missing_tables)}")
+            if missing_columns:
+                names = (f"{column.table.name}.{column.name}" for column in missing_columns)
+                missing.append(f"missing columns: {', '.join(names)}")
+            raise RuntimeError(f"Database schema is not up to date, {'; '.join(missing)}")
+
+        # Создание недостающих таблиц в базе данных
+        if missing_tables:
+            await conn.run_sync(Base.metadata.create_all)
+        if missing_columns:
+            await conn.run_sync(_add_columns, missing_columns)
+
+
+async def close_db() -> None:
+    """
+    :return: None
+
+    Закрывает подключения пула при остановке приложения, после завершения фоновых потоков.
+    """
+
+    await engine.dispose()
+
+
+async def get_db() -> AsyncSession:
+    """
+    :return: AsyncSession
+
+    Открывает сессию базы данных и предоставляет её для дальнейших операций.
+    """
+
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragma(dbapi_connection: AsyncAdapt_aiosqlite_connection, connection_record: _ConnectionRecord) -> None:
+    """
+    :param dbapi_connection: подключение к базе данных
+    :param connection_record: запись подключения
+    :return: None
+
+    Включает поддержку внешних ключей в базе данных SQLite.
+    """
+
+    if isinstance(dbapi_connection, AsyncAdapt_aiosqlite_connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
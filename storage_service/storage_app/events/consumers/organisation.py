@@ -1,82 +1,93 @@
-import asyncio
-import json
-
-import pika
-from pika.channel import Channel
-from pika.spec import Basic, BasicProperties
-
-from storage_app.crud.organisation import create_organisation_copy, delete_organisation_by_id
-from storage_app.database import AsyncSessionLocal
-from storage_app.events import RABBITMQ_HOST
-from storage_app.schemas.organisation import OrganisationCopySchema
-
-
-def listen_organisation_created_event() -> None:
-    """
-    Слушатель события создания новой организации. Создает копию организации при получении события.
-
-    :return: None
-    """
-
-    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-    channel = connection.channel()
-    channel.queue_declare(queue="organisation_created")
-
-    def callback(ch: Channel, method: Basic.Deliver, properties: BasicProperties, body: bytes) -> None:
-        """
-        Обработчик сообщений из очереди, который создает копию организации.
-
-        :param ch: Канал RabbitMQ
-        :param method: Метаданные о сообщении
-        :param properties: Свойства сообщения
-        :param body: Тело сообщения, содержащее id организации
-        :return: None
-        """
-
-        message = json.loads(body)
-        organisation_id = message["id"]
-
-        async def handle_event():
-            async with AsyncSessionLocal() as db:
-                org_data = OrganisationCopySchema(id=organisation_id)
-                await create_organisation_copy(db, organisation=org_data)
-
-        asyncio.run(handle_event())
-
-    channel.basic_consume(queue="organisation_created", on_message_callback=callback, auto_ack=True)
-    channel.start_consuming()
-
-
-def listen_organisation_deleted_event() -> None:
-    """
-    Слушатель события удаления организации. Удаляет организацию по полученному id.
-
-    :return: None
-    """
-
-    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-    channel = connection.channel()
-    channel.queue_declare(queue="organisation_delete")
-
-    def callback(ch: Channel, method: Basic.Deliver, properties: BasicProperties, body: bytes) -> None:
-        """
-        Обработчик сообщений из очереди, который удаляет организацию по id.
-
-        :param ch: Канал RabbitMQ
-        :param method: Метаданные о сообщении
-        :param properties: Свойства сообщения
-        :param body: Тело сообщения, содержащее id организации для удаления
-        :return: None
-        """
-
-        message = json.loads(body)
-        org_id = message["id"]
-
-        async def handle_event():
-            async with AsyncSessionLocal() as db:
-                await delete_organisation_by_id(db, org_id)
-
-        asyncio.run(handle_event())
-
-    channel.basic_consume(queue="organisation_delete", on_message_callback=callback, auto_ack=True)
-    channel.start_consuming()
+from typing import TYPE_CHECKING, Any, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.crud.organisation import create_organisation_copies, delete_organisation_by_id
+from storage_app.crud.storage_distance import compute_storage_distances
+from storage_app.events import CONSUMER_PREFETCH
+from storage_app.events.broker import connect
+from storage_app.events.codec import event_items
+from storage_app.events.producers.storage_distance import send_storage_distances_created_event
+from storage_app.geo import AUTO_DISTANCES
+from storage_app.schemas.organisation import OrganisationCopySchema
+from .delivery import consume, handle_delivery
+
+if TYPE_CHECKING:
+    from pika.channel import Channel
+    from pika.spec import Basic, BasicProperties
+
+
+def listen_organisation_created_event() -> None:
+    """
+    Слушатель события создания новых организаций. Создает копии организаций при получении события
+    (одиночного или пакетного). При `AUTO_DISTANCES` для организаций с координатами вычисляются расстояния
+    до всех хранилищ, они отправляются одним пакетным событием.
+
+    :return: None
+    """
+
+    connection = connect()
+    channel = connection.channel()
+    channel.queue_declare(queue="organisation_created")
+
+    def callback(ch: "Channel", method: "Basic.Deliver", properties: "BasicProperties", body: bytes) -> None:
+        """
+        Обработчик сообщений из очереди, который создает копию организации.
+
+        :param ch: Канал RabbitMQ
+        :param method: Метаданные о сообщении
+        :param properties: Свойства сообщения
+        :param body: Тело сообщения, содержащее id организации
+        :return: None
+        """
+
+        async def handle_event(db: AsyncSession, message: Dict[str, Any]) -> None:
+            org_data = [OrganisationCopySchema(id=item["id"], latitude=item.get("latitude"),
+                                               longitude=item.get("longitude"))
+                        for item in event_items(message)]
+            await create_organisation_copies(db, organisations=org_data, commit=False)
+
+            if AUTO_DISTANCES:
+                db_distances = await compute_storage_distances(
+                    db, organisation_ids=[org.id for org in org_data if org.latitude is not None]
+                )
+                if db_distances:
+                    send_storage_distances_created_event(db, db_distances)
+
+        handle_delivery(ch, method, properties, body, handle_event)
+
+    channel.basic_qos(prefetch_count=CONSUMER_PREFETCH)
+    channel.basic_consume(queue="organisation_created", on_message_callback=callback)
+    consume(connection, channel)
+
+
+def listen_organisation_deleted_event() -> None:
+    """
+    Слушатель события удаления организации. Удаляет организацию по полученному id.
+
+    :return: None
+    """
+
+    connection = connect()
+    channel = connection.channel()
+    channel.queue_declare(queue="organisation_delete")
+
+    def callback(ch: "Channel", method: "Basic.Deliver", properties: "BasicProperties", body: bytes) -> None:
+        """
+        Обработчик сообщений из очереди, который удаляет организацию по id.
+
+        :param ch: Канал RabbitMQ
+        :param method: Метаданные о сообщении
+        :param properties: Свойства сообщения
+        :param body: Тело сообщения, содержащее id организации для удаления
+        :return: None
+        """
+
+        async def handle_event(db: AsyncSession, message: Dict[str, Any]) -> None:
+            await delete_organisation_by_id(db, message["id"])
+
+        handle_delivery(ch, method, properties, body, handle_event)
+
+    channel.basic_qos(prefetch_count=CONSUMER_PREFETCH)
+    channel.basic_consume(queue="organisation_delete", on_message_callback=callback)
+    consume(connection, channel)
@@ -0,0 +1,46 @@
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from storage_app.events.broker import connect
+from storage_app.events.codec import encode_event
+from storage_app.tracing import TRACEPARENT_HEADER
+
+
+def publish_events(events: Iterable[Tuple[str, Dict[str, Any], Optional[str], Optional[str]]]) -> None:
+    """
+    Публикация пачки событий в RabbitMQ через одно подключение.
+
+    :param events: Четвёрки (очередь, данные события, идентификатор события, `traceparent` спана публикации).
+    Очередь служит и типом события, `traceparent` передаётся в заголовке сообщения
+    :return: None
+    :raises pika.exceptions.AMQPError: если брокер недоступен или не подтвердил публикацию
+
+    Тела кодируются согласно `EVENT_CODEC`, формат передаётся в content type сообщения.
+    Функция возвращается только после подтверждения брокером (publisher confirms).
+    """
+
+    import pika
+
+    connection = connect()
+    try:
+        channel = connection.channel()
+        channel.confirm_delivery()
+
+        declared = set()
+        for queue, data, event_id, traceparent in events:
+            if queue not in declared:
+                channel.queue_declare(queue=queue)
+                declared.add(queue)
+
+            body, content_type = encode_event(queue, data, event_id=event_id, timestamp=time.time())
+            channel.basic_publish(exchange="",
+                                  routing_key=queue,
+                                  body=body,
+                                  properties=pika.BasicProperties(content_type=content_type,
+                                                                  message_id=event_id,
+                                                                  headers={TRACEPARENT_HEADER: traceparent}
+                                                                  if traceparent else None,
+                                                                  ),
+                                  )
+    finally:
+        connection.close()
@@ -1,48 +1,71 @@
-import json
-
-import pika
-
-from storage_app.events import RABBITMQ_HOST
-from storage_app.models.storage import Storage
-
-
-def send_storage_created_event(storage: Storage) -> None:
-    """
-    Отправка события о создании нового хранилища.
-
-    :param storage: Объект хранилища, для которого отправляется событие
-    :return: None
-    """
-
-    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-    channel = connection.channel()
-
-    channel.queue_declare(queue="storage_created")
-    message = json.dumps({"id": storage.id, "capacity": storage.capacity})
-    channel.basic_publish(exchange="",
-                          routing_key="storage_created",
-                          body=message,
-                          )
-
-    connection.close()
-
-
-def send_storage_deleted_event(storage: Storage) -> None:
-    """
-    Отправка события об удалении хранилища.
-
-    :param storage: Объект хранилища, для которого отправляется событие
-    :return: None
-    """
-
-    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-    channel = connection.channel()
-
-    channel.queue_declare(queue="storage_delete")
-    message = json.dumps({"id": storage.id})
-    channel.basic_publish(exchange="",
-                          routing_key="storage_delete",
-                          body=message,
-                          )
-
-    connection.close()
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.events.outbox import stage_event
+from storage_app.models.storage import Storage
+
+
+def storage_created_item(storage: Storage) -> Dict[str, Any]:
+    """
+    :param storage: Созданное хранилище
+    :return: Данные хранилища для события `storage_created`. Координаты передаются, только если заданы
+    """
+
+    item = {"id": storage.id, "capacity": storage.capacity, "version": storage.version}
+    if storage.latitude is not None:
+        item.update(latitude=storage.latitude, longitude=storage.longitude)
+
+    return item
+
+
+def send_storage_created_event(db: AsyncSession, storage: Storage) -> None:
+    """
+    Отправка события о создании нового хранилища.
+
+    :param db: Сессия базы данных, в транзакции которой создано хранилище
+    :param storage: Объект хранилища, для которого отправляется событие
+    :return: None
+
+    Событие записывается в outbox и будет опубликовано после фиксации транзакции.
+    """
+
+    stage_event(db, "storage_created", storage_created_item(storage))
+
+
+def send_storages_created_event(db: AsyncSession, storages: List[Storage]) -> None:
+    """
+    Отправка одного пакетного события о создании нескольких хранилищ.
+
+    :param db: Сессия базы данных, в транзакции которой созданы хранилища
+    :param storages: Созданные хранилища
+    :return: None
+    """
+
+    stage_event(db, "storage_created", {
+        "items": [storage_created_item(storage) for storage in storages],
+    })
+
+
+def send_storage_deleted_event(db: AsyncSession, storage: Storage) -> None:
+    """
+    Отправка события об удалении хранилища.
+
+    :param db: Сессия базы данных, в транзакции которой удалено хранилище
+    :param storage: Объект хранилища, для которого отправляется событие
+    :return: None
+    """
+
+    stage_event(db, "storage_delete", {"id": storage.id})
+
+
+def send_storages_deleted_event(db: AsyncSession, storage_ids: Sequence[int]) -> None:
+    """
+    Отправка одного пакетного события об удалении нескольких хранилищ.
+
+    :param db: Сессия базы данных, в транзакции которой удалены хранилища
+    :param storage_ids: ID удалённых хранилищ
+    :return: None
+    """
+
+    stage_event(db, "storage_delete", {"items": [{"id": storage_id} for storage_id in storage_ids]})
@@ -1,50 +1,74 @@
-import json
-
-import pika
-
-from storage_app.events import RABBITMQ_HOST
-from storage_app.models.storage_distance import StorageDistance
-
-
-def send_storage_distance_created_event(storage_distance: StorageDistance) -> None:
-    """
-    Отправка события о создании нового расстояния между хранилищем и организацией.
-
-    :param storage_distance: Объект расстояния между хранилищем и организацией
-    :return: None
-    """
-
-    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-    channel = connection.channel()
-
-    channel.queue_declare(queue="storage_distance_created")
-    message = json.dumps({
-        "id": storage_distance.id,
-        "storage_id": storage_distance.storage_id,
-        "organisation_id": storage_distance.organisation_id,
-        "distance": storage_distance.distance,
-    })
-    channel.basic_publish(exchange="", routing_key="storage_distance_created", body=message)
-
-    connection.close()
-
-
-def send_distance_deleted_event(storage_distance: StorageDistance) -> None:
-    """
-    Отправка события об удалении расстояния.
-
-    :param storage_distance: Объект расстояния, для которого отправляется событие
-    :return: None
-    """
-
-    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-    channel = connection.channel()
-
-    channel.queue_declare(queue="distance_delete")
-    message = json.dumps({"id": storage_distance.id})
-    channel.basic_publish(exchange="",
-                          routing_key="distance_delete",
-                          body=message,
-                          )
-
-    connection.close()
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.events.outbox import stage_event
+from storage_app.models.storage_distance import StorageDistance
+
+
+def _storage_distance_data(storage_distance: StorageDistance) -> Dict[str, Any]:
+    """
+    Данные события о создании расстояния.
+
+    :param storage_distance: Объект расстояния между хранилищем и организацией
+    :return: Словарь с данными записи
+    """
+
+    return {
+        "id": storage_distance.id,
+        "storage_id": storage_distance.storage_id,
+        "organisation_id": storage_distance.organisation_id,
+        "distance": storage_distance.distance,
+    }
+
+
+def send_storage_distance_created_event(db: AsyncSession, storage_distance: StorageDistance) -> None:
+    """
+    Отправка события о создании нового расстояния между хранилищем и организацией.
+
+    :param db: Сессия базы данных, в транзакции которой создана запись
+    :param storage_distance: Объект расстояния между хранилищем и организацией
+    :return: None
+
+    Событие записывается в outbox и будет опубликовано после фиксации транзакции.
+    """
+
+    stage_event(db, "storage_distance_created", _storage_distance_data(storage_distance))
+
+
+def send_storage_distances_created_event(db: AsyncSession, storage_distances: List[StorageDistance]) -> None:
+    """
+    Отправка одного пакетного события о создании нескольких записей о расстоянии.
+
+    :param db: Сессия базы данных, в транзакции которой созданы записи
+    :param storage_distances: Созданные записи о расстоянии
+    :return: None
+    """
+
+    stage_event(db, "storage_distance_created", {
+        "items": [_storage_distance_data(storage_distance) for storage_distance in storage_distances],
+    })
+
+
+def send_distance_deleted_event(db: AsyncSession, storage_distance: StorageDistance) -> None:
+    """
+    Отправка события об удалении расстояния.
+
+    :param db: Сессия базы данных, в транзакции которой удалена запись
+    :param storage_distance: Объект расстояния, для которого отправляется событие
+    :return: None
+    """
+
+    stage_event(db, "distance_delete", {"id": storage_distance.id})
+
+
+def send_distances_deleted_event(db: AsyncSession, distance_ids: Sequence[int]) -> None:
+    """
+    Отправка одного пакетного события об удалении нескольких записей о расстоянии.
+
+    :param db: Сессия базы данных, в транзакции которой удалены записи
+    :param distance_ids: ID удалённых записей о расстоянии
+    :return: None
+    """
+
+    stage_event(db, "distance_delete", {"items": [{"id": distance_id} for distance_id in distance_ids]})
@@ -0,0 +1,81 @@
+import math
+import os
+from functools import lru_cache
+from types import ModuleType
+from typing import List, Optional, Sequence, Tuple
+
+# Средний радиус Земли, км
+EARTH_RADIUS_KM = 6371.0088
+
+# Вычислять расстояния по координатам при создании хранилищ и копий организаций
+AUTO_DISTANCES = os.getenv("AUTO_DISTANCES", "false").lower() == "true"
+# Максимальное вычисляемое расстояние, км (0 - без ограничения). Ограничивает матрицу расстояний соседями
+DISTANCE_MATRIX_MAX_KM = float(os.getenv("DISTANCE_MATRIX_MAX_KM", "0"))
+
+
+@lru_cache(maxsize=None)
+def get_numpy() -> Optional[ModuleType]:
+    """
+    :return: Модуль numpy или None, если он не установлен
+
+    numpy импортируется при первом вычислении расстояний, а не при старте процесса.
+    """
+
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - numpy необязателен
+        return None
+
+    return numpy
+
+
+class Locations:
+    """
+    Точки с координатами, расстояния до которых считаются сразу для всех точек.
+
+    С numpy координаты хранятся массивами и формула гаверсинуса вычисляется векторно, без него - циклом.
+
+    :param rows: Тройки (ID, широта, долгота)
+    """
+
+    def __init__(self, rows: Sequence[Tuple[int, float, float]]) -> None:
+        self.rows = [tuple(row) for row in rows]
+        self.ids = [row[0] for row in rows]
+        latitudes = [math.radians(row[1]) for row in rows]
+        longitudes = [math.radians(row[2]) for row in rows]
+
+        np = self._np = get_numpy()
+        if np is not None:
+            self._latitudes = np.array(latitudes, dtype=float)
+            self._longitudes = np.array(longitudes, dtype=float)
+            self._cos_latitudes = np.cos(self._latitudes)
+        else:
+            self._latitudes, self._longitudes = latitudes, longitudes
+            self._cos_latitudes = [math.cos(latitude) for latitude in latitudes]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def distances_km(self, latitude: float, longitude: float) -> List[int]:
+        """
+        :param latitude: Широта, градусы
+        :param longitude: Долгота, градусы
+        :return: Расстояния по большому кругу до каждой точки в порядке `ids`, округлённые до километра
+        """
+
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        cos_lat = math.cos(lat)
+
+        np = self._np
+        if np is not None:
+            a = (np.sin((self._latitudes - lat) / 2) ** 2
+                 + cos_lat * self._cos_latitudes * np.sin((self._longitudes - lon) / 2) ** 2)
+            distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+            return np.rint(distances).astype(int).tolist()
+
+        distances = []
+        for latitude2, longitude2, cos_latitude2 in zip(self._latitudes, self._longitudes, self._cos_latitudes):
+            a = math.sin((latitude2 - lat) / 2) ** 2 + cos_lat * cos_latitude2 * math.sin((longitude2 - lon) / 2) ** 2
+            distances.append(round(2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))))
+
+        return distances
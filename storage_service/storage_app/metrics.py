@@ -0,0 +1,191 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Сбор метрик и эндпоинт /metrics. При выключенном сборе обработчики запросов к БД не регистрируются
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+
+# Каталог файлов метрик режима multiprocess prometheus_client: метрики всех воркеров uvicorn и процессов
+# потребителей, запущенных с этим каталогом, складываются при каждом запросе к /metrics. Пусто - метрики процесса.
+# Переменную читает и сам prometheus_client при импорте, поэтому она задаётся до запуска процессов
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+
+# Границы корзин гистограмм длительности, с
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Границы корзин гистограмм задержки доставки событий, с
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+# Границы корзин количества запросов к БД на один HTTP-запрос
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+# Метрики процесса. В режиме multiprocess значения пишутся в файлы `PROMETHEUS_MULTIPROC_DIR`
+REGISTRY = CollectorRegistry()
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Длительность обработки HTTP-запроса", ("method", "route", "status"),
+    buckets=DURATION_BUCKETS, registry=REGISTRY,
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Длительность одного запроса к БД", ("operation",),
+    buckets=DURATION_BUCKETS, registry=REGISTRY,
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "Количество запросов к БД за один HTTP-запрос", ("route",),
+    buckets=COUNT_BUCKETS, registry=REGISTRY,
+)
+DB_DURATION_PER_REQUEST = Histogram(
+    "db_duration_per_request_seconds", "Суммарное время запросов к БД за один HTTP-запрос", ("route",),
+    buckets=DURATION_BUCKETS, registry=REGISTRY,
+)
+EVENT_PUBLISH_DURATION = Histogram(
+    "event_publish_duration_seconds", "Длительность публикации пачки событий из outbox до подтверждения брокером",
+    buckets=DURATION_BUCKETS, registry=REGISTRY,
+)
+EVENT_PUBLISH_DELAY = Histogram(
+    "event_publish_delay_seconds", "Время от записи события в outbox до подтверждения публикации", ("queue",),
+    buckets=LAG_BUCKETS, registry=REGISTRY,
+)
+EVENT_CONSUMER_LAG = Histogram(
+    "event_consumer_lag_seconds", "Время от публикации события до начала его обработки", ("queue",),
+    buckets=LAG_BUCKETS, registry=REGISTRY,
+)
+EVENT_HANDLER_DURATION = Histogram(
+    "event_handler_duration_seconds", "Длительность обработки события", ("queue",),
+    buckets=DURATION_BUCKETS, registry=REGISTRY,
+)
+EVENTS_CONSUMED = Counter(
+    "events_consumed", "Количество полученных событий по результату обработки", ("queue", "result"),
+    registry=REGISTRY,
+)
+
+
+class RequestStats:
+    """
+    Запросы к БД, выполненные в рамках одного HTTP-запроса.
+
+    :param queries: Количество запросов
+    :param duration: Суммарная длительность, с
+    """
+
+    __slots__ = ("queries", "duration")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.duration = 0.0
+
+
+# Статистика текущего HTTP-запроса. Вне HTTP-запросов (потребители, фоновые задачи) - None
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                           executemany: bool) -> None:
+    conn.info.setdefault("metrics_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                          executemany: bool) -> None:
+    duration = time.perf_counter() - conn.info["metrics_start_time"].pop()
+    words = statement.split(None, 1)
+    DB_QUERY_DURATION.labels(words[0].upper() if words else "UNKNOWN").observe(duration)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.duration += duration
+
+
+def _handle_error(context: Any) -> None:
+    start_times = context.connection.info.get("metrics_start_time") if context.connection is not None else None
+    if start_times:
+        start_times.pop()
+
+
+def setup_query_metrics(engine: Engine, enabled: bool = METRICS_ENABLED) -> None:
+    """
+    Подключает замер запросов к БД к движку.
+
+    :param engine: синхронный движок SQLAlchemy (`AsyncEngine.sync_engine`)
+    :param enabled: включён ли сбор метрик; при выключенном обработчики не регистрируются
+    :return: None
+    """
+
+    if not enabled:
+        return
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: длительность HTTP-запросов и количество запросов к БД на каждый из них.
+
+    Метка `route` - шаблон пути маршрута (`/storage/{storage_id}/`), а не сам путь,
+    чтобы количество рядов метрик не зависело от ID в запросах.
+    """
+
+    def __init__(self, app: Callable) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            _request_stats.reset(token)
+
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(scope["method"], route, status_code).observe(duration)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
+            DB_DURATION_PER_REQUEST.labels(route).observe(stats.duration)
+
+
+def render_metrics() -> bytes:
+    """
+    :return: Метрики в текстовом формате Prometheus: сумма по всем процессам `PROMETHEUS_MULTIPROC_DIR`
+        или, без него, метрики этого процесса
+    """
+
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest(REGISTRY)
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry, PROMETHEUS_MULTIPROC_DIR)
+
+    return generate_latest(registry)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """
+    Метрики сервиса в текстовом формате Prometheus.
+
+    :param request: HTTP-запрос
+    :return: Ответ со всеми метриками
+    """
+
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -1,23 +1,29 @@
-from sqlalchemy import Column, Integer
-from sqlalchemy.orm import relationship
-
-from . import Base
-
-
-class OrganisationCopy(Base):
-    """
-    Модель для хранения информации о копиях организаций.
-    Эта таблица используется для хранения связей между организациями и хранилищами.
-
-    :param id: Уникальный идентификатор копии организации.
-    :param storage_distances: Связь с таблицей расстояний (между хранилищем и организацией).
-    """
-
-    __tablename__ = "organisations_copy"
-
-    id = Column(Integer, primary_key=True, index=True)
-    storage_distances = relationship("StorageDistance",
-                                     back_populates="organisation",
-                                     cascade="all, delete-orphan",
-                                     single_parent=True,
-                                     )
+from sqlalchemy import Boolean, Column, Float, Integer, false
+from sqlalchemy.orm import relationship
+
+from . import Base
+
+
+class OrganisationCopy(Base):
+    """
+    Модель для хранения информации о копиях организаций.
+    Эта таблица используется для хранения связей между организациями и хранилищами.
+
+    :param id: Уникальный идентификатор копии организации.
+    :param latitude: Широта организации в градусах или None, если координаты не заданы.
+    :param longitude: Долгота организации в градусах или None, если координаты не заданы.
+    :param deleted: Организация удалена (tombstone): копия скрыта, а расстояния до неё удаляются в фоне.
+    :param storage_distances: Связь с таблицей расстояний (между хранилищем и организацией).
+    """
+
+    __tablename__ = "organisations_copy"
+
+    id = Column(Integer, primary_key=True, index=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    deleted = Column(Boolean, nullable=False, default=False, server_default=false(), index=True)
+    storage_distances = relationship("StorageDistance",
+                                     back_populates="organisation",
+                                     cascade="all, delete-orphan",
+                                     single_parent=True,
+                                     )
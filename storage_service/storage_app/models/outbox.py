@@ -0,0 +1,37 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer, JSON, String, func
+
+from . import Base
+
+
+class OutboxEvent(Base):
+    """
+    Модель события, ожидающего публикации в RabbitMQ (transactional outbox).
+
+    Событие записывается в той же транзакции, что и изменение данных, и публикуется фоновым ретранслятором.
+
+    :param id: Уникальный идентификатор, задаёт порядок публикации
+    :param event_id: Идентификатор события для потребителей. Не меняется при повторной публикации,
+    поэтому потребители могут отбросить дубликат
+    :param queue: Очередь RabbitMQ, она же тип события
+    :param payload: Данные события
+    :param attempts: Количество неудачных попыток публикации
+    :param created_at: Время записи события (UTC)
+    :param traceparent: Спан, в котором записано событие (W3C Trace Context), или None вне трассы
+    """
+
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String(32), nullable=False, default=lambda: uuid.uuid4().hex)
+    queue = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime,
+                        nullable=False,
+                        default=lambda: datetime.now(timezone.utc).replace(tzinfo=None),
+                        server_default=func.now(),
+                        )
+    traceparent = Column(String(55), nullable=True)
@@ -1,29 +1,43 @@
-from sqlalchemy import Column, Integer, String, JSON
-from sqlalchemy.orm import relationship
-
-from . import Base
-
-
-class Storage(Base):
-    """
-    Модель для хранения информации о хранилищах (складах).
-
-    :param id: Уникальный идентификатор хранилища.
-    :param name: Название хранилища.
-    :param location: Местоположение хранилища.
-    :param capacity: Вместимость хранилища, хранимая в виде JSON (типы отходов и их количество).
-    :param storage_distances: Связь с таблицей расстояний
-    """
-
-    __tablename__ = "storages"
-
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, index=True)
-    location = Column(String, nullable=False)
-    capacity = Column(JSON, nullable=False)
-
-    storage_distances = relationship("StorageDistance",
-                                     back_populates="storage",
-                                     cascade="all, delete-orphan",
-                                     single_parent=True,
-                                     )
+from sqlalchemy import Boolean, Column, Float, Integer, String, JSON, false
+from sqlalchemy.orm import relationship
+
+from . import Base
+
+
+class Storage(Base):
+    """
+    Модель для хранения информации о хранилищах (складах).
+
+    :param id: Уникальный идентификатор хранилища.
+    :param name: Название хранилища.
+    :param location: Местоположение хранилища.
+    :param latitude: Широта хранилища в градусах или None, если координаты не заданы.
+    :param longitude: Долгота хранилища в градусах или None, если координаты не заданы.
+    :param capacity: Вместимость хранилища, хранимая в виде JSON (типы отходов и их количество).
+    :param version: Версия последнего изменения хранилища (см. `StorageChange`).
+    :param capacity_updates: Количество применённых изменений вместимости от сервиса Организация
+    (событий `update_capacity`). По нему сервис Организация узнаёт, что его изменения уже в ленте.
+    :param deleted: Хранилище удалено (tombstone): оно скрыто, а расстояния до него удаляются в фоне
+    (см. `storage_app.tombstones`). ID удалённых хранилищ не переиспользуются.
+    :param storage_distances: Связь с таблицей расстояний
+    """
+
+    __tablename__ = "storages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+    location = Column(String, nullable=False)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    capacity = Column(JSON, nullable=False)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    capacity_updates = Column(Integer, nullable=False, default=0, server_default="0")
+    deleted = Column(Boolean, nullable=False, default=False, server_default=false(), index=True)
+
+    storage_distances = relationship("StorageDistance",
+                                     back_populates="storage",
+                                     cascade="all, delete-orphan",
+                                     single_parent=True,
+                                     )
+
+    __table_args__ = {"sqlite_autoincrement": True}
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Float, Integer, JSON
+
+from . import Base
+
+
+class StorageChange(Base):
+    """
+    Последнее изменение хранилища для синхронизации копий в других сервисах.
+
+    :param version: Версия изменения. Растёт монотонно для всех хранилищ сразу, поэтому по ней можно запросить
+    все изменения после уже полученной версии.
+    :param storage_id: Идентификатор хранилища. Для каждого хранилища хранится только последнее изменение.
+    :param capacity: Вместимость хранилища после изменения или None, если хранилище удалено
+    :param latitude: Широта хранилища, чтобы копии, созданные по ленте, получили координаты
+    :param longitude: Долгота хранилища
+    :param capacity_updates: Количество применённых изменений вместимости от сервиса Организация
+    (`Storage.capacity_updates`)
+    """
+
+    __tablename__ = "storage_changes"
+    # AUTOINCREMENT: версии удалённых записей не должны выдаваться повторно
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    version = Column(Integer, primary_key=True)
+    storage_id = Column(Integer, nullable=False, unique=True)
+    capacity = Column(JSON, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    capacity_updates = Column(Integer, nullable=False, default=0, server_default="0")
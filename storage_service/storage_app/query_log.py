@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Подробный вывод SQLAlchemy (echo) - только для отладки, на горячем пути стоит дорого
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
+
+# Структурированное логирование медленных запросов, по умолчанию выключено
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG_ENABLED", "false").lower() == "true"
+QUERY_LOG_SLOW_MS = float(os.getenv("QUERY_LOG_SLOW_MS", "100"))
+QUERY_LOG_SAMPLE_RATE = float(os.getenv("QUERY_LOG_SAMPLE_RATE", "1.0"))
+
+logger = logging.getLogger("storage_app.query")
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_LIST_RE = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_statement(statement: str) -> str:
+    """
+    Приводит SQL-запрос к обобщённому виду: литералы и списки параметров заменяются заглушками.
+
+    :param statement: SQL-запрос
+    :return: нормализованный запрос, одинаковый для запросов, отличающихся только параметрами
+    """
+
+    normalized = _STRING_LITERAL_RE.sub("?", statement)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST_RE.sub("(...)", normalized)
+    normalized = _VALUES_LIST_RE.sub("(...)", normalized)
+
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+
+@lru_cache(maxsize=1024)
+def fingerprint_statement(statement: str) -> str:
+    """
+    Вычисляет отпечаток SQL-запроса.
+
+    :param statement: SQL-запрос
+    :return: короткий хеш нормализованного запроса
+    """
+
+    return hashlib.sha1(normalize_statement(statement).encode()).hexdigest()[:16]
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                           executemany: bool) -> None:
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                          executemany: bool) -> None:
+    duration_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+
+    if duration_ms < QUERY_LOG_SLOW_MS:
+        return
+    if QUERY_LOG_SAMPLE_RATE < 1.0 and random.random() >= QUERY_LOG_SAMPLE_RATE:
+        return
+
+    record = {
+        "event": "slow_query",
+        "fingerprint": fingerprint_statement(statement),
+        "statement": normalize_statement(statement),
+        "duration_ms": round(duration_ms, 3),
+        "executemany": executemany,
+        "rowcount": cursor.rowcount,
+    }
+    logger.warning(json.dumps(record, ensure_ascii=False), extra={"query": record})
+
+
+def _handle_error(context: Any) -> None:
+    start_times = context.connection.info.get("query_start_time") if context.connection is not None else None
+    if start_times:
+        start_times.pop()
+
+
+def setup_query_logging(engine: Engine, enabled: bool = QUERY_LOG_ENABLED) -> None:
+    """
+    Подключает логирование медленных запросов к движку.
+
+    :param engine: синхронный движок SQLAlchemy (`AsyncEngine.sync_engine`)
+    :param enabled: включено ли логирование; при выключенном обработчики не регистрируются
+    :return: None
+
+    Каждый запрос дольше `QUERY_LOG_SLOW_MS` с вероятностью `QUERY_LOG_SAMPLE_RATE` записывается
+    в лог `storage_app.query` одной JSON-строкой с отпечатком запроса и длительностью.
+    """
+
+    if not enabled:
+        return
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
@@ -1,11 +1,17 @@
-from pydantic import BaseModel
-
-
-class OrganisationCopySchema(BaseModel):
-    """
-    Модель для хранения информации о копии организации.
-
-    :param id: Уникальный идентификатор копии организации.
-    """
-
-    id: int
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class OrganisationCopySchema(BaseModel):
+    """
+    Модель для хранения информации о копии организации.
+
+    :param id: Уникальный идентификатор копии организации.
+    :param latitude: Широта организации в градусах, если задана.
+    :param longitude: Долгота организации в градусах, если задана.
+    """
+
+    id: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
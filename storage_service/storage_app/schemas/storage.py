@@ -1,42 +1,65 @@
-from typing import Dict
-
-from pydantic import BaseModel, ConfigDict
-
-
-class StorageBaseSchema(BaseModel):
-    """
-    Базовая модель для хранения информации о хранилище.
-
-    :param name: Название хранилища.
-    :param location: Местоположение хранилища.
-    :param capacity: Вместимость хранилища, представляемая как словарь.
-                      Ключи типы отходов (например, "стекло", "пластик", "биоотходы"),
-                      а значения — списки с уже помещенным количеством отходов и максимальной вместимостью.
-    """
-
-    name: str
-    location: str
-    capacity: Dict[str, list]
-
-
-class StorageCreateSchema(StorageBaseSchema):
-    """
-    Модель для создания нового хранилища. Наследует от StorageBaseSchema.
-
-    Используется при создании нового хранилища.
-    """
-
-    pass
-
-
-class StorageSchema(StorageBaseSchema):
-    """
-    Модель для хранения информации о хранилище с его уникальным идентификатором.
-
-    :param id: Уникальный идентификатор хранилища в базе данных.
-    :param model_config: Конфигурация модели для автоматического извлечения значений атрибутов из ORM-модели.
-    """
-
-    id: int
-
-    model_config = ConfigDict(from_attributes=True)
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+class StorageBaseSchema(BaseModel):
+    """
+    Базовая модель для хранения информации о хранилище.
+
+    :param name: Название хранилища.
+    :param location: Местоположение хранилища.
+    :param capacity: Вместимость хранилища, представляемая как словарь.
+                      Ключи типы отходов (например, "стекло", "пластик", "биоотходы"),
+                      а значения — списки с уже помещенным количеством отходов и максимальной вместимостью.
+    :param latitude: Широта хранилища в градусах. Необязательна, задаётся вместе с долготой.
+    :param longitude: Долгота хранилища в градусах. Необязательна, задаётся вместе с широтой.
+    """
+
+    name: str
+    location: str
+    capacity: Dict[str, list]
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+    @model_validator(mode="after")
+    def check_coordinates(self) -> "StorageBaseSchema":
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError("Широта и долгота задаются вместе")
+
+        return self
+
+
+class StorageCreateSchema(StorageBaseSchema):
+    """
+    Модель для создания нового хранилища. Наследует от StorageBaseSchema.
+
+    Используется при создании нового хранилища.
+    """
+
+    pass
+
+
+class StorageSchema(StorageBaseSchema):
+    """
+    Модель для хранения информации о хранилище с его уникальным идентификатором.
+
+    :param id: Уникальный идентификатор хранилища в базе данных.
+    :param model_config: Конфигурация модели для автоматического извлечения значений атрибутов из ORM-модели.
+    """
+
+    id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class StorageBulkDeleteSchema(BaseModel):
+    """
+    Модель запроса на массовое удаление хранилищ. Удаляются хранилища, подходящие под любой из критериев.
+
+    :param ids: ID хранилищ.
+    :param locations: Местоположения, все хранилища в которых удаляются.
+    """
+
+    ids: List[int] = []
+    locations: List[str] = []
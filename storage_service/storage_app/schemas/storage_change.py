@@ -0,0 +1,25 @@
+from typing import Dict, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class StorageChangeSchema(BaseModel):
+    """
+    Модель изменения хранилища в ленте синхронизации.
+
+    :param version: Версия изменения
+    :param storage_id: Идентификатор хранилища
+    :param capacity: Вместимость хранилища после изменения или None, если хранилище удалено
+    :param latitude: Широта хранилища или None, если координаты не заданы
+    :param longitude: Долгота хранилища или None, если координаты не заданы
+    :param capacity_updates: Количество применённых изменений вместимости от сервиса Организация
+    """
+
+    version: int
+    storage_id: int
+    capacity: Optional[Dict[str, list]]
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    capacity_updates: int = 0
+
+    model_config = ConfigDict(from_attributes=True)
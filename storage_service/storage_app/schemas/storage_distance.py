@@ -1,27 +1,55 @@
-from pydantic import BaseModel, ConfigDict
-
-
-class StorageDistanceBaseSchema(BaseModel):
-    """
-    Базовая модель для хранения информации о расстоянии между хранилищем и организацией.
-
-    :param storage_id: Идентификатор хранилища.
-    :param organisation_id: Идентификатор копии организации.
-    :param distance: Расстояние между хранилищем и организацией.
-    """
-
-    storage_id: int
-    organisation_id: int
-    distance: int
-
-
-class StorageDistanceSchema(StorageDistanceBaseSchema):
-    """
-    Модель для хранения информации о расстоянии между хранилищем и организацией с уникальным идентификатором.
-
-    :param model_config: Конфигурация модели для автоматического извлечения значений атрибутов из ORM-модели.
-    """
-
-    id: int
-
-    model_config = ConfigDict(from_attributes=True)
+from typing import List
+
+from pydantic import BaseModel, ConfigDict
+
+
+class StorageDistanceBaseSchema(BaseModel):
+    """
+    Базовая модель для хранения информации о расстоянии между хранилищем и организацией.
+
+    :param storage_id: Идентификатор хранилища.
+    :param organisation_id: Идентификатор копии организации.
+    :param distance: Расстояние между хранилищем и организацией.
+    """
+
+    storage_id: int
+    organisation_id: int
+    distance: int
+
+
+class StorageDistanceSchema(StorageDistanceBaseSchema):
+    """
+    Модель для хранения информации о расстоянии между хранилищем и организацией с уникальным идентификатором.
+
+    :param model_config: Конфигурация модели для автоматического извлечения значений атрибутов из ORM-модели.
+    """
+
+    id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class StorageDistanceComputeSchema(BaseModel):
+    """
+    Модель запроса на вычисление расстояний по координатам.
+
+    :param storage_ids: ID хранилищ, расстояния от которых вычисляются до всех организаций.
+    :param organisation_ids: ID копий организаций, расстояния от которых вычисляются до всех хранилищ.
+    """
+
+    storage_ids: List[int] = []
+    organisation_ids: List[int] = []
+
+
+class StorageDistanceBulkDeleteSchema(BaseModel):
+    """
+    Модель запроса на массовое удаление записей о расстоянии. Удаляются записи, подходящие под любой из критериев.
+
+    :param ids: ID записей о расстоянии.
+    :param storage_ids: ID хранилищ, все расстояния от которых удаляются.
+    :param organisation_ids: ID копий организаций, все расстояния до которых удаляются.
+    """
+
+    ids: List[int] = []
+    storage_ids: List[int] = []
+    organisation_ids: List[int] = []
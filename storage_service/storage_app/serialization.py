@@ -0,0 +1,39 @@
+import json
+import os
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+# Быстрая сериализация: orjson для ответов и событий, списки отдаются без валидации через Pydantic
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() == "true"
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Сериализация в JSON: через orjson, если включён `FAST_JSON` и он установлен, иначе стандартным модулем json.
+
+    :param content: Данные для сериализации
+    :return: JSON в виде байт (UTF-8)
+    """
+
+    if FAST_JSON and orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON-ответ, сериализуемый через `dumps`.
+
+    Предназначен для данных, которые уже соответствуют схеме ответа (например, строки из БД),
+    поэтому FastAPI не валидирует их повторно через `response_model`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
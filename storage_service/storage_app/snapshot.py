@@ -0,0 +1,80 @@
+import asyncio
+import gzip
+import sys
+from typing import Any, Dict
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.crud.storage_distance import live_distances
+from storage_app.database import AsyncSessionLocal, init_db
+from storage_app.models.storage import Storage
+from storage_app.models.storage_change import StorageChange
+from storage_app.models.storage_distance import StorageDistance
+from storage_app.serialization import dumps
+
+# Версия формата снимка: потребитель отказывается загружать снимок неизвестного формата
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_COMPRESS_LEVEL = 6
+
+
+async def build_snapshot(db: AsyncSession) -> Dict[str, Any]:
+    """
+    Снимок хранилищ и расстояний для начальной загрузки копий в сервисе organisation.
+
+    :param db: Асинхронная сессия базы данных
+    :return: Словарь {"v": версия формата, "version": версия ленты изменений, "storages": [...], "distances": [...]}
+
+    Все данные читаются в одной транзакции, поэтому снимок согласован с версией ленты изменений
+    (`/storages/changes/`): после загрузки снимка копии догоняются изменениями начиная с `version`.
+    """
+
+    version = await db.scalar(select(func.coalesce(func.max(StorageChange.version), 0)))
+    storages = await db.execute(
+        select(Storage.id, Storage.capacity, Storage.version, Storage.latitude, Storage.longitude,
+               Storage.capacity_updates)
+        .where(Storage.deleted.is_(False))
+        .order_by(Storage.id)
+    )
+    distances = await db.execute(live_distances(
+        select(StorageDistance.id, StorageDistance.storage_id, StorageDistance.organisation_id, StorageDistance.distance)
+    ).order_by(StorageDistance.id))
+
+    return {
+        "v": SNAPSHOT_FORMAT_VERSION,
+        "version": version,
+        "storages": [dict(row) for row in storages.mappings()],
+        "distances": [dict(row) for row in distances.mappings()],
+    }
+
+
+def encode_snapshot(snapshot: Dict[str, Any]) -> bytes:
+    """
+    :param snapshot: Снимок (см. `build_snapshot`)
+    :return: JSON, сжатый gzip
+    """
+
+    return gzip.compress(dumps(snapshot), compresslevel=SNAPSHOT_COMPRESS_LEVEL, mtime=0)
+
+
+async def export_snapshot(path: str) -> None:
+    """
+    Запись снимка в файл.
+
+    :param path: Путь к файлу снимка
+    :return: None
+    """
+
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        snapshot = await build_snapshot(db)
+
+    with open(path, "wb") as file:
+        file.write(encode_snapshot(snapshot))
+
+    print(f"Снимок записан в {path}: хранилищ {len(snapshot['storages'])}, "
+          f"расстояний {len(snapshot['distances'])}, версия {snapshot['version']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(export_snapshot(sys.argv[1] if len(sys.argv) > 1 else "storage_snapshot.json.gz"))
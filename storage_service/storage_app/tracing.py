@@ -0,0 +1,391 @@
+import json
+import logging
+import os
+import random
+import re
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from storage_app.query_log import normalize_statement
+
+if TYPE_CHECKING:
+    import httpx
+
+# Куда выгружать спаны: пусто - трассировка выключена, log - JSON-строки в лог `storage_app.trace`,
+# memory - в память процесса (для тестов)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+# Доля трасс, которые записываются, если трасса начинается в этом сервисе. Иначе решение берётся из traceparent
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+
+SERVICE_NAME = "storage_service"
+
+# Заголовок W3C Trace Context: в HTTP-запросах и в заголовках сообщений RabbitMQ
+TRACEPARENT_HEADER = "traceparent"
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+logger = logging.getLogger("storage_app.trace")
+
+
+class SpanContext(NamedTuple):
+    """
+    Идентификаторы спана, передаваемые между сервисами.
+
+    :param trace_id: Идентификатор трассы, 32 hex-символа
+    :param span_id: Идентификатор спана, 16 hex-символов
+    :param sampled: Записывается ли трасса
+    """
+
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+    def to_traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Any) -> Optional[SpanContext]:
+    """
+    :param value: Значение заголовка `traceparent`. Заголовки AMQP могут прийти байтами
+    :return: Контекст родительского спана или None, если заголовка нет или он некорректен
+    """
+
+    if isinstance(value, bytes):
+        value = value.decode("latin-1")
+    if not value or not isinstance(value, str):
+        return None
+
+    match = _TRACEPARENT_RE.match(value.strip().lower())
+    if match is None or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+
+    return SpanContext(match.group(1), match.group(2), bool(int(match.group(3), 16) & 1))
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits) or 1:0{bits // 4}x}"
+
+
+class Span:
+    """
+    Интервал работы внутри трассы.
+
+    :param name: Название операции
+    :param context: Идентификаторы спана
+    :param parent_id: Идентификатор родительского спана или None для корневого
+    :param kind: server, client, producer, consumer или internal
+    :param attributes: Атрибуты спана
+    """
+
+    def __init__(self,
+                 name: str,
+                 context: SpanContext,
+                 parent_id: Optional[str] = None,
+                 kind: str = "internal",
+                 attributes: Optional[Dict[str, Any]] = None,
+                 ) -> None:
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        """
+        :return: Длительность завершённого спана, с
+        """
+
+        return (self.end_time or self.start_time) - self.start_time
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """
+        Завершение спана и выгрузка, если трасса записывается.
+
+        :param error: Исключение, с которым завершилась операция
+        :return: None
+        """
+
+        if self.end_time is not None:
+            return
+
+        self.end_time = self.start_time + (time.perf_counter() - self._start)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+        exporter = _exporter
+        if exporter is not None and self.context.sampled:
+            exporter.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "service": SERVICE_NAME,
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter(ABC):
+    """
+    Получатель завершённых спанов.
+    """
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """
+        :param span: Завершённый спан записываемой трассы
+        :return: None
+        """
+
+
+class LoggingSpanExporter(SpanExporter):
+    """
+    Выгрузка спанов в лог `storage_app.trace` по одной JSON-строке. Спаны разных сервисов связываются по `trace_id`.
+    """
+
+    def export(self, span: Span) -> None:
+        record = span.to_dict()
+        logger.info(json.dumps(record, ensure_ascii=False, default=str), extra={"span": record})
+
+
+class InMemorySpanExporter(SpanExporter):
+    """
+    Спаны в памяти процесса, для тестов.
+    """
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+def create_span_exporter(name: str = TRACING_EXPORTER) -> Optional[SpanExporter]:
+    """
+    :param name: Значение `TRACING_EXPORTER`
+    :return: Получатель спанов или None, если трассировка выключена
+    """
+
+    if not name:
+        return None
+    if name == "log":
+        return LoggingSpanExporter()
+    if name == "memory":
+        return InMemorySpanExporter()
+
+    raise ValueError(f"Unknown TRACING_EXPORTER: {name}")
+
+
+_exporter: Optional[SpanExporter] = create_span_exporter()
+
+# Текущий спан. Вне трассируемых операций - None
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def set_span_exporter(exporter: Optional[SpanExporter]) -> None:
+    """
+    Замена получателя спанов (например, на `InMemorySpanExporter` в тестах).
+
+    :param exporter: Получатель спанов или None, чтобы выключить трассировку
+    :return: None
+    """
+
+    global _exporter
+    _exporter = exporter
+
+
+def get_current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_traceparent() -> Optional[str]:
+    """
+    :return: Заголовок `traceparent` текущего спана или None вне трассы
+    """
+
+    span = _current_span.get()
+
+    return span.context.to_traceparent() if span is not None else None
+
+
+def create_span(name: str,
+                parent: Optional[SpanContext] = None,
+                kind: str = "internal",
+                attributes: Optional[Dict[str, Any]] = None,
+                ) -> Optional[Span]:
+    """
+    Создание спана без назначения текущим. Завершается вызовом `Span.end()`.
+
+    :param name: Название операции
+    :param parent: Родительский спан из другого процесса. По умолчанию - текущий спан
+    :param kind: Вид спана
+    :param attributes: Атрибуты спана
+    :return: Спан или None, если трассировка выключена
+    """
+
+    if _exporter is None:
+        return None
+
+    if parent is None and _current_span.get() is not None:
+        parent = _current_span.get().context
+
+    if parent is not None:
+        context = SpanContext(parent.trace_id, _new_id(64), parent.sampled)
+    else:
+        context = SpanContext(_new_id(128), _new_id(64), random.random() < TRACING_SAMPLE_RATE)
+
+    return Span(name, context, parent.span_id if parent is not None else None, kind, attributes)
+
+
+@contextmanager
+def start_span(name: str,
+               parent: Optional[SpanContext] = None,
+               kind: str = "internal",
+               attributes: Optional[Dict[str, Any]] = None,
+               ) -> Iterator[Optional[Span]]:
+    """
+    Спан блока `with`, текущий внутри блока.
+
+    :param name: Название операции
+    :param parent: Родительский спан из другого процесса. По умолчанию - текущий спан
+    :param kind: Вид спана
+    :param attributes: Атрибуты спана
+    :return: Спан или None, если трассировка выключена
+    """
+
+    span = create_span(name, parent, kind, attributes)
+    if span is None:
+        yield None
+        return
+
+    token = _current_span.set(span)
+    error = None
+    try:
+        yield span
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end(error)
+
+
+async def inject_trace_headers(request: "httpx.Request") -> None:
+    """
+    Хук исходящих запросов httpx: передаёт текущий спан в заголовке `traceparent`.
+
+    :param request: Исходящий запрос
+    :return: None
+    """
+
+    traceparent = current_traceparent()
+    if traceparent is not None:
+        request.headers[TRACEPARENT_HEADER] = traceparent
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                           executemany: bool) -> None:
+    parent = _current_span.get()
+    if parent is None or not parent.context.sampled:
+        return
+
+    words = statement.split(None, 1)
+    span = create_span(f"db {words[0].upper() if words else 'UNKNOWN'}", kind="client",
+                       attributes={"db.statement": normalize_statement(statement)})
+    conn.info.setdefault("trace_spans", []).append(span)
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                          executemany: bool) -> None:
+    parent = _current_span.get()
+    if parent is None or not parent.context.sampled or not conn.info.get("trace_spans"):
+        return
+
+    span = conn.info["trace_spans"].pop()
+    if span is not None:
+        span.end()
+
+
+def _handle_error(context: Any) -> None:
+    spans = context.connection.info.get("trace_spans") if context.connection is not None else None
+    if spans:
+        span = spans.pop()
+        if span is not None:
+            span.end(context.original_exception)
+
+
+def setup_query_tracing(engine: Engine) -> None:
+    """
+    Подключает спаны запросов к БД к движку. Спаны создаются только внутри записываемой трассы.
+
+    :param engine: синхронный движок SQLAlchemy (`AsyncEngine.sync_engine`)
+    :return: None
+    """
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class TracingMiddleware:
+    """
+    ASGI-middleware: серверный спан на каждый HTTP-запрос.
+
+    Родитель берётся из заголовка `traceparent` запроса, идентификаторы спана возвращаются в заголовке
+    `traceparent` ответа (по нему nginx связывает свой лог с трассой).
+    """
+
+    def __init__(self, app: Callable) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or _exporter is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = parse_traceparent(headers.get(TRACEPARENT_HEADER.encode(), b"").decode("latin-1"))
+        method = scope["method"]
+
+        with start_span(f"{method} {scope['path']}", parent=parent, kind="server",
+                        attributes={"http.method": method, "http.target": scope["path"]}) as span:
+
+            async def send_with_trace(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    message.setdefault("headers", [])
+                    message["headers"] = [*message["headers"],
+                                          (TRACEPARENT_HEADER.encode(), span.context.to_traceparent().encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
+
+            route = getattr(scope.get("route"), "path", None)
+            if route is not None:
+                span.name = f"{method} {route}"
+                span.set_attribute("http.route", route)
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import signal
+
+from storage_app.database import close_db, init_db
+from storage_app.events.consumers import start_listening_events, stop_event_consumers
+from storage_app.events.outbox import start_outbox_relay
+from storage_app.lifecycle import shutdown_event
+from storage_app.reconcile import start_reconciler
+from storage_app.tombstones import start_tombstone_purger
+
+
+async def shutdown() -> None:
+    """
+    Плавная остановка воркера: потребители, фоновые потоки, outbox, затем подключения к базе данных.
+
+    :return: None
+    """
+
+    await stop_event_consumers()
+    await close_db()
+
+
+def main() -> None:
+    """
+    Запуск отдельного процесса-потребителя событий (режим `CONSUMER_MODE=dedicated`).
+
+    :return: None
+
+    HTTP-воркеры в этом режиме события не слушают и масштабируются независимо (`WEB_CONCURRENCY`),
+    а количество потребителей задаётся через `CONSUMER_CONCURRENCY`. Здесь же работают ретранслятор outbox,
+    сверка копий и фоновое удаление дочерних записей удалённых строк. По SIGTERM или SIGINT воркер
+    останавливается плавно (см. `stop_event_consumers`).
+    """
+
+    logging.basicConfig(level=logging.INFO)
+
+    asyncio.run(init_db())
+    start_listening_events()
+    start_outbox_relay()
+    start_reconciler()
+    start_tombstone_purger()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: shutdown_event.set())
+    shutdown_event.wait()
+
+    asyncio.run(shutdown())
+
+
+if __name__ == "__main__":
+    main()
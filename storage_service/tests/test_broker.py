@@ -0,0 +1,127 @@
+import asyncio
+from threading import Event, Thread
+from typing import Generator, List
+from unittest.mock import patch
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.crud.organisation import create_organisation_copies
+from storage_app.events.broker import InMemoryBroker, set_broker
+from storage_app.events.consumers import stop_event_consumers
+from storage_app.events.consumers.organisation import listen_organisation_created_event
+from storage_app.events.outbox import relay_outbox_batch
+from storage_app.events.producers import publish_events
+from storage_app.lifecycle import shutdown_event, start_thread
+from storage_app.models.organisation import OrganisationCopy
+from storage_app.models.outbox import OutboxEvent
+from storage_app.schemas.organisation import OrganisationCopySchema
+from .conftest import TestSessionLocal
+
+
+@pytest.fixture
+def broker() -> Generator[InMemoryBroker, None, None]:
+    """
+    Подключает продюсеры и потребители к брокеру в памяти на время теста.
+
+    :return: Брокер в памяти
+    """
+
+    broker = InMemoryBroker()
+    set_broker(broker)
+    yield broker
+    broker.close()
+    set_broker(None)
+
+
+@pytest.mark.asyncio
+async def test_event_pipeline_with_in_memory_broker(broker: InMemoryBroker,
+                                                    async_client: AsyncClient,
+                                                    db_session: AsyncSession,
+                                                    ) -> None:
+    """
+    Проверяем, что событие из outbox попадает в брокер в памяти, а настоящий потребитель в отдельном потоке
+    применяет событие другого сервиса к базе данных и подтверждает его.
+
+    :param broker: Брокер в памяти.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    with patch("storage_app.events.consumers.delivery.AsyncSessionLocal", TestSessionLocal):
+        thread = Thread(target=listen_organisation_created_event, daemon=True)
+        thread.start()
+        publish_events([("organisation_created", {"id": 1}, "event-1", None)])
+        assert broker.join(timeout=5)
+
+    broker.close()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+    assert await db_session.get(OrganisationCopy, 1) is not None
+
+    response = await async_client.post("/api/v1/storage/storage/",
+                                       json={"name": "МНО1", "location": "Москва", "capacity": {"Пластик": [0, 60]}})
+    assert response.status_code == status.HTTP_200_OK
+
+    assert await relay_outbox_batch(db_session) == 1
+    assert broker.pending() == {"organisation_created": 0, "storage_created": 1}
+
+
+@pytest.mark.asyncio
+async def test_graceful_shutdown_drains_consumers_and_outbox(broker: InMemoryBroker,
+                                                             async_client: AsyncClient,
+                                                             db_session: AsyncSession,
+                                                             ) -> None:
+    """
+    Проверяем плавную остановку: потребитель дорабатывает текущее сообщение и подтверждает его, следующее
+    остаётся в очереди для другого экземпляра, а события outbox публикуются до закрытия подключений.
+
+    :param broker: Брокер в памяти.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    response = await async_client.post("/api/v1/storage/storage/",
+                                       json={"name": "МНО1", "location": "Москва", "capacity": {"Пластик": [0, 60]}})
+    assert response.status_code == status.HTTP_200_OK
+
+    started, release = Event(), Event()
+
+    async def slow_create_organisation_copies(db: AsyncSession,
+                                              organisations: List[OrganisationCopySchema],
+                                              commit: bool = True,
+                                              ) -> None:
+        started.set()
+        await asyncio.to_thread(release.wait, 5)
+        await create_organisation_copies(db, organisations, commit=commit)
+
+    try:
+        with patch("storage_app.events.consumers.delivery.AsyncSessionLocal", TestSessionLocal), \
+                patch("storage_app.events.consumers.AsyncSessionLocal", TestSessionLocal), \
+                patch("storage_app.events.outbox._relay_started", True), \
+                patch("storage_app.events.consumers.organisation.create_organisation_copies",
+                      slow_create_organisation_copies):
+            thread = start_thread(listen_organisation_created_event)
+            publish_events([("organisation_created", {"id": 1}, "event-1", None),
+                            ("organisation_created", {"id": 2}, "event-2", None)])
+            assert await asyncio.to_thread(started.wait, 5)
+
+            stopping = asyncio.create_task(stop_event_consumers(timeout=5))
+            await asyncio.sleep(0.2)
+            assert not stopping.done()
+            release.set()
+            await stopping
+    finally:
+        shutdown_event.clear()
+
+    assert not thread.is_alive()
+    assert broker.acked == 1
+    assert broker.pending() == {"organisation_created": 1, "storage_created": 1}
+    assert (await db_session.execute(select(OrganisationCopy.id))).scalars().all() == [1]
+    assert (await db_session.execute(select(OutboxEvent))).scalars().all() == []
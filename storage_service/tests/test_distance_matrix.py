@@ -0,0 +1,159 @@
+import random
+from threading import Thread
+from unittest.mock import patch
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app import geo
+from storage_app.events.broker import InMemoryBroker, set_broker
+from storage_app.events.consumers.organisation import listen_organisation_created_event
+from storage_app.events.producers import publish_events
+from storage_app.geo import Locations
+from storage_app.models.organisation import OrganisationCopy
+from storage_app.models.outbox import OutboxEvent
+from storage_app.models.storage_distance import StorageDistance
+from .conftest import TestSessionLocal
+from .factories import create_organisation, create_storage, create_distance
+
+# Москва
+LATITUDE, LONGITUDE = 55.75, 37.62
+
+
+async def get_distances(db_session: AsyncSession) -> dict:
+    """
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: Расстояния по парам (ID хранилища, ID организации).
+    """
+
+    result = await db_session.execute(select(StorageDistance.storage_id, StorageDistance.organisation_id,
+                                             StorageDistance.distance))
+
+    return {(storage_id, organisation_id): distance for storage_id, organisation_id, distance in result.all()}
+
+
+def test_locations_distances() -> None:
+    """
+    Проверяем расстояния по большому кругу, округлённые до километра, и совпадение векторного вычисления
+    с вычислением без numpy.
+
+    :return: None
+    """
+
+    # Санкт-Петербург, Тверь, Владивосток и сама Москва
+    locations = Locations([(1, 59.94, 30.31), (2, 56.86, 35.9), (3, 43.12, 131.89), (4, LATITUDE, LONGITUDE)])
+    assert locations.ids == [1, 2, 3, 4]
+    assert locations.distances_km(LATITUDE, LONGITUDE) == [635, 163, 6416, 0]
+    assert Locations([]).distances_km(LATITUDE, LONGITUDE) == []
+
+    if geo.get_numpy() is None:
+        pytest.skip("numpy не установлен")
+
+    rng = random.Random(1)
+    rows = [(i, rng.uniform(-90, 90), rng.uniform(-180, 180)) for i in range(1000)]
+    vectorised = Locations(rows).distances_km(LATITUDE, LONGITUDE)
+    with patch.object(geo, "get_numpy", return_value=None):
+        assert Locations(rows).distances_km(LATITUDE, LONGITUDE) == vectorised
+
+
+@pytest.mark.asyncio
+async def test_compute_distances(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем, что расстояния вычисляются от хранилища до всех организаций с координатами одним пакетным
+    событием, а пары с заданным расстоянием и записи без координат пропускаются.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    storage = await create_storage(db_session, "МНО1", "Москва", {"Пластик": [0, 60]},
+                                   latitude=LATITUDE, longitude=LONGITUDE)
+    without_coordinates = await create_storage(db_session, "МНО2", "Казань", {"Пластик": [0, 60]})
+    spb = await create_organisation(db_session, latitude=59.94, longitude=30.31)
+    tver = await create_organisation(db_session, latitude=56.86, longitude=35.9)
+    linked = await create_organisation(db_session, latitude=43.12, longitude=131.89)
+    await create_organisation(db_session)
+    await create_distance(db_session, storage.id, linked.id, distance=10)
+
+    response = await async_client.post("/api/v1/storage/distances/compute/",
+                                       json={"storage_ids": [storage.id, without_coordinates.id, 404]})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"created": 2}
+    assert await get_distances(db_session) == {
+        (storage.id, spb.id): 635,
+        (storage.id, tver.id): 163,
+        (storage.id, linked.id): 10,
+    }
+
+    events = (await db_session.execute(select(OutboxEvent))).scalars().all()
+    assert [event.queue for event in events] == ["storage_distance_created"]
+    assert sorted(item["organisation_id"] for item in events[0].payload["items"]) == [spb.id, tver.id]
+
+    response = await async_client.post("/api/v1/storage/distances/compute/",
+                                       json={"organisation_ids": [spb.id, tver.id]})
+    assert response.json() == {"created": 0}
+
+
+@pytest.mark.asyncio
+async def test_auto_distances_for_new_storage(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем, что при `AUTO_DISTANCES` расстояния до организаций в радиусе `DISTANCE_MATRIX_MAX_KM`
+    создаются вместе с хранилищем.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    spb = await create_organisation(db_session, latitude=59.94, longitude=30.31)
+    await create_organisation(db_session, latitude=43.12, longitude=131.89)
+
+    with patch("storage_app.api.AUTO_DISTANCES", True), \
+            patch("storage_app.crud.storage_distance.DISTANCE_MATRIX_MAX_KM", 1000):
+        response = await async_client.post("/api/v1/storage/storage/", json={
+            "name": "МНО1", "location": "Москва", "capacity": {"Пластик": [0, 60]},
+            "latitude": LATITUDE, "longitude": LONGITUDE,
+        })
+
+    assert response.status_code == status.HTTP_200_OK
+    assert await get_distances(db_session) == {(response.json()["id"], spb.id): 635}
+
+
+@pytest.mark.asyncio
+async def test_auto_distances_for_new_organisations(db_session: AsyncSession) -> None:
+    """
+    Проверяем, что потребитель события `organisation_created` сохраняет координаты копий и при `AUTO_DISTANCES`
+    вычисляет расстояния от новых организаций до всех хранилищ.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    storage = await create_storage(db_session, "МНО1", "Москва", {"Пластик": [0, 60]},
+                                   latitude=LATITUDE, longitude=LONGITUDE)
+
+    broker = InMemoryBroker()
+    set_broker(broker)
+    try:
+        with patch("storage_app.events.consumers.delivery.AsyncSessionLocal", TestSessionLocal), \
+                patch("storage_app.events.consumers.organisation.AUTO_DISTANCES", True):
+            thread = Thread(target=listen_organisation_created_event, daemon=True)
+            thread.start()
+            publish_events([("organisation_created",
+                             {"items": [{"id": 1, "latitude": 59.94, "longitude": 30.31}, {"id": 2}]},
+                             "event-1", None)])
+            assert broker.join(timeout=5)
+    finally:
+        broker.close()
+        set_broker(None)
+    thread.join(timeout=5)
+
+    organisation = await db_session.get(OrganisationCopy, 1)
+    assert (organisation.latitude, organisation.longitude) == (59.94, 30.31)
+    assert await db_session.get(OrganisationCopy, 2) is not None
+    assert await get_distances(db_session) == {(storage.id, 1): 635}
@@ -0,0 +1,121 @@
+import json
+import time
+from unittest.mock import patch, MagicMock
+
+import msgpack
+import pytest
+
+from storage_app.events.codec import decode_event, encode_event, event_items, MSGPACK_CONTENT_TYPE, JSON_CONTENT_TYPE
+from storage_app.events.producers import publish_events
+
+
+def test_msgpack_event_roundtrip() -> None:
+    """
+    Проверяем, что событие в msgpack распаковывается в исходные данные, а известные типы отходов
+    передаются кодами и занимают меньше места, чем в JSON.
+
+    :return: None
+    """
+
+    data = {"id": 1, "capacity": {"Пластик": [0, 60], "Стекло": [10, 20], "Металл": [0, 5]}}
+
+    body, content_type = encode_event("storage_created", data, codec="msgpack")
+    json_body, json_content_type = encode_event("storage_created", data, codec="json")
+
+    assert content_type == MSGPACK_CONTENT_TYPE
+    assert json_content_type == JSON_CONTENT_TYPE
+    assert "Пластик".encode() not in body
+    assert len(body) < len(json_body)
+    assert decode_event(body, content_type) == {"v": 1, "type": "storage_created", "data": data}
+    assert decode_event(json_body, json_content_type) == decode_event(body, content_type)
+
+
+def test_batch_event_roundtrip() -> None:
+    """
+    Проверяем, что типы отходов кодируются и в записях пакетного события.
+
+    :return: None
+    """
+
+    data = {"items": [{"id": 1, "capacity": {"Пластик": [0, 60]}}, {"id": 2, "capacity": {"Стекло": [0, 20]}}]}
+
+    body, content_type = encode_event("storage_created", data, codec="msgpack")
+
+    assert "Пластик".encode() not in body
+    assert event_items(decode_event(body, content_type)["data"]) == data["items"]
+    assert event_items({"id": 1}) == [{"id": 1}]
+
+
+def test_legacy_json_event_is_accepted() -> None:
+    """
+    Проверяем, что JSON без конверта от предыдущих версий сервисов принимается как данные события.
+
+    :return: None
+    """
+
+    body = json.dumps({"id": 1, "capacity": {"Пластик": [0, 60]}}).encode()
+
+    assert decode_event(body, None)["data"] == {"id": 1, "capacity": {"Пластик": [0, 60]}}
+
+
+def test_newer_event_version_is_rejected() -> None:
+    """
+    Проверяем, что событие неизвестной (более новой) версии конверта не обрабатывается.
+
+    :return: None
+    """
+
+    body = json.dumps({"v": 100, "type": "storage_created", "data": {}}).encode()
+
+    with pytest.raises(ValueError):
+        decode_event(body, JSON_CONTENT_TYPE)
+
+
+def test_unknown_waste_type_code_is_rejected() -> None:
+    """
+    Проверяем, что код типа отходов вне `WASTE_TYPES` отклоняется с понятной ошибкой, а не `IndexError`.
+
+    :return: None
+    """
+
+    body = msgpack.packb({"v": 1, "type": "storage_created", "data": {"id": 1, "capacity": {99: [0, 60]}}})
+
+    with pytest.raises(ValueError, match="Unknown waste type code: 99"):
+        decode_event(body, MSGPACK_CONTENT_TYPE)
+
+
+def test_newer_msgpack_version_is_rejected_before_decoding_data() -> None:
+    """
+    Проверяем, что версия конверта msgpack проверяется до разбора данных: данные новой версии с незнакомыми
+    кодами отклоняются как неподдерживаемая версия.
+
+    :return: None
+    """
+
+    body = msgpack.packb({"v": 100, "type": "storage_created", "data": {"id": 1, "capacity": {99: [0, 60]}}})
+
+    with pytest.raises(ValueError, match="Unsupported event envelope version: 100"):
+        decode_event(body, MSGPACK_CONTENT_TYPE)
+
+
+@patch("storage_app.events.codec.EVENT_CODEC", "msgpack")
+@patch("pika.BlockingConnection")
+def test_publish_event_sets_content_type(mock_connection: MagicMock) -> None:
+    """
+    Проверяем, что формат тела события передаётся в content type сообщения, а идентификатор - в message id.
+
+    :param mock_connection: Мок подключения к RabbitMQ.
+    :return: None
+    """
+
+    publish_events([("storage_delete", {"id": 1}, "event-1", None)])
+
+    channel = mock_connection.return_value.channel.return_value
+    kwargs = channel.basic_publish.call_args.kwargs
+
+    assert kwargs["properties"].content_type == MSGPACK_CONTENT_TYPE
+    assert kwargs["properties"].message_id == "event-1"
+    envelope = decode_event(kwargs["body"], MSGPACK_CONTENT_TYPE)
+    # Время публикации - для замера задержки доставки на стороне потребителя
+    assert time.time() - envelope.pop("ts") < 5
+    assert envelope == {"v": 1, "id": "event-1", "type": "storage_delete", "data": {"id": 1}}
@@ -0,0 +1,82 @@
+import json
+import time
+from unittest.mock import patch, MagicMock, AsyncMock
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.crud.storage import update_storage_capacity as crud_update_storage_capacity
+from storage_app.events.consumers.delivery import handle_delivery, process_event_once, purge_processed_events
+from storage_app.models.processed_event import ProcessedEvent
+from storage_app.models.storage import Storage
+from .conftest import TestSessionLocal
+from .factories import create_storage
+
+
+@pytest.mark.asyncio
+async def test_redelivered_capacity_update_is_applied_once(db_session: AsyncSession) -> None:
+    """
+    Проверяем, что повторно доставленное событие об изменении заполненности не применяется второй раз.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    storage = await create_storage(db_session, name="МНО1", location="Москва", capacity={"Пластик": [0, 60]})
+
+    async def handler(db: AsyncSession) -> None:
+        await crud_update_storage_capacity(db, storage.id, {"Пластик": 10})
+
+    assert await process_event_once("event-1", handler, session_factory=TestSessionLocal)
+    assert not await process_event_once("event-1", handler, session_factory=TestSessionLocal)
+
+    result = await db_session.execute(select(Storage).execution_options(populate_existing=True))
+    assert result.scalars().one().capacity == {"Пластик": [10, 60]}
+
+
+@pytest.mark.asyncio
+async def test_processed_events_are_purged_after_retention(db_session: AsyncSession) -> None:
+    """
+    Проверяем, что удаляются только идентификаторы событий старше срока хранения.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    db_session.add_all([
+        ProcessedEvent(event_id="old", processed_at=time.time() - 100),
+        ProcessedEvent(event_id="new", processed_at=time.time()),
+    ])
+    await db_session.commit()
+
+    assert await purge_processed_events(db_session, retention=50) == 1
+
+    result = await db_session.execute(select(ProcessedEvent.event_id))
+    assert result.scalars().all() == ["new"]
+
+
+@patch("storage_app.events.consumers.delivery.process_event_once", new_callable=AsyncMock)
+def test_message_is_acked_only_after_processing(mock_process: AsyncMock) -> None:
+    """
+    Проверяем, что сообщение подтверждается после обработки, а при ошибке возвращается в очередь один раз.
+
+    :param mock_process: Мок-функция обработки события.
+    :return: None
+    """
+
+    channel = MagicMock()
+    properties = MagicMock(content_type=None, message_id=None)
+    body = json.dumps({"v": 1, "id": "event-1", "type": "storage_delete", "data": {"id": 1}}).encode()
+
+    handle_delivery(channel, MagicMock(delivery_tag=1, redelivered=False), properties, body, AsyncMock())
+    assert mock_process.call_args.args[0] == "event-1"
+    channel.basic_ack.assert_called_once_with(delivery_tag=1)
+
+    mock_process.side_effect = RuntimeError("database is locked")
+    handle_delivery(channel, MagicMock(delivery_tag=2, redelivered=False), properties, body, AsyncMock())
+    channel.basic_nack.assert_called_with(delivery_tag=2, requeue=True)
+
+    handle_delivery(channel, MagicMock(delivery_tag=3, redelivered=True), properties, body, AsyncMock())
+    channel.basic_nack.assert_called_with(delivery_tag=3, requeue=False)
+    channel.basic_ack.assert_called_once()
@@ -0,0 +1,124 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from storage_app.events.codec import encode_event
+from storage_app.events.consumers.delivery import handle_delivery
+from storage_app.metrics import REGISTRY, setup_query_metrics
+from .conftest import test_engine
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """
+    :param text: Метрики в текстовом формате Prometheus
+    :return: Значения метрик по строке `имя{метки}`
+    """
+
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+
+    return samples
+
+
+@pytest.mark.asyncio
+async def test_request_metrics(async_client: AsyncClient) -> None:
+    """
+    Проверяем, что `/metrics` отдаёт длительность запроса по шаблону пути и количество запросов к БД за запрос.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    setup_query_metrics(test_engine.sync_engine, enabled=True)
+    before = parse_metrics((await async_client.get("/metrics")).text)
+
+    response = await async_client.delete("/api/v1/storage/storage/100/")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = await async_client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    after = parse_metrics(response.text)
+
+    def delta(prefix: str, *labels: str) -> float:
+        # Шаблон пути в метке зависит от версии FastAPI (с префиксом роутера или без), ищем по окончанию
+        name = next(name for name in after if name.startswith(prefix) and all(label in name for label in labels))
+        return after[name] - before.get(name, 0)
+
+    route = '/storage/{storage_id}/"'
+    assert delta("http_request_duration_seconds_count{", 'method="DELETE"', route, 'status="404"') == 1
+    assert delta("db_queries_per_request_count{", route) == 1
+    assert delta("db_queries_per_request_sum{", route) >= 1
+
+
+@pytest.mark.asyncio
+async def test_failed_query_does_not_leak_start_time() -> None:
+    """
+    Проверяем, что время начала запроса, завершившегося ошибкой, не остаётся в `conn.info`.
+
+    :return: None
+    """
+
+    setup_query_metrics(test_engine.sync_engine, enabled=True)
+
+    async with test_engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            await conn.execute(text("SELECT * FROM missing_table"))
+
+        assert conn.sync_connection.info.get("metrics_start_time") == []
+
+
+@patch("storage_app.events.consumers.delivery.process_event_once", new_callable=AsyncMock, return_value=False)
+def test_handle_delivery_records_consumer_metrics(mock_process: AsyncMock) -> None:
+    """
+    Проверяем, что потребитель записывает задержку доставки, время обработки и результат по очереди.
+
+    :param mock_process: Мок-функция обработки события, сообщает о дубликате.
+    :return: None
+    """
+
+    queue = "metrics_test_queue"
+    body, content_type = encode_event(queue, {}, timestamp=time.time() - 5)
+    method = MagicMock(routing_key=queue, delivery_tag=1, redelivered=False)
+    properties = MagicMock(content_type=content_type, message_id=None)
+
+    handle_delivery(MagicMock(), method, properties, body, AsyncMock())
+
+    assert REGISTRY.get_sample_value("event_consumer_lag_seconds_count", {"queue": queue}) == 1
+    assert REGISTRY.get_sample_value("event_handler_duration_seconds_count", {"queue": queue}) == 1
+    assert REGISTRY.get_sample_value("events_consumed_total", {"queue": queue, "result": "duplicate"}) == 1
+
+
+def test_metrics_are_summed_across_processes(tmp_path: Path) -> None:
+    """
+    Проверяем режим `PROMETHEUS_MULTIPROC_DIR`: `/metrics` любого процесса отдаёт сумму метрик всех процессов
+    (воркеров uvicorn и потребителей), а не только свои.
+
+    :param tmp_path: Временный каталог файлов метрик.
+    :return: None
+    """
+
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    cwd = Path(__file__).parent.parent
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", "from storage_app.metrics import EVENTS_CONSUMED; "
+                                              "EVENTS_CONSUMED.labels('queue', 'processed').inc()"],
+                       env=env, cwd=cwd, check=True)
+
+    result = subprocess.run([sys.executable, "-c", "import sys; from storage_app.metrics import render_metrics; "
+                                                   "sys.stdout.write(render_metrics().decode())"],
+                            env=env, cwd=cwd, capture_output=True, text=True, check=True)
+
+    assert parse_metrics(result.stdout)['events_consumed_total{queue="queue",result="processed"}'] == 2
@@ -0,0 +1,82 @@
+from unittest.mock import patch, MagicMock
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.events.outbox import relay_outbox_batch
+from storage_app.models.outbox import OutboxEvent
+from .factories import create_storage
+
+
+async def get_outbox_events(db_session: AsyncSession) -> list[OutboxEvent]:
+    """
+    Возвращает события, ожидающие публикации.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: События outbox в порядке записи
+    """
+
+    result = await db_session.execute(select(OutboxEvent).order_by(OutboxEvent.id).execution_options(populate_existing=True))
+
+    return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+@patch("storage_app.events.outbox.publish_events")
+async def test_events_are_relayed_in_order(mock_publish: MagicMock,
+                                           async_client: AsyncClient,
+                                           db_session: AsyncSession,
+                                           ) -> None:
+    """
+    Проверяем, что события записываются в outbox вместе с изменениями и публикуются одной пачкой в порядке записи.
+
+    :param mock_publish: Мок-функция публикации пачки событий в RabbitMQ.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    response = await async_client.post("/api/v1/storage/storage/",
+                                       json={"name": "МНО1", "location": "Москва", "capacity": {"Пластик": [0, 60]}},
+                                       )
+    storage_id = response.json()["id"]
+    await async_client.delete(f"/api/v1/storage/storage/{storage_id}/")
+
+    assert await relay_outbox_batch(db_session) == 2
+
+    published = mock_publish.call_args.args[0]
+    assert [(queue, data) for queue, data, _, _ in published] == [
+        ("storage_created", {"id": storage_id, "capacity": {"Пластик": [0, 60]}, "version": 1}),
+        ("storage_delete", {"id": storage_id}),
+    ]
+    # У каждого события свой идентификатор для отбрасывания дубликатов потребителями
+    assert len({event_id for _, _, event_id, _ in published}) == 2
+    assert await get_outbox_events(db_session) == []
+
+
+@pytest.mark.asyncio
+@patch("storage_app.events.outbox.publish_events", side_effect=ConnectionError("broker is down"))
+async def test_failed_relay_keeps_events(mock_publish: MagicMock,
+                                         async_client: AsyncClient,
+                                         db_session: AsyncSession,
+                                         ) -> None:
+    """
+    Проверяем, что при недоступном брокере запрос выполняется, а событие остаётся в outbox для повтора.
+
+    :param mock_publish: Мок-функция публикации, имитирующая недоступность брокера.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    storage = await create_storage(db_session, name="МНО1", location="Москва", capacity={"Пластик": [0, 60]})
+    response = await async_client.delete(f"/api/v1/storage/storage/{storage.id}/")
+    assert response.status_code == 200
+
+    with pytest.raises(ConnectionError):
+        await relay_outbox_batch(db_session)
+
+    events = await get_outbox_events(db_session)
+    assert [(event.queue, event.attempts) for event in events] == [("storage_delete", 1)]
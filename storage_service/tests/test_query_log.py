@@ -0,0 +1,82 @@
+import json
+import logging
+
+import pytest
+from sqlalchemy import event, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app import query_log
+from storage_app.models.storage import Storage
+from .conftest import test_engine
+
+
+def test_fingerprint_ignores_literals() -> None:
+    """
+    Проверяем, что запросы, отличающиеся только параметрами, имеют одинаковый отпечаток.
+
+    :return: None
+    """
+
+    first = "SELECT * FROM storages WHERE id IN (?, ?, ?) AND name = 'МНО1'"
+    second = "SELECT *   FROM storages\nWHERE id IN (?) AND name = 'МНО2'"
+
+    assert query_log.normalize_statement(first) == "SELECT * FROM storages WHERE id IN (...) AND name = ?"
+    assert query_log.fingerprint_statement(first) == query_log.fingerprint_statement(second)
+
+
+@pytest.mark.asyncio
+async def test_slow_query_is_logged(db_session: AsyncSession,
+                                    caplog: pytest.LogCaptureFixture,
+                                    monkeypatch: pytest.MonkeyPatch,
+                                    ) -> None:
+    """
+    Проверяем, что медленный запрос попадает в лог в виде структурированной записи.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :param caplog: Перехватчик логов.
+    :param monkeypatch: Фикстура для подмены порога медленного запроса.
+    :return: None
+    """
+
+    monkeypatch.setattr(query_log, "QUERY_LOG_SLOW_MS", 0)
+    query_log.setup_query_logging(test_engine.sync_engine, enabled=True)
+
+    try:
+        with caplog.at_level(logging.WARNING, logger="storage_app.query"):
+            await db_session.execute(select(Storage).where(Storage.id == 1))
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", query_log._before_cursor_execute)
+        event.remove(test_engine.sync_engine, "after_cursor_execute", query_log._after_cursor_execute)
+        event.remove(test_engine.sync_engine, "handle_error", query_log._handle_error)
+
+    records = [record for record in caplog.records if record.name == "storage_app.query"]
+    assert records
+    payload = json.loads(records[-1].getMessage())
+    assert payload["event"] == "slow_query"
+    assert payload["fingerprint"] == query_log.fingerprint_statement(payload["statement"])
+    assert payload["duration_ms"] >= 0
+    assert records[-1].query == payload
+
+
+@pytest.mark.asyncio
+async def test_failed_query_does_not_leak_start_time() -> None:
+    """
+    Проверяем, что время начала запроса, завершившегося ошибкой, не остаётся в `conn.info`.
+
+    :return: None
+    """
+
+    query_log.setup_query_logging(test_engine.sync_engine, enabled=True)
+
+    try:
+        async with test_engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                await conn.execute(text("SELECT * FROM missing_table"))
+            start_times = conn.sync_connection.info.get("query_start_time")
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", query_log._before_cursor_execute)
+        event.remove(test_engine.sync_engine, "after_cursor_execute", query_log._after_cursor_execute)
+        event.remove(test_engine.sync_engine, "handle_error", query_log._handle_error)
+
+    assert start_times == []
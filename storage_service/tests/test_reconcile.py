@@ -0,0 +1,154 @@
+from typing import AsyncGenerator
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from storage_app.models import Base
+from storage_app.models.organisation import OrganisationCopy
+from storage_app.models.storage_distance import StorageDistance
+from storage_app.reconcile import REPLICA_TABLES, get_bounds, get_range_checksums, get_range_rows, reconcile
+from .conftest import TestSessionLocal
+from .factories import create_organisation, create_storage, create_distance
+
+
+@pytest_asyncio.fixture
+async def remote_session_factory() -> AsyncGenerator[sessionmaker, None]:
+    """
+    Отдельная БД, которая изображает исходную таблицу организаций в сервисе organisation.
+
+    :return: Фабрика сессий этой БД
+    """
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    await engine.dispose()
+
+
+def organisation_service_client(session_factory: sessionmaker) -> httpx.AsyncClient:
+    """
+    HTTP-клиент, который отвечает на запросы сверки вместо сервиса organisation.
+
+    :param session_factory: Фабрика сессий БД с исходными организациями
+    :return: HTTP-клиент
+    """
+
+    table = REPLICA_TABLES["organisations"]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        params = {key: int(value) for key, value in request.url.params.items()}
+        async with session_factory() as db:
+            if request.url.path.endswith("/bounds/"):
+                min_id, max_id = await get_bounds(db, table)
+                return httpx.Response(200, json={"min": min_id, "max": max_id})
+            if request.url.path.endswith("/checksums/"):
+                return httpx.Response(200, json=await get_range_checksums(db, table, **params))
+            return httpx.Response(200, json=await get_range_rows(db, table, **params))
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler),
+                             base_url="http://organisation_service/api/v1/organisation/replication/organisations")
+
+
+@pytest.mark.asyncio
+async def test_reconcile_organisation_copies(db_session: AsyncSession, remote_session_factory: sessionmaker) -> None:
+    """
+    Проверяем, что сверка восстанавливает только разошедшиеся диапазоны: недостающие копии создаются,
+    изменившиеся координаты обновляются, лишние копии удаляются вместе с расстояниями.
+
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :param remote_session_factory: Фабрика сессий БД с исходными организациями.
+    :return: None
+    """
+
+    remote_ids = [organisation_id for organisation_id in range(1, 2001) if organisation_id != 3]
+    async with remote_session_factory() as remote_db:
+        await remote_db.execute(insert(OrganisationCopy), [{"id": organisation_id} for organisation_id in remote_ids])
+        await remote_db.execute(update(OrganisationCopy).where(OrganisationCopy.id == 700)
+                                .values(latitude=55.75, longitude=37.62))
+        await remote_db.commit()
+
+    await db_session.execute(insert(OrganisationCopy), [{"id": organisation_id} for organisation_id in range(1, 1501)])
+    await db_session.execute(insert(OrganisationCopy), [{"id": 5000}])
+    await db_session.commit()
+    storage = await create_storage(db_session, name="МНО1", location="Москва", capacity={"Пластик": [0, 60]})
+    await create_distance(db_session, storage.id, 5000, distance=100)
+
+    async with organisation_service_client(remote_session_factory) as client:
+        repaired = await reconcile(client, session_factory=TestSessionLocal)
+
+        assert 0 < repaired < 30
+        assert await reconcile(client, session_factory=TestSessionLocal) == 0
+
+    local_ids = (await db_session.execute(select(OrganisationCopy.id).order_by(OrganisationCopy.id))).scalars().all()
+    assert local_ids == remote_ids
+    result = await db_session.execute(select(OrganisationCopy.latitude, OrganisationCopy.longitude)
+                                      .where(OrganisationCopy.id == 700))
+    assert result.one() == (55.75, 37.62)
+    assert (await db_session.execute(select(StorageDistance))).first() is None
+
+
+@pytest.mark.asyncio
+async def test_replication_endpoints(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем API сверки для сервиса organisation: границы, контрольные суммы и строки диапазона.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания записей в тестах.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session)
+    storage = await create_storage(db_session, name="МНО1", location="Москва", capacity={"Пластик": [0, 60]})
+    first = await create_distance(db_session, storage.id, organisation.id, distance=100)
+    second = await create_distance(db_session, storage.id, organisation.id, distance=200)
+
+    bounds = (await async_client.get("/api/v1/storage/replication/distances/bounds/")).json()
+    assert bounds == {"min": first.id, "max": second.id}
+
+    response = await async_client.get("/api/v1/storage/replication/distances/checksums/",
+                                      params={"start": first.id, "end": second.id + 1, "parts": 2})
+    checksums = response.json()
+    assert [(part["start"], part["end"], part["count"]) for part in checksums] == [
+        (first.id, first.id + 1, 1),
+        (second.id, second.id + 1, 1),
+    ]
+    assert checksums[0]["hash"] != checksums[1]["hash"]
+
+    rows = (await async_client.get("/api/v1/storage/replication/distances/rows/",
+                                   params={"start": first.id, "end": first.id + 1})).json()
+    assert rows == [{"id": first.id, "storage_id": storage.id, "organisation_id": organisation.id, "distance": 100}]
+
+    response = await async_client.get("/api/v1/storage/replication/organisations/bounds/")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_replication_skips_distances_of_deleted_organisations(async_client: AsyncClient,
+                                                                     db_session: AsyncSession,
+                                                                     ) -> None:
+    """
+    Проверяем, что расстояния до удалённой копии организации, ещё не удалённые в фоне, не отдаются для сверки.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания записей в тестах.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session)
+    storage = await create_storage(db_session, name="МНО1", location="Москва", capacity={"Пластик": [0, 60]})
+    await create_distance(db_session, storage.id, organisation.id, distance=100)
+    await db_session.execute(update(OrganisationCopy).where(OrganisationCopy.id == organisation.id)
+                             .values(deleted=True))
+    await db_session.commit()
+
+    bounds = (await async_client.get("/api/v1/storage/replication/distances/bounds/")).json()
+    assert bounds == {"min": None, "max": None}
@@ -0,0 +1,129 @@
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from storage_app.database import init_db
+from storage_app.events.consumers.delivery import keep_listening
+from storage_app.lifecycle import shutdown_event
+
+
+@pytest.mark.asyncio
+async def test_init_db_creates_schema_only_once(tmp_path: Path) -> None:
+    """
+    Проверяем, что `init_db` создаёт недостающие таблицы, при существующей схеме не выполняет DDL,
+    а в режиме check отказывается стартовать с пустой базой данных.
+
+    :param tmp_path: Временная директория для файла базы данных.
+    :return: None
+    """
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'startup.db'}")
+    statements: List[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    try:
+        with patch("storage_app.database.engine", engine):
+            with pytest.raises(RuntimeError, match="missing tables"):
+                await init_db("check")
+
+            await init_db("create")
+            assert any(statement.lstrip().startswith("CREATE TABLE") for statement in statements)
+
+            statements.clear()
+            await init_db("create")
+            await init_db("check")
+            assert not any(statement.lstrip().startswith("CREATE") for statement in statements)
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_init_db_adds_missing_columns(tmp_path: Path) -> None:
+    """
+    Проверяем обновление базы данных предыдущей версии: в режиме check старт завершается ошибкой со списком
+    недостающих столбцов, в режиме create они добавляются в существующую таблицу без потери строк.
+
+    :param tmp_path: Временная директория для файла базы данных.
+    :return: None
+    """
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'upgrade.db'}")
+
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE storages (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE, "
+                                    "location VARCHAR NOT NULL, capacity JSON NOT NULL)"))
+            await conn.execute(text("INSERT INTO storages (id, name, location, capacity) "
+                                    "VALUES (1, 'Хранилище', 'Москва', '{}')"))
+
+        with patch("storage_app.database.engine", engine):
+            with pytest.raises(RuntimeError, match=r"missing columns: .*storages\.deleted"):
+                await init_db("check")
+
+            await init_db("create")
+            await init_db("check")
+
+        async with engine.connect() as conn:
+            columns = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_columns("storages"))
+            indexes = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_indexes("storages"))
+            row = (await conn.execute(text("SELECT version, capacity_updates, deleted FROM storages"))).one()
+
+        assert {"latitude", "longitude", "version", "capacity_updates", "deleted"} <= {c["name"] for c in columns}
+        assert any(index["column_names"] == ["deleted"] for index in indexes)
+        assert tuple(row) == (0, 0, 0)
+    finally:
+        await engine.dispose()
+
+
+def test_keep_listening_reconnects_until_shutdown() -> None:
+    """
+    Проверяем, что слушатель перезапускается после ошибки подключения и не перезапускается после остановки.
+
+    :return: None
+    """
+
+    calls = []
+
+    def listener() -> None:
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise ConnectionError("broker is unavailable")
+
+    keep_listening(listener, delay=0.01)
+    assert calls == [0, 1]
+
+    def failing_listener() -> None:
+        calls.append(len(calls))
+        shutdown_event.set()
+        raise ConnectionError("broker is unavailable")
+
+    calls.clear()
+    try:
+        keep_listening(failing_listener, delay=0.01)
+    finally:
+        shutdown_event.clear()
+    assert calls == [0]
+
+
+def test_app_import_defers_broker_and_consumers() -> None:
+    """
+    Проверяем, что импорт приложения не загружает pika, httpx и модули потребителей: они нужны только
+    фоновым потокам и загружаются при их запуске.
+
+    :return: None
+    """
+
+    code = ("import sys, storage_app.main; "
+            "print(' '.join(sorted(name for name in sys.modules if name.split('.')[0] in ('pika', 'httpx', 'numpy') "
+            "or name in ('storage_app.events.consumers.organisation', 'storage_app.events.consumers.storage'))))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=Path(__file__).parent.parent)
+
+    assert result.stdout.split() == []
@@ -1,251 +1,444 @@
-from unittest.mock import patch, AsyncMock
-
-import pytest
-from fastapi import status
-from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from .factories import create_storage
-
-
-############################# CREATE ###################################
-
-@pytest.mark.asyncio
-@patch("storage_app.api.send_storage_created_event", autospec=True)
-async def test_create_storage(mock_send_event: AsyncMock, async_client: AsyncClient) -> None:
-    """
-    Функция тестирует создание новой организации с заданными параметрами и проверяет,
-    что событие о создании организации было отправлено.
-
-    :param mock_send_event: Мок-функция для отправки события о создании хранилища.
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    data = {
-        "name": "Test organisation",
-        "location": "Москва",
-        "capacity": {
-            "Пластик": [0, 60],
-            "Стекло": [0, 20],
-            "Биоотходы": [0, 50]
-        }
-    }
-    response = await async_client.post("/api/v1/storage/storage/", json=data)
-
-    assert response.status_code == status.HTTP_200_OK
-    assert response.json()["name"] == data["name"]
-    mock_send_event.assert_called_once()
-
-
-@pytest.mark.asyncio
-async def test_create_already_exist_storage(async_client: AsyncClient, db_session: AsyncSession) -> None:
-    """
-    Проверяем, что хранилище с указанным именем существует
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :param db_session: Сессия базы данных для создания хранилища в тестах.
-    :return: None
-    """
-
-    data = {
-        "name": "Test organisation",
-        "location": "Москва",
-        "capacity": {
-            "Пластик": [0, 60],
-        }
-    }
-
-    await create_storage(db_session,
-                         name=data['name'],
-                         location=data['location'],
-                         capacity=data['capacity'],
-                         )
-    response = await async_client.post("/api/v1/storage/storage/", json=data)
-    resp_data = response.json()
-
-    assert response.status_code == status.HTTP_400_BAD_REQUEST
-    assert resp_data["detail"] == f'Хранилище с именем {data["name"]} уже существует'
-
-
-@pytest.mark.asyncio
-async def test_creat_organisation_without_name(async_client: AsyncClient) -> None:
-    """
-    Функция тестирует создание нового хранилиза без имени.
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    data = {
-        "capacity": {
-            "Пластик": [0, 60],
-        }
-    }
-    response = await async_client.post("/api/v1/storage/storage/", json=data)
-    resp_data = response.json()
-
-    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
-    missing_name_error = next(
-        (
-            error
-            for error in resp_data["detail"]
-            if error["type"] == "missing" and "name" in error["loc"]
-        ),
-        None,
-    )
-    assert missing_name_error is not None
-    assert missing_name_error["msg"] == "Field required"
-
-
-@pytest.mark.asyncio
-async def test_creat_storage_with_incorrect_name_type(async_client: AsyncClient) -> None:
-    """
-    Функция тестирует что тип name неверен.
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    data = {
-        "name": 123,
-        "location": "Москва",
-        "capacity": {
-            "Пластик": [0, 60],
-        }
-    }
-
-    response = await async_client.post("/api/v1/storage/storage/", json=data)
-    resp_data = response.json()
-
-    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
-    missing_name_error = next(
-        (
-            error
-            for error in resp_data["detail"]
-            if error["type"] == "string_type" and "name" in error["loc"]
-        ),
-        None,
-    )
-    assert missing_name_error is not None
-    assert missing_name_error["msg"] == "Input should be a valid string"
-
-@pytest.mark.asyncio
-async def test_creat_storage_with_overflow_capacity(async_client: AsyncClient) -> None:
-    """
-    Проверяем, что не можем создать организацию с переполненной вместимостью
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    data = {
-        "name": "Test organisation",
-        "location": "Москва",
-        "capacity": {
-            "Пластик": [70, 60],
-            "Стекло": [0, 20],
-            "Биоотходы": [90, 50]
-        }
-    }
-    response = await async_client.post("/api/v1/storage/storage/", json=data)
-    resp_data = response.json()
-
-    assert response.status_code == status.HTTP_400_BAD_REQUEST
-    assert resp_data["detail"] == "Переполнение для отхода Пластик: 70 превышает вместимость 60"
-
-
-############################# GET ###################################
-
-@pytest.mark.asyncio
-async def test_get_storages(async_client: AsyncClient) -> None:
-    """
-    Функция проверяет правильность работы эндпоинта для получения списка всех хранилищ.
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    response = await async_client.get("/api/v1/storage/storages/")
-
-    assert response.status_code == status.HTTP_200_OK
-    assert isinstance(response.json(), list)
-
-
-############################# GET ###################################
-
-@pytest.mark.asyncio
-async def test_delete_empty_storage(async_client: AsyncClient) -> None:
-    """
-    Функция проверяет, что если нет хранилища для удаления, возвращается ошибка с детализированным сообщением.
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    response = await async_client.delete(f"/api/v1/storage/storage/1/")
-
-    assert response.status_code == status.HTTP_404_NOT_FOUND
-    response_json = response.json()
-    assert response_json["detail"] == "Не найдено хранилища для удаления"
-
-
-############################# DELETE ###################################
-
-@pytest.mark.asyncio
-@patch("storage_app.api.send_storage_deleted_event", autospec=True)
-async def test_delete_storage(mock_send_event: AsyncMock,
-                              async_client: AsyncClient,
-                              db_session: AsyncSession,
-                              ) -> None:
-    """
-    Проверяем удаление Хранилища
-
-    :param mock_send_event: Мок-функция для отправки события об удалении всех организаций.
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :param db_session: Сессия базы данных для создания организации в тестах.
-    :return: None
-    """
-
-    data = {
-        "name": "Test organisation",
-        "location": "Москва",
-        "capacity": {
-            "Пластик": [0, 60],
-        }
-    }
-
-    storage = await create_storage(db_session,
-                                   name=data['name'],
-                                   location=data['location'],
-                                   capacity=data['capacity'],
-                                   )
-    response = await async_client.delete(f"/api/v1/storage/storage/{storage.id}/")
-
-    assert response.status_code == status.HTTP_200_OK
-    assert response.json()["message"] == "Хранилище успешно удалено"
-    mock_send_event.assert_called_once()
-
-@pytest.mark.asyncio
-async def test_delete_storage_with_incorrect_id_type(async_client: AsyncClient) -> None:
-    """
-    Функция тестирует, что ID хранилища для удаления неверно.
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    response = await async_client.delete(f"/api/v1/storage/storage/FAKE_ID/")
-    resp_data = response.json()
-
-    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
-    missing_name_error = next(
-        (
-            error
-            for error in resp_data["detail"]
-            if error["type"] == "int_parsing" and "storage_id" in error["loc"]
-        ),
-        None,
-    )
-    assert missing_name_error is not None
-    assert missing_name_error["msg"] == "Input should be a valid integer, unable to parse string as an integer"
+from unittest.mock import patch, AsyncMock
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.crud.storage import update_storage_capacity as crud_update_storage_capacity
+from storage_app.crud.storage_change import backfill_storage_changes as crud_backfill_storage_changes
+from storage_app.models.outbox import OutboxEvent
+from .factories import create_storage
+
+
+############################# CREATE ###################################
+
+@pytest.mark.asyncio
+@patch("storage_app.api.send_storage_created_event", autospec=True)
+async def test_create_storage(mock_send_event: AsyncMock, async_client: AsyncClient) -> None:
+    """
+    Функция тестирует создание новой организации с заданными параметрами и проверяет,
+    что событие о создании организации было отправлено.
+
+    :param mock_send_event: Мок-функция для отправки события о создании хранилища.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    data = {
+        "name": "Test organisation",
+        "location": "Москва",
+        "capacity": {
+            "Пластик": [0, 60],
+            "Стекло": [0, 20],
+            "Биоотходы": [0, 50]
+        }
+    }
+    response = await async_client.post("/api/v1/storage/storage/", json=data)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["name"] == data["name"]
+    mock_send_event.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_create_already_exist_storage(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем, что хранилище с указанным именем существует
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания хранилища в тестах.
+    :return: None
+    """
+
+    data = {
+        "name": "Test organisation",
+        "location": "Москва",
+        "capacity": {
+            "Пластик": [0, 60],
+        }
+    }
+
+    await create_storage(db_session,
+                         name=data['name'],
+                         location=data['location'],
+                         capacity=data['capacity'],
+                         )
+    response = await async_client.post("/api/v1/storage/storage/", json=data)
+    resp_data = response.json()
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert resp_data["detail"] == f'Хранилище с именем {data["name"]} уже существует'
+
+
+@pytest.mark.asyncio
+async def test_creat_organisation_without_name(async_client: AsyncClient) -> None:
+    """
+    Функция тестирует создание нового хранилиза без имени.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    data = {
+        "capacity": {
+            "Пластик": [0, 60],
+        }
+    }
+    response = await async_client.post("/api/v1/storage/storage/", json=data)
+    resp_data = response.json()
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    missing_name_error = next(
+        (
+            error
+            for error in resp_data["detail"]
+            if error["type"] == "missing" and "name" in error["loc"]
+        ),
+        None,
+    )
+    assert missing_name_error is not None
+    assert missing_name_error["msg"] == "Field required"
+
+
+@pytest.mark.asyncio
+async def test_create_storage_with_coordinates(async_client: AsyncClient) -> None:
+    """
+    Проверяем, что координаты хранилища необязательны, сохраняются и передаются в ленту синхронизации,
+    а широта без долготы или координаты вне диапазона отклоняются.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    data = {"name": "МНО1", "location": "Москва", "capacity": {"Пластик": [0, 60]}, "latitude": 55.75,
+            "longitude": 37.62}
+    response = await async_client.post("/api/v1/storage/storage/", json=data)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert (response.json()["latitude"], response.json()["longitude"]) == (55.75, 37.62)
+    change, = (await async_client.get("/api/v1/storage/storages/changes/")).json()
+    assert (change["latitude"], change["longitude"]) == (55.75, 37.62)
+
+    for coordinates in ({"latitude": 55.75}, {"latitude": 91, "longitude": 0}, {"latitude": 0, "longitude": 181}):
+        response = await async_client.post("/api/v1/storage/storage/",
+                                           json={"name": "МНО2", "location": "Москва",
+                                                 "capacity": {"Пластик": [0, 60]}, **coordinates})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_creat_storage_with_incorrect_name_type(async_client: AsyncClient) -> None:
+    """
+    Функция тестирует что тип name неверен.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    data = {
+        "name": 123,
+        "location": "Москва",
+        "capacity": {
+            "Пластик": [0, 60],
+        }
+    }
+
+    response = await async_client.post("/api/v1/storage/storage/", json=data)
+    resp_data = response.json()
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    missing_name_error = next(
+        (
+            error
+            for error in resp_data["detail"]
+            if error["type"] == "string_type" and "name" in error["loc"]
+        ),
+        None,
+    )
+    assert missing_name_error is not None
+    assert missing_name_error["msg"] == "Input should be a valid string"
+
+@pytest.mark.asyncio
+async def test_creat_storage_with_overflow_capacity(async_client: AsyncClient) -> None:
+    """
+    Проверяем, что не можем создать организацию с переполненной вместимостью
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    data = {
+        "name": "Test organisation",
+        "location": "Москва",
+        "capacity": {
+            "Пластик": [70, 60],
+            "Стекло": [0, 20],
+            "Биоотходы": [90, 50]
+        }
+    }
+    response = await async_client.post("/api/v1/storage/storage/", json=data)
+    resp_data = response.json()
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert resp_data["detail"] == "Переполнение для отхода Пластик: 70 превышает вместимость 60"
+
+
+@pytest.mark.asyncio
+@patch("storage_app.api.send_storages_created_event", autospec=True)
+async def test_create_storages_in_bulk(mock_send_event: AsyncMock, async_client: AsyncClient) -> None:
+    """
+    Проверяем массовое создание хранилищ: все хранилища создаются, отправляется одно пакетное событие.
+
+    :param mock_send_event: Мок-функция для отправки пакетного события о создании хранилищ.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    data = [{"name": f"МНО{i}", "location": "Москва", "capacity": {"Пластик": [0, 60]}} for i in range(100)]
+    response = await async_client.post("/api/v1/storage/storages/bulk/", json=data)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [storage["name"] for storage in response.json()] == [item["name"] for item in data]
+    mock_send_event.assert_called_once()
+    assert len(mock_send_event.call_args.args[1]) == 100
+
+
+@pytest.mark.asyncio
+@patch("storage_app.api.send_storages_created_event", autospec=True)
+async def test_create_storages_in_bulk_with_duplicate_names(mock_send_event: AsyncMock,
+                                                           async_client: AsyncClient,
+                                                           ) -> None:
+    """
+    Проверяем, что при повторяющихся именах в запросе не создается ни одно хранилище.
+
+    :param mock_send_event: Мок-функция для отправки пакетного события о создании хранилищ.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    data = [{"name": name, "location": "Москва", "capacity": {"Пластик": [0, 60]}} for name in ("МНО1", "МНО2", "МНО1")]
+    response = await async_client.post("/api/v1/storage/storages/bulk/", json=data)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Имена хранилищ повторяются: МНО1"
+    assert (await async_client.get("/api/v1/storage/storages/")).json() == []
+    mock_send_event.assert_not_called()
+
+
+############################# GET ###################################
+
+@pytest.mark.asyncio
+async def test_get_storages(async_client: AsyncClient) -> None:
+    """
+    Функция проверяет правильность работы эндпоинта для получения списка всех хранилищ.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    response = await async_client.get("/api/v1/storage/storages/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert isinstance(response.json(), list)
+
+
+@pytest.mark.asyncio
+async def test_get_storages_fast_json(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем, что с `FAST_JSON` список хранилищ совпадает с ответом, сериализованным через Pydantic.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания хранилища в тестах.
+    :return: None
+    """
+
+    await create_storage(db_session, name="МНО1", location="Москва", capacity={"Пластик": [10, 60]})
+
+    response = await async_client.get("/api/v1/storage/storages/")
+    with patch("storage_app.api.FAST_JSON", True), patch("storage_app.serialization.FAST_JSON", True):
+        fast_response = await async_client.get("/api/v1/storage/storages/")
+
+    assert fast_response.status_code == status.HTTP_200_OK
+    assert fast_response.json() == response.json()
+
+
+@pytest.mark.asyncio
+@patch("storage_app.api.send_storage_deleted_event", autospec=True)
+@patch("storage_app.api.send_storages_created_event", autospec=True)
+async def test_get_storage_changes(mock_send_created: AsyncMock,
+                                   mock_send_deleted: AsyncMock,
+                                   async_client: AsyncClient,
+                                   db_session: AsyncSession,
+                                   ) -> None:
+    """
+    Проверяем ленту синхронизации: каждое хранилище в ней одно, с последней версией, удалённые - с capacity null.
+
+    :param mock_send_created: Мок-функция для отправки пакетного события о создании хранилищ.
+    :param mock_send_deleted: Мок-функция для отправки события об удалении хранилища.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для изменения хранилища в тестах.
+    :return: None
+    """
+
+    data = [{"name": f"МНО{i}", "location": "Москва", "capacity": {"Пластик": [0, 60]}} for i in range(3)]
+    storages = (await async_client.post("/api/v1/storage/storages/bulk/", json=data)).json()
+    snapshot = (await async_client.get("/api/v1/storage/storages/changes/")).json()
+    assert [change["storage_id"] for change in snapshot] == [storage["id"] for storage in storages]
+
+    since = snapshot[-1]["version"]
+    await crud_update_storage_capacity(db_session, storages[0]["id"], {"Пластик": 10})
+    await async_client.delete(f"/api/v1/storage/storage/{storages[1]['id']}/")
+
+    response = await async_client.get("/api/v1/storage/storages/changes/", params={"since": since})
+
+    assert response.status_code == status.HTTP_200_OK
+    changes = response.json()
+    assert [(change["storage_id"], change["capacity"]) for change in changes] == [
+        (storages[0]["id"], {"Пластик": [10, 60]}),
+        (storages[1]["id"], None),
+    ]
+    assert since < changes[0]["version"] < changes[1]["version"]
+    # Изменение вместимости от сервиса Организация учитывается в счётчике, по которому тот сверяет свои копии
+    assert changes[0]["capacity_updates"] == 1
+
+    first_page = (await async_client.get("/api/v1/storage/storages/changes/", params={"limit": 2})).json()
+    assert [change["storage_id"] for change in first_page] == [storages[2]["id"], storages[0]["id"]]
+
+
+@pytest.mark.asyncio
+async def test_backfill_storage_changes(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем, что хранилища, созданные в обход ленты синхронизации, попадают в неё при старте.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания хранилища в тестах.
+    :return: None
+    """
+
+    storage = await create_storage(db_session, name="МНО1", location="Москва", capacity={"Пластик": [10, 60]})
+    assert (await async_client.get("/api/v1/storage/storages/changes/")).json() == []
+
+    await crud_backfill_storage_changes(db_session)
+    await crud_backfill_storage_changes(db_session)
+
+    changes = (await async_client.get("/api/v1/storage/storages/changes/")).json()
+    assert changes == [{"version": 1, "storage_id": storage.id, "capacity": {"Пластик": [10, 60]},
+                        "latitude": None, "longitude": None, "capacity_updates": 0}]
+    await db_session.refresh(storage)
+    assert storage.version == 1
+
+
+############################# GET ###################################
+
+@pytest.mark.asyncio
+async def test_delete_empty_storage(async_client: AsyncClient) -> None:
+    """
+    Функция проверяет, что если нет хранилища для удаления, возвращается ошибка с детализированным сообщением.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    response = await async_client.delete(f"/api/v1/storage/storage/1/")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response_json = response.json()
+    assert response_json["detail"] == "Не найдено хранилища для удаления"
+
+
+############################# DELETE ###################################
+
+@pytest.mark.asyncio
+@patch("storage_app.api.send_storage_deleted_event", autospec=True)
+async def test_delete_storage(mock_send_event: AsyncMock,
+                              async_client: AsyncClient,
+                              db_session: AsyncSession,
+                              ) -> None:
+    """
+    Проверяем удаление Хранилища
+
+    :param mock_send_event: Мок-функция для отправки события об удалении всех организаций.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания организации в тестах.
+    :return: None
+    """
+
+    data = {
+        "name": "Test organisation",
+        "location": "Москва",
+        "capacity": {
+            "Пластик": [0, 60],
+        }
+    }
+
+    storage = await create_storage(db_session,
+                                   name=data['name'],
+                                   location=data['location'],
+                                   capacity=data['capacity'],
+                                   )
+    response = await async_client.delete(f"/api/v1/storage/storage/{storage.id}/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["message"] == "Хранилище успешно удалено"
+    mock_send_event.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_delete_storages_bulk(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем массовое удаление хранилищ по ID и местоположению с одним пакетным событием `storage_delete`.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    moscow = [await create_storage(db_session, f"МНО{i}", "Москва", {"Пластик": [0, 60]}) for i in range(3)]
+    tver = await create_storage(db_session, "МНО3", "Тверь", {"Пластик": [0, 60]})
+    kazan = await create_storage(db_session, "МНО4", "Казань", {"Пластик": [0, 60]})
+
+    response = await async_client.post("/api/v1/storage/storages/delete/",
+                                       json={"ids": [tver.id, moscow[0].id, 404], "locations": ["Москва"]})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"deleted": 4}
+    assert [item["id"] for item in (await async_client.get("/api/v1/storage/storages/")).json()] == [kazan.id]
+    changes = (await async_client.get("/api/v1/storage/storages/changes/", params={"since": 0})).json()
+    assert {change["storage_id"] for change in changes if change["capacity"] is None} == {
+        *(storage.id for storage in moscow), tver.id,
+    }
+
+    events = (await db_session.execute(select(OutboxEvent))).scalars().all()
+    assert [event.queue for event in events] == ["storage_delete"]
+    assert events[0].payload == {"items": [{"id": storage.id} for storage in (*moscow, tver)]}
+
+    response = await async_client.post("/api/v1/storage/storages/delete/", json={"locations": ["Москва"]})
+    assert response.json() == {"deleted": 0}
+    assert len((await db_session.execute(select(OutboxEvent))).scalars().all()) == 1
+
+
+@pytest.mark.asyncio
+async def test_delete_storage_with_incorrect_id_type(async_client: AsyncClient) -> None:
+    """
+    Функция тестирует, что ID хранилища для удаления неверно.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    response = await async_client.delete(f"/api/v1/storage/storage/FAKE_ID/")
+    resp_data = response.json()
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    missing_name_error = next(
+        (
+            error
+            for error in resp_data["detail"]
+            if error["type"] == "int_parsing" and "storage_id" in error["loc"]
+        ),
+        None,
+    )
+    assert missing_name_error is not None
+    assert missing_name_error["msg"] == "Input should be a valid integer, unable to parse string as an integer"
@@ -1,258 +1,392 @@
-from unittest.mock import patch, AsyncMock
-
-import pytest
-from fastapi import status
-from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from .factories import create_organisation, create_storage, create_distance
-
-
-############################# CREATE ###################################
-
-@pytest.mark.asyncio
-@patch("storage_app.api.send_storage_distance_created_event")
-async def test_create_storage_distance(mock_send_event: AsyncMock,
-                                       async_client: AsyncClient,
-                                       db_session: AsyncSession,
-                                       ):
-    """
-    Проверяется создание `StorageDistance`.
-
-    :param mock_send_event: Мок-функция для отправки события о создании `StorageDistance`.
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :param db_session: Сессия базы данных для создания данных в тестах.
-    :return: None
-    """
-
-    organisation = await create_organisation(db_session)
-    storage = await create_storage(db_session,
-                                   name='Тест МНО',
-                                   location='Тверь',
-                                   capacity={"Пластик": [0, 60],
-                                             }
-                                   )
-
-    data = {"storage_id": storage.id, "organisation_id": organisation.id, "distance": 100}
-    response = await async_client.post("/api/v1/storage/distance/", json=data)
-
-    assert response.status_code == status.HTTP_200_OK
-    assert response.json()["distance"] == data["distance"]
-    mock_send_event.assert_called_once()
-
-
-@pytest.mark.asyncio
-async def test_create_already_exist_storage_distance(async_client: AsyncClient,
-                                                     db_session: AsyncSession,
-                                                     ):
-    """
-    Проверяем, что не можем создать 2 одинаковых `StorageDistance`
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :param db_session: Сессия базы данных для создания данных в тестах.
-    :return: None
-    """
-
-    organisation = await create_organisation(db_session)
-    storage = await create_storage(db_session,
-                                   name='Тест МНО',
-                                   location='Тверь',
-                                   capacity={"Пластик": [0, 60]},
-                                   )
-
-    data = {"storage_id": storage.id, "organisation_id": organisation.id, "distance": 100}
-    await create_distance(db_session, **data)
-    response = await async_client.post("/api/v1/storage/distance/", json=data)
-    resp_data = response.json()
-
-    assert response.status_code == status.HTTP_400_BAD_REQUEST
-    assert resp_data["detail"] == 'Такая запись уже существует'
-
-
-@pytest.mark.asyncio
-async def test_creat_storage_distance_without_organisation_id(async_client: AsyncClient) -> None:
-    """
-    Функция тестирует создание `StorageDistance` без указания `organisation_id`.
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    data = {"storage_id": 1, "distance": 100}
-
-    response = await async_client.post("/api/v1/storage/distance/", json=data)
-    resp_data = response.json()
-
-    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
-    missing_organisation_id_error = next(
-        (
-            error
-            for error in resp_data["detail"]
-            if error["type"] == "missing" and "organisation_id" in error["loc"]
-        ),
-        None,
-    )
-    assert missing_organisation_id_error is not None
-    assert missing_organisation_id_error["msg"] == "Field required"
-
-
-@pytest.mark.asyncio
-async def test_creat_storage_distance_without_organisation(async_client: AsyncClient, db_session: AsyncSession) -> None:
-    """
-    Функция тестирует создание `StorageDistance`, когда организации с указанным id в БД нет.
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    storage = await create_storage(db_session,
-                                   name='Тест МНО',
-                                   location='Тверь',
-                                   capacity={"Пластик": [0, 60]},
-                                   )
-
-    data = {"storage_id": storage.id, "organisation_id": 1, "distance": 100}
-
-    response = await async_client.post("/api/v1/storage/distance/", json=data)
-    resp_data = response.json()
-
-    assert response.status_code == status.HTTP_400_BAD_REQUEST
-    assert resp_data["detail"] == 'Указанной организации не существует'
-
-
-@pytest.mark.asyncio
-async def test_creat_storage_distance_without_storage(async_client: AsyncClient, db_session: AsyncSession) -> None:
-    """
-    Функция тестирует создание `StorageDistance`, когда хранилища с указанным id в БД нет.
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    organisation = await create_organisation(db_session)
-
-    data = {"storage_id": 1, "organisation_id": organisation.id, "distance": 100}
-
-    response = await async_client.post("/api/v1/storage/distance/", json=data)
-    resp_data = response.json()
-
-    assert response.status_code == status.HTTP_400_BAD_REQUEST
-    assert resp_data["detail"] == 'Указанного хранилища не существует'
-
-
-@pytest.mark.asyncio
-async def test_creat_distance_with_incorrect_org_id_type(async_client: AsyncClient) -> None:
-    """
-    Функция тестирует что тип `organisation_id` неверен.
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    data = {"storage_id": 1, "organisation_id": 'FAKE_ID', "distance": 100}
-
-    response = await async_client.post("/api/v1/storage/distance/", json=data)
-    resp_data = response.json()
-
-    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
-    missing_name_error = next(
-        (
-            error
-            for error in resp_data["detail"]
-            if error["type"] == "int_parsing" and "organisation_id" in error["loc"]
-        ),
-        None,
-    )
-    assert missing_name_error is not None
-    assert missing_name_error["msg"] == "Input should be a valid integer, unable to parse string as an integer"
-
-
-############################# GET ###################################
-
-@pytest.mark.asyncio
-async def test_get_storage_distances(async_client: AsyncClient) -> None:
-    """
-    Функция проверяет правильность работы эндпоинта для получения списка всех `StorageDistance`.
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    response = await async_client.get("/api/v1/storage/distances/")
-    assert response.status_code == status.HTTP_200_OK
-    assert isinstance(response.json(), list)
-
-
-############################# DELETE ###################################
-
-@pytest.mark.asyncio
-async def test_delete_empty_distance(async_client: AsyncClient) -> None:
-    """
-    Функция проверяет, что если нет расстояния, возвращается ошибка.
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    response = await async_client.delete(f"/api/v1/storage/distance/1/")
-
-    assert response.status_code == status.HTTP_404_NOT_FOUND
-    response_json = response.json()
-    assert response_json["detail"] == "Не найдено расстояние между МНО и ОО для удаления"
-
-
-@pytest.mark.asyncio
-@patch("storage_app.api.send_distance_deleted_event", autospec=True)
-async def test_delete_distance(mock_send_event: AsyncMock,
-                               async_client: AsyncClient,
-                               db_session: AsyncSession,
-                               ) -> None:
-    """
-    Проверяем успешное удаление расстояния
-
-    :param mock_send_event: Мок-функция для отправки события об удалении всех организаций.
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :param db_session: Сессия базы данных для создания организации в тестах.
-    :return: None
-    """
-
-    organisation = await create_organisation(db_session)
-    storage = await create_storage(db_session,
-                                   name='Тест МНО',
-                                   location='Тверь',
-                                   capacity={"Пластик": [0, 60],
-                                             }
-                                   )
-
-    data = {"storage_id": storage.id, "organisation_id": organisation.id, "distance": 100}
-    distance = await create_distance(db_session, **data)
-    response = await async_client.delete(f"/api/v1/storage/distance/{distance.id}/")
-
-    assert response.status_code == status.HTTP_200_OK
-    assert response.json()["message"] == "Расстояние между ОО и МНО успешно удалено"
-    mock_send_event.assert_called_once()
-
-
-@pytest.mark.asyncio
-async def test_delete_distance_with_incorrect_id_type(async_client: AsyncClient) -> None:
-    """
-    Функция тестирует, что ID хранилища для удаления неверно.
-
-    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
-    :return: None
-    """
-
-    response = await async_client.delete(f"/api/v1/storage/distance/FAKE_ID/")
-    resp_data = response.json()
-
-    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
-    missing_name_error = next(
-        (
-            error
-            for error in resp_data["detail"]
-            if error["type"] == "int_parsing" and "distance_id" in error["loc"]
-        ),
-        None,
-    )
-    assert missing_name_error is not None
-    assert missing_name_error["msg"] == "Input should be a valid integer, unable to parse string as an integer"
+from unittest.mock import patch, AsyncMock
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.models.outbox import OutboxEvent
+from .factories import create_organisation, create_storage, create_distance
+
+
+############################# CREATE ###################################
+
+@pytest.mark.asyncio
+@patch("storage_app.api.send_storage_distance_created_event")
+async def test_create_storage_distance(mock_send_event: AsyncMock,
+                                       async_client: AsyncClient,
+                                       db_session: AsyncSession,
+                                       ):
+    """
+    Проверяется создание `StorageDistance`.
+
+    :param mock_send_event: Мок-функция для отправки события о создании `StorageDistance`.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания данных в тестах.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session)
+    storage = await create_storage(db_session,
+                                   name='Тест МНО',
+                                   location='Тверь',
+                                   capacity={"Пластик": [0, 60],
+                                             }
+                                   )
+
+    data = {"storage_id": storage.id, "organisation_id": organisation.id, "distance": 100}
+    response = await async_client.post("/api/v1/storage/distance/", json=data)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["distance"] == data["distance"]
+    mock_send_event.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_create_already_exist_storage_distance(async_client: AsyncClient,
+                                                     db_session: AsyncSession,
+                                                     ):
+    """
+    Проверяем, что не можем создать 2 одинаковых `StorageDistance`
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания данных в тестах.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session)
+    storage = await create_storage(db_session,
+                                   name='Тест МНО',
+                                   location='Тверь',
+                                   capacity={"Пластик": [0, 60]},
+                                   )
+
+    data = {"storage_id": storage.id, "organisation_id": organisation.id, "distance": 100}
+    await create_distance(db_session, **data)
+    response = await async_client.post("/api/v1/storage/distance/", json=data)
+    resp_data = response.json()
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert resp_data["detail"] == 'Такая запись уже существует'
+
+
+@pytest.mark.asyncio
+async def test_creat_storage_distance_without_organisation_id(async_client: AsyncClient) -> None:
+    """
+    Функция тестирует создание `StorageDistance` без указания `organisation_id`.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    data = {"storage_id": 1, "distance": 100}
+
+    response = await async_client.post("/api/v1/storage/distance/", json=data)
+    resp_data = response.json()
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    missing_organisation_id_error = next(
+        (
+            error
+            for error in resp_data["detail"]
+            if error["type"] == "missing" and "organisation_id" in error["loc"]
+        ),
+        None,
+    )
+    assert missing_organisation_id_error is not None
+    assert missing_organisation_id_error["msg"] == "Field required"
+
+
+@pytest.mark.asyncio
+async def test_creat_storage_distance_without_organisation(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Функция тестирует создание `StorageDistance`, когда организации с указанным id в БД нет.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    storage = await create_storage(db_session,
+                                   name='Тест МНО',
+                                   location='Тверь',
+                                   capacity={"Пластик": [0, 60]},
+                                   )
+
+    data = {"storage_id": storage.id, "organisation_id": 1, "distance": 100}
+
+    response = await async_client.post("/api/v1/storage/distance/", json=data)
+    resp_data = response.json()
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert resp_data["detail"] == 'Указанной организации не существует'
+
+
+@pytest.mark.asyncio
+async def test_creat_storage_distance_without_storage(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Функция тестирует создание `StorageDistance`, когда хранилища с указанным id в БД нет.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session)
+
+    data = {"storage_id": 1, "organisation_id": organisation.id, "distance": 100}
+
+    response = await async_client.post("/api/v1/storage/distance/", json=data)
+    resp_data = response.json()
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert resp_data["detail"] == 'Указанного хранилища не существует'
+
+
+@pytest.mark.asyncio
+async def test_creat_distance_with_incorrect_org_id_type(async_client: AsyncClient) -> None:
+    """
+    Функция тестирует что тип `organisation_id` неверен.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    data = {"storage_id": 1, "organisation_id": 'FAKE_ID', "distance": 100}
+
+    response = await async_client.post("/api/v1/storage/distance/", json=data)
+    resp_data = response.json()
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    missing_name_error = next(
+        (
+            error
+            for error in resp_data["detail"]
+            if error["type"] == "int_parsing" and "organisation_id" in error["loc"]
+        ),
+        None,
+    )
+    assert missing_name_error is not None
+    assert missing_name_error["msg"] == "Input should be a valid integer, unable to parse string as an integer"
+
+
+@pytest.mark.asyncio
+@patch("storage_app.api.send_storage_distances_created_event", autospec=True)
+async def test_create_storage_distances_in_bulk(mock_send_event: AsyncMock,
+                                                async_client: AsyncClient,
+                                                db_session: AsyncSession,
+                                                ) -> None:
+    """
+    Проверяем массовое создание расстояний и отказ, если одно из хранилищ не существует.
+
+    :param mock_send_event: Мок-функция для отправки пакетного события о создании расстояний.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания записей в тестах.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session)
+    storages = [await create_storage(db_session, name=f"МНО{i}", location="Москва", capacity={"Пластик": [0, 60]})
+                for i in range(3)]
+
+    data = [{"storage_id": storage.id, "organisation_id": organisation.id, "distance": 100 * (i + 1)}
+            for i, storage in enumerate(storages)]
+    response = await async_client.post("/api/v1/storage/distances/bulk/", json=data)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [distance["distance"] for distance in response.json()] == [100, 200, 300]
+    mock_send_event.assert_called_once()
+
+    response = await async_client.post("/api/v1/storage/distances/bulk/", json=[
+        {"storage_id": storages[0].id, "organisation_id": organisation.id, "distance": 50},
+        {"storage_id": 100, "organisation_id": organisation.id, "distance": 50},
+    ])
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Указанных хранилищ не существует: 100"
+    assert len((await async_client.get("/api/v1/storage/distances/")).json()) == 3
+
+
+############################# GET ###################################
+
+@pytest.mark.asyncio
+async def test_get_storage_distances(async_client: AsyncClient) -> None:
+    """
+    Функция проверяет правильность работы эндпоинта для получения списка всех `StorageDistance`.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    response = await async_client.get("/api/v1/storage/distances/")
+    assert response.status_code == status.HTTP_200_OK
+    assert isinstance(response.json(), list)
+
+
+@pytest.mark.asyncio
+async def test_get_storage_distances_fast_json(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем, что с `FAST_JSON` список расстояний совпадает с ответом, сериализованным через Pydantic.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания записей в тестах.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session)
+    storage = await create_storage(db_session, name="МНО1", location="Москва", capacity={"Пластик": [10, 60]})
+    await create_distance(db_session, storage.id, organisation.id, distance=100)
+
+    response = await async_client.get("/api/v1/storage/distances/")
+    with patch("storage_app.api.FAST_JSON", True), patch("storage_app.serialization.FAST_JSON", True):
+        fast_response = await async_client.get("/api/v1/storage/distances/")
+
+    assert fast_response.status_code == status.HTTP_200_OK
+    assert fast_response.json() == response.json()
+
+
+@pytest.mark.asyncio
+@patch("storage_app.api.send_storages_created_event", autospec=True)
+async def test_get_snapshot(mock_send_event: AsyncMock, async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем, что снимок сжат и содержит хранилища, расстояния и версию ленты изменений.
+
+    :param mock_send_event: Мок-функция для отправки пакетного события о создании хранилищ.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания записей в тестах.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session)
+    data = [{"name": f"МНО{i}", "location": "Москва", "capacity": {"Пластик": [0, 60]}} for i in range(2)]
+    data[0].update(latitude=55.75, longitude=37.62)
+    storages = (await async_client.post("/api/v1/storage/storages/bulk/", json=data)).json()
+    distance = await create_distance(db_session, storages[0]["id"], organisation.id, distance=100)
+
+    response = await async_client.get("/api/v1/storage/snapshot/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == {
+        "v": 1,
+        "version": 2,
+        "storages": [{"id": storage["id"], "capacity": {"Пластик": [0, 60]}, "version": i + 1,
+                      "latitude": storage["latitude"], "longitude": storage["longitude"], "capacity_updates": 0}
+                     for i, storage in enumerate(storages)],
+        "distances": [{"id": distance.id, "storage_id": storages[0]["id"], "organisation_id": organisation.id,
+                       "distance": 100}],
+    }
+
+
+############################# DELETE ###################################
+
+@pytest.mark.asyncio
+async def test_delete_empty_distance(async_client: AsyncClient) -> None:
+    """
+    Функция проверяет, что если нет расстояния, возвращается ошибка.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    response = await async_client.delete(f"/api/v1/storage/distance/1/")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response_json = response.json()
+    assert response_json["detail"] == "Не найдено расстояние между МНО и ОО для удаления"
+
+
+@pytest.mark.asyncio
+@patch("storage_app.api.send_distance_deleted_event", autospec=True)
+async def test_delete_distance(mock_send_event: AsyncMock,
+                               async_client: AsyncClient,
+                               db_session: AsyncSession,
+                               ) -> None:
+    """
+    Проверяем успешное удаление расстояния
+
+    :param mock_send_event: Мок-функция для отправки события об удалении всех организаций.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для создания организации в тестах.
+    :return: None
+    """
+
+    organisation = await create_organisation(db_session)
+    storage = await create_storage(db_session,
+                                   name='Тест МНО',
+                                   location='Тверь',
+                                   capacity={"Пластик": [0, 60],
+                                             }
+                                   )
+
+    data = {"storage_id": storage.id, "organisation_id": organisation.id, "distance": 100}
+    distance = await create_distance(db_session, **data)
+    response = await async_client.delete(f"/api/v1/storage/distance/{distance.id}/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["message"] == "Расстояние между ОО и МНО успешно удалено"
+    mock_send_event.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_delete_distances_bulk(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Проверяем массовое удаление расстояний по ID записей, хранилищ и организаций с одним пакетным событием
+    `distance_delete`.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    organisations = [await create_organisation(db_session) for _ in range(3)]
+    storages = [await create_storage(db_session, f"МНО{i}", "Тверь", {"Пластик": [0, 60]}) for i in range(3)]
+    distances = {
+        (storage.id, organisation.id): await create_distance(db_session, storage.id, organisation.id, distance=10)
+        for storage in storages for organisation in organisations
+    }
+    kept = distances[(storages[2].id, organisations[2].id)]
+    single = distances[(storages[2].id, organisations[1].id)]
+
+    response = await async_client.post("/api/v1/storage/distances/delete/", json={
+        "ids": [single.id, 404],
+        "storage_ids": [storages[0].id],
+        "organisation_ids": [organisations[0].id],
+    })
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"deleted": 6}
+    remaining = [item["id"] for item in (await async_client.get("/api/v1/storage/distances/")).json()]
+    assert remaining == [distances[(storages[1].id, organisations[1].id)].id,
+                         distances[(storages[1].id, organisations[2].id)].id,
+                         kept.id]
+
+    events = (await db_session.execute(select(OutboxEvent))).scalars().all()
+    assert [event.queue for event in events] == ["distance_delete"]
+    assert [item["id"] for item in events[0].payload["items"]] == sorted(
+        distance.id for distance in distances.values() if distance.id not in remaining
+    )
+
+
+@pytest.mark.asyncio
+async def test_delete_distance_with_incorrect_id_type(async_client: AsyncClient) -> None:
+    """
+    Функция тестирует, что ID хранилища для удаления неверно.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :return: None
+    """
+
+    response = await async_client.delete(f"/api/v1/storage/distance/FAKE_ID/")
+    resp_data = response.json()
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    missing_name_error = next(
+        (
+            error
+            for error in resp_data["detail"]
+            if error["type"] == "int_parsing" and "distance_id" in error["loc"]
+        ),
+        None,
+    )
+    assert missing_name_error is not None
+    assert missing_name_error["msg"] == "Input should be a valid integer, unable to parse string as an integer"
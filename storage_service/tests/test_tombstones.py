@@ -0,0 +1,97 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.crud.organisation import delete_organisation_by_id
+from storage_app.models.organisation import OrganisationCopy
+from storage_app.models.storage import Storage
+from storage_app.models.storage_distance import StorageDistance
+from storage_app.tombstones import purge_tombstones_batch
+from .factories import create_storage, create_distance
+
+
+async def count_distances(db_session: AsyncSession, storage_id: int) -> int:
+    """
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :param storage_id: ID хранилища.
+    :return: Количество строк расстояний до хранилища, включая ещё не удалённые в фоне.
+    """
+
+    result = await db_session.execute(select(StorageDistance.id).where(StorageDistance.storage_id == storage_id))
+
+    return len(result.all())
+
+
+@pytest.mark.asyncio
+async def test_delete_storage_purges_distances_in_background(async_client: AsyncClient,
+                                                             db_session: AsyncSession,
+                                                             ) -> None:
+    """
+    Проверяем, что удалённое хранилище сразу скрыто и освобождает имя, а его расстояния удаляются в фоне
+    пачками, после чего удаляется и само хранилище. Расстояния других хранилищ не затрагиваются.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    storage = await create_storage(db_session, "МНО1", "Москва", {"Пластик": [0, 60]})
+    other = await create_storage(db_session, "МНО2", "Казань", {"Пластик": [0, 60]})
+    await db_session.execute(insert(OrganisationCopy), [{"id": organisation_id} for organisation_id in range(1, 26)])
+    await db_session.execute(insert(StorageDistance), [
+        {"storage_id": storage.id, "organisation_id": organisation_id, "distance": organisation_id}
+        for organisation_id in range(1, 26)
+    ])
+    await db_session.commit()
+    kept = await create_distance(db_session, other.id, 1, distance=5)
+
+    response = await async_client.delete(f"/api/v1/storage/storage/{storage.id}/")
+    assert response.status_code == status.HTTP_200_OK
+
+    assert [item["id"] for item in (await async_client.get("/api/v1/storage/storages/")).json()] == [other.id]
+    assert [item["id"] for item in (await async_client.get("/api/v1/storage/distances/")).json()] == [kept.id]
+    response = await async_client.delete(f"/api/v1/storage/storage/{storage.id}/")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await async_client.post("/api/v1/storage/storage/",
+                                       json={"name": "МНО1", "location": "Москва", "capacity": {"Пластик": [0, 60]}})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["id"] not in (storage.id, other.id)
+
+    # Строки ещё в БД: 25 расстояний удаляются пачками по 10, затем удаляется хранилище
+    assert await count_distances(db_session, storage.id) == 25
+    assert [await purge_tombstones_batch(db_session, batch_size=10) for _ in range(5)] == [10, 10, 5, 1, 0]
+    assert await count_distances(db_session, storage.id) == 0
+    assert await db_session.get(Storage, storage.id, populate_existing=True) is None
+    assert await count_distances(db_session, other.id) == 1
+
+
+@pytest.mark.asyncio
+async def test_delete_organisation_copy_purges_distances_in_background(async_client: AsyncClient,
+                                                                      db_session: AsyncSession,
+                                                                      ) -> None:
+    """
+    Проверяем, что удалённая копия организации не принимает новые расстояния, а её расстояния удаляются в фоне.
+
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    storage = await create_storage(db_session, "МНО1", "Москва", {"Пластик": [0, 60]})
+    db_session.add(OrganisationCopy(id=1))
+    await db_session.commit()
+    await create_distance(db_session, storage.id, 1, distance=5)
+
+    await delete_organisation_by_id(db_session, 1)
+    assert await count_distances(db_session, storage.id) == 1
+    response = await async_client.post("/api/v1/storage/distance/",
+                                       json={"storage_id": storage.id, "organisation_id": 1, "distance": 7})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    while await purge_tombstones_batch(db_session):
+        pass
+
+    assert await count_distances(db_session, storage.id) == 0
+    assert await db_session.get(OrganisationCopy, 1, populate_existing=True) is None
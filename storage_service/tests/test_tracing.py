@@ -0,0 +1,120 @@
+from typing import Generator, List, Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from storage_app.events.codec import encode_event
+from storage_app.events.consumers.delivery import handle_delivery
+from storage_app.events.outbox import relay_outbox_batch
+from storage_app.events.producers import publish_events
+from storage_app.models.outbox import OutboxEvent
+from storage_app.tracing import (InMemorySpanExporter, Span, get_current_span, parse_traceparent, set_span_exporter,
+                                 setup_query_tracing)
+from .conftest import test_engine
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def span_exporter() -> Generator[InMemorySpanExporter, None, None]:
+    """
+    Включает трассировку с выгрузкой спанов в память на время теста.
+
+    :return: Получатель спанов
+    """
+
+    exporter = InMemorySpanExporter()
+    set_span_exporter(exporter)
+    setup_query_tracing(test_engine.sync_engine)
+    yield exporter
+    set_span_exporter(None)
+
+
+@pytest.mark.asyncio
+@patch("storage_app.events.outbox.publish_events")
+async def test_create_storage_trace(mock_publish: MagicMock,
+                                    span_exporter: InMemorySpanExporter,
+                                    async_client: AsyncClient,
+                                    db_session: AsyncSession,
+                                    ) -> None:
+    """
+    Проверяем, что запрос продолжает трассу из заголовка `traceparent`, запросы к БД записываются дочерними
+    спанами, а событие сохраняется в outbox с контекстом запроса и публикуется в той же трассе.
+
+    :param mock_publish: Мок-функция публикации пачки событий в RabbitMQ.
+    :param span_exporter: Получатель спанов в памяти.
+    :param async_client: Асинхронный клиент для выполнения HTTP-запросов.
+    :param db_session: Сессия базы данных для выполнения запросов.
+    :return: None
+    """
+
+    response = await async_client.post("/api/v1/storage/storage/",
+                                       json={"name": "МНО1", "location": "Москва", "capacity": {"Пластик": [0, 60]}},
+                                       headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"},
+                                       )
+    assert response.status_code == status.HTTP_200_OK
+
+    server = next(span for span in span_exporter.spans if span.kind == "server")
+    assert (server.name, server.context.trace_id, server.parent_id) == ("POST /storage/", TRACE_ID, PARENT_ID)
+    assert any(span.name == "db INSERT" and span.parent_id == server.context.span_id for span in span_exporter.spans)
+
+    event = (await db_session.execute(select(OutboxEvent))).scalars().one()
+    assert parse_traceparent(event.traceparent) == server.context
+
+    span_exporter.clear()
+    assert await relay_outbox_batch(db_session) == 1
+
+    publish = next(span for span in span_exporter.spans if span.kind == "producer")
+    assert (publish.name, publish.parent_id) == ("publish storage_created", server.context.span_id)
+    assert mock_publish.call_args.args[0][0][3] == publish.context.to_traceparent()
+
+
+@patch("pika.BlockingConnection")
+def test_publish_event_sets_traceparent_header(mock_connection: MagicMock) -> None:
+    """
+    Проверяем, что `traceparent` передаётся в заголовках сообщения.
+
+    :param mock_connection: Мок подключения к RabbitMQ.
+    :return: None
+    """
+
+    traceparent = f"00-{TRACE_ID}-{PARENT_ID}-01"
+    publish_events([("storage_delete", {"id": 1}, "event-1", traceparent)])
+
+    channel = mock_connection.return_value.channel.return_value
+    assert channel.basic_publish.call_args.kwargs["properties"].headers == {"traceparent": traceparent}
+
+
+def test_consumer_continues_publisher_trace(span_exporter: InMemorySpanExporter) -> None:
+    """
+    Проверяем, что обработка события об обновлении ёмкости записывается спаном трассы организации,
+    отправившей отходы: так видно полное время от запроса /recycle/ до обновления хранилища.
+
+    :param span_exporter: Получатель спанов в памяти.
+    :return: None
+    """
+
+    handler_spans: List[Optional[Span]] = []
+
+    async def process(*args) -> bool:
+        handler_spans.append(get_current_span())
+        return True
+
+    queue = "update_capacity"
+    body, content_type = encode_event(queue, {"id": 1, "capacity": {"Пластик": [10, 60]}}, event_id="event-1")
+    method = MagicMock(routing_key=queue, delivery_tag=1, redelivered=False)
+    properties = MagicMock(content_type=content_type, message_id="event-1",
+                           headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01".encode()})
+
+    with patch("storage_app.events.consumers.delivery.process_event_once", new=AsyncMock(side_effect=process)):
+        handle_delivery(MagicMock(), method, properties, body, AsyncMock())
+
+    consume, = span_exporter.spans
+    assert (consume.name, consume.kind) == ("consume update_capacity", "consumer")
+    assert (consume.context.trace_id, consume.parent_id) == (TRACE_ID, PARENT_ID)
+    assert handler_spans == [consume]